@@ -0,0 +1,206 @@
+"""
+Адаптивная выборка комментариев с досрочной остановкой.
+
+Для видео с тысячами комментариев релевантность нужна с точностью до
+нескольких процентов. Комментарии оцениваются порциями по убыванию лайков,
+после каждой порции пересчитывается взвешенная оценка с доверительным
+интервалом, и загрузка с анализом прекращаются, как только интервал
+становится уже допуска или вердикт уже не может измениться.
+"""
+import heapq
+import itertools
+import numpy as np
+from comment_batch import CommentBatch
+from video_evaluator import evaluate_arrays, relevance_verdict
+
+# Причины остановки, при которых оценены не все доступные комментарии
+EARLY_STOP_REASONS = ('converged', 'verdict')
+
+
+class AdaptiveSample:
+    """
+    Состояние адаптивной выборки одного видео.
+
+    Полученные страницы комментариев складываются в пул (без повторов текста),
+    из которого на анализ выдаются порции с наибольшим числом лайков. Новая
+    страница загружается, только когда пула не хватает на полную порцию,
+    поэтому порядок по лайкам соблюдается в пределах уже полученных страниц
+    (API отдаёт ветки по релевантности, которая близка к порядку по лайкам).
+    """
+
+    def __init__(self, sampler):
+        """
+        :param sampler: Настройки выборки (AdaptiveSampler).
+        """
+        self.sampler = sampler
+        self.pages = 0
+        self.fetched = 0
+        self.used = 0
+        self.exhausted = False  # Страниц больше нет (или закончился бюджет квоты)
+        self.stop_reason = None
+        self.estimate = None
+        self._pool = []
+        self._seen_texts = set()
+        self._order = itertools.count()
+        self._batches = []
+
+    @property
+    def done(self):
+        """Выборка завершена."""
+        return self.stop_reason is not None
+
+    def add_page(self, comments):
+        """
+        Добавляет страницу комментариев в пул.
+
+        :param comments: Список словарей комментариев ('text', 'likeCount').
+        """
+        self.pages += 1
+        for comment in comments:
+            if comment['text'] in self._seen_texts:
+                continue
+            self._seen_texts.add(comment['text'])
+            self.fetched += 1
+            heapq.heappush(self._pool, (-comment['likeCount'], next(self._order), comment))
+
+    def needs_page(self):
+        """Проверяет, нужно ли загрузить следующую страницу перед выдачей порции."""
+        return not self.done and not self.exhausted and len(self._pool) < self.sampler.batch_size
+
+    def next_batch(self):
+        """
+        Выдаёт следующую порцию комментариев с наибольшим числом лайков.
+
+        Если пул пуст, выборка завершается с причиной 'exhausted'.
+
+        :return: Набор комментариев (CommentBatch) или None.
+        """
+        if self.done:
+            return None
+        size = min(self.sampler.batch_size, self.sampler.max_comments - self.used)
+        comments = [heapq.heappop(self._pool)[2] for _ in range(min(size, len(self._pool)))]
+        if not comments:
+            self.stop_reason = 'exhausted'
+            return None
+        return CommentBatch.from_comments(comments)
+
+    def record(self, batch):
+        """
+        Учитывает проанализированную порцию и проверяет условие остановки.
+
+        :param batch: Порция с оценками тональности (CommentBatch).
+        """
+        self._batches.append(batch)
+        self.used += len(batch)
+        self.estimate = evaluate_arrays(
+            np.concatenate([b.stars for b in self._batches]),
+            np.concatenate([b.likes for b in self._batches]),
+            np.concatenate([b.scores for b in self._batches]),
+            weighting=self.sampler.weighting, z=self.sampler.z
+        )
+        self.stop_reason = self.sampler.stop_reason(self.estimate, self.used)
+
+    def margin(self):
+        """Полуширина текущего доверительного интервала в процентных пунктах."""
+        if self.estimate is None:
+            return 100.0
+        low, high = self.estimate['confidence_interval']
+        return (high - low) / 2
+
+    def comments(self):
+        """Проанализированные комментарии в порядке анализа (список словарей)."""
+        return [comment for batch in self._batches for comment in batch.to_comments()]
+
+    def result(self):
+        """
+        Итоговая оценка по проанализированным комментариям.
+
+        :return: Словарь evaluate_arrays с полями 'comments_used', 'comments_fetched',
+                 'pages' и 'stop_reason'.
+        """
+        evaluation = dict(self.estimate) if self.estimate is not None else evaluate_arrays([], [])
+        evaluation.update(
+            comments_used=self.used,
+            comments_fetched=self.fetched,
+            pages=self.pages,
+            stop_reason=self.stop_reason or 'exhausted',
+        )
+        return evaluation
+
+
+class AdaptiveSampler:
+    """
+    Настройки адаптивной выборки и правило остановки.
+
+    Выборка останавливается, когда оценено не меньше min_comments комментариев и
+    полуширина доверительного интервала не больше tolerance ('converged') или
+    оба конца интервала дают один вердикт ('verdict'); а также по достижении
+    max_comments ('limit') или когда комментарии закончились ('exhausted').
+
+    Комментарии идут по убыванию лайков, а не случайно, поэтому интервал
+    описывает разброс оценок среди уже учтённых комментариев; min_comments
+    защищает от остановки на первых однородных порциях.
+    """
+
+    def __init__(self, tolerance=3.0, batch_size=25, min_comments=50, max_comments=2000, weighting='linear', z=1.96):
+        """
+        :param tolerance: Допуск: полуширина доверительного интервала в процентных пунктах.
+        :param batch_size: Размер порции анализа.
+        :param min_comments: Минимальное количество комментариев до проверки условия остановки.
+        :param max_comments: Максимальное количество анализируемых комментариев.
+        :param weighting: Стратегия взвешивания комментариев (см. VideoEvaluator).
+        :param z: Квантиль нормального распределения для доверительного интервала.
+        """
+        self.tolerance = tolerance
+        self.batch_size = batch_size
+        self.min_comments = min_comments
+        self.max_comments = max_comments
+        self.weighting = weighting
+        self.z = z
+
+    def start(self):
+        """Начинает выборку для одного видео."""
+        return AdaptiveSample(self)
+
+    def stop_reason(self, estimate, used):
+        """
+        Проверяет условие остановки.
+
+        :param estimate: Текущая оценка (словарь evaluate_arrays).
+        :param used: Количество оценённых комментариев.
+        :return: Причина остановки или None.
+        """
+        if used >= self.max_comments:
+            return 'limit'
+        if used < self.min_comments:
+            return None
+        low, high = estimate['confidence_interval']
+        if (high - low) / 2 <= self.tolerance:
+            return 'converged'
+        if relevance_verdict(round(low)) == relevance_verdict(round(high)):
+            return 'verdict'
+        return None
+
+    def run(self, pages, score):
+        """
+        Выполняет выборку синхронно.
+
+        :param pages: Итератор страниц комментариев (списков словарей); следующая
+                      страница запрашивается только при необходимости.
+        :param score: Функция, сохраняющая оценки тональности в порции (CommentBatch) и возвращающая её.
+        :return: Завершённая выборка (AdaptiveSample).
+        """
+        sample = self.start()
+        pages = iter(pages)
+        while not sample.done:
+            if sample.needs_page():
+                page = next(pages, None)
+                if page is None:
+                    sample.exhausted = True
+                else:
+                    sample.add_page(page)
+                continue
+            batch = sample.next_batch()
+            if batch is not None:
+                sample.record(score(batch))
+        return sample
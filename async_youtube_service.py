@@ -0,0 +1,323 @@
+import asyncio
+import logging
+import time
+import httpx
+from comment_batch import CommentBatch
+from youtube_service import (
+    COMMENT_THREADS_PAGE_SIZE, QUOTA_COSTS, TopKSelector, WatermarkCollector, default_quota_budget, parse_comment,
+    parse_thread
+)
+from quota_manager import QuotaManager, ApiError, parse_error_reason
+from metrics import observe_api_request
+
+logger = logging.getLogger(__name__)
+
+API_BASE_URL = 'https://www.googleapis.com/youtube/v3'
+
+# Бюджет по умолчанию на догрузку веток ответов: единиц comments.list на страницу commentThreads
+REPLY_UNITS_PER_PAGE = 5
+
+
+class AsyncYouTubeService:
+    """
+    Асинхронный клиент YouTube Data API для конкурентного получения комментариев.
+
+    Использует общий пул HTTP-соединений (httpx.AsyncClient). Запрос следующей
+    страницы commentThreads отправляется сразу после получения текущей, а полные
+    ветки ответов, усечённые в поле replies, загружаются через comments.list
+    параллельно с ограничением количества одновременных запросов.
+    Экземпляр должен использоваться в одном цикле событий.
+    """
+
+    def __init__(self, api_key, base_url=API_BASE_URL, max_concurrency=8, timeout=30.0, transport=None,
+                 quota_manager=None):
+        """
+        Инициализация клиента.
+
+        :param api_key: API ключ для доступа к YouTube Data API.
+        :param base_url: Базовый адрес API (для тестов — адрес локальной заглушки).
+        :param max_concurrency: Максимальное количество одновременных запросов к API.
+        :param timeout: Таймаут запроса, секунд.
+        :param transport: Транспорт httpx (для тестов).
+        :param quota_manager: Менеджер квоты с пулом ключей (QuotaManager); по умолчанию — для одного api_key.
+        """
+        self.api_key = api_key
+        self.quota = quota_manager or QuotaManager([api_key])
+        self.max_concurrency = max_concurrency
+        self._semaphore = None
+        self._client = httpx.AsyncClient(
+            base_url=base_url.rstrip('/'),
+            timeout=timeout,
+            limits=httpx.Limits(max_connections=max_concurrency, max_keepalive_connections=max_concurrency),
+            transport=transport
+        )
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
+
+    async def aclose(self):
+        """Закрывает пул соединений."""
+        await self._client.aclose()
+
+    async def get_comments(self, video_id, max_results=100, max_quota_units=None, stable_pages=1,
+                           max_reply_quota_units=None):
+        """
+        Получение комментариев к видео, включая полные ветки ответов, отсортированных по убыванию лайков.
+
+        :param video_id: Идентификатор видео на YouTube.
+        :param max_results: Количество комментариев для возвращения после обработки.
+        :param max_quota_units: Бюджет единиц квоты API на страницы commentThreads;
+                                по умолчанию — default_quota_budget(max_results).
+        :param stable_pages: Сколько страниц подряд не должны менять отбор, чтобы прекратить загрузку.
+        :param max_reply_quota_units: Отдельный бюджет на догрузку веток ответов (comments.list);
+                                      по умолчанию — REPLY_UNITS_PER_PAGE на каждую страницу бюджета.
+        :return: Список словарей с комментариями и их метаданными (как у YouTubeService.get_comments).
+        """
+        comments, _ = await self.get_comments_with_stats(
+            video_id, max_results, max_quota_units, stable_pages, max_reply_quota_units
+        )
+        return comments
+
+    async def get_comment_batch(self, video_id, max_results=100, max_quota_units=None, stable_pages=1,
+                                max_reply_quota_units=None):
+        """
+        Получение комментариев к видео в столбцовом представлении.
+
+        :return: Набор комментариев (CommentBatch) по убыванию лайков.
+        """
+        comments, _ = await self.get_comments_with_stats(
+            video_id, max_results, max_quota_units, stable_pages, max_reply_quota_units
+        )
+        return CommentBatch.from_comments(comments)
+
+    async def get_comments_with_stats(self, video_id, max_results=100, max_quota_units=None, stable_pages=1,
+                                      max_reply_quota_units=None):
+        """
+        Получение комментариев вместе со статистикой загрузки.
+
+        Решение о загрузке следующей страницы принимается по комментариям
+        страницы и её встроенным ответам; полные ветки ответов догружаются
+        параллельно и учитываются в отборе по завершении. У страниц и веток
+        ответов раздельные бюджеты квоты, поэтому малый бюджет на страницы
+        не отключает догрузку ответов.
+
+        :return: Пара (список комментариев, словарь статистики с потраченными единицами квоты).
+        """
+        if max_quota_units is None:
+            max_quota_units = default_quota_budget(max_results)
+        max_results, max_quota_units, degraded = self.quota.plan(max_results, max_quota_units)
+        if max_reply_quota_units is None:
+            max_reply_quota_units = REPLY_UNITS_PER_PAGE * max_quota_units
+        selector = TopKSelector(max_results)
+        stats = {
+            'pages': 0, 'reply_threads': 0, 'truncated_reply_threads': 0, 'quota_units': 0, 'reply_quota_units': 0,
+            'comments_seen': 0, 'stop_reason': 'exhausted', 'degraded': degraded
+        }
+        reply_tasks = []
+        unchanged_pages = 0
+
+        params = {
+            'part': 'snippet,replies',
+            'videoId': video_id,
+            'maxResults': COMMENT_THREADS_PAGE_SIZE,
+            'textFormat': 'plainText',
+            'order': 'relevance'
+        }
+        page = asyncio.create_task(self._request('commentThreads', params, stats, video_id))
+        try:
+            while page is not None:
+                response = await page
+                stats['pages'] += 1
+                items = response.get('items', [])
+
+                changed = False
+                for item in items:
+                    for comment in parse_thread(item):
+                        stats['comments_seen'] += 1
+                        changed = selector.add(comment) or changed
+                unchanged_pages = 0 if changed else unchanged_pages + 1
+
+                # Следующая страница запрашивается до загрузки веток ответов текущей
+                page = None
+                next_page_token = response.get('nextPageToken')
+                if len(selector) >= max_results and unchanged_pages >= stable_pages:
+                    stats['stop_reason'] = 'stable'
+                elif next_page_token and (stats['pages'] + 1) * QUOTA_COSTS['commentThreads.list'] <= max_quota_units:
+                    page = asyncio.create_task(
+                        self._request('commentThreads', {**params, 'pageToken': next_page_token}, stats, video_id)
+                    )
+                elif next_page_token:
+                    stats['stop_reason'] = 'budget'
+
+                for item in items:
+                    if self._is_truncated(item) and self._reserve_reply_page(stats, max_reply_quota_units):
+                        reply_tasks.append(asyncio.create_task(
+                            self._fetch_replies(item['id'], stats, video_id, max_reply_quota_units)
+                        ))
+
+            for replies in await asyncio.gather(*reply_tasks):
+                for comment in replies:
+                    stats['comments_seen'] += 1
+                    selector.add(comment)
+        except BaseException:
+            for task in [page, *reply_tasks]:
+                if task is not None:
+                    task.cancel()
+            raise
+
+        stats['reply_threads'] = len(reply_tasks)
+        comments = selector.result()
+        stats['returned'] = len(comments)
+        logger.info(f"Комментарии к {video_id}: {stats}")
+        return comments, stats
+
+    async def iter_comment_pages(self, video_id, max_quota_units=50):
+        """
+        Постраничное получение комментариев для адаптивной выборки.
+
+        Учитываются ответы, встроенные в страницу; полные ветки ответов не
+        догружаются. Следующая страница запрашивается только по запросу потребителя.
+
+        :return: Асинхронный генератор списков словарей комментариев (как у YouTubeService.iter_comment_pages).
+        """
+        _, max_quota_units, _ = self.quota.plan(0, max_quota_units)
+        stats = {'quota_units': 0}
+        params = {
+            'part': 'snippet,replies',
+            'videoId': video_id,
+            'maxResults': COMMENT_THREADS_PAGE_SIZE,
+            'textFormat': 'plainText',
+            'order': 'relevance'
+        }
+        while params and stats['quota_units'] + QUOTA_COSTS['commentThreads.list'] <= max_quota_units:
+            response = await self._request('commentThreads', params, stats, video_id)
+            yield [comment for item in response.get('items', []) for comment in parse_thread(item)]
+
+            next_page_token = response.get('nextPageToken')
+            params = {**params, 'pageToken': next_page_token} if next_page_token else None
+
+    async def get_playlist_video_ids(self, playlist_id, max_results=50):
+        """
+        Получение идентификаторов видео плейлиста в порядке плейлиста.
+
+        :return: Список идентификаторов видео (как у YouTubeService.get_playlist_video_ids).
+        """
+        stats = {'quota_units': 0}
+        params = {'part': 'contentDetails', 'playlistId': playlist_id, 'maxResults': min(max_results, 50)}
+        video_ids = []
+        while params and len(video_ids) < max_results:
+            response = await self._request('playlistItems', params, stats, None)
+            video_ids.extend(item['contentDetails']['videoId'] for item in response.get('items', []))
+
+            next_page_token = response.get('nextPageToken')
+            params = {**params, 'pageToken': next_page_token} if next_page_token else None
+        return video_ids[:max_results]
+
+    async def get_comments_since(self, video_id, watermark=None, max_results=500, max_quota_units=10):
+        """
+        Получение комментариев, опубликованных после отметки, от новых к старым.
+
+        :return: Пара (список записей комментариев с 'id' и 'updatedAt', словарь статистики)
+                 (как у YouTubeService.get_comments_since).
+        """
+        collector = WatermarkCollector(watermark, max_results)
+        stats = {'pages': 0, 'quota_units': 0, 'stop_reason': 'exhausted'}
+        params = {
+            'part': 'snippet,replies',
+            'videoId': video_id,
+            'maxResults': COMMENT_THREADS_PAGE_SIZE,
+            'textFormat': 'plainText',
+            'order': 'time'
+        }
+
+        # Следующая страница зависит от того, достигнута ли отметка, поэтому страницы загружаются последовательно
+        while params:
+            if stats['quota_units'] + QUOTA_COSTS['commentThreads.list'] > max_quota_units:
+                stats['stop_reason'] = 'budget'
+                break
+
+            response = await self._request('commentThreads', params, stats, video_id)
+            stats['pages'] += 1
+
+            if not collector.add_page(response.get('items', [])):
+                stats['stop_reason'] = 'watermark' if collector.reached_watermark else 'limit'
+                break
+
+            next_page_token = response.get('nextPageToken')
+            params = {**params, 'pageToken': next_page_token} if next_page_token else None
+
+        stats['returned'] = len(collector.records)
+        logger.info(f"Новые комментарии к {video_id}: {stats}")
+        return collector.records, stats
+
+    @staticmethod
+    def _reserve_reply_page(stats, max_reply_quota_units):
+        """
+        Резервирует бюджет на страницу ответов ветки.
+
+        Бюджет резервируется до отправки запроса, поэтому одновременно
+        загружаемые ветки вместе не выходят за max_reply_quota_units.
+
+        :return: True, если бюджет на страницу есть.
+        """
+        cost = QUOTA_COSTS['comments.list']
+        if stats['reply_quota_units'] + cost > max_reply_quota_units:
+            return False
+        stats['reply_quota_units'] += cost
+        return True
+
+    @staticmethod
+    def _is_truncated(item):
+        """Проверяет, содержит ли поле replies не все ответы ветки."""
+        inline_replies = len(item.get('replies', {}).get('comments', []))
+        return item['snippet'].get('totalReplyCount', 0) > inline_replies
+
+    async def _fetch_replies(self, thread_id, stats, video_id, max_reply_quota_units):
+        """
+        Загружает ответы ветки комментариев; бюджет на первую страницу уже зарезервирован.
+
+        Каждая следующая страница ответов запрашивается только при остатке
+        бюджета, поэтому большая ветка не выходит за max_reply_quota_units.
+        """
+        params = {
+            'part': 'snippet',
+            'parentId': thread_id,
+            'maxResults': 100,
+            'textFormat': 'plainText'
+        }
+        replies = []
+        while True:
+            response = await self._request('comments', params, stats, video_id)
+            replies.extend(parse_comment(reply) for reply in response.get('items', []))
+            next_page_token = response.get('nextPageToken')
+            if not next_page_token:
+                return replies
+            if not self._reserve_reply_page(stats, max_reply_quota_units):
+                stats['truncated_reply_threads'] += 1
+                return replies
+            params = {**params, 'pageToken': next_page_token}
+
+    async def _request(self, resource, params, stats, video_id):
+        """
+        Выполняет GET-запрос к ресурсу API с ограничением параллелизма и учётом квоты.
+
+        Повторы временных ошибок и переключение ключей выполняет менеджер квоты.
+        """
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def send(key):
+            async with self._semaphore:
+                started = time.perf_counter()
+                response = await self._client.get(f'/{resource}', params={**params, 'key': key})
+                observe_api_request(resource, response.status_code, time.perf_counter() - started)
+            if response.is_error:
+                raise ApiError(response.status_code, parse_error_reason(response.content), response.reason_phrase)
+            return response.json()
+
+        cost = QUOTA_COSTS[f'{resource}.list']
+        stats['quota_units'] += cost
+        return await self.quota.execute_async(send, cost, video_id)
@@ -0,0 +1,452 @@
+"""
+Калибровка потоков моделей, количества воркеров и размера порции на текущей машине.
+
+Потоки PyTorch внутри вызова модели, количество одновременных анализов
+(воркеров) и размер порции конвейера влияют друг на друга: по умолчанию
+каждый вызов модели занимает все ядра, и одновременные запросы конкурируют
+за процессор. Калибровка перебирает конфигурации на представительном наборе
+комментариев, замеряет пропускную способность и задержки и сохраняет
+лучшую конфигурацию в профиль, который бот загружает при запуске.
+
+Запуск: python autotune.py [--threads 1 2 4] [--workers 1 2 4] [--batch-sizes 5 10 20]
+                           [--comments comments.txt] [--output cache/inference_profile.json]
+"""
+import argparse
+import itertools
+import json
+import logging
+import os
+import platform
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from comment_batch import CommentBatch
+from language_detector import LanguageDetector, route_batch
+from streaming_pipeline import stream_analysis
+
+logger = logging.getLogger(__name__)
+
+PROFILE_VERSION = 1
+DEFAULT_PROFILE_PATH = 'cache/inference_profile.json'
+
+# Конфигурация бота без профиля: потоки библиотеки, WorkerPool(max_workers=2), TelegramBot.STREAM_BATCH_SIZE
+BASELINE_WORKERS = 2
+BASELINE_BATCH_SIZE = 32
+
+
+class InferenceProfile:
+    """
+    Профиль инференса для конкретной машины: результат калибровки.
+
+    Содержит выбранные настройки и все замеры, по которым они выбраны.
+    """
+
+    def __init__(self, threads=None, workers=None, batch_size=None, backend=None, host=None,
+                 measurements=(), created_at=None):
+        """
+        :param threads: Количество потоков на вызов модели; None — значение библиотеки.
+        :param workers: Количество одновременных анализов (размер пула воркеров).
+        :param batch_size: Размер порции комментариев конвейера перевод -> тональность.
+        :param backend: Бэкенд инференса, на котором выполнена калибровка.
+        :param host: Описание машины (см. host_info).
+        :param measurements: Замеры конфигураций (см. measure_pipeline).
+        :param created_at: Время калибровки (ISO 8601).
+        """
+        self.threads = threads
+        self.workers = workers
+        self.batch_size = batch_size
+        self.backend = backend
+        self.host = host or {}
+        self.measurements = list(measurements)
+        self.created_at = created_at
+
+    def __repr__(self):
+        return f'InferenceProfile(threads={self.threads}, workers={self.workers}, batch_size={self.batch_size})'
+
+    def to_dict(self):
+        """Профиль в виде JSON-сериализуемого словаря."""
+        return {
+            'version': PROFILE_VERSION,
+            'created_at': self.created_at,
+            'backend': self.backend,
+            'host': self.host,
+            'settings': {'threads': self.threads, 'workers': self.workers, 'batch_size': self.batch_size},
+            'measurements': self.measurements,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        """
+        Создаёт профиль из словаря (см. to_dict).
+
+        :raises ValueError: Если версия формата профиля не поддерживается.
+        """
+        if data.get('version') != PROFILE_VERSION:
+            raise ValueError(f"Неподдерживаемая версия профиля: {data.get('version')}")
+        settings = data['settings']
+        return cls(
+            threads=settings.get('threads'), workers=settings.get('workers'), batch_size=settings.get('batch_size'),
+            backend=data.get('backend'), host=data.get('host'), measurements=data.get('measurements', ()),
+            created_at=data.get('created_at')
+        )
+
+    def save(self, path):
+        """Сохраняет профиль в JSON-файл (запись через временный файл)."""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temporary = f'{path}.tmp'
+        with open(temporary, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False, indent=2)
+        os.replace(temporary, path)
+
+    @classmethod
+    def load(cls, path, backend=None):
+        """
+        Загружает профиль, если он есть.
+
+        Профиль другой машины или другого бэкенда применяется с предупреждением:
+        лучше откалибровать заново.
+
+        :param path: Путь к JSON-файлу профиля.
+        :param backend: Бэкенд инференса бота (для проверки соответствия профилю).
+        :return: Профиль или None, если файла нет или он повреждён.
+        """
+        if not path or not os.path.exists(path):
+            return None
+        try:
+            with open(path, encoding='utf-8') as f:
+                profile = cls.from_dict(json.load(f))
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"Профиль инференса {path} не загружен: {e}")
+            return None
+
+        if profile.host.get('cpu_count') != os.cpu_count():
+            logger.warning(
+                f"Профиль инференса откалиброван на машине с {profile.host.get('cpu_count')} ядрами, "
+                f"а здесь {os.cpu_count()}: запустите python autotune.py заново"
+            )
+        if backend is not None and profile.backend not in (None, backend):
+            logger.warning(f"Профиль инференса откалиброван для бэкенда {profile.backend}, а используется {backend}")
+        logger.info(f"Загружен профиль инференса {path}: {profile}")
+        return profile
+
+
+def host_info():
+    """Описание машины для сопоставления профиля."""
+    return {
+        'cpu_count': os.cpu_count(),
+        'platform': platform.platform(),
+        'processor': platform.processor() or platform.machine(),
+        'python': platform.python_version(),
+    }
+
+
+def powers_of_two(limit):
+    """Степени двойки от 1 до limit включительно (и сам limit)."""
+    values = [1 << i for i in range(limit.bit_length()) if 1 << i <= limit]
+    if values[-1] != limit:
+        values.append(limit)
+    return values
+
+
+def candidate_grid(threads, workers, batch_sizes, cpu_count, oversubscribe=False):
+    """
+    Конфигурации для перебора.
+
+    :param threads: Варианты количества потоков на вызов модели.
+    :param workers: Варианты количества воркеров.
+    :param batch_sizes: Варианты размера порции.
+    :param cpu_count: Количество ядер.
+    :param oversubscribe: Перебирать и конфигурации, где потоков всех воркеров больше, чем ядер.
+    :return: Список троек (threads, workers, batch_size), сгруппированный по threads.
+    """
+    return [
+        (thread_count, worker_count, batch_size)
+        for thread_count in threads
+        for worker_count in workers
+        for batch_size in batch_sizes
+        if oversubscribe or thread_count * worker_count <= cpu_count
+    ]
+
+
+def request_batch(texts, index, size):
+    """Комментарии запроса с номером index: следующие size текстов набора по кругу."""
+    start = index * size
+    return CommentBatch([texts[(start + i) % len(texts)] for i in range(size)])
+
+
+def measure_pipeline(route, translate, analyze, texts, workers, batch_size, requests=16, comments_per_request=20):
+    """
+    Замеряет конвейер анализа при workers одновременных запросах.
+
+    Каждый из workers потоков выполняет запросы подряд, пока не будет выполнено
+    requests запросов. Запрос — перевод и анализ тональности comments_per_request
+    комментариев порциями по batch_size, как при анализе одного видео ботом.
+
+    :param route: Функция маршрутизации перевода (см. streaming_pipeline.translation_stage).
+    :param translate: Функция перевода порции.
+    :param analyze: Функция анализа тональности порции.
+    :param texts: Представительный набор текстов комментариев.
+    :return: Словарь с пропускной способностью (видео и комментариев в секунду) и задержками, мс:
+             полного запроса (p50, p95) и до первой обработанной порции (p50).
+    """
+    counter = itertools.count()
+    latencies, first_batches = [], []
+    lock = threading.Lock()
+
+    def client():
+        while True:
+            with lock:
+                index = next(counter)
+            if index >= requests:
+                return
+            comments = request_batch(texts, index, comments_per_request)
+            started = time.perf_counter()
+            first_batch = None
+            for _ in stream_analysis(comments, route, translate, analyze, batch_size=batch_size):
+                if first_batch is None:
+                    first_batch = time.perf_counter() - started
+            latency = time.perf_counter() - started
+            with lock:
+                latencies.append(latency)
+                first_batches.append(first_batch)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for future in [executor.submit(client) for _ in range(workers)]:
+            future.result()
+    duration = time.perf_counter() - started
+
+    latencies_ms = np.asarray(latencies) * 1000
+    p50, p95 = np.percentile(latencies_ms, [50, 95])
+    return {
+        'workers': workers,
+        'batch_size': batch_size,
+        'requests': requests,
+        'duration': duration,
+        'videos_per_second': requests / duration,
+        'comments_per_second': requests * comments_per_request / duration,
+        'latency_p50_ms': float(p50),
+        'latency_p95_ms': float(p95),
+        'first_batch_p50_ms': float(np.percentile(np.asarray(first_batches) * 1000, 50)),
+    }
+
+
+def calibrate(load_models, texts, grid, requests=16, comments_per_request=20, on_measurement=None):
+    """
+    Замеряет конфигурации на текущей машине.
+
+    :param load_models: Функция (threads) -> (переводчик, анализатор тональности), настроенные
+        на заданное количество потоков (None — значение библиотеки).
+    :param texts: Представительный набор текстов комментариев.
+    :param grid: Конфигурации: тройки (threads, workers, batch_size).
+    :param requests: Количество запросов на замер.
+    :param comments_per_request: Количество комментариев в запросе.
+    :param on_measurement: Функция, вызываемая с каждым замером (для вывода хода калибровки).
+    :return: Список замеров (см. measure_pipeline) с полем 'threads'.
+    """
+    detector = LanguageDetector()
+    measurements = []
+    # Модели перезагружаются только при смене количества потоков
+    for threads, configs in itertools.groupby(grid, key=lambda config: config[0]):
+        translator, sentiment_analyzer = load_models(threads)
+
+        def route(batch):
+            return route_batch(batch, detector, multilingual=sentiment_analyzer.multilingual)
+
+        for _, workers, batch_size in configs:
+            # Прогрев: первый вызов после смены потоков создаёт пул потоков библиотеки
+            measure_pipeline(
+                route, translator.translate_batch, sentiment_analyzer.analyze_batch, texts,
+                workers=1, batch_size=batch_size, requests=1, comments_per_request=batch_size
+            )
+            measurement = measure_pipeline(
+                route, translator.translate_batch, sentiment_analyzer.analyze_batch, texts,
+                workers, batch_size, requests, comments_per_request
+            )
+            measurement = {'threads': threads, **measurement}
+            measurements.append(measurement)
+            if on_measurement is not None:
+                on_measurement(measurement)
+    return measurements
+
+
+def pareto_front(measurements):
+    """
+    Замеры, которые нельзя улучшить по пропускной способности, не ухудшив задержку p95.
+
+    :return: Список замеров по убыванию пропускной способности.
+    """
+    front = []
+    for measurement in measurements:
+        dominated = any(
+            other['videos_per_second'] >= measurement['videos_per_second']
+            and other['latency_p95_ms'] <= measurement['latency_p95_ms']
+            and (other['videos_per_second'] > measurement['videos_per_second']
+                 or other['latency_p95_ms'] < measurement['latency_p95_ms'])
+            for other in measurements
+        )
+        if not dominated:
+            front.append(measurement)
+    return sorted(front, key=lambda measurement: measurement['videos_per_second'], reverse=True)
+
+
+def choose(measurements, latency_slack=1.5, max_latency_ms=None):
+    """
+    Выбирает конфигурацию с наибольшей пропускной способностью при допустимой задержке.
+
+    :param measurements: Замеры конфигураций.
+    :param latency_slack: Во сколько раз задержка p95 может превышать наименьшую среди замеров.
+    :param max_latency_ms: Предельная задержка p95, мс; если задана, latency_slack не учитывается.
+    :return: Выбранный замер (если ни один не укладывается в предел — с наименьшей задержкой).
+    """
+    if max_latency_ms is None:
+        max_latency_ms = min(measurement['latency_p95_ms'] for measurement in measurements) * latency_slack
+    allowed = [measurement for measurement in measurements if measurement['latency_p95_ms'] <= max_latency_ms]
+    if not allowed:
+        return min(measurements, key=lambda measurement: measurement['latency_p95_ms'])
+    return max(allowed, key=lambda measurement: measurement['videos_per_second'])
+
+
+def format_report(measurements, chosen, baseline=None):
+    """
+    Таблица замеров по убыванию пропускной способности.
+
+    :param measurements: Замеры конфигураций.
+    :param chosen: Выбранный замер.
+    :param baseline: Замер конфигурации по умолчанию (для сравнения).
+    :return: Список строк.
+    """
+    front = pareto_front(measurements)
+    lines = [
+        f"{'':2}{'потоков':>8} {'воркеров':>9} {'порция':>7} {'видео/с':>8} {'комм./с':>8} "
+        f"{'p50, мс':>8} {'p95, мс':>8} {'1-я порция, мс':>15}"
+    ]
+    for measurement in sorted(measurements, key=lambda measurement: measurement['videos_per_second'], reverse=True):
+        marker = '->' if measurement is chosen else ('* ' if measurement in front else '  ')
+        threads = measurement['threads'] if measurement['threads'] is not None else '—'
+        lines.append(
+            f"{marker}{threads:>8} {measurement['workers']:>9} {measurement['batch_size']:>7} "
+            f"{measurement['videos_per_second']:>8.2f} {measurement['comments_per_second']:>8.1f} "
+            f"{measurement['latency_p50_ms']:>8.0f} {measurement['latency_p95_ms']:>8.0f} "
+            f"{measurement['first_batch_p50_ms']:>15.0f}"
+        )
+    lines.append('-> выбранная конфигурация, * — лучшие компромиссы пропускной способности и задержки, '
+                 '— потоков: значение библиотеки')
+    if baseline is not None:
+        lines.append(
+            f"По сравнению с конфигурацией по умолчанию: пропускная способность "
+            f"×{chosen['videos_per_second'] / baseline['videos_per_second']:.2f}, задержка p95 "
+            f"×{chosen['latency_p95_ms'] / baseline['latency_p95_ms']:.2f}"
+        )
+    return lines
+
+
+def model_loader(backend):
+    """
+    Загрузчик моделей для калибровки: (threads) -> (переводчик, анализатор тональности).
+
+    Модели PyTorch загружаются один раз, количество потоков меняется на лету;
+    сессии ONNX Runtime создаются заново для каждого количества потоков.
+    Кеш результатов по комментариям не используется, чтобы замерять сами модели.
+    """
+    # Импорт transformers и torch занимает секунды, поэтому выполняется только при калибровке
+    import torch
+    from inference_backends import TRANSFORMERS, set_num_threads
+    from translator import Translator
+    from sentiment_analyzer import SentimentAnalyzer
+
+    library_threads = torch.get_num_threads()
+    loaded = {}
+
+    def load(threads):
+        key = None if backend == TRANSFORMERS else threads
+        if key not in loaded:
+            loaded.clear()
+            loaded[key] = (
+                Translator(backend=backend, num_threads=threads),
+                SentimentAnalyzer(backend=backend, num_threads=threads)
+            )
+        if backend == TRANSFORMERS:
+            set_num_threads(threads or library_threads)
+        return loaded[key]
+
+    return load
+
+
+def read_texts(path):
+    """Читает тексты комментариев: по одному на строку, пустые строки пропускаются."""
+    with open(path, encoding='utf-8') as f:
+        return [line.strip() for line in f if line.strip()]
+
+
+def main():
+    cpu_count = os.cpu_count() or 1
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--threads', type=int, nargs='+', default=powers_of_two(cpu_count),
+                        help='варианты количества потоков на вызов модели')
+    parser.add_argument('--workers', type=int, nargs='+', default=powers_of_two(min(cpu_count, 8)),
+                        help='варианты количества одновременных анализов')
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[10, 20, 32],
+                        help='варианты размера порции конвейера')
+    parser.add_argument('--oversubscribe', action='store_true',
+                        help='перебирать и конфигурации, где потоков всех воркеров больше, чем ядер')
+    parser.add_argument('--comments', help='файл с комментариями, по одному на строку (по умолчанию синтетический корпус)')
+    parser.add_argument('--corpus-size', type=int, default=400, help='размер синтетического корпуса')
+    parser.add_argument('--requests', type=int, default=16, help='запросов на замер')
+    parser.add_argument('--comments-per-request', type=int, default=20, help='комментариев в запросе (MAX_COMMENTS бота)')
+    parser.add_argument('--latency-slack', type=float, default=1.5,
+                        help='во сколько раз задержка p95 выбранной конфигурации может превышать наименьшую')
+    parser.add_argument('--max-latency-ms', type=float, help='предельная задержка p95 выбранной конфигурации, мс')
+    parser.add_argument('--backend', default=os.getenv('INFERENCE_BACKEND', 'transformers'),
+                        help='бэкенд инференса: transformers, onnx, onnx-int8')
+    parser.add_argument('--output', default=os.getenv('INFERENCE_PROFILE', DEFAULT_PROFILE_PATH),
+                        help='путь к файлу профиля')
+    parser.add_argument('--dry-run', action='store_true', help='только показать результаты, не сохраняя профиль')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    if args.comments:
+        texts = read_texts(args.comments)
+    else:
+        from benchmarks.corpus import generate_comments
+        texts = [comment['text'] for comment in generate_comments(args.corpus_size)]
+
+    # Первой замеряется конфигурация бота без профиля — для сравнения
+    baseline_config = (None, BASELINE_WORKERS, BASELINE_BATCH_SIZE)
+    grid = [baseline_config] + candidate_grid(
+        sorted(set(args.threads)), sorted(set(args.workers)), sorted(set(args.batch_sizes)), cpu_count, args.oversubscribe
+    )
+    print(f"Ядер: {cpu_count}, конфигураций: {len(grid)}, комментариев в наборе: {len(texts)}")
+
+    def report_progress(measurement):
+        threads = measurement['threads'] if measurement['threads'] is not None else 'по умолчанию'
+        print(f"  потоков {threads}, воркеров {measurement['workers']}, порция {measurement['batch_size']}: "
+              f"{measurement['videos_per_second']:.2f} видео/с, p95 {measurement['latency_p95_ms']:.0f} мс")
+
+    measurements = calibrate(
+        model_loader(args.backend), texts, grid, args.requests, args.comments_per_request, report_progress
+    )
+    baseline, candidates = measurements[0], measurements[1:] or measurements[:1]
+    chosen = choose(candidates, args.latency_slack, args.max_latency_ms)
+
+    print()
+    print('\n'.join(format_report(measurements, chosen, baseline)))
+
+    profile = InferenceProfile(
+        threads=chosen['threads'], workers=chosen['workers'], batch_size=chosen['batch_size'],
+        backend=args.backend, host=host_info(), measurements=measurements,
+        created_at=time.strftime('%Y-%m-%dT%H:%M:%S')
+    )
+    if args.dry_run:
+        print(f"\nВыбрано: {profile} (профиль не сохранён)")
+        return
+    profile.save(args.output)
+    print(f"\nПрофиль сохранён в {args.output}: {profile}")
+
+
+if __name__ == '__main__':
+    main()
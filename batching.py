@@ -0,0 +1,33 @@
+def plan_batches(lengths, max_batch_tokens=8192, max_batch_size=64):
+    """
+    Разбивает тексты на батчи с учётом длины в токенах.
+
+    Тексты сортируются по длине, после чего жадно набираются батчи так, чтобы
+    размер батча с паддингом (количество текстов * длина самого длинного из них)
+    не превышал бюджет токенов. Соседние по длине тексты попадают в один батч,
+    поэтому на паддинг уходит минимум вычислений.
+
+    :param lengths: Список длин текстов в токенах.
+    :param max_batch_tokens: Максимальное количество токенов в батче с учётом паддинга.
+    :param max_batch_size: Максимальное количество текстов в батче.
+    :return: Список батчей, каждый — список индексов исходных текстов.
+    """
+    order = sorted(range(len(lengths)), key=lambda i: lengths[i])
+
+    batches = []
+    current = []
+    current_max = 0
+    for index in order:
+        length = lengths[index]
+        batch_max = max(current_max, length)
+        if current and (len(current) >= max_batch_size or batch_max * (len(current) + 1) > max_batch_tokens):
+            batches.append(current)
+            current = []
+            batch_max = length
+        current.append(index)
+        current_max = batch_max
+
+    if current:
+        batches.append(current)
+
+    return batches
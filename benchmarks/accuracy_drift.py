@@ -0,0 +1,93 @@
+"""
+Проверка расхождения бэкендов инференса с эталонным (transformers) на фиксированном корпусе.
+
+Запуск: python -m benchmarks.accuracy_drift [--backends onnx onnx-int8] [--output drift.json]
+"""
+import argparse
+import json
+import time
+from difflib import SequenceMatcher
+from sentiment_analyzer import SentimentAnalyzer
+from translator import Translator
+from video_evaluator import VideoEvaluator
+from inference_backends import TRANSFORMERS, ONNX, ONNX_INT8
+from benchmarks.corpus import SAMPLE_COMMENTS, generate_comments
+
+
+def run_backend(backend, texts):
+    """Прогоняет корпус через перевод и анализ тональности выбранного бэкенда."""
+    translator = Translator(backend=backend)
+    analyzer = SentimentAnalyzer(backend=backend)
+
+    started = time.perf_counter()
+    translations = translator.translate_with_model(texts)
+    translation_time = time.perf_counter() - started
+
+    started = time.perf_counter()
+    sentiments = analyzer.analyze(texts)
+    sentiment_time = time.perf_counter() - started
+
+    return {
+        'translations': translations,
+        'sentiments': sentiments,
+        'translation_rate': len(texts) / translation_time,
+        'sentiment_rate': len(texts) / sentiment_time,
+    }
+
+
+def compare(reference, candidate, comments):
+    """Сравнивает результаты бэкенда с эталоном."""
+    stars_ref = [result['stars'] for result in reference['sentiments']]
+    stars_cand = [result['stars'] for result in candidate['sentiments']]
+    scores_ref = [result['score'] for result in reference['sentiments']]
+    scores_cand = [result['score'] for result in candidate['sentiments']]
+
+    def relevance(sentiments):
+        scored = [{**comment, 'stars': s['stars']} for comment, s in zip(comments, sentiments)]
+        return VideoEvaluator().evaluate(scored)['video_relevance']
+
+    return {
+        'stars_agreement': sum(a == b for a, b in zip(stars_ref, stars_cand)) / len(stars_ref),
+        'stars_mean_abs_diff': sum(abs(a - b) for a, b in zip(stars_ref, stars_cand)) / len(stars_ref),
+        'score_max_abs_diff': max(abs(a - b) for a, b in zip(scores_ref, scores_cand)),
+        'relevance_diff': relevance(candidate['sentiments']) - relevance(reference['sentiments']),
+        'translation_exact_match': sum(
+            a == b for a, b in zip(reference['translations'], candidate['translations'])
+        ) / len(comments),
+        'translation_similarity': sum(
+            SequenceMatcher(None, a, b).ratio()
+            for a, b in zip(reference['translations'], candidate['translations'])
+        ) / len(comments),
+        'translation_speedup': candidate['translation_rate'] / reference['translation_rate'],
+        'sentiment_speedup': candidate['sentiment_rate'] / reference['sentiment_rate'],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--backends', nargs='+', default=[ONNX, ONNX_INT8])
+    parser.add_argument('--size', type=int, default=200, help='количество синтетических комментариев')
+    parser.add_argument('--output', help='путь к JSON-файлу с результатами')
+    args = parser.parse_args()
+
+    # Фиксированный корпус: образцы комментариев и воспроизводимая синтетическая выборка
+    comments = [{'text': text, 'likeCount': 0} for text in SAMPLE_COMMENTS] + generate_comments(args.size, seed=0)
+    texts = [comment['text'] for comment in comments]
+
+    reference = run_backend(TRANSFORMERS, texts)
+    report = {}
+    for backend in args.backends:
+        report[backend] = compare(reference, run_backend(backend, texts), comments)
+
+    for backend, metrics in report.items():
+        print(backend)
+        for name, value in metrics.items():
+            print(f"  {name:>24}: {value:.3f}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+"""
+Память на представление комментариев: список словарей против CommentBatch.
+
+Тексты комментариев создаются до начала измерения и общие для обоих
+вариантов, поэтому учитываются только накладные расходы структуры
+и результаты этапов конвейера.
+
+Запуск: python -m benchmarks.bench_comment_memory [--sizes 10000 100000]
+"""
+import argparse
+import tracemalloc
+from comment_batch import CommentBatch
+from benchmarks.corpus import generate_comments
+
+
+def as_dicts(comments):
+    """Прежнее представление: словарь на комментарий, дополняемый этапами конвейера."""
+    result = [{'text': comment['text'], 'likeCount': comment['likeCount']} for comment in comments]
+    for i, comment in enumerate(result):
+        comment['language'] = 'ru'
+        comment['translation_path'] = 'translated'
+        comment['translated_text'] = comment['text']
+        comment['stars'] = i % 5 + 1
+        comment['sentiment_score'] = 0.5 + (i % 50) / 100
+    return result
+
+
+def as_batch(comments):
+    """Столбцовое представление с теми же результатами этапов."""
+    batch = CommentBatch.from_comments(comments)
+    batch.languages[:] = 'ru'
+    batch.paths[:] = 'translated'
+    batch.set_translations(slice(None), batch.texts)
+    batch.set_sentiments([{'stars': i % 5 + 1, 'score': 0.5 + (i % 50) / 100} for i in range(len(batch))])
+    return batch
+
+
+def measure(build, comments):
+    """Возвращает объём памяти, занятой результатом build, в байтах."""
+    tracemalloc.start()
+    snapshot = tracemalloc.take_snapshot()
+    result = build(comments)
+    allocated = sum(stat.size_diff for stat in tracemalloc.take_snapshot().compare_to(snapshot, 'filename'))
+    tracemalloc.stop()
+    del result
+    return allocated
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000])
+    args = parser.parse_args()
+
+    print(f"{'комментариев':>12} {'словари, КБ/10k':>16} {'CommentBatch, КБ/10k':>21} {'экономия':>9}")
+    for size in args.sizes:
+        comments = generate_comments(size)
+        dict_bytes = measure(as_dicts, comments)
+        batch_bytes = measure(as_batch, comments)
+        per_10k = 10000 / size / 1024
+        print(f"{size:>12} {dict_bytes * per_10k:>16.0f} {batch_bytes * per_10k:>21.0f} "
+              f"{dict_bytes / batch_bytes:>8.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,44 @@
+"""
+Скорость векторизованной оценки видео на больших выборках комментариев.
+
+Запуск: python -m benchmarks.bench_evaluator [--sizes 1000 100000]
+"""
+import argparse
+import time
+import numpy as np
+from video_evaluator import RunningEvaluation, evaluate_arrays, WEIGHTING_STRATEGIES
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    print(f"{'комментариев':>12} {'цикл, мс':>10} " + ' '.join(f"{name + ', мс':>16}" for name in WEIGHTING_STRATEGIES))
+    for size in args.sizes:
+        stars = rng.integers(1, 6, size)
+        likes = rng.zipf(2.0, size) - 1
+        scores = rng.uniform(0.3, 1.0, size)
+        comments = [{'stars': int(s), 'likeCount': int(l)} for s, l in zip(stars, likes)]
+
+        started = time.perf_counter()
+        for _ in range(args.repeat):
+            evaluation = RunningEvaluation()
+            evaluation.add(comments)
+            evaluation.result()
+        loop_ms = (time.perf_counter() - started) / args.repeat * 1000
+
+        timings = []
+        for name in WEIGHTING_STRATEGIES:
+            started = time.perf_counter()
+            for _ in range(args.repeat):
+                evaluate_arrays(stars, likes, scores, weighting=name)
+            timings.append((time.perf_counter() - started) / args.repeat * 1000)
+
+        print(f"{size:>12} {loop_ms:>10.2f} " + ' '.join(f"{t:>16.2f}" for t in timings))
+
+
+if __name__ == '__main__':
+    main()
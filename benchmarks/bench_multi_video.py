@@ -0,0 +1,140 @@
+"""
+Сравнение нескольких видео одним сообщением против отдельных запросов по каждому видео.
+
+Комментарии загружаются настоящим клиентом API с локальной заглушки, модели
+синтетические: помимо стоимости на комментарий у каждого вызова есть
+фиксированная стоимость (запуск модели, дополнение порции), которую общие
+порции сравнения платят реже. Для каждого количества видео печатаются время,
+количество вызовов моделей и совпадение оценок видео в обоих режимах.
+
+Запуск: python -m benchmarks.bench_multi_video [--videos 5 10 20] [--call-cost-ms 20] [--client async]
+"""
+import argparse
+import asyncio
+import time
+from result_cache import ResultCache
+from worker_pool import WorkerPool
+from benchmarks.fake_youtube_server import FakeYouTubeServer
+from benchmarks.load_test import (
+    InstrumentedBot, SimulatedUpdate, StageTimer, SyntheticSentimentAnalyzer, SyntheticTranslator,
+    create_youtube_service
+)
+
+
+class CallCostTranslator(SyntheticTranslator):
+    """Синтетический переводчик с фиксированной стоимостью каждого вызова."""
+
+    def __init__(self, cost, call_cost):
+        """
+        :param cost: Время обработки одного комментария, секунд.
+        :param call_cost: Время одного вызова модели независимо от размера порции, секунд.
+        """
+        super().__init__(cost)
+        self.call_cost = call_cost
+        self.calls = 0
+
+    def translate(self, texts):
+        self.calls += 1
+        time.sleep(self.call_cost)
+        return super().translate(texts)
+
+
+class CallCostSentimentAnalyzer(SyntheticSentimentAnalyzer):
+    """Синтетический анализатор тональности с фиксированной стоимостью каждого вызова."""
+
+    def __init__(self, cost, call_cost):
+        """
+        :param cost: Время обработки одного комментария, секунд.
+        :param call_cost: Время одного вызова модели независимо от размера порции, секунд.
+        """
+        super().__init__(cost)
+        self.call_cost = call_cost
+        self.calls = 0
+
+    def analyze(self, texts):
+        self.calls += 1
+        time.sleep(self.call_cost)
+        return super().analyze(texts)
+
+
+async def measure(server, args, video_ids, combined):
+    """
+    Анализирует видео отдельными сообщениями или одним сообщением со всеми ссылками.
+
+    :param combined: True — одно сообщение со всеми ссылками, False — сообщение на каждое видео.
+    :return: Словарь с длительностью, количеством вызовов моделей и релевантностью видео.
+    """
+    cost, call_cost = args.cost_ms / 1000, args.call_cost_ms / 1000
+    translator = CallCostTranslator(cost, call_cost)
+    analyzer = CallCostSentimentAnalyzer(cost, call_cost)
+    youtube_service = create_youtube_service(server, args.client, args.youtube_concurrency)
+    bot = InstrumentedBot(
+        'bench', None, timer=StageTimer(), models=(translator, analyzer),
+        worker_pool=WorkerPool(max_workers=args.workers), result_cache=ResultCache(),
+        youtube_service=youtube_service, warm_up=False
+    )
+    bot.MAX_COMMENTS = args.comments
+    bot.MAX_VIDEOS_PER_MESSAGE = len(video_ids)
+    bot.preload()
+
+    conversation = []
+    started = time.perf_counter()
+    if combined:
+        text = ' '.join(f'https://youtu.be/{video_id}' for video_id in video_ids)
+        await bot.handle_message(SimulatedUpdate(1, text, conversation), None)
+    else:
+        for video_id in video_ids:
+            await bot.handle_message(SimulatedUpdate(1, f'https://youtu.be/{video_id}', conversation), None)
+    duration = time.perf_counter() - started
+
+    mode = bot._top_liked_mode()
+    relevance = {}
+    for video_id in video_ids:
+        cached = bot.result_cache.get(bot._cache_key(video_id, mode))
+        relevance[video_id] = cached['evaluation']['video_relevance'] if cached else None
+
+    bot.worker_pool.shutdown()
+    if args.client == 'async':
+        await youtube_service.aclose()
+    return {
+        'duration': duration,
+        'translation_calls': translator.calls,
+        'sentiment_calls': analyzer.calls,
+        'relevance': relevance,
+    }
+
+
+async def run(args):
+    with FakeYouTubeServer(latency=args.youtube_latency_ms / 1000, threads_per_video=args.threads_per_video) as server:
+        for count in args.videos:
+            video_ids = [f'multi{i:06d}' for i in range(count)]
+            separate = await measure(server, args, video_ids, combined=False)
+            shared = await measure(server, args, video_ids, combined=True)
+
+            print(f"\nВидео: {count}, комментариев на видео: {args.comments}")
+            for name, result in (('по одному', separate), ('одним сообщением', shared)):
+                print(f"  {name:>17}: {result['duration']:6.2f} с ({count / result['duration']:5.1f} видео/с), "
+                      f"вызовов перевода: {result['translation_calls']}, тональности: {result['sentiment_calls']}")
+            print(f"  ускорение: {separate['duration'] / shared['duration']:.1f}×")
+            mismatched = [
+                video_id for video_id in video_ids if separate['relevance'][video_id] != shared['relevance'][video_id]
+            ]
+            print(f"  оценки видео совпадают: {'да' if not mismatched else f'нет ({len(mismatched)} видео)'}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--videos', type=int, nargs='+', default=[5, 10, 20], help='количество видео')
+    parser.add_argument('--comments', type=int, default=20, help='комментариев на видео (MAX_COMMENTS)')
+    parser.add_argument('--cost-ms', type=float, default=0.5, help='стоимость модели на комментарий, мс')
+    parser.add_argument('--call-cost-ms', type=float, default=20.0, help='фиксированная стоимость вызова модели, мс')
+    parser.add_argument('--youtube-latency-ms', type=float, default=50.0, help='задержка ответа заглушки API, мс')
+    parser.add_argument('--youtube-concurrency', type=int, default=8, help='одновременных запросов к API')
+    parser.add_argument('--threads-per-video', type=int, default=200, help='веток комментариев у видео')
+    parser.add_argument('--client', choices=['async', 'sync'], default='async', help='клиент YouTube API')
+    parser.add_argument('--workers', type=int, default=2, help='потоков пула воркеров')
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+"""
+Объединение почти одинаковых комментариев: сэкономленные вызовы модели и изменение оценки видео.
+
+Корпус — обычные комментарии с волнами спама и копипасты с мелкими правками.
+Оценка видео считается дважды: по всем комментариям и по представителям
+групп с перенесёнными лайками.
+
+Запуск: python -m benchmarks.bench_near_duplicates [--sizes 200 2000] [--threshold 0.8]
+"""
+import argparse
+import random
+import time
+from comment_batch import CommentBatch
+from near_duplicates import collapse_near_duplicates
+from sentiment_analyzer import SentimentAnalyzer
+from video_evaluator import VideoEvaluator
+from benchmarks.corpus import SAMPLE_COMMENTS, generate_comments
+
+# Шаблоны спам-волн и копипасты
+SPAM_TEMPLATES = [
+    'Check out my channel for free giveaways!!!',
+    'Who is here after the announcement?',
+    'This comment section is so wholesome, love you all',
+    ('If you are reading this, you are going to have an amazing day. '
+     'Copy this comment to three other videos and it will come true.'),
+]
+
+
+def edit(text, rng):
+    """Мелкая правка текста: регистр, повтор знаков, опечатка или приписка."""
+    choice = rng.randrange(4)
+    if choice == 0:
+        return text.upper() if rng.random() < 0.5 else text.lower()
+    if choice == 1:
+        return text.rstrip('!.') + '!' * rng.randint(1, 5)
+    if choice == 2 and len(text) > 20:
+        i = rng.randrange(len(text) - 1)
+        return text[:i] + text[i + 1] + text[i] + text[i + 2:]
+    return f'{text} {rng.choice(["lol", "fr", "😂", "!!"])}'
+
+
+def generate_corpus(count, spam_share=0.4, seed=0):
+    """
+    Корпус комментариев с почти одинаковыми группами.
+
+    :param count: Количество комментариев.
+    :param spam_share: Доля комментариев из спам-волн и копипасты.
+    :param seed: Зерно генератора случайных чисел.
+    :return: CommentBatch.
+    """
+    rng = random.Random(seed)
+    comments = generate_comments(count, seed)
+    templates = SPAM_TEMPLATES + SAMPLE_COMMENTS[:4]
+    for comment in comments:
+        if rng.random() < spam_share:
+            comment['text'] = edit(rng.choice(templates), rng)
+    # Точные повторы удаляются при получении комментариев, поэтому здесь тоже
+    unique = list({comment['text']: comment for comment in comments}.values())
+    return CommentBatch.from_comments(unique)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[200, 2000])
+    parser.add_argument('--threshold', type=float, default=0.8)
+    args = parser.parse_args()
+
+    analyzer = SentimentAnalyzer()
+    evaluator = VideoEvaluator()
+    analyzer.analyze(['warm up'])
+
+    print(f"{'комментариев':>12} {'групп':>7} {'экономия':>9} {'кластеризация, мс':>18} "
+          f"{'модель, с':>10} {'оценка (все)':>13} {'оценка (группы)':>16} {'разница':>8}")
+    for size in args.sizes:
+        batch = generate_corpus(size)
+
+        started = time.perf_counter()
+        collapsed, _ = collapse_near_duplicates(batch, args.threshold)
+        clustering = time.perf_counter() - started
+
+        started = time.perf_counter()
+        analyzer.analyze_batch(batch)
+        full_time = time.perf_counter() - started
+        started = time.perf_counter()
+        analyzer.analyze_batch(collapsed)
+        collapsed_time = time.perf_counter() - started
+
+        full = evaluator.evaluate_batch(batch)['video_relevance']
+        reduced = evaluator.evaluate_batch(collapsed)['video_relevance']
+        saved = 1 - len(collapsed) / len(batch)
+        print(f"{len(batch):>12} {len(collapsed):>7} {saved:>8.1%} {clustering * 1000:>18.1f} "
+              f"{f'{full_time:.1f}->{collapsed_time:.1f}':>10} {full:>13.1f} {reduced:>16.1f} {reduced - full:>+8.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+"""
+Сравнение пакетного анализа тональности с поштучным вызовом пайплайна.
+
+Запуск: python -m benchmarks.bench_sentiment [--sizes 20 200 2000]
+"""
+import argparse
+import time
+from transformers import pipeline
+from sentiment_analyzer import SentimentAnalyzer
+from benchmarks.corpus import generate_comments
+
+
+def analyze_one_by_one(sentiment_pipeline, texts):
+    """Прежняя реализация: один вызов пайплайна на комментарий."""
+    results = []
+    for text in texts:
+        result = sentiment_pipeline(text[:512])[0]
+        results.append({
+            'text': text,
+            'stars': int(result['label'].split()[0]),
+            'score': result['score']
+        })
+    return results
+
+
+def measure(func, texts):
+    """Возвращает количество комментариев в секунду и результат."""
+    started = time.perf_counter()
+    results = func(texts)
+    elapsed = time.perf_counter() - started
+    return len(texts) / elapsed, results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[20, 200, 2000])
+    args = parser.parse_args()
+
+    analyzer = SentimentAnalyzer()
+    sentiment_pipeline = pipeline('sentiment-analysis', model=analyzer.model, tokenizer=analyzer.tokenizer)
+
+    # Прогрев, чтобы не учитывать ленивую инициализацию
+    analyzer.analyze(['warm up'])
+    sentiment_pipeline('warm up')
+
+    print(f"{'комментариев':>12} {'поштучно, шт/с':>16} {'батчами, шт/с':>15} {'ускорение':>10} {'совпадение':>11}")
+    for size in args.sizes:
+        texts = [comment['text'] for comment in generate_comments(size)]
+        loop_rate, loop_results = measure(lambda t: analyze_one_by_one(sentiment_pipeline, t), texts)
+        batch_rate, batch_results = measure(analyzer.analyze, texts)
+        agreement = sum(
+            a['stars'] == b['stars'] for a, b in zip(loop_results, batch_results)
+        ) / len(texts)
+        print(f"{size:>12} {loop_rate:>16.1f} {batch_rate:>15.1f} {batch_rate / loop_rate:>9.1f}x {agreement:>10.1%}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,52 @@
+"""
+Сравнение пакетной генерации перевода с поштучным вызовом пайплайна.
+
+Запуск: python -m benchmarks.bench_translator [--sizes 20 100] [--num-beams 1 4]
+"""
+import argparse
+import time
+from transformers import pipeline
+from translator import Translator
+from benchmarks.corpus import generate_comments
+
+
+def translate_one_by_one(translation_pipeline, texts):
+    """Прежняя реализация: один вызов пайплайна на комментарий."""
+    return [translation_pipeline(text[:512], max_length=512)[0]['translation_text'] for text in texts]
+
+
+def measure(func, texts):
+    """Возвращает количество комментариев в секунду и результат."""
+    started = time.perf_counter()
+    results = func(texts)
+    elapsed = time.perf_counter() - started
+    return len(texts) / elapsed, results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[20, 100])
+    parser.add_argument('--num-beams', type=int, nargs='+', default=[None])
+    args = parser.parse_args()
+
+    translator = Translator()
+    translation_pipeline = pipeline('translation', model=translator.model, tokenizer=translator.tokenizer)
+    default_beams = translator.num_beams
+
+    translation_pipeline('warm up')
+    translator.translate_with_model(['warm up'])
+
+    print(f"{'комментариев':>12} {'лучей':>6} {'поштучно, шт/с':>16} {'батчами, шт/с':>15} {'ускорение':>10} {'совпадение':>11}")
+    for size in args.sizes:
+        texts = [comment['text'] for comment in generate_comments(size)]
+        loop_rate, loop_results = measure(lambda t: translate_one_by_one(translation_pipeline, t), texts)
+        for num_beams in args.num_beams:
+            translator.num_beams = num_beams or default_beams
+            batch_rate, batch_results = measure(translator.translate_with_model, texts)
+            agreement = sum(a == b for a, b in zip(loop_results, batch_results)) / len(texts)
+            print(f"{size:>12} {translator.num_beams:>6} {loop_rate:>16.1f} {batch_rate:>15.1f} "
+                  f"{batch_rate / loop_rate:>9.1f}x {agreement:>10.1%}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,49 @@
+import random
+
+# Типичные комментарии YouTube на нескольких языках разной длины
+SAMPLE_COMMENTS = [
+    'first',
+    'Great video!!',
+    'I love this video, thank you so much for making it!',
+    'This is the worst video ever.',
+    'It is an average video, nothing special.',
+    'Who is watching this in 2024?',
+    'The editing in this one is incredible, you can tell how much work went into every single shot.',
+    'Honestly I expected more. The first half was fine but the ending felt rushed and confusing.',
+    'Отличное видео, спасибо автору!',
+    'Ничего не понял, но очень интересно.',
+    'Худшее, что я видел за последнее время. Зря потратил время.',
+    'Смотрю уже третий раз, и каждый раз замечаю что-то новое. Продолжайте в том же духе!',
+    'Me encanta este canal, siempre aprendo algo nuevo.',
+    'Das Video ist wirklich gut gemacht, aber der Ton ist zu leise.',
+    'Vidéo très intéressante, merci beaucoup !',
+    'Bu videoyu çok beğendim, teşekkürler.',
+    '😂😂😂',
+    '❤️❤️❤️ best channel',
+    ('I have been following this channel for years and I have to say that the quality keeps getting better. '
+     'The research, the narration, the music — everything is top notch. Please never stop making these.'),
+    ('Не согласен с автором по поводу второй части. Во-первых, источники устарели, во-вторых, '
+     'выводы противоречат тому, что было сказано в начале. Хотелось бы видеть больше аргументов.'),
+]
+
+
+def generate_comments(count, seed=0):
+    """
+    Генерирует воспроизводимый набор комментариев для бенчмарков.
+
+    :param count: Количество комментариев.
+    :param seed: Зерно генератора случайных чисел.
+    :return: Список словарей с полями 'text' и 'likeCount'.
+    """
+    rng = random.Random(seed)
+    comments = []
+    for i in range(count):
+        text = rng.choice(SAMPLE_COMMENTS)
+        if rng.random() < 0.5:
+            # Небольшие вариации, чтобы тексты не совпадали полностью
+            text = f'{text} #{i}'
+        comments.append({
+            'text': text,
+            'likeCount': int(rng.paretovariate(1.2)) - 1
+        })
+    return comments
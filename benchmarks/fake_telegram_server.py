@@ -0,0 +1,173 @@
+"""
+Локальный HTTP-сервер, имитирующий Telegram Bot API, для проверки режима вебхука.
+
+Принимает вызовы getMe, sendMessage, editMessageText, setWebhook и deleteWebhook
+по адресу /bot<token>/<method> (telegram.Bot(token, base_url=server.base_url))
+и записывает переписку по чатам. Обновления доставляются на вебхук методом
+send_update, как это делает Telegram.
+
+Запуск отдельно: python -m benchmarks.fake_telegram_server [--port 8081] [--latency-ms 20]
+"""
+import argparse
+import itertools
+import json
+import threading
+import time
+import urllib.error
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+BOT_USER = {'id': 1, 'is_bot': True, 'first_name': 'Fake', 'username': 'fake_bot'}
+
+
+class FakeTelegramServer:
+    """Заглушка Telegram Bot API на локальном порту."""
+
+    def __init__(self, host='127.0.0.1', port=0, latency=0.0):
+        """
+        :param host: Адрес сервера.
+        :param port: Порт (0 — любой свободный).
+        :param latency: Задержка ответа, секунд.
+        """
+        self.latency = latency
+        self.chats = {}  # chat_id -> список пар (метод, текст)
+        self.webhook = None
+        self.failures = 0  # Сколько следующих вызовов завершить ошибкой 502
+        self._message_ids = itertools.count(1000)
+        self._update_ids = itertools.count(1)
+        self._lock = threading.Lock()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+                if self.headers.get('Content-Type', '').startswith('application/json'):
+                    params = json.loads(body or b'{}')
+                else:
+                    params = {name: values[0] for name, values in parse_qs(body.decode()).items()}
+                status, result = server.respond(self.path.rstrip('/').rsplit('/', 1)[-1], params)
+                payload = json.dumps(result).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+
+    @property
+    def base_url(self):
+        """Базовый адрес Bot API для telegram.Bot(token, base_url=...)."""
+        host, port = self._server.server_address[:2]
+        return f'http://{host}:{port}/bot'
+
+    def serve_forever(self):
+        """Обрабатывает запросы в текущем потоке до остановки."""
+        self._server.serve_forever()
+
+    def start(self):
+        """Запускает сервер в фоновом потоке."""
+        threading.Thread(target=self.serve_forever, name='fake-telegram', daemon=True).start()
+        return self
+
+    def stop(self):
+        """Останавливает сервер."""
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def messages(self, chat_id):
+        """Переписка чата: список пар (метод, текст)."""
+        with self._lock:
+            return list(self.chats.get(chat_id, []))
+
+    def respond(self, method, params):
+        """
+        Формирует ответ Bot API.
+
+        :return: Пара (HTTP-статус, тело ответа).
+        """
+        if self.latency:
+            time.sleep(self.latency)
+        with self._lock:
+            if self.failures:
+                self.failures -= 1
+                return 502, {'ok': False, 'error_code': 502, 'description': 'Bad Gateway'}
+
+            if method == 'getMe':
+                return 200, {'ok': True, 'result': BOT_USER}
+            if method == 'setWebhook':
+                self.webhook = params.get('url') or None
+                return 200, {'ok': True, 'result': True}
+            if method == 'deleteWebhook':
+                self.webhook = None
+                return 200, {'ok': True, 'result': True}
+            if method in ('sendMessage', 'editMessageText'):
+                chat_id = int(params['chat_id'])
+                self.chats.setdefault(chat_id, []).append((method, params['text']))
+                message_id = next(self._message_ids) if method == 'sendMessage' else int(params['message_id'])
+                return 200, {'ok': True, 'result': {
+                    'message_id': message_id, 'date': int(time.time()), 'text': params['text'],
+                    'chat': {'id': chat_id, 'type': 'private'}, 'from': BOT_USER,
+                }}
+        return 404, {'ok': False, 'error_code': 404, 'description': 'Not Found: method not found'}
+
+    def send_update(self, chat_id, text, url=None, secret_token=None, update_id=None):
+        """
+        Доставляет обновление с текстовым сообщением на вебхук.
+
+        :param chat_id: Идентификатор чата (и пользователя).
+        :param text: Текст сообщения.
+        :param url: Адрес вебхука (по умолчанию установленный через setWebhook).
+        :param secret_token: Значение заголовка X-Telegram-Bot-Api-Secret-Token.
+        :param update_id: Идентификатор обновления (для повторной доставки).
+        :return: HTTP-статус ответа вебхука.
+        """
+        update_id = next(self._update_ids) if update_id is None else update_id
+        update = {
+            'update_id': update_id,
+            'message': {
+                'message_id': update_id, 'date': int(time.time()), 'text': text,
+                'chat': {'id': chat_id, 'type': 'private'},
+                'from': {'id': chat_id, 'is_bot': False, 'first_name': 'User'},
+            },
+        }
+        request = urllib.request.Request(
+            url or self.webhook, data=json.dumps(update).encode(), method='POST',
+            headers={'Content-Type': 'application/json'}
+        )
+        if secret_token:
+            request.add_header('X-Telegram-Bot-Api-Secret-Token', secret_token)
+        try:
+            with urllib.request.urlopen(request, timeout=10) as response:
+                return response.status
+        except urllib.error.HTTPError as e:
+            return e.code
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--port', type=int, default=8081)
+    parser.add_argument('--latency-ms', type=float, default=0.0, help='задержка ответа, мс')
+    args = parser.parse_args()
+
+    server = FakeTelegramServer(port=args.port, latency=args.latency_ms / 1000)
+    print(f"Заглушка Telegram Bot API: {server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
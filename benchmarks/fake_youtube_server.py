@@ -0,0 +1,219 @@
+"""
+Локальный HTTP-сервер, имитирующий эндпоинты YouTube Data API
+(commentThreads.list и comments.list) для нагрузочных тестов.
+
+Отдаёт синтетические комментарии (воспроизводимые для каждого video_id) или
+записанные ветки из JSON-файла вида {video_id: [ресурсы commentThread]} —
+например, объединённые поля items сохранённых ответов API.
+
+Запуск отдельно: python -m benchmarks.fake_youtube_server [--port 8085] [--latency-ms 50]
+"""
+import argparse
+import json
+import random
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+from benchmarks.corpus import SAMPLE_COMMENTS
+
+INLINE_REPLIES = 5  # Сколько ответов API возвращает в поле replies
+
+
+def make_comment(comment_id, text, like_count, published_at, parent_id=None):
+    """Формирует ресурс comment в формате YouTube Data API."""
+    snippet = {
+        'textDisplay': text,
+        'textOriginal': text,
+        'likeCount': like_count,
+        'publishedAt': published_at,
+        'updatedAt': published_at,
+    }
+    if parent_id is not None:
+        snippet['parentId'] = parent_id
+    return {'kind': 'youtube#comment', 'id': comment_id, 'snippet': snippet}
+
+
+def synthetic_threads(video_id, threads=200, max_replies=8):
+    """
+    Генерирует воспроизводимые ветки комментариев видео.
+
+    :param video_id: Идентификатор видео (задаёт зерно генератора).
+    :param threads: Количество веток.
+    :param max_replies: Максимальное количество ответов в ветке.
+    :return: Список ресурсов commentThread с полными ветками ответов.
+    """
+    rng = random.Random(zlib.crc32(video_id.encode()))
+    items = []
+    for i in range(threads):
+        thread_id = f'{video_id}-t{i}'
+        published_at = time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(1704067200 + (threads - i) * 60))
+        top = make_comment(thread_id, f'{rng.choice(SAMPLE_COMMENTS)} #{i}', int(rng.paretovariate(1.2)) - 1,
+                           published_at)
+        replies = [
+            make_comment(f'{thread_id}.r{j}', rng.choice(SAMPLE_COMMENTS), int(rng.paretovariate(1.5)) - 1,
+                         published_at, parent_id=thread_id)
+            for j in range(rng.randint(0, max_replies))
+        ]
+        items.append({
+            'kind': 'youtube#commentThread',
+            'id': thread_id,
+            'snippet': {'topLevelComment': top, 'totalReplyCount': len(replies)},
+            'replies': {'comments': replies},
+        })
+    return items
+
+
+class FakeYouTubeServer:
+    """
+    Заглушка YouTube Data API на локальном порту.
+
+    Каждый запрос обрабатывается в отдельном потоке с искусственной задержкой,
+    поэтому сервер выдерживает конкурентную нагрузку как настоящий API.
+    """
+
+    def __init__(self, host='127.0.0.1', port=0, latency=0.05, threads_per_video=200, recording=None):
+        """
+        :param host: Адрес сервера.
+        :param port: Порт (0 — любой свободный).
+        :param latency: Задержка ответа, секунд.
+        :param threads_per_video: Количество синтетических веток на видео.
+        :param recording: Путь к JSON-файлу с записанными ветками; видео вне записи генерируются.
+        """
+        self.latency = latency
+        self.threads_per_video = threads_per_video
+        self.requests = 0
+        self._videos = {}
+        self._threads_by_id = {}
+        self._lock = threading.Lock()
+        if recording:
+            with open(recording, encoding='utf-8') as f:
+                for video_id, threads in json.load(f).items():
+                    self._add_video(video_id, threads)
+
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                url = urlsplit(self.path)
+                params = {name: values[0] for name, values in parse_qs(url.query).items()}
+                status, body = server.respond(url.path.rstrip('/').rsplit('/', 1)[-1], params)
+                payload = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def endpoint(self):
+        """Адрес сервера для YouTubeService(api_endpoint=...)."""
+        host, port = self._server.server_address[:2]
+        return f'http://{host}:{port}'
+
+    @property
+    def base_url(self):
+        """Базовый адрес API для AsyncYouTubeService(base_url=...)."""
+        return f'{self.endpoint}/youtube/v3'
+
+    def serve_forever(self):
+        """Обрабатывает запросы в текущем потоке до остановки."""
+        self._server.serve_forever()
+
+    def start(self):
+        """Запускает сервер в фоновом потоке."""
+        self._thread = threading.Thread(target=self.serve_forever, name='fake-youtube', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Останавливает сервер."""
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def threads(self, video_id):
+        """Ветки комментариев видео (синтетические создаются при первом обращении)."""
+        with self._lock:
+            if video_id not in self._videos:
+                self._add_video(video_id, synthetic_threads(video_id, self.threads_per_video))
+            return self._videos[video_id]
+
+    def _add_video(self, video_id, threads):
+        self._videos[video_id] = threads
+        for thread in threads:
+            self._threads_by_id[thread['id']] = thread
+
+    def respond(self, resource, params):
+        """
+        Формирует ответ API.
+
+        :return: Пара (HTTP-статус, тело ответа).
+        """
+        with self._lock:
+            self.requests += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+        if resource == 'commentThreads':
+            threads = self.threads(params['videoId'])
+            if params.get('order') == 'time':
+                threads = sorted(
+                    threads, key=lambda thread: thread['snippet']['topLevelComment']['snippet']['publishedAt'],
+                    reverse=True
+                )
+            include_replies = 'replies' in params.get('part', '')
+            items = []
+            for thread in threads:
+                item = {key: value for key, value in thread.items() if key != 'replies'}
+                replies = thread.get('replies', {}).get('comments', [])
+                if include_replies and replies:
+                    item['replies'] = {'comments': replies[:INLINE_REPLIES]}
+                items.append(item)
+        elif resource == 'comments':
+            with self._lock:
+                thread = self._threads_by_id.get(params['parentId'], {})
+            items = thread.get('replies', {}).get('comments', [])
+        else:
+            return 404, {'error': {'code': 404, 'message': 'Not Found', 'errors': [{'reason': 'notFound'}]}}
+
+        max_results = int(params.get('maxResults', 20))
+        offset = int(params.get('pageToken', 0))
+        body = {'items': items[offset:offset + max_results]}
+        if offset + max_results < len(items):
+            body['nextPageToken'] = str(offset + max_results)
+        return 200, body
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--port', type=int, default=8085)
+    parser.add_argument('--latency-ms', type=float, default=50.0, help='задержка ответа, мс')
+    parser.add_argument('--threads-per-video', type=int, default=200, help='синтетических веток на видео')
+    parser.add_argument('--recording', help='JSON-файл с записанными ветками комментариев')
+    args = parser.parse_args()
+
+    server = FakeYouTubeServer(port=args.port, latency=args.latency_ms / 1000,
+                               threads_per_video=args.threads_per_video, recording=args.recording)
+    print(f"Заглушка YouTube Data API: {server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
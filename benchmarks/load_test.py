@@ -0,0 +1,402 @@
+"""
+Сквозной нагрузочный тест бота: заглушка YouTube Data API, имитация потока
+обновлений Telegram и замер времени каждого этапа анализа.
+
+Виртуальные пользователи (--concurrency) отправляют ссылки на видео в
+TelegramBot.handle_message, пока не будет отправлено --requests сообщений.
+Комментарии загружаются настоящим клиентом API по HTTP с локальной заглушки,
+перевод и анализ тональности выполняются настоящими моделями или
+синтетическими с заданной стоимостью (--synthetic-models).
+
+Результат — задержки p50/p95/p99 (полный ответ и первый ответ), пропускная
+способность, время этапов fetch/route/translate/sentiment/evaluate и пиковый
+RSS — печатается и сохраняется в JSON для сравнения запусков (--compare).
+
+Запуск: python -m benchmarks.load_test [--requests 200] [--concurrency 20] [--synthetic-models]
+                                      [--output load_test.json] [--compare baseline.json]
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import platform
+import resource
+import subprocess
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+import numpy as np
+from async_youtube_service import AsyncYouTubeService
+from quota_manager import QuotaManager
+from result_cache import ResultCache
+from telegram_bot import TelegramBot
+from worker_pool import WorkerPool
+from youtube_service import YouTubeService
+from benchmarks.fake_youtube_server import FakeYouTubeServer
+
+STAGES = ['fetch', 'route', 'translate', 'sentiment', 'evaluate']
+
+# Метрики, которые сравниваются между запусками: (путь в отчёте, больше — лучше)
+COMPARED_METRICS = [
+    (('throughput_rps',), True),
+    (('latency', 'p50'), False),
+    (('latency', 'p95'), False),
+    (('latency', 'p99'), False),
+    (('first_response', 'p95'), False),
+    *((('stages', stage, 'p95'), False) for stage in STAGES),
+    (('peak_rss_mb',), False),
+]
+
+
+class StageTimer:
+    """Собирает длительности вызовов этапов анализа (из разных потоков)."""
+
+    def __init__(self):
+        self.durations = defaultdict(list)
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def measure(self, stage):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                self.durations[stage].append(elapsed)
+
+
+class SyntheticTranslator:
+    """Переводчик с фиксированной стоимостью на комментарий вместо модели."""
+
+    model_name = 'synthetic-translator'
+
+    def __init__(self, cost):
+        """
+        :param cost: Время обработки одного комментария, секунд.
+        """
+        self.cost = cost
+
+    def translate(self, texts):
+        time.sleep(self.cost * len(texts))
+        return [f'translated: {text}' for text in texts]
+
+    def translate_batch(self, batch, indices=None):
+        if indices is None:
+            indices = np.arange(len(batch))
+        batch.set_translations(indices, self.translate(batch.select_texts(indices)))
+        return batch
+
+
+class SyntheticSentimentAnalyzer:
+    """Анализатор тональности с фиксированной стоимостью на комментарий и воспроизводимыми оценками."""
+
+    model_name = 'synthetic-sentiment'
+    multilingual = False
+
+    def __init__(self, cost):
+        """
+        :param cost: Время обработки одного комментария, секунд.
+        """
+        self.cost = cost
+
+    def analyze(self, texts):
+        time.sleep(self.cost * len(texts))
+        return [
+            {'text': text, 'stars': hashlib.md5(text.encode()).digest()[0] % 5 + 1, 'score': 0.9}
+            for text in texts
+        ]
+
+    def analyze_batch(self, batch):
+        batch.set_sentiments(self.analyze(batch.model_texts()))
+        return batch
+
+
+class InstrumentedBot(TelegramBot):
+    """Бот, замеряющий время этапов анализа."""
+
+    def __init__(self, *args, timer, models=None, **kwargs):
+        """
+        :param timer: Сборщик длительностей этапов (StageTimer).
+        :param models: Пара (переводчик, анализатор тональности) вместо загружаемых моделей.
+        """
+        self.timer = timer
+        self.models = models
+        super().__init__(*args, **kwargs)
+
+    def _create_translator(self):
+        if self.models:
+            return self.models[0]
+        return super()._create_translator()
+
+    def _create_sentiment_analyzer(self):
+        if self.models:
+            return self.models[1]
+        return super()._create_sentiment_analyzer()
+
+    async def _fetch_comments(self, video_id):
+        with self.timer.measure('fetch'):
+            return await super()._fetch_comments(video_id)
+
+    def _route_comments(self, comments):
+        with self.timer.measure('route'):
+            return super()._route_comments(comments)
+
+    def _translate_comments(self, comments, indices):
+        with self.timer.measure('translate'):
+            return super()._translate_comments(comments, indices)
+
+    def _analyze_sentiments(self, comments):
+        with self.timer.measure('sentiment'):
+            return super()._analyze_sentiments(comments)
+
+    def _evaluate_video(self, comments):
+        with self.timer.measure('evaluate'):
+            return super()._evaluate_video(comments)
+
+
+class SimulatedMessage:
+    """Сообщение Telegram: ответы и правки записываются с отметками времени."""
+
+    def __init__(self, conversation, text='', latency=0.0):
+        self.conversation = conversation
+        self.text = text
+        self.latency = latency
+
+    async def reply_text(self, text):
+        return await self._send(text)
+
+    async def edit_text(self, text):
+        return await self._send(text)
+
+    async def _send(self, text):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        self.conversation.append((time.perf_counter(), text))
+        return SimulatedMessage(self.conversation, text, self.latency)
+
+
+class SimulatedUpdate:
+    """Обновление Telegram с текстовым сообщением пользователя."""
+
+    def __init__(self, user_id, text, conversation, latency=0.0):
+        self.message = SimulatedMessage(conversation, text, latency)
+        self.effective_user = type('User', (), {'id': user_id})()
+        self.effective_chat = type('Chat', (), {'id': user_id})()
+
+
+def summarize(durations):
+    """Сводка длительностей в миллисекундах."""
+    if not durations:
+        return {'count': 0}
+    values = np.asarray(durations) * 1000
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {
+        'count': len(values),
+        'mean': float(values.mean()),
+        'p50': float(p50),
+        'p95': float(p95),
+        'p99': float(p99),
+        'max': float(values.max()),
+        'total': float(values.sum()),
+    }
+
+
+def peak_rss_mb():
+    """Пиковый размер резидентной памяти процесса, МБ."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux возвращает килобайты, macOS — байты
+    return peak / 1024 / 1024 if sys.platform == 'darwin' else peak / 1024
+
+
+def environment():
+    """Описание окружения запуска для сопоставления результатов."""
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, timeout=5,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'commit': commit,
+    }
+
+
+def create_youtube_service(server, client, max_concurrency):
+    """Клиент API, направленный на заглушку, без ограничения частоты запросов."""
+    quota_manager = QuotaManager(['load-test'], daily_quota=10 ** 9, rate=10 ** 9, burst=10 ** 9)
+    if client == 'async':
+        return AsyncYouTubeService(
+            'load-test', base_url=server.base_url, max_concurrency=max_concurrency, quota_manager=quota_manager
+        )
+    return YouTubeService('load-test', quota_manager=quota_manager, api_endpoint=server.endpoint)
+
+
+async def drive(bot, video_ids, requests, concurrency, telegram_latency):
+    """
+    Отправляет сообщения боту от виртуальных пользователей.
+
+    :return: Список пар (время начала, переписка) по каждому сообщению.
+    """
+    conversations = []
+    next_request = iter(range(requests))
+
+    async def user(user_id):
+        for i in next_request:
+            conversation = []
+            video_id = video_ids[i % len(video_ids)]
+            update = SimulatedUpdate(user_id, f'https://youtu.be/{video_id}', conversation, telegram_latency)
+            started = time.perf_counter()
+            await bot.handle_message(update, None)
+            conversations.append((started, time.perf_counter(), conversation))
+
+    await asyncio.gather(*(user(user_id) for user_id in range(concurrency)))
+    return conversations
+
+
+async def run(args):
+    """Выполняет нагрузочный тест и возвращает отчёт."""
+    timer = StageTimer()
+    models = None
+    if args.synthetic_models:
+        cost = args.synthetic_cost_ms / 1000
+        models = (SyntheticTranslator(cost), SyntheticSentimentAnalyzer(cost))
+
+    video_count = args.videos or args.requests
+    video_ids = [f'bench{i:06d}' for i in range(video_count)]
+
+    with FakeYouTubeServer(latency=args.youtube_latency_ms / 1000, threads_per_video=args.threads_per_video,
+                           recording=args.recording) as server:
+        youtube_service = create_youtube_service(server, args.client, args.youtube_concurrency)
+        bot = InstrumentedBot(
+            'load-test', None, timer=timer, models=models,
+            worker_pool=WorkerPool(max_workers=args.workers, max_queue_size=args.concurrency),
+            result_cache=ResultCache(), youtube_service=youtube_service, warm_up=False,
+            inference_backend=args.backend
+        )
+        bot.MAX_COMMENTS = args.max_comments
+        # Загрузка моделей не входит в измерение
+        bot.preload()
+
+        started = time.perf_counter()
+        conversations = await drive(bot, video_ids, args.requests, args.concurrency, args.telegram_latency_ms / 1000)
+        duration = time.perf_counter() - started
+
+        bot.worker_pool.shutdown()
+        if args.client == 'async':
+            await youtube_service.aclose()
+        youtube_requests = server.requests
+
+    latencies, first_responses, errors = [], [], Counter()
+    for request_started, finished, conversation in conversations:
+        latencies.append(finished - request_started)
+        if conversation:
+            first_responses.append(conversation[0][0] - request_started)
+        reply = conversation[-1][1] if conversation else 'нет ответа'
+        if not reply.startswith('Анализ завершён'):
+            errors[reply.splitlines()[0]] += 1
+
+    return {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'config': vars(args),
+        'environment': environment(),
+        'requests': len(conversations),
+        'succeeded': len(conversations) - sum(errors.values()),
+        'errors': dict(errors),
+        'duration_seconds': duration,
+        'throughput_rps': len(conversations) / duration,
+        'latency': summarize(latencies),
+        'first_response': summarize(first_responses),
+        'stages': {stage: summarize(timer.durations[stage]) for stage in STAGES},
+        'youtube_requests': youtube_requests,
+        'cache': bot.result_cache.stats(),
+        'peak_rss_mb': peak_rss_mb(),
+    }
+
+
+def print_report(report):
+    """Печатает основные показатели отчёта."""
+    print(f"Запросов: {report['requests']}, успешно: {report['succeeded']}, "
+          f"за {report['duration_seconds']:.1f} с ({report['throughput_rps']:.2f} запросов/с)")
+    for reply, count in report['errors'].items():
+        print(f"  ошибка ×{count}: {reply}")
+    print(f"Пиковый RSS: {report['peak_rss_mb']:.0f} МБ, запросов к YouTube API: {report['youtube_requests']}")
+    print()
+    print(f"{'мс':<16} {'вызовов':>8} {'p50':>9} {'p95':>9} {'p99':>9} {'max':>9} {'всего, с':>9}")
+    rows = [('запрос', report['latency']), ('первый ответ', report['first_response'])]
+    rows += [(stage, report['stages'][stage]) for stage in STAGES]
+    for name, summary in rows:
+        if not summary['count']:
+            print(f"{name:<16} {0:>8}")
+            continue
+        print(f"{name:<16} {summary['count']:>8} {summary['p50']:>9.1f} {summary['p95']:>9.1f} "
+              f"{summary['p99']:>9.1f} {summary['max']:>9.1f} {summary['total'] / 1000:>9.2f}")
+
+
+def compare(baseline, report):
+    """Печатает изменение показателей относительно предыдущего запуска."""
+    print()
+    print(f"Сравнение с запуском {baseline.get('timestamp')} (коммит {baseline['environment'].get('commit')}):")
+    print(f"{'показатель':<28} {'было':>10} {'стало':>10} {'изменение':>10}")
+    for path, higher_is_better in COMPARED_METRICS:
+        old, new = baseline, report
+        for key in path:
+            old = old.get(key, {}) if isinstance(old, dict) else None
+            new = new.get(key, {}) if isinstance(new, dict) else None
+        if not isinstance(old, (int, float)) or not isinstance(new, (int, float)) or not old:
+            continue
+        change = (new - old) / old * 100
+        better = change > 0 if higher_is_better else change < 0
+        mark = '+' if better else '-' if abs(change) >= 1 else ' '
+        print(f"{'.'.join(path):<28} {old:>10.2f} {new:>10.2f} {change:>+9.1f}% {mark}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=200, help='количество сообщений')
+    parser.add_argument('--concurrency', type=int, default=20, help='количество виртуальных пользователей')
+    parser.add_argument('--videos', type=int, help='количество разных видео (по умолчанию — все разные)')
+    parser.add_argument('--workers', type=int, default=2, help='размер пула воркеров бота')
+    parser.add_argument('--max-comments', type=int, default=TelegramBot.MAX_COMMENTS,
+                        help='количество анализируемых комментариев на видео')
+    parser.add_argument('--client', choices=['async', 'sync'], default='async', help='клиент YouTube API')
+    parser.add_argument('--youtube-concurrency', type=int, default=8,
+                        help='одновременных запросов асинхронного клиента')
+    parser.add_argument('--youtube-latency-ms', type=float, default=50.0, help='задержка ответа заглушки API')
+    parser.add_argument('--threads-per-video', type=int, default=200, help='синтетических веток на видео')
+    parser.add_argument('--recording', help='JSON-файл с записанными ветками комментариев')
+    parser.add_argument('--telegram-latency-ms', type=float, default=0.0, help='задержка отправки сообщения')
+    parser.add_argument('--synthetic-models', action='store_true', help='синтетические модели вместо настоящих')
+    parser.add_argument('--synthetic-cost-ms', type=float, default=2.0,
+                        help='стоимость синтетической модели на комментарий')
+    parser.add_argument('--backend', default=os.getenv('INFERENCE_BACKEND', 'transformers'),
+                        help='бэкенд инференса настоящих моделей')
+    parser.add_argument('--output', default='load_test.json', help='JSON-файл с результатами')
+    parser.add_argument('--compare', help='JSON-файл предыдущего запуска для сравнения')
+    parser.add_argument('--verbose', action='store_true', help='выводить журнал бота')
+    args = parser.parse_args()
+
+    if not args.verbose:
+        logging.getLogger('telegram_bot').setLevel(logging.WARNING)
+
+    report = asyncio.run(run(args))
+    print_report(report)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"\nРезультаты сохранены в {args.output}")
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            compare(json.load(f), report)
+
+
+if __name__ == '__main__':
+    main()
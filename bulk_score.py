@@ -0,0 +1,306 @@
+"""
+Пакетная оценка релевантности множества видео (каналы, плейлисты) без Telegram.
+
+Видео распределяются по пулу процессов; каждый процесс один раз загружает
+свои копии моделей. Результаты дописываются в JSONL-файл по мере готовности,
+поэтому прерванный запуск продолжается с того же места: уже оценённые
+видео пропускаются.
+
+Запуск: python bulk_score.py videos.txt --output results.jsonl [--parquet results.parquet] [--workers 4]
+"""
+import argparse
+import json
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dotenv import load_dotenv
+from quota_manager import DEFAULT_DAILY_QUOTA, QuotaManager
+from youtube_links import parse_video_reference
+
+logger = logging.getLogger(__name__)
+
+PYARROW_INSTALL_HINT = "Для записи в Parquet установите: pip install pyarrow"
+
+# Компоненты процесса-воркера, создаются в init_worker
+_worker = {}
+
+
+def read_video_ids(path):
+    """
+    Читает список видео: по одной ссылке или идентификатору на строку.
+
+    Пустые строки и строки, начинающиеся с '#', пропускаются; повторы удаляются.
+
+    :param path: Путь к файлу со списком видео.
+    :return: Список идентификаторов видео в порядке файла.
+    """
+    video_ids = []
+    seen = set()
+    with open(path, encoding='utf-8') as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            video_id = parse_video_reference(line)
+            if video_id is None:
+                logger.warning(f"Строка {line_number}: не удалось извлечь video_id из {line!r}")
+            elif video_id not in seen:
+                seen.add(video_id)
+                video_ids.append(video_id)
+    return video_ids
+
+
+def load_results(path):
+    """
+    Читает результаты предыдущих запусков.
+
+    Для каждого видео берётся последняя запись; оборванная последняя строка
+    (запуск прерван во время записи) игнорируется.
+
+    :param path: Путь к JSONL-файлу результатов.
+    :return: Словарь video_id -> запись.
+    """
+    results = {}
+    if not os.path.exists(path):
+        return results
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            results[record['video_id']] = record
+    return results
+
+
+def completed_video_ids(results):
+    """Идентификаторы видео, успешно оценённых ранее (записи с ошибкой оцениваются повторно)."""
+    return {video_id for video_id, record in results.items() if 'error' not in record}
+
+
+def worker_quota_settings(workers, daily_quota=DEFAULT_DAILY_QUOTA, rate=20.0, burst=50):
+    """
+    Делит дневную квоту и ограничение частоты запросов между процессами-воркерами.
+
+    Каждый процесс ведёт собственный учёт квоты (QuotaManager), поэтому без
+    деления N процессов вместе могли бы израсходовать N дневных квот, прежде
+    чем любой из них начнёт сокращать загрузку.
+
+    :param workers: Количество процессов.
+    :param daily_quota: Дневная квота одного ключа, единиц.
+    :param rate: Допустимая скорость расхода квоты, единиц в секунду.
+    :param burst: Допустимый всплеск запросов, единиц.
+    :return: Параметры QuotaManager одного процесса: daily_quota, rate и burst.
+    """
+    return {
+        'daily_quota': max(1, daily_quota // workers),
+        'rate': rate / workers,
+        'burst': max(1, burst // workers),
+    }
+
+
+def init_worker(api_key, backend, memo_path, max_comments, threads, near_duplicate_threshold=None, quota=None):
+    """
+    Инициализирует процесс-воркер: клиент API и собственные копии моделей.
+
+    :param api_key: API ключи YouTube Data API через запятую.
+    :param backend: Бэкенд инференса моделей.
+    :param memo_path: Путь к кешу результатов по комментариям или None.
+    :param max_comments: Количество комментариев на видео.
+    :param threads: Количество потоков на вызов модели в процессе (см. inference_backends.load_model).
+    :param near_duplicate_threshold: Порог объединения почти одинаковых комментариев или None.
+    :param quota: Доля квоты процесса — параметры QuotaManager (см. worker_quota_settings).
+    """
+    from youtube_service import YouTubeService
+    from translator import Translator
+    from sentiment_analyzer import SentimentAnalyzer
+    from language_detector import LanguageDetector
+    from video_evaluator import VideoEvaluator
+    from comment_memo import CommentMemo
+
+    memo = CommentMemo(memo_path) if memo_path else None
+    _worker.update(
+        youtube=YouTubeService(
+            None, quota_manager=QuotaManager([key.strip() for key in api_key.split(',')], **(quota or {}))
+        ),
+        # Процессы не должны конкурировать за ядра: потоки ограничиваются и у PyTorch, и у сессий ONNX Runtime
+        translator=Translator(memo=memo, backend=backend, num_threads=threads),
+        sentiment_analyzer=SentimentAnalyzer(memo=memo, backend=backend, num_threads=threads),
+        language_detector=LanguageDetector(),
+        video_evaluator=VideoEvaluator(),
+        max_comments=max_comments,
+        near_duplicate_threshold=near_duplicate_threshold,
+    )
+
+
+def score_video(video_id):
+    """
+    Оценивает одно видео в процессе-воркере.
+
+    :param video_id: Идентификатор видео.
+    :return: Запись результата; при ошибке запись содержит поле 'error'.
+    """
+    from language_detector import route_batch
+    from streaming_pipeline import stream_analysis
+    from near_duplicates import collapse_near_duplicates
+
+    started = time.perf_counter()
+    record = {'video_id': video_id}
+    try:
+        comments = _worker['youtube'].get_comment_batch(video_id, max_results=_worker['max_comments'])
+        if not len(comments):
+            record['error'] = 'no comments'
+            return record
+        if _worker.get('near_duplicate_threshold') is not None:
+            record['fetched_comments'] = len(comments)
+            comments, _ = collapse_near_duplicates(comments, _worker['near_duplicate_threshold'])
+
+        sentiment_analyzer = _worker['sentiment_analyzer']
+        stream = stream_analysis(
+            comments,
+            lambda batch: route_batch(batch, _worker['language_detector'], sentiment_analyzer.multilingual),
+            _worker['translator'].translate_batch,
+            sentiment_analyzer.analyze_batch,
+            batch_size=len(comments)
+        )
+        for _ in stream:
+            pass
+        record.update(_worker['video_evaluator'].evaluate_batch(comments))
+    except Exception as e:
+        record['error'] = str(e)
+    quota = getattr(_worker['youtube'], 'quota', None)
+    if quota is not None:
+        record['quota_units'] = quota.video_units(video_id)
+    record['elapsed'] = time.perf_counter() - started
+    return record
+
+
+def write_parquet(results, path):
+    """
+    Записывает результаты в Parquet.
+
+    :param results: Список записей результатов.
+    :param path: Путь к Parquet-файлу.
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise ImportError(PYARROW_INSTALL_HINT) from e
+
+    rows = []
+    for record in results:
+        row = {key: value for key, value in record.items() if key not in ('distribution', 'counts', 'confidence_interval')}
+        interval = record.get('confidence_interval') or [None, None]
+        row['ci_low'], row['ci_high'] = interval
+        for star in range(1, 6):
+            row[f'share_{star}'] = record.get('distribution', {}).get(str(star))
+        rows.append(row)
+    pq.write_table(pa.Table.from_pylist(rows), path)
+
+
+def run(video_ids, output, api_key, workers=1, backend='transformers', memo_path=None, max_comments=100,
+        near_duplicate_threshold=None, daily_quota=DEFAULT_DAILY_QUOTA, rate=20.0, burst=50):
+    """
+    Оценивает видео в пуле процессов, дописывая результаты в output.
+
+    :param video_ids: Список идентификаторов видео.
+    :param output: Путь к JSONL-файлу результатов (он же контрольная точка).
+    :param api_key: API ключи YouTube Data API через запятую.
+    :param workers: Количество процессов.
+    :param backend: Бэкенд инференса моделей.
+    :param memo_path: Путь к общему кешу результатов по комментариям.
+    :param max_comments: Количество комментариев на видео.
+    :param near_duplicate_threshold: Порог объединения почти одинаковых комментариев или None.
+    :param daily_quota: Дневная квота одного ключа на весь запуск, единиц (делится между процессами).
+    :param rate: Допустимая скорость расхода квоты на весь запуск, единиц в секунду.
+    :param burst: Допустимый всплеск запросов на весь запуск, единиц.
+    :return: Словарь со статистикой запуска.
+    """
+    done = completed_video_ids(load_results(output))
+    pending = [video_id for video_id in video_ids if video_id not in done]
+    logger.info(f"Видео всего: {len(video_ids)}, уже оценено: {len(video_ids) - len(pending)}, осталось: {len(pending)}")
+
+    stats = {'scored': 0, 'failed': 0, 'skipped': len(video_ids) - len(pending)}
+    if not pending:
+        stats['videos_per_minute'] = 0.0
+        return stats
+
+    threads = max(1, (os.cpu_count() or 1) // workers)
+    quota = worker_quota_settings(workers, daily_quota, rate, burst)
+    started = time.perf_counter()
+    with open(output, 'a', encoding='utf-8') as out, ProcessPoolExecutor(
+        max_workers=workers, initializer=init_worker,
+        initargs=(api_key, backend, memo_path, max_comments, threads, near_duplicate_threshold, quota)
+    ) as pool:
+        futures = [pool.submit(score_video, video_id) for video_id in pending]
+        try:
+            for future in as_completed(futures):
+                record = future.result()
+                out.write(json.dumps(record, ensure_ascii=False) + '\n')
+                out.flush()
+
+                stats['failed' if 'error' in record else 'scored'] += 1
+                finished = stats['scored'] + stats['failed']
+                rate = finished / (time.perf_counter() - started) * 60
+                if 'error' in record:
+                    logger.warning(f"[{finished}/{len(pending)}] {record['video_id']}: ошибка {record['error']}")
+                else:
+                    logger.info(
+                        f"[{finished}/{len(pending)}] {record['video_id']}: {record['video_relevance']}% "
+                        f"({rate:.1f} видео/мин)"
+                    )
+        except KeyboardInterrupt:
+            logger.warning("Прервано, готовые результаты сохранены; повторный запуск продолжит оценку")
+            for future in futures:
+                future.cancel()
+            raise
+
+    stats['videos_per_minute'] = (stats['scored'] + stats['failed']) / (time.perf_counter() - started) * 60
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('input', help='файл со ссылками или идентификаторами видео, по одному на строку')
+    parser.add_argument('--output', default='results.jsonl', help='JSONL-файл результатов (контрольная точка)')
+    parser.add_argument('--parquet', help='дополнительно записать итоговые результаты в Parquet')
+    parser.add_argument('--workers', type=int, default=max(1, (os.cpu_count() or 2) // 2), help='количество процессов')
+    parser.add_argument('--max-comments', type=int, default=100, help='количество комментариев на видео')
+    parser.add_argument('--backend', default=os.getenv('INFERENCE_BACKEND', 'transformers'),
+                        help='бэкенд инференса: transformers, onnx, onnx-int8')
+    parser.add_argument('--memo-path', default=os.getenv('COMMENT_MEMO_PATH'),
+                        help='кеш результатов по комментариям (SQLite), общий для процессов')
+    parser.add_argument('--near-duplicate-threshold', type=float,
+                        help='объединять почти одинаковые комментарии со сходством не ниже порога (например, 0.8)')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    load_dotenv()
+    api_key = os.getenv('YOUTUBE_API_KEYS') or os.getenv('YOUTUBE_API_KEY')
+    if not api_key:
+        raise ValueError("Необходимо установить YOUTUBE_API_KEY или YOUTUBE_API_KEYS")
+
+    video_ids = read_video_ids(args.input)
+    stats = run(
+        video_ids, args.output, api_key, workers=args.workers, backend=args.backend,
+        memo_path=args.memo_path, max_comments=args.max_comments,
+        near_duplicate_threshold=args.near_duplicate_threshold,
+        daily_quota=int(os.getenv('YOUTUBE_DAILY_QUOTA', str(DEFAULT_DAILY_QUOTA))),
+        rate=float(os.getenv('YOUTUBE_RATE_LIMIT', '20')),
+        burst=int(os.getenv('YOUTUBE_RATE_BURST', '50'))
+    )
+    logger.info(
+        f"Оценено: {stats['scored']}, с ошибкой: {stats['failed']}, пропущено: {stats['skipped']}, "
+        f"скорость: {stats['videos_per_minute']:.1f} видео/мин"
+    )
+
+    if args.parquet:
+        results = load_results(args.output)
+        write_parquet([results[video_id] for video_id in video_ids if video_id in results], args.parquet)
+        logger.info(f"Результаты записаны в {args.parquet}")
+
+
+if __name__ == '__main__':
+    main()
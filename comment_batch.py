@@ -0,0 +1,138 @@
+import numpy as np
+
+# Значение в столбце stars для ещё не проанализированных комментариев
+NOT_ANALYZED = 0
+
+
+def _object_column(values, size):
+    column = np.empty(size, dtype=object)
+    if values is not None:
+        column[:] = values
+    return column
+
+
+class CommentBatch:
+    """
+    Столбцовое представление комментариев.
+
+    Вместо словаря на каждый комментарий хранит по массиву на каждое поле:
+    тексты, лайки, переводы, оценки тональности, язык и путь обработки.
+    Срез (batch[start:stop]) не копирует данные: этапы конвейера записывают
+    результаты в столбцы среза, и они сразу видны в исходном наборе.
+    """
+
+    __slots__ = ('texts', 'likes', 'translated', 'stars', 'scores', 'languages', 'paths')
+
+    def __init__(self, texts=(), likes=None):
+        """
+        :param texts: Тексты комментариев.
+        :param likes: Количество лайков (по умолчанию 0).
+        """
+        texts = list(texts)
+        size = len(texts)
+        self.texts = _object_column(texts, size)
+        self.likes = np.zeros(size, dtype=np.int64) if likes is None else np.asarray(likes, dtype=np.int64)
+        if len(self.likes) != size:
+            raise ValueError("Количество лайков не совпадает с количеством текстов")
+        self.translated = _object_column(None, size)
+        self.stars = np.full(size, NOT_ANALYZED, dtype=np.int8)
+        self.scores = np.zeros(size, dtype=np.float32)
+        self.languages = _object_column(None, size)
+        self.paths = _object_column(None, size)
+
+    @classmethod
+    def from_comments(cls, comments):
+        """
+        Создаёт набор из списка словарей комментариев ('text', 'likeCount').
+
+        :param comments: Список словарей комментариев.
+        :return: CommentBatch.
+        """
+        return cls([comment['text'] for comment in comments], [comment['likeCount'] for comment in comments])
+
+    @classmethod
+    def concat(cls, batches):
+        """
+        Объединяет наборы в один (с копированием столбцов).
+
+        :param batches: Последовательность наборов (CommentBatch).
+        :return: Новый CommentBatch: комментарии наборов подряд в том же порядке.
+        """
+        combined = object.__new__(cls)
+        for name in cls.__slots__:
+            setattr(combined, name, np.concatenate([getattr(batch, name) for batch in batches]))
+        return combined
+
+    def __len__(self):
+        return len(self.texts)
+
+    def __getitem__(self, index):
+        """Срез набора без копирования столбцов."""
+        if not isinstance(index, slice):
+            raise TypeError("CommentBatch поддерживает только срезы")
+        view = object.__new__(CommentBatch)
+        for name in self.__slots__:
+            setattr(view, name, getattr(self, name)[index])
+        return view
+
+    def take(self, indices):
+        """
+        Копия набора с комментариями с указанными индексами.
+
+        :param indices: Индексы комментариев.
+        :return: Новый CommentBatch.
+        """
+        subset = object.__new__(CommentBatch)
+        for name in self.__slots__:
+            setattr(subset, name, getattr(self, name)[indices])
+        return subset
+
+    def select_texts(self, indices):
+        """
+        Возвращает тексты комментариев с указанными индексами.
+
+        :param indices: Индексы комментариев.
+        :return: Список строк.
+        """
+        return self.texts[indices].tolist()
+
+    def model_texts(self):
+        """Тексты для анализа тональности: перевод, если он есть, иначе исходный текст."""
+        return [text if translated is None else translated for text, translated in zip(self.texts, self.translated)]
+
+    def set_translations(self, indices, translations):
+        """
+        Сохраняет переводы комментариев с указанными индексами.
+
+        :param indices: Индексы комментариев.
+        :param translations: Переводы в том же порядке.
+        """
+        self.translated[indices] = _object_column(translations, len(translations))
+
+    def set_sentiments(self, sentiments):
+        """
+        Сохраняет результаты анализа тональности всех комментариев набора.
+
+        :param sentiments: Список словарей с 'stars' и 'score'.
+        """
+        self.stars[:] = [sentiment['stars'] for sentiment in sentiments]
+        self.scores[:] = [sentiment['score'] for sentiment in sentiments]
+
+    def to_comments(self):
+        """
+        Преобразует набор в список словарей комментариев (для кеша и сериализации).
+
+        :return: Список словарей с 'text', 'likeCount' и результатами обработки.
+        """
+        comments = []
+        for i in range(len(self)):
+            comment = {'text': self.texts[i], 'likeCount': int(self.likes[i])}
+            if self.languages[i] is not None:
+                comment['language'] = self.languages[i]
+                comment['translation_path'] = self.paths[i]
+            if self.stars[i] != NOT_ANALYZED:
+                comment['translated_text'] = self.texts[i] if self.translated[i] is None else self.translated[i]
+                comment['stars'] = int(self.stars[i])
+                comment['sentiment_score'] = float(self.scores[i])
+            comments.append(comment)
+        return comments
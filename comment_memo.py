@@ -0,0 +1,157 @@
+import hashlib
+import json
+import logging
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+WHITESPACE_PATTERN = re.compile(r'\s+')
+
+
+def normalize_text(text):
+    """
+    Нормализует текст комментария для поиска в кеше.
+
+    :param text: Исходный текст.
+    :return: Текст в форме NFKC без лишних пробелов.
+    """
+    return WHITESPACE_PATTERN.sub(' ', unicodedata.normalize('NFKC', text)).strip()
+
+
+def text_key(namespace, text):
+    """
+    Вычисляет ключ записи по нормализованному тексту и пространству имён (модели).
+
+    :return: 16-байтовый хеш BLAKE2b.
+    """
+    payload = f'{namespace}\0{normalize_text(text)}'.encode('utf-8')
+    return hashlib.blake2b(payload, digest_size=16).digest()
+
+
+class CommentMemo:
+    """
+    Кеш результатов обработки отдельных комментариев (перевод, тональность).
+
+    Записи адресуются хешем нормализованного текста и названия модели, поэтому
+    повторяющиеся комментарии ("first", эмодзи, копипаста) обрабатываются моделью
+    один раз. Хранилище — компактная таблица SQLite с вытеснением давно не
+    использованных записей при превышении лимита.
+    """
+
+    def __init__(self, path=None, max_entries=200000):
+        """
+        Инициализация хранилища.
+
+        :param path: Путь к файлу SQLite; None — хранилище в памяти.
+        :param max_entries: Максимальное количество записей.
+        """
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        if path is None:
+            path = ':memory:'
+        else:
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(path), check_same_thread=False, timeout=30)
+        if path != ':memory:':
+            # Кеш может использоваться несколькими процессами (bulk_score): WAL не блокирует чтение при записи
+            self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute(
+            'CREATE TABLE IF NOT EXISTS memo ('
+            'key BLOB PRIMARY KEY, value TEXT NOT NULL, last_used INTEGER NOT NULL) WITHOUT ROWID'
+        )
+        self._db.execute('CREATE INDEX IF NOT EXISTS memo_last_used ON memo (last_used)')
+        self._db.commit()
+        self._size = self._db.execute('SELECT COUNT(*) FROM memo').fetchone()[0]
+
+    def memoize(self, namespace, texts, compute):
+        """
+        Возвращает результаты для текстов, вычисляя только отсутствующие в кеше.
+
+        :param namespace: Пространство имён, например 'sentiment:<модель>'.
+        :param texts: Список текстов.
+        :param compute: Функция, принимающая список текстов и возвращающая список JSON-сериализуемых результатов.
+        :return: Список результатов в порядке texts.
+        """
+        keys = [text_key(namespace, text) for text in texts]
+        cached = self.get_many(keys)
+
+        # Одинаковые тексты внутри батча тоже вычисляются один раз
+        missing = {}
+        for i, key in enumerate(keys):
+            if key not in cached and key not in missing:
+                missing[key] = i
+
+        if missing:
+            computed = compute([texts[i] for i in missing.values()])
+            new_values = dict(zip(missing.keys(), computed))
+            self.set_many(new_values)
+            cached.update(new_values)
+
+        logger.debug(f"Кеш комментариев {namespace}: {len(texts) - len(missing)} из {len(texts)} найдено")
+        return [cached[key] for key in keys]
+
+    def get_many(self, keys):
+        """
+        Читает записи по ключам и обновляет время их использования.
+
+        :return: Словарь key -> значение для найденных записей.
+        """
+        found = {}
+        unique_keys = list(dict.fromkeys(keys))
+        with self._lock:
+            for start in range(0, len(unique_keys), 500):
+                chunk = unique_keys[start:start + 500]
+                placeholders = ','.join('?' * len(chunk))
+                rows = self._db.execute(f'SELECT key, value FROM memo WHERE key IN ({placeholders})', chunk)
+                for key, value in rows:
+                    found[key] = json.loads(value)
+            if found:
+                now = int(time.time())
+                self._db.executemany('UPDATE memo SET last_used = ? WHERE key = ?', [(now, key) for key in found])
+                self._db.commit()
+            self.hits += len(found)
+            self.misses += len(unique_keys) - len(found)
+        return found
+
+    def set_many(self, values):
+        """
+        Сохраняет записи и вытесняет давно не использованные при превышении лимита.
+
+        :param values: Словарь key -> JSON-сериализуемое значение.
+        """
+        now = int(time.time())
+        with self._lock:
+            self._db.executemany(
+                'INSERT OR REPLACE INTO memo (key, value, last_used) VALUES (?, ?, ?)',
+                [(key, json.dumps(value, ensure_ascii=False), now) for key, value in values.items()]
+            )
+            self._size += len(values)
+            if self._size > self.max_entries:
+                self._size = self._db.execute('SELECT COUNT(*) FROM memo').fetchone()[0]
+            if self._size > self.max_entries:
+                # Освобождаем 10% сверх лимита, чтобы не вытеснять на каждой записи
+                excess = self._size - int(self.max_entries * 0.9)
+                self._db.execute(
+                    'DELETE FROM memo WHERE key IN (SELECT key FROM memo ORDER BY last_used LIMIT ?)', (excess,)
+                )
+                self._size -= excess
+                self.evictions += excess
+            self._db.commit()
+
+    def __len__(self):
+        with self._lock:
+            return self._db.execute('SELECT COUNT(*) FROM memo').fetchone()[0]
+
+    def close(self):
+        """Закрывает соединение с базой."""
+        self._db.close()
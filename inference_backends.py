@@ -0,0 +1,112 @@
+import logging
+import shutil
+from pathlib import Path
+from transformers import AutoModelForSequenceClassification, AutoModelForSeq2SeqLM
+
+logger = logging.getLogger(__name__)
+
+TRANSFORMERS = 'transformers'
+ONNX = 'onnx'
+ONNX_INT8 = 'onnx-int8'
+BACKENDS = (TRANSFORMERS, ONNX, ONNX_INT8)
+
+OPTIMUM_INSTALL_HINT = "Для бэкендов ONNX установите: pip install optimum[onnxruntime]"
+
+
+def set_num_threads(num_threads):
+    """
+    Задаёт количество потоков PyTorch внутри одной операции (intra-op).
+
+    Настройка действует на весь процесс: по умолчанию каждый вызов модели
+    использует все ядра, и одновременные анализы в нескольких воркерах
+    конкурируют за процессор.
+
+    :param num_threads: Количество потоков; None — значение библиотеки.
+    """
+    if num_threads is None:
+        return
+    import torch
+    if torch.get_num_threads() != num_threads:
+        torch.set_num_threads(num_threads)
+        logger.info(f"Потоков PyTorch на операцию: {num_threads}")
+
+
+def load_model(task, model_name, cache_dir, backend=TRANSFORMERS, num_threads=None):
+    """
+    Загружает модель для выбранного бэкенда инференса.
+
+    Модели ONNX Runtime экспортируются из PyTorch-модели при первой загрузке
+    и сохраняются в cache_dir; вариант int8 получается динамическим квантованием
+    весов экспортированной модели. Интерфейс модели (forward с logits и generate)
+    одинаков для всех бэкендов.
+
+    :param task: 'sequence-classification' или 'seq2seq'.
+    :param model_name: Название модели на Hugging Face.
+    :param cache_dir: Директория для кеширования моделей.
+    :param backend: Один из BACKENDS.
+    :param num_threads: Количество потоков на вызов модели: для PyTorch — общее для процесса
+        (см. set_num_threads), для ONNX Runtime — у сессии модели; None — значение библиотеки.
+    :return: Модель.
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Неизвестный бэкенд инференса: {backend}. Доступны: {', '.join(BACKENDS)}")
+
+    if backend == TRANSFORMERS:
+        set_num_threads(num_threads)
+        model_class = AutoModelForSequenceClassification if task == 'sequence-classification' else AutoModelForSeq2SeqLM
+        model = model_class.from_pretrained(model_name, cache_dir=cache_dir)
+        model.eval()
+        return model
+
+    ort_model_class = _ort_model_class(task)
+    onnx_dir = Path(cache_dir) / 'onnx' / model_name.replace('/', '--')
+    if not any(onnx_dir.glob('*.onnx')):
+        logger.info(f"Экспорт {model_name} в ONNX: {onnx_dir}")
+        ort_model_class.from_pretrained(model_name, export=True, cache_dir=cache_dir).save_pretrained(onnx_dir)
+
+    model_dir = onnx_dir
+    if backend == ONNX_INT8:
+        model_dir = onnx_dir.with_name(onnx_dir.name + '--int8')
+        if not any(model_dir.glob('*.onnx')):
+            logger.info(f"Динамическое квантование {model_name} в int8: {model_dir}")
+            quantize_dynamic_int8(onnx_dir, model_dir)
+
+    session_options = None
+    if num_threads is not None:
+        import onnxruntime
+        session_options = onnxruntime.SessionOptions()
+        session_options.intra_op_num_threads = num_threads
+    return ort_model_class.from_pretrained(model_dir, session_options=session_options)
+
+
+def quantize_dynamic_int8(source_dir, target_dir):
+    """
+    Квантует веса всех ONNX-файлов модели в int8 (динамическое квантование).
+
+    Остальные файлы (конфигурация, параметры генерации) копируются без изменений,
+    имена ONNX-файлов сохраняются, поэтому модель загружается так же, как исходная.
+
+    :param source_dir: Директория с экспортированной ONNX-моделью.
+    :param target_dir: Директория для квантованной модели.
+    """
+    try:
+        from onnxruntime.quantization import quantize_dynamic, QuantType
+    except ImportError as e:
+        raise ImportError(OPTIMUM_INSTALL_HINT) from e
+
+    source_dir, target_dir = Path(source_dir), Path(target_dir)
+    target_dir.mkdir(parents=True, exist_ok=True)
+    for path in source_dir.iterdir():
+        if path.suffix == '.onnx':
+            quantize_dynamic(str(path), str(target_dir / path.name), weight_type=QuantType.QInt8)
+        elif path.is_file():
+            shutil.copy2(path, target_dir / path.name)
+
+
+def _ort_model_class(task):
+    """Возвращает класс модели ONNX Runtime из optimum для задачи."""
+    try:
+        from optimum.onnxruntime import ORTModelForSequenceClassification, ORTModelForSeq2SeqLM
+    except ImportError as e:
+        raise ImportError(OPTIMUM_INSTALL_HINT) from e
+    return ORTModelForSequenceClassification if task == 'sequence-classification' else ORTModelForSeq2SeqLM
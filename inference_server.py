@@ -0,0 +1,359 @@
+"""
+Локальный сервер инференса: один процесс владеет моделями перевода и тональности
+и обслуживает несколько экземпляров бота через Unix-сокет.
+
+Запуск: python inference_server.py --socket /tmp/youtube-rating-inference.sock
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import logging
+import os
+import socket
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from autotune import InferenceProfile, DEFAULT_PROFILE_PATH
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SOCKET_PATH = '/tmp/youtube-rating-inference.sock'
+MAX_LINE_LENGTH = 64 * 1024 * 1024
+
+
+class InferenceServerError(Exception):
+    """Ошибка, возвращённая сервером инференса."""
+
+
+class MicroBatcher:
+    """
+    Объединяет запросы разных клиентов в один батч.
+
+    Запросы копятся в течение max_delay секунд (или до max_batch_size текстов),
+    затем все тексты обрабатываются одним вызовом модели, а результаты
+    раздаются обратно по запросам. Вызовы одной модели выполняются
+    последовательно в отдельном потоке; пока идёт батч, следующий успевает
+    набраться.
+    """
+
+    def __init__(self, func, max_delay=0.005, max_batch_size=256):
+        """
+        :param func: Функция, принимающая список текстов и возвращающая список результатов той же длины.
+        :param max_delay: Время накопления батча, секунд.
+        :param max_batch_size: Количество текстов, при котором батч отправляется сразу.
+        """
+        self.func = func
+        self.max_delay = max_delay
+        self.max_batch_size = max_batch_size
+        self.batches = 0
+        self.requests = 0
+        self._executor = ThreadPoolExecutor(max_workers=1)
+        self._pending = []
+        self._pending_size = 0
+        self._timer = None
+
+    async def submit(self, texts):
+        """
+        Добавляет запрос в текущий батч.
+
+        :param texts: Список текстов запроса.
+        :return: Список результатов для этих текстов.
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((texts, future))
+        self._pending_size += len(texts)
+        self.requests += 1
+
+        if self._pending_size >= self.max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_delay, self._flush)
+        return await future
+
+    def shutdown(self):
+        """Останавливает поток модели."""
+        self._executor.shutdown(wait=False)
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        pending, self._pending, self._pending_size = self._pending, [], 0
+        if pending:
+            asyncio.ensure_future(self._run(pending))
+
+    async def _run(self, pending):
+        texts = [text for request_texts, _ in pending for text in request_texts]
+        self.batches += 1
+        try:
+            results = await asyncio.get_running_loop().run_in_executor(self._executor, self.func, texts)
+        except Exception as e:
+            for _, future in pending:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        offset = 0
+        for request_texts, future in pending:
+            if not future.done():
+                future.set_result(results[offset:offset + len(request_texts)])
+            offset += len(request_texts)
+
+
+class InferenceServer:
+    """
+    Сервер инференса на Unix-сокете.
+
+    Протокол — JSON по строкам: запрос {"id": 1, "op": "translate" | "analyze" | "info", "texts": [...]},
+    ответ {"id": 1, "result": ...} или {"id": 1, "error": "..."}. Одно соединение
+    может отправлять несколько запросов, не дожидаясь ответов.
+    """
+
+    def __init__(self, socket_path, translator, sentiment_analyzer, max_delay=0.005, max_batch_size=256):
+        """
+        :param socket_path: Путь к Unix-сокету.
+        :param translator: Переводчик (Translator).
+        :param sentiment_analyzer: Анализатор тональности (SentimentAnalyzer).
+        :param max_delay: Время накопления батча, секунд.
+        :param max_batch_size: Максимальный размер батча в текстах.
+        """
+        self.socket_path = socket_path
+        self.translator = translator
+        self.sentiment_analyzer = sentiment_analyzer
+        self.batchers = {
+            'translate': MicroBatcher(translator.translate, max_delay, max_batch_size),
+            'analyze': MicroBatcher(sentiment_analyzer.analyze, max_delay, max_batch_size),
+        }
+
+    def info(self):
+        """Сведения о моделях сервера."""
+        return {
+            'translator': {
+                'model_name': self.translator.model_name,
+                'backend': getattr(self.translator, 'backend', None),
+            },
+            'sentiment': {
+                'model_name': self.sentiment_analyzer.model_name,
+                'backend': getattr(self.sentiment_analyzer, 'backend', None),
+                'multilingual': self.sentiment_analyzer.multilingual,
+            },
+            'stats': {op: {'requests': b.requests, 'batches': b.batches} for op, b in self.batchers.items()},
+        }
+
+    async def serve(self, started=None):
+        """
+        Запускает сервер и обслуживает клиентов до отмены.
+
+        :param started: threading.Event, устанавливаемый после открытия сокета.
+        """
+        server = await asyncio.start_unix_server(self._handle_connection, path=self.socket_path, limit=MAX_LINE_LENGTH)
+        logger.info(f"Сервер инференса слушает {self.socket_path}")
+        if started is not None:
+            started.set()
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            for batcher in self.batchers.values():
+                batcher.shutdown()
+
+    async def _handle_connection(self, reader, writer):
+        write_lock = asyncio.Lock()
+        tasks = set()
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                task = asyncio.create_task(self._handle_request(line, writer, write_lock))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            if tasks:
+                await asyncio.gather(*tasks, return_exceptions=True)
+        finally:
+            writer.close()
+
+    async def _handle_request(self, line, writer, write_lock):
+        request_id = None
+        try:
+            request = json.loads(line)
+            request_id = request.get('id')
+            op = request['op']
+            if op == 'info':
+                response = {'id': request_id, 'result': self.info()}
+            elif op in self.batchers:
+                response = {'id': request_id, 'result': await self.batchers[op].submit(request['texts'])}
+            else:
+                response = {'id': request_id, 'error': f'Неизвестная операция: {op}'}
+        except Exception as e:
+            logger.error(f"Ошибка обработки запроса: {e}")
+            response = {'id': request_id, 'error': str(e)}
+
+        async with write_lock:
+            writer.write(json.dumps(response, ensure_ascii=False).encode('utf-8') + b'\n')
+            await writer.drain()
+
+
+class InferenceClient:
+    """
+    Синхронный клиент сервера инференса.
+
+    Каждый поток использует собственное соединение, поэтому клиент можно
+    вызывать из пула воркеров бота.
+    """
+
+    def __init__(self, socket_path=DEFAULT_SOCKET_PATH, timeout=300):
+        """
+        :param socket_path: Путь к Unix-сокету сервера.
+        :param timeout: Таймаут ответа, секунд.
+        """
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self._local = threading.local()
+        self._ids = itertools.count(1)
+
+    def call(self, op, texts=None):
+        """
+        Выполняет запрос к серверу.
+
+        :param op: Операция: 'translate', 'analyze' или 'info'.
+        :param texts: Список текстов.
+        :return: Результат операции.
+        :raises InferenceServerError: Если сервер вернул ошибку.
+        """
+        request_id = next(self._ids)
+        request = {'id': request_id, 'op': op}
+        if texts is not None:
+            request['texts'] = list(texts)
+
+        sock, reader = self._connection()
+        try:
+            sock.sendall(json.dumps(request, ensure_ascii=False).encode('utf-8') + b'\n')
+            line = reader.readline()
+        except OSError:
+            self._disconnect()
+            raise
+        if not line:
+            self._disconnect()
+            raise InferenceServerError('Сервер инференса закрыл соединение')
+
+        response = json.loads(line)
+        if response.get('id') != request_id:
+            self._disconnect()
+            raise InferenceServerError('Ответ сервера инференса не соответствует запросу')
+        if 'error' in response:
+            raise InferenceServerError(response['error'])
+        return response['result']
+
+    def close(self):
+        """Закрывает соединение текущего потока."""
+        self._disconnect()
+
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(self.timeout)
+            sock.connect(self.socket_path)
+            connection = (sock, sock.makefile('rb'))
+            self._local.connection = connection
+        return connection
+
+    def _disconnect(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is not None:
+            sock, reader = connection
+            reader.close()
+            sock.close()
+            self._local.connection = None
+
+
+class RemoteTranslator:
+    """Тонкий клиент переводчика с интерфейсом Translator."""
+
+    def __init__(self, client):
+        """
+        :param client: Клиент сервера инференса (InferenceClient).
+        """
+        self.client = client
+        info = client.call('info')['translator']
+        self.model_name = info['model_name']
+        self.backend = info['backend']
+
+    def translate(self, texts):
+        """Переводит список текстов на английский язык на сервере инференса."""
+        return self.client.call('translate', texts)
+
+    def translate_batch(self, batch, indices=None):
+        """Переводит комментарии набора (CommentBatch) на сервере инференса."""
+        if indices is None:
+            indices = slice(None)
+        batch.set_translations(indices, self.translate(batch.select_texts(indices)))
+        return batch
+
+
+class RemoteSentimentAnalyzer:
+    """Тонкий клиент анализатора тональности с интерфейсом SentimentAnalyzer."""
+
+    def __init__(self, client):
+        """
+        :param client: Клиент сервера инференса (InferenceClient).
+        """
+        self.client = client
+        info = client.call('info')['sentiment']
+        self.model_name = info['model_name']
+        self.backend = info['backend']
+        self.multilingual = info['multilingual']
+
+    def analyze(self, texts):
+        """Анализирует тональность списка текстов на сервере инференса."""
+        return self.client.call('analyze', texts)
+
+    def analyze_batch(self, batch):
+        """Анализирует тональность набора комментариев (CommentBatch) на сервере инференса."""
+        batch.set_sentiments(self.analyze(batch.model_texts()))
+        return batch
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--socket', default=DEFAULT_SOCKET_PATH, help='путь к Unix-сокету')
+    parser.add_argument('--backend', default='transformers', help='бэкенд инференса: transformers, onnx, onnx-int8')
+    parser.add_argument('--max-delay-ms', type=float, default=5.0, help='время накопления батча, мс')
+    parser.add_argument('--max-batch-size', type=int, default=256, help='максимальный размер батча в текстах')
+    parser.add_argument('--memo-path', help='путь к кешу результатов по комментариям (SQLite)')
+    parser.add_argument('--profile', default=os.getenv('INFERENCE_PROFILE', DEFAULT_PROFILE_PATH),
+                        help='профиль калибровки (python autotune.py): количество потоков моделей')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    from translator import Translator
+    from sentiment_analyzer import SentimentAnalyzer
+    from comment_memo import CommentMemo
+
+    memo = CommentMemo(args.memo_path) if args.memo_path else None
+    profile = InferenceProfile.load(args.profile, backend=args.backend)
+    num_threads = profile.threads if profile is not None else None
+    server = InferenceServer(
+        args.socket,
+        Translator(memo=memo, backend=args.backend, num_threads=num_threads),
+        SentimentAnalyzer(memo=memo, backend=args.backend, num_threads=num_threads),
+        max_delay=args.max_delay_ms / 1000,
+        max_batch_size=args.max_batch_size
+    )
+
+    if os.path.exists(args.socket):
+        os.unlink(args.socket)
+    try:
+        asyncio.run(server.serve())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if os.path.exists(args.socket):
+            os.unlink(args.socket)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,300 @@
+"""
+Надёжная очередь заданий анализа между приёмом обновлений и воркерами.
+
+Задание, выданное воркеру, невидимо для остальных на время visibility_timeout;
+если воркер не подтвердил выполнение и не продлил аренду (например, процесс
+упал), задание снова выдаётся. Неудачные задания повторяются с растущей
+задержкой, а после max_attempts попыток переносятся в мёртвые (dead letter).
+"""
+import json
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from pathlib import Path
+from urllib.parse import urlsplit
+
+logger = logging.getLogger(__name__)
+
+# Состояния задания
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+DEAD = 'dead'
+
+
+class Job:
+    """Задание, выданное воркеру."""
+
+    def __init__(self, job_id, payload, attempts, worker_id):
+        """
+        :param job_id: Идентификатор задания.
+        :param payload: JSON-сериализуемые данные задания.
+        :param attempts: Номер попытки (начиная с 1); вместе с worker_id определяет аренду.
+        :param worker_id: Воркер, получивший задание.
+        """
+        self.id = job_id
+        self.payload = payload
+        self.attempts = attempts
+        self.worker_id = worker_id
+
+    def __repr__(self):
+        return f'Job(id={self.id}, attempts={self.attempts}, worker_id={self.worker_id!r})'
+
+
+class JobQueue(ABC):
+    """
+    Интерфейс очереди заданий.
+
+    Реализации регистрируются через register_queue_backend и создаются по адресу
+    в open_job_queue. Методы подтверждения (complete, fail, extend) возвращают
+    False, если аренда задания уже истекла и оно выдано другому воркеру.
+    """
+
+    @abstractmethod
+    def enqueue(self, payload, key=None, delay=0.0):
+        """
+        Добавляет задание.
+
+        :param payload: JSON-сериализуемые данные задания.
+        :param key: Ключ идемпотентности: повторное задание с тем же ключом не добавляется.
+        :param delay: Задержка до первой выдачи, секунд.
+        :return: Идентификатор задания или None, если задание с таким ключом уже есть.
+        """
+
+    @abstractmethod
+    def claim(self, worker_id):
+        """
+        Выдаёт воркеру следующее доступное задание.
+
+        :param worker_id: Идентификатор воркера.
+        :return: Задание (Job) или None, если доступных заданий нет.
+        """
+
+    @abstractmethod
+    def extend(self, job):
+        """Продлевает аренду задания на visibility_timeout."""
+
+    @abstractmethod
+    def complete(self, job):
+        """Отмечает задание выполненным."""
+
+    @abstractmethod
+    def fail(self, job, error):
+        """
+        Отмечает попытку неудачной: задание повторяется позже или становится мёртвым.
+
+        :param job: Задание.
+        :param error: Описание ошибки.
+        """
+
+    @abstractmethod
+    def stats(self):
+        """Количество заданий по состояниям."""
+
+    @abstractmethod
+    def dead_letters(self, limit=100):
+        """Мёртвые задания: список словарей с 'id', 'payload', 'attempts' и 'error'."""
+
+    @abstractmethod
+    def requeue(self, job_id):
+        """Возвращает мёртвое задание в очередь с обнулённым счётчиком попыток."""
+
+    @abstractmethod
+    def purge(self, max_age):
+        """Удаляет выполненные задания старше max_age секунд."""
+
+
+class SQLiteJobQueue(JobQueue):
+    """
+    Очередь заданий в базе SQLite.
+
+    Подходит для нескольких процессов на одной машине: выдача задания — одна
+    транзакция BEGIN IMMEDIATE, поэтому задание получает ровно один воркер.
+    """
+
+    def __init__(self, path, visibility_timeout=300.0, max_attempts=3, retry_delay=10.0, clock=time.time):
+        """
+        :param path: Путь к файлу SQLite.
+        :param visibility_timeout: Время аренды задания воркером, секунд.
+        :param max_attempts: Количество попыток до переноса задания в мёртвые.
+        :param retry_delay: Задержка перед первым повтором, секунд (удваивается с каждой попыткой).
+        :param clock: Функция текущего времени (для тестов).
+        """
+        self.visibility_timeout = visibility_timeout
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self._clock = clock
+        self._lock = threading.Lock()
+
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        # Транзакциями управляем явно; ожидание блокировки другими процессами — до 30 с
+        self._db = sqlite3.connect(str(path), check_same_thread=False, isolation_level=None, timeout=30)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute(
+            'CREATE TABLE IF NOT EXISTS jobs ('
+            'id INTEGER PRIMARY KEY AUTOINCREMENT, key TEXT UNIQUE, payload TEXT NOT NULL, '
+            'status TEXT NOT NULL, attempts INTEGER NOT NULL DEFAULT 0, available_at REAL NOT NULL, '
+            'worker_id TEXT, error TEXT, created_at REAL NOT NULL, updated_at REAL NOT NULL)'
+        )
+        self._db.execute('CREATE INDEX IF NOT EXISTS jobs_available ON jobs (status, available_at)')
+
+    def enqueue(self, payload, key=None, delay=0.0):
+        now = self._clock()
+        with self._lock:
+            cursor = self._db.execute(
+                'INSERT OR IGNORE INTO jobs (key, payload, status, available_at, created_at, updated_at) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                (key, json.dumps(payload, ensure_ascii=False), QUEUED, now + delay, now, now)
+            )
+        if not cursor.rowcount:
+            logger.info(f"Задание с ключом {key} уже в очереди")
+            return None
+        return cursor.lastrowid
+
+    def claim(self, worker_id):
+        now = self._clock()
+        with self._lock, self._transaction():
+            # Аренда истекла на последней попытке: воркер, вероятно, падает на этом задании
+            self._db.execute(
+                'UPDATE jobs SET status = ?, error = ?, updated_at = ? '
+                'WHERE status = ? AND available_at <= ? AND attempts >= ?',
+                (DEAD, 'истекло время аренды', now, RUNNING, now, self.max_attempts)
+            )
+            row = self._db.execute(
+                'SELECT id, payload, attempts FROM jobs WHERE status IN (?, ?) AND available_at <= ? '
+                'ORDER BY available_at, id LIMIT 1',
+                (QUEUED, RUNNING, now)
+            ).fetchone()
+            if row is None:
+                return None
+            job_id, payload, attempts = row
+            self._db.execute(
+                'UPDATE jobs SET status = ?, attempts = ?, available_at = ?, worker_id = ?, updated_at = ? '
+                'WHERE id = ?',
+                (RUNNING, attempts + 1, now + self.visibility_timeout, worker_id, now, job_id)
+            )
+        if attempts:
+            logger.warning(f"Задание {job_id} выдано повторно (попытка {attempts + 1})")
+        return Job(job_id, json.loads(payload), attempts + 1, worker_id)
+
+    def extend(self, job):
+        now = self._clock()
+        return self._update_leased(job, 'available_at = ?, updated_at = ?', (now + self.visibility_timeout, now))
+
+    def complete(self, job):
+        return self._update_leased(job, 'status = ?, error = NULL, updated_at = ?', (DONE, self._clock()))
+
+    def fail(self, job, error):
+        now = self._clock()
+        if job.attempts >= self.max_attempts:
+            logger.error(f"Задание {job.id} перенесено в мёртвые после {job.attempts} попыток: {error}")
+            return self._update_leased(job, 'status = ?, error = ?, updated_at = ?', (DEAD, str(error), now))
+        delay = self.retry_delay * 2 ** (job.attempts - 1)
+        logger.warning(f"Задание {job.id} будет повторено через {delay:.0f} с: {error}")
+        return self._update_leased(
+            job, 'status = ?, error = ?, available_at = ?, updated_at = ?', (QUEUED, str(error), now + delay, now)
+        )
+
+    def stats(self):
+        with self._lock:
+            rows = self._db.execute('SELECT status, COUNT(*) FROM jobs GROUP BY status').fetchall()
+        counts = {QUEUED: 0, RUNNING: 0, DONE: 0, DEAD: 0}
+        counts.update(rows)
+        return counts
+
+    def dead_letters(self, limit=100):
+        with self._lock:
+            rows = self._db.execute(
+                'SELECT id, payload, attempts, error FROM jobs WHERE status = ? ORDER BY updated_at DESC LIMIT ?',
+                (DEAD, limit)
+            ).fetchall()
+        return [
+            {'id': job_id, 'payload': json.loads(payload), 'attempts': attempts, 'error': error}
+            for job_id, payload, attempts, error in rows
+        ]
+
+    def requeue(self, job_id):
+        now = self._clock()
+        with self._lock:
+            cursor = self._db.execute(
+                'UPDATE jobs SET status = ?, attempts = 0, available_at = ?, updated_at = ? WHERE id = ? AND status = ?',
+                (QUEUED, now, now, job_id, DEAD)
+            )
+        return cursor.rowcount > 0
+
+    def purge(self, max_age):
+        with self._lock:
+            cursor = self._db.execute(
+                'DELETE FROM jobs WHERE status = ? AND updated_at < ?', (DONE, self._clock() - max_age)
+            )
+        return cursor.rowcount
+
+    def close(self):
+        """Закрывает соединение с базой."""
+        self._db.close()
+
+    def _update_leased(self, job, assignments, values):
+        """Обновляет задание, если его аренда по-прежнему принадлежит этому воркеру."""
+        with self._lock:
+            cursor = self._db.execute(
+                f'UPDATE jobs SET {assignments} WHERE id = ? AND status = ? AND worker_id = ? AND attempts = ?',
+                (*values, job.id, RUNNING, job.worker_id, job.attempts)
+            )
+        if not cursor.rowcount:
+            logger.warning(f"Аренда задания {job.id} истекла, результат попытки {job.attempts} не учтён")
+        return cursor.rowcount > 0
+
+    @contextmanager
+    def _transaction(self):
+        """Транзакция с блокировкой записи с самого начала (BEGIN IMMEDIATE)."""
+        self._db.execute('BEGIN IMMEDIATE')
+        try:
+            yield
+        except BaseException:
+            self._db.execute('ROLLBACK')
+            raise
+        self._db.execute('COMMIT')
+
+
+QUEUE_BACKENDS = {
+    'sqlite': lambda url, **options: SQLiteJobQueue(url.netloc + url.path, **options),
+}
+
+
+def register_queue_backend(scheme, factory):
+    """
+    Регистрирует реализацию очереди.
+
+    :param scheme: Схема адреса очереди (например, 'redis').
+    :param factory: Функция (разобранный адрес urllib.parse.SplitResult, **параметры) -> JobQueue.
+    """
+    QUEUE_BACKENDS[scheme] = factory
+
+
+def open_job_queue(url, **options):
+    """
+    Открывает очередь по адресу.
+
+    :param url: Адрес очереди: 'sqlite:///abs/path.sqlite3', 'sqlite://relative/path.sqlite3'
+                или путь к файлу (SQLite).
+    :param options: Параметры реализации (visibility_timeout, max_attempts, retry_delay).
+    :return: Очередь (JobQueue).
+    """
+    parts = urlsplit(url)
+    scheme = parts.scheme if '://' in url else 'sqlite'
+    if scheme not in QUEUE_BACKENDS:
+        raise ValueError(f"Неизвестный тип очереди: {scheme}")
+    if '://' not in url:
+        parts = urlsplit(f'sqlite://{url}')
+    return QUEUE_BACKENDS[scheme](parts, **options)
+
+
+def make_worker_id():
+    """Идентификатор воркера: хост, процесс и случайный суффикс."""
+    return f'{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}'
@@ -0,0 +1,155 @@
+import re
+import unicodedata
+import numpy as np
+
+# Пути, по которым комментарий проходит через этап перевода
+PATH_TRANSLATED = 'translated'
+PATH_ENGLISH = 'english'
+PATH_MULTILINGUAL = 'multilingual_model'
+PATH_NO_TEXT = 'no_text'
+
+UNDETERMINED = 'und'
+NO_LINGUISTIC_CONTENT = 'zxx'
+
+# Частотные служебные слова латинских языков
+STOPWORDS = {
+    'en': {'the', 'and', 'is', 'are', 'was', 'this', 'that', 'it', 'you', 'i', 'to', 'of', 'in', 'for',
+           'with', 'my', 'so', 'not', 'but', 'have', 'what', 'who', 'be', 'on', 'me', 'your', 'love', 'video'},
+    'es': {'el', 'la', 'los', 'las', 'de', 'que', 'y', 'es', 'en', 'un', 'una', 'por', 'con', 'para', 'muy',
+           'pero', 'lo', 'como', 'más', 'este', 'esta', 'siempre', 'gracias'},
+    'pt': {'o', 'os', 'as', 'de', 'que', 'e', 'é', 'um', 'uma', 'não', 'com', 'para', 'muito', 'mas', 'isso',
+           'esse', 'essa', 'você', 'obrigado', 'vídeo'},
+    'de': {'der', 'die', 'das', 'und', 'ist', 'nicht', 'ich', 'du', 'ein', 'eine', 'zu', 'mit', 'sehr', 'aber',
+           'auch', 'wie', 'danke', 'wirklich', 'gut'},
+    'fr': {'le', 'la', 'les', 'de', 'des', 'et', 'est', 'un', 'une', 'je', 'pas', 'que', 'pour', 'avec',
+           'très', 'mais', 'merci', 'vidéo', 'ce', 'cette', "c'est"},
+    'it': {'il', 'lo', 'la', 'di', 'che', 'e', 'è', 'un', 'una', 'non', 'per', 'con', 'molto', 'ma', 'questo',
+           'questa', 'grazie', 'sono'},
+    'nl': {'de', 'het', 'een', 'en', 'is', 'niet', 'ik', 'je', 'van', 'dat', 'met', 'voor', 'heel', 'maar',
+           'ook', 'bedankt', 'echt'},
+    'tr': {'bir', 've', 'bu', 'çok', 'için', 'ama', 'de', 'da', 'ne', 'ben', 'sen', 'gibi', 'teşekkürler',
+           'güzel', 'video', 'değil'},
+    'pl': {'i', 'w', 'nie', 'jest', 'to', 'na', 'że', 'się', 'z', 'jak', 'ale', 'bardzo', 'dzięki', 'tak'},
+    'id': {'yang', 'dan', 'ini', 'itu', 'di', 'tidak', 'saya', 'aku', 'dengan', 'untuk', 'bagus', 'sangat',
+           'terima', 'kasih'},
+}
+
+# Буквы, не встречающиеся в английском тексте
+NON_ENGLISH_LATIN = set('ñáéíóúàèìòùâêîôûäëïöüßçãõğşıłąęśźżćńőűøåæœ')
+
+WORD_PATTERN = re.compile(r"[^\W\d_]+(?:'[^\W\d_]+)?")
+
+
+def _script(char):
+    """Определяет письменность символа по его названию в Unicode."""
+    try:
+        name = unicodedata.name(char)
+    except ValueError:
+        return None
+    return name.split(' ', 1)[0]
+
+
+class LanguageDetector:
+    """
+    Быстрое офлайн-определение языка комментария без внешних моделей.
+
+    Язык определяется по письменности (кириллица, CJK, арабское письмо и т.д.),
+    а для латиницы — по частотным служебным словам. Комментарии без букв
+    (эмодзи, числа) получают код 'zxx'.
+    """
+
+    # Письменность -> язык по умолчанию
+    SCRIPT_LANGUAGES = {
+        'CYRILLIC': 'ru',
+        'GREEK': 'el',
+        'ARABIC': 'ar',
+        'HEBREW': 'he',
+        'DEVANAGARI': 'hi',
+        'THAI': 'th',
+        'HANGUL': 'ko',
+        'HIRAGANA': 'ja',
+        'KATAKANA': 'ja',
+        'CJK': 'zh',
+        'ARMENIAN': 'hy',
+        'GEORGIAN': 'ka',
+    }
+
+    def detect(self, text):
+        """
+        Определяет язык текста.
+
+        :param text: Текст комментария.
+        :return: Код языка ISO 639-1, 'und', если язык определить нельзя, или 'zxx' для текста без букв.
+        """
+        scripts = {}
+        for char in text:
+            if char.isalpha():
+                script = _script(char)
+                scripts[script] = scripts.get(script, 0) + 1
+
+        if not scripts:
+            return NO_LINGUISTIC_CONTENT
+
+        # Японский текст содержит иероглифы, но выдаёт себя каной
+        if 'HIRAGANA' in scripts or 'KATAKANA' in scripts:
+            return 'ja'
+
+        script = max(scripts, key=scripts.get)
+        if script != 'LATIN':
+            if script == 'CYRILLIC' and any(char in 'іїєґІЇЄҐ' for char in text):
+                return 'uk'
+            return self.SCRIPT_LANGUAGES.get(script, UNDETERMINED)
+
+        return self._detect_latin(text.lower())
+
+    def _detect_latin(self, text):
+        """Определяет язык латинского текста по служебным словам."""
+        words = WORD_PATTERN.findall(text)
+        hits = {language: sum(word in stopwords for word in words) for language, stopwords in STOPWORDS.items()}
+        best = max(hits, key=hits.get)
+
+        if hits[best] == 0:
+            # Короткие реплики без служебных слов ("lol", "first") считаем английскими,
+            # если в них нет букв с диакритикой
+            return UNDETERMINED if NON_ENGLISH_LATIN & set(text) else 'en'
+        if hits['en'] == hits[best] and not NON_ENGLISH_LATIN & set(text):
+            return 'en'
+        return best
+
+
+def route_for_translation(languages, multilingual=False):
+    """
+    Определяет, какие комментарии нужно переводить.
+
+    :param languages: Список кодов языков комментариев.
+    :param multilingual: Модель тональности поддерживает исходные языки и перевод не нужен.
+    :return: Список путей обработки (PATH_*) для каждого комментария.
+    """
+    paths = []
+    for language in languages:
+        if multilingual:
+            paths.append(PATH_MULTILINGUAL)
+        elif language == 'en':
+            paths.append(PATH_ENGLISH)
+        elif language == NO_LINGUISTIC_CONTENT:
+            paths.append(PATH_NO_TEXT)
+        else:
+            paths.append(PATH_TRANSLATED)
+    return paths
+
+
+def route_batch(batch, detector, multilingual=False):
+    """
+    Определяет язык и путь обработки комментариев набора.
+
+    Язык и путь сохраняются в столбцах набора (languages, paths).
+
+    :param batch: Набор комментариев (CommentBatch).
+    :param detector: Детектор языка (LanguageDetector).
+    :param multilingual: Модель тональности поддерживает исходные языки и перевод не нужен.
+    :return: Индексы комментариев, которые нужно перевести.
+    """
+    languages = [detector.detect(text) for text in batch.texts]
+    batch.languages[:] = languages
+    batch.paths[:] = route_for_translation(languages, multilingual=multilingual)
+    return np.flatnonzero(batch.paths == PATH_TRANSLATED)
@@ -0,0 +1,89 @@
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class LazyResource:
+    """
+    Потокобезопасная ленивая инициализация тяжёлого ресурса (модели, клиента API).
+
+    Ресурс создаётся при первом обращении или заранее в фоновом потоке;
+    время создания сохраняется для диагностики.
+    """
+
+    def __init__(self, name, factory):
+        """
+        :param name: Название ресурса для логов и статуса.
+        :param factory: Функция без аргументов, создающая ресурс.
+        """
+        self.name = name
+        self._factory = factory
+        self._lock = threading.Lock()
+        self._value = None
+        self._ready = False
+        self._loading = False
+        self.load_time = None
+        self.error = None
+
+    @property
+    def ready(self):
+        """Ресурс создан."""
+        return self._ready
+
+    def get(self):
+        """
+        Возвращает ресурс, создавая его при первом обращении.
+
+        Одновременные обращения ожидают единственной инициализации.
+        """
+        if self._ready:
+            return self._value
+        with self._lock:
+            if not self._ready:
+                self._load()
+            return self._value
+
+    def warm_up(self):
+        """
+        Запускает создание ресурса в фоновом потоке.
+
+        :return: Поток инициализации.
+        """
+        thread = threading.Thread(target=self._warm_up, name=f'warm-up-{self.name}', daemon=True)
+        thread.start()
+        return thread
+
+    def status(self):
+        """Возвращает состояние ресурса: ready, loading, load_time, error."""
+        return {
+            'name': self.name,
+            'ready': self._ready,
+            'loading': self._loading,
+            'load_time': self.load_time,
+            'error': None if self.error is None else str(self.error),
+        }
+
+    def _warm_up(self):
+        try:
+            self.get()
+        except Exception:
+            # Ошибка уже записана; при следующем обращении будет повторная попытка
+            pass
+
+    def _load(self):
+        self._loading = True
+        started = time.perf_counter()
+        try:
+            self._value = self._factory()
+        except Exception as e:
+            self.error = e
+            logger.error(f"Не удалось инициализировать {self.name}: {e}")
+            raise
+        finally:
+            self._loading = False
+        self.load_time = time.perf_counter() - started
+        self.error = None
+        self._ready = True
+        logger.info(f"{self.name} инициализирован за {self.load_time:.2f} с")
@@ -1,17 +1,155 @@
 import os
+import asyncio
+import argparse
+from telegram import Bot
 from telegram_bot import TelegramBot
+from worker_pool import WorkerPool
+from result_cache import ResultCache
+from comment_memo import CommentMemo
+from async_youtube_service import AsyncYouTubeService
+from quota_manager import QuotaManager
+from video_state import VideoStateStore
+from adaptive_sampler import AdaptiveSampler
+from job_queue import open_job_queue
+from webhook import WebhookIngress
+from metrics import MetricsServer, SamplingProfiler, TRACER, slow_request_recorder
+from autotune import InferenceProfile, DEFAULT_PROFILE_PATH
 from dotenv import load_dotenv
 
 def main():
+    parser = argparse.ArgumentParser(description='Telegram-бот оценки релевантности YouTube-видео')
+    parser.add_argument('--preload', action='store_true',
+                        help='загрузить модели до начала опроса Telegram (для продакшена)')
+    parser.add_argument('--mode', choices=['polling', 'webhook', 'worker'], default='polling',
+                        help='polling — всё в одном процессе; webhook — приём обновлений в очередь заданий; '
+                             'worker — выполнение заданий очереди')
+    args = parser.parse_args()
+
     load_dotenv()
     TELEGRAM_TOKEN = os.getenv('TELEGRAM_TOKEN')
     YOUTUBE_API_KEY = os.getenv('YOUTUBE_API_KEY')
+    TELEGRAM_API_URL = os.getenv('TELEGRAM_API_URL', 'https://api.telegram.org/bot')
+
+    job_queue = None
+    if args.mode != 'polling':
+        job_queue = open_job_queue(
+            os.getenv('JOB_QUEUE_URL', 'cache/jobs.sqlite3'),
+            visibility_timeout=float(os.getenv('JOB_VISIBILITY_TIMEOUT', '300')),
+            max_attempts=int(os.getenv('JOB_MAX_ATTEMPTS', '3')),
+            retry_delay=float(os.getenv('JOB_RETRY_DELAY', '10'))
+        )
+
+    if args.mode == 'webhook':
+        # Приёмнику вебхука не нужны ни модели, ни YouTube API
+        if not TELEGRAM_TOKEN:
+            raise ValueError("Необходимо установить TELEGRAM_TOKEN")
+        ingress = WebhookIngress(
+            job_queue,
+            host=os.getenv('WEBHOOK_HOST', '0.0.0.0'),
+            port=int(os.getenv('WEBHOOK_PORT', '8443')),
+            path=os.getenv('WEBHOOK_PATH', '/telegram'),
+            secret_token=os.getenv('WEBHOOK_SECRET')
+        )
+        if os.getenv('WEBHOOK_URL'):
+            asyncio.run(Bot(TELEGRAM_TOKEN, base_url=TELEGRAM_API_URL).set_webhook(
+                os.getenv('WEBHOOK_URL'), secret_token=os.getenv('WEBHOOK_SECRET')
+            ))
+        ingress.serve_forever()
+        return
 
     if not TELEGRAM_TOKEN or not YOUTUBE_API_KEY:
         raise ValueError("Необходимо установить TELEGRAM_TOKEN и YOUTUBE_API_KEY")
 
-    bot = TelegramBot(TELEGRAM_TOKEN, YOUTUBE_API_KEY)
-    bot.run()
+    # Профиль калибровки (python autotune.py): потоки моделей, количество воркеров и размер порции
+    inference_backend = os.getenv('INFERENCE_BACKEND', 'transformers')
+    inference_profile = InferenceProfile.load(
+        os.getenv('INFERENCE_PROFILE', DEFAULT_PROFILE_PATH), backend=inference_backend
+    )
+    default_workers = inference_profile.workers if inference_profile is not None and inference_profile.workers else 2
+
+    worker_pool = WorkerPool(
+        max_workers=int(os.getenv('ANALYSIS_WORKERS', default_workers)),
+        max_queue_size=int(os.getenv('ANALYSIS_QUEUE_SIZE', '10')),
+        max_jobs_per_user=int(os.getenv('ANALYSIS_JOBS_PER_USER', '1'))
+    )
+
+    result_cache = ResultCache(
+        path=os.getenv('RESULT_CACHE_PATH', 'cache/results.sqlite3'),
+        memory_size=int(os.getenv('RESULT_CACHE_MEMORY_SIZE', '256')),
+        memory_ttl=int(os.getenv('RESULT_CACHE_MEMORY_TTL', '3600')),
+        disk_ttl=int(os.getenv('RESULT_CACHE_DISK_TTL', '86400'))
+    )
+
+    comment_memo = CommentMemo(
+        path=os.getenv('COMMENT_MEMO_PATH', 'cache/comments.sqlite3'),
+        max_entries=int(os.getenv('COMMENT_MEMO_MAX_ENTRIES', '200000'))
+    )
+
+    # Несколько ключей через запятую: при исчерпании квоты одного используется следующий
+    api_keys = [key.strip() for key in os.getenv('YOUTUBE_API_KEYS', YOUTUBE_API_KEY).split(',')]
+    quota_manager = QuotaManager(
+        api_keys,
+        daily_quota=int(os.getenv('YOUTUBE_DAILY_QUOTA', '10000')),
+        rate=float(os.getenv('YOUTUBE_RATE_LIMIT', '20')),
+        burst=int(os.getenv('YOUTUBE_RATE_BURST', '50'))
+    )
+
+    youtube_service = None
+    if os.getenv('YOUTUBE_FETCH_MODE', 'sync') == 'async':
+        youtube_service = AsyncYouTubeService(
+            YOUTUBE_API_KEY,
+            max_concurrency=int(os.getenv('YOUTUBE_MAX_CONCURRENCY', '8')),
+            quota_manager=quota_manager
+        )
+
+    # Хранилище состояний видео включает инкрементальную переоценку
+    video_state = None
+    if os.getenv('VIDEO_STATE_PATH'):
+        video_state = VideoStateStore(os.getenv('VIDEO_STATE_PATH'))
+
+    # Допуск адаптивной выборки включает оценку порциями до достижения точности
+    adaptive_sampler = None
+    if os.getenv('ADAPTIVE_TOLERANCE'):
+        adaptive_sampler = AdaptiveSampler(
+            tolerance=float(os.getenv('ADAPTIVE_TOLERANCE')),
+            batch_size=int(os.getenv('ADAPTIVE_BATCH_SIZE', '25')),
+            min_comments=int(os.getenv('ADAPTIVE_MIN_COMMENTS', '50')),
+            max_comments=int(os.getenv('ADAPTIVE_MAX_COMMENTS', '2000'))
+        )
+
+    # Порог сходства (например, 0.8) включает объединение почти одинаковых комментариев
+    near_duplicate_threshold = None
+    if os.getenv('NEAR_DUPLICATE_THRESHOLD'):
+        near_duplicate_threshold = float(os.getenv('NEAR_DUPLICATE_THRESHOLD'))
+
+    # Метрики Prometheus, последние спаны и профилирование по запросу
+    profiler = None
+    if os.getenv('PROFILE_SLOW_REQUEST_SECONDS'):
+        profiler = SamplingProfiler(interval=float(os.getenv('PROFILE_INTERVAL', '0.01'))).start()
+        TRACER.add_listener(slow_request_recorder(
+            profiler, float(os.getenv('PROFILE_SLOW_REQUEST_SECONDS')), os.getenv('PROFILE_DIR', 'profiles')
+        ))
+    if os.getenv('METRICS_PORT'):
+        MetricsServer(
+            host=os.getenv('METRICS_HOST', '127.0.0.1'), port=int(os.getenv('METRICS_PORT')), profiler=profiler
+        ).start()
+
+    bot = TelegramBot(
+        TELEGRAM_TOKEN, YOUTUBE_API_KEY,
+        worker_pool=worker_pool, result_cache=result_cache, comment_memo=comment_memo,
+        youtube_service=youtube_service, preload=args.preload,
+        inference_backend=inference_backend, inference_profile=inference_profile,
+        inference_socket=os.getenv('INFERENCE_SOCKET'),
+        quota_manager=quota_manager, video_state=video_state,
+        near_duplicate_threshold=near_duplicate_threshold,
+        adaptive_sampler=adaptive_sampler
+    )
+    if args.mode == 'worker':
+        bot.run_worker(
+            job_queue, base_url=TELEGRAM_API_URL, concurrency=int(os.getenv('JOB_WORKER_CONCURRENCY', '4'))
+        )
+    else:
+        bot.run()
 
 if __name__ == '__main__':
     main()
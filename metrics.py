@@ -0,0 +1,618 @@
+"""
+Метрики, трассировка этапов обработки и профилирование.
+
+Счётчики, гистограммы и датчики регистрируются в реестре (по умолчанию
+общий REGISTRY) и отдаются в текстовом формате Prometheus. Этапы обработки
+оборачиваются в спаны с атрибутами (количество комментариев, токенов,
+размер батча); длительности спанов попадают в гистограмму, последние
+спаны доступны по /debug/spans. Семплирующий профайлер собирает стеки
+всех потоков в формате collapsed stacks для построения flame graph.
+"""
+import contextvars
+import json
+import logging
+import math
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import Counter as StackCounter, deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+
+logger = logging.getLogger(__name__)
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+SIZE_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in (*zip(names, values), *extra)]
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value):
+    if value == math.inf:
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    """Общая часть метрик: имя, описание, метки и значения по наборам меток."""
+
+    kind = None
+
+    def __init__(self, name, help, labels=()):
+        """
+        :param name: Имя метрики.
+        :param help: Описание метрики.
+        :param labels: Имена меток.
+        """
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        if set(labels) != set(self.labels):
+            raise ValueError(f"Метрика {self.name} ожидает метки {self.labels}, получены {tuple(labels)}")
+        return tuple(labels[name] for name in self.labels)
+
+    def render(self):
+        """Строки метрики в текстовом формате Prometheus."""
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} {self.kind}']
+        with self._lock:
+            values = sorted(self._values.items())
+        for key, value in values:
+            lines.append(f'{self.name}{_format_labels(self.labels, key)} {_format_value(value)}')
+        return lines
+
+
+class _FunctionMetric(_Metric):
+    """Метрика, значения которой могут вычисляться функциями при каждом сборе метрик."""
+
+    def __init__(self, name, help, labels=()):
+        super().__init__(name, help, labels)
+        self._functions = {}
+
+    def set_function(self, func, **labels):
+        """Задаёт функцию, вычисляющую значение при каждом сборе метрик."""
+        key = self._key(labels)
+        with self._lock:
+            self._functions[key] = func
+
+    def render(self):
+        with self._lock:
+            functions = list(self._functions.items())
+        for key, func in functions:
+            try:
+                value = func()
+            except Exception as e:
+                logger.warning(f"Не удалось вычислить метрику {self.name}: {e}")
+                continue
+            with self._lock:
+                self._values[key] = value
+        return super().render()
+
+
+class Counter(_FunctionMetric):
+    """
+    Монотонно возрастающий счётчик.
+
+    Значение увеличивается через inc либо берётся функцией (set_function) из
+    счётчика другого компонента, который сам только растёт.
+    """
+
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        """Увеличивает счётчик для набора меток."""
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        """Текущее значение счётчика."""
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+
+class Gauge(_FunctionMetric):
+    """Датчик: текущее значение, заданное явно или вычисляемое при сборе метрик."""
+
+    kind = 'gauge'
+
+    def set(self, value, **labels):
+        """Задаёт значение датчика."""
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram(_Metric):
+    """Гистограмма наблюдений с фиксированными границами корзин."""
+
+    kind = 'histogram'
+
+    def __init__(self, name, help, labels=(), buckets=DURATION_BUCKETS):
+        """
+        :param buckets: Верхние границы корзин по возрастанию.
+        """
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+
+    def observe(self, value, **labels):
+        """Добавляет наблюдение."""
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[0][i] += 1
+                    break
+            state[1] += value
+            state[2] += 1
+
+    def count(self, **labels):
+        """Количество наблюдений."""
+        with self._lock:
+            state = self._values.get(self._key(labels))
+            return state[2] if state else 0
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            values = sorted((key, (list(counts), total, count)) for key, (counts, total, count) in self._values.items())
+        for key, (counts, total, count) in values:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                labels = _format_labels(self.labels, key, [('le', _format_value(float(bound)))])
+                lines.append(f'{self.name}_bucket{labels} {cumulative}')
+            labels = _format_labels(self.labels, key)
+            lines.append(f'{self.name}_sum{labels} {_format_value(total)}')
+            lines.append(f'{self.name}_count{labels} {count}')
+        return lines
+
+
+class MetricsRegistry:
+    """
+    Реестр метрик.
+
+    Повторная регистрация метрики с тем же именем возвращает существующую,
+    поэтому модули могут объявлять метрики независимо.
+    """
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _register(self, cls, name, help, labels, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, help, labels, **kwargs)
+            elif not isinstance(metric, cls):
+                raise ValueError(f"Метрика {name} уже зарегистрирована как {metric.kind}")
+            return metric
+
+    def counter(self, name, help, labels=()):
+        """Регистрирует счётчик."""
+        return self._register(Counter, name, help, labels)
+
+    def gauge(self, name, help, labels=()):
+        """Регистрирует датчик."""
+        return self._register(Gauge, name, help, labels)
+
+    def histogram(self, name, help, labels=(), buckets=DURATION_BUCKETS):
+        """Регистрирует гистограмму."""
+        return self._register(Histogram, name, help, labels, buckets=buckets)
+
+    def get(self, name):
+        """Метрика по имени или None."""
+        with self._lock:
+            return self._metrics.get(name)
+
+    def render(self):
+        """Все метрики в текстовом формате Prometheus."""
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda metric: metric.name)
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = MetricsRegistry()
+
+MODEL_BATCH_SECONDS = REGISTRY.histogram(
+    'model_batch_seconds', 'Время обработки одного батча моделью', ['model']
+)
+MODEL_BATCH_SIZE = REGISTRY.histogram(
+    'model_batch_size', 'Количество текстов в батче модели', ['model'], buckets=SIZE_BUCKETS
+)
+MODEL_TOKENS = REGISTRY.counter(
+    'model_tokens_total', 'Токены, обработанные моделью (padded — с учётом паддинга)', ['model', 'kind']
+)
+API_REQUESTS = REGISTRY.counter(
+    'youtube_api_requests_total', 'Запросы к YouTube Data API', ['resource', 'status']
+)
+API_SECONDS = REGISTRY.histogram(
+    'youtube_api_request_seconds', 'Время запроса к YouTube Data API', ['resource']
+)
+
+
+_current_span = contextvars.ContextVar('current_span', default=None)
+
+
+class Span:
+    """Интервал выполнения этапа обработки с атрибутами."""
+
+    __slots__ = ('name', 'trace_id', 'span_id', 'parent_id', 'attributes', 'started', 'duration', 'status')
+
+    def __init__(self, name, parent=None, attributes=None):
+        self.name = name
+        self.trace_id = parent.trace_id if parent is not None else uuid.uuid4().hex[:16]
+        self.span_id = uuid.uuid4().hex[:8]
+        self.parent_id = parent.span_id if parent is not None else None
+        self.attributes = dict(attributes or {})
+        self.started = time.time()
+        self.duration = None
+        self.status = 'ok'
+
+    def set(self, **attributes):
+        """Задаёт атрибуты спана."""
+        self.attributes.update(attributes)
+
+    def add(self, **amounts):
+        """Прибавляет значения к числовым атрибутам спана (например, токены нескольких батчей)."""
+        for name, amount in amounts.items():
+            self.attributes[name] = self.attributes.get(name, 0) + amount
+
+    def fail(self, message):
+        """Отмечает этап как завершённый с ошибкой."""
+        self.status = 'error'
+        self.attributes['error'] = str(message)
+
+    def to_dict(self):
+        return {
+            'name': self.name,
+            'trace_id': self.trace_id,
+            'span_id': self.span_id,
+            'parent_id': self.parent_id,
+            'started': self.started,
+            'duration': self.duration,
+            'status': self.status,
+            'attributes': self.attributes,
+        }
+
+
+class Tracer:
+    """
+    Трассировка этапов обработки.
+
+    Вложенные спаны связываются через contextvars, поэтому спаны этапов,
+    выполняемых в пуле воркеров, относятся к спану запроса.
+    """
+
+    def __init__(self, registry=REGISTRY, max_spans=1000):
+        """
+        :param registry: Реестр метрик для гистограммы длительностей.
+        :param max_spans: Сколько последних спанов хранить.
+        """
+        self.durations = registry.histogram(
+            'span_duration_seconds', 'Длительность этапов обработки', ['span', 'status']
+        )
+        self.spans = deque(maxlen=max_spans)
+        self._listeners = []
+
+    @contextmanager
+    def span(self, name, **attributes):
+        """
+        Открывает спан этапа.
+
+        :param name: Название этапа.
+        :param attributes: Начальные атрибуты спана.
+        """
+        span = Span(name, _current_span.get(), attributes)
+        token = _current_span.set(span)
+        started = time.perf_counter()
+        try:
+            yield span
+        except BaseException as e:
+            span.fail(e)
+            raise
+        finally:
+            span.duration = time.perf_counter() - started
+            _current_span.reset(token)
+            self._finish(span)
+
+    def add_listener(self, func):
+        """Добавляет функцию func(span), вызываемую по завершении каждого спана."""
+        self._listeners.append(func)
+
+    def recent(self, name=None, min_duration=0.0):
+        """
+        Последние завершённые спаны.
+
+        :param name: Только спаны с этим названием.
+        :param min_duration: Минимальная длительность, секунд.
+        :return: Список словарей спанов.
+        """
+        return [
+            span.to_dict() for span in list(self.spans)
+            if (name is None or span.name == name) and span.duration >= min_duration
+        ]
+
+    def _finish(self, span):
+        self.durations.observe(span.duration, span=span.name, status=span.status)
+        self.spans.append(span)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(json.dumps(span.to_dict(), ensure_ascii=False, default=str))
+        for listener in self._listeners:
+            try:
+                listener(span)
+            except Exception as e:
+                logger.warning(f"Ошибка обработчика спанов: {e}")
+
+
+TRACER = Tracer()
+
+
+def span(name, **attributes):
+    """Открывает спан этапа в общем трассировщике (см. Tracer.span)."""
+    return TRACER.span(name, **attributes)
+
+
+def current_span():
+    """Текущий спан или None."""
+    return _current_span.get()
+
+
+def observe_model_batch(model, size, tokens, padded_tokens, seconds):
+    """
+    Учитывает батч модели в метриках и в атрибутах текущего спана.
+
+    :param model: Модель ('translation' или 'sentiment').
+    :param size: Количество текстов в батче.
+    :param tokens: Токены без паддинга.
+    :param padded_tokens: Токены с учётом паддинга.
+    :param seconds: Время обработки батча.
+    """
+    MODEL_BATCH_SECONDS.observe(seconds, model=model)
+    MODEL_BATCH_SIZE.observe(size, model=model)
+    MODEL_TOKENS.inc(tokens, model=model, kind='real')
+    MODEL_TOKENS.inc(padded_tokens, model=model, kind='padded')
+    span = current_span()
+    if span is not None:
+        span.add(tokens=tokens, padded_tokens=padded_tokens, model_batches=1)
+        span.set(max_batch_size=max(size, span.attributes.get('max_batch_size', 0)))
+
+
+def observe_api_request(resource, status, seconds):
+    """
+    Учитывает запрос к YouTube Data API.
+
+    :param resource: Ресурс API ('commentThreads', 'comments').
+    :param status: HTTP-статус ответа.
+    :param seconds: Время запроса.
+    """
+    API_REQUESTS.inc(resource=resource, status=status)
+    API_SECONDS.observe(seconds, resource=resource)
+    span = current_span()
+    if span is not None:
+        span.add(api_requests=1)
+
+
+class SamplingProfiler:
+    """
+    Семплирующий профайлер всех потоков процесса.
+
+    Фоновый поток с заданным интервалом снимает стеки остальных потоков
+    (sys._current_frames) и хранит их за последние window секунд, поэтому
+    профиль медленного запроса можно получить уже после его завершения.
+    Результат — collapsed stacks ('поток;модуль:функция;... количество'),
+    который принимают flamegraph.pl и speedscope.
+    """
+
+    def __init__(self, interval=0.01, window=120.0):
+        """
+        :param interval: Интервал между снимками, секунд.
+        :param window: Сколько секунд хранить снимки.
+        """
+        self.interval = interval
+        self.window = window
+        self._samples = deque()  # (время, стек)
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        """Запускает снятие стеков в фоновом потоке."""
+        if self.running:
+            return self
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='sampling-profiler', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Останавливает снятие стеков."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def sample(self):
+        """Снимает стеки всех потоков, кроме потока профайлера."""
+        now = time.time()
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        own = threading.get_ident()
+        stacks = []
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own:
+                continue
+            frames = []
+            while frame is not None:
+                code = frame.f_code
+                frames.append(f'{os.path.basename(code.co_filename)}:{code.co_name}')
+                frame = frame.f_back
+            frames.append(names.get(thread_id, str(thread_id)))
+            stacks.append(';'.join(reversed(frames)))
+        with self._lock:
+            self._samples.extend((now, stack) for stack in stacks)
+            while self._samples and self._samples[0][0] < now - self.window:
+                self._samples.popleft()
+
+    def folded(self, since=None, until=None):
+        """
+        Профиль за интервал времени в формате collapsed stacks.
+
+        :param since: Начало интервала (time.time()); None — с первого снимка.
+        :param until: Конец интервала; None — до последнего снимка.
+        :return: Текст профиля.
+        """
+        with self._lock:
+            samples = list(self._samples)
+        counts = StackCounter(
+            stack for moment, stack in samples
+            if (since is None or moment >= since) and (until is None or moment <= until)
+        )
+        return ''.join(f'{stack} {count}\n' for stack, count in counts.most_common())
+
+    def capture(self, seconds):
+        """
+        Снимает профиль в течение заданного времени.
+
+        :param seconds: Длительность профилирования.
+        :return: Текст профиля в формате collapsed stacks.
+        """
+        started = time.time()
+        if self.running:
+            time.sleep(seconds)
+            return self.folded(since=started)
+        while time.time() - started < seconds:
+            self.sample()
+            time.sleep(self.interval)
+        return self.folded(since=started)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.sample()
+
+
+def slow_request_recorder(profiler, threshold, directory, span_name='request'):
+    """
+    Создаёт обработчик спанов, сохраняющий профиль медленных запросов.
+
+    Профиль включает стеки всех потоков за время запроса, поэтому при
+    конкурентных запросах в нём видны и соседние запросы.
+
+    :param profiler: Запущенный профайлер (SamplingProfiler).
+    :param threshold: Порог длительности запроса, секунд.
+    :param directory: Каталог для файлов профилей.
+    :param span_name: Название спана запроса.
+    :return: Функция для Tracer.add_listener.
+    """
+    os.makedirs(directory, exist_ok=True)
+
+    def record(span):
+        if span.name != span_name or span.duration < threshold:
+            return
+        path = os.path.join(directory, f'{span.trace_id}.folded')
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(profiler.folded(since=span.started, until=span.started + span.duration))
+        logger.warning(f"Медленный запрос {span.attributes} ({span.duration:.2f} с), профиль сохранён в {path}")
+
+    return record
+
+
+class MetricsServer:
+    """
+    HTTP-сервер метрик.
+
+    /metrics — метрики в формате Prometheus, /debug/spans — последние спаны
+    (параметры name и min_duration), /debug/profile?seconds=N — профиль
+    процесса за N секунд в формате collapsed stacks.
+    """
+
+    MAX_PROFILE_SECONDS = 60
+
+    def __init__(self, host='127.0.0.1', port=9100, registry=REGISTRY, tracer=TRACER, profiler=None):
+        """
+        :param host: Адрес сервера.
+        :param port: Порт (0 — любой свободный).
+        :param registry: Реестр метрик.
+        :param tracer: Трассировщик.
+        :param profiler: Профайлер для /debug/profile; по умолчанию создаётся на время запроса.
+        """
+        self.registry = registry
+        self.tracer = tracer
+        self.profiler = profiler
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                url = urlsplit(self.path)
+                params = {name: values[0] for name, values in parse_qs(url.query).items()}
+                try:
+                    status, content_type, body = server.handle(url.path, params)
+                except ValueError as e:
+                    status, content_type, body = 400, 'text/plain; charset=utf-8', f'{e}\n'
+                payload = body.encode()
+                self.send_response(status)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+
+    @property
+    def port(self):
+        return self._server.server_address[1]
+
+    def handle(self, path, params):
+        """
+        Формирует ответ на запрос.
+
+        :return: Тройка (HTTP-статус, Content-Type, тело ответа).
+        """
+        if path == '/metrics':
+            return 200, 'text/plain; version=0.0.4; charset=utf-8', self.registry.render()
+        if path == '/debug/spans':
+            spans = self.tracer.recent(params.get('name'), float(params.get('min_duration', 0)))
+            return 200, 'application/json', json.dumps(spans, ensure_ascii=False, default=str)
+        if path == '/debug/profile':
+            seconds = min(float(params.get('seconds', 10)), self.MAX_PROFILE_SECONDS)
+            profiler = self.profiler or SamplingProfiler()
+            return 200, 'text/plain; charset=utf-8', profiler.capture(seconds)
+        return 404, 'text/plain; charset=utf-8', 'Not Found\n'
+
+    def start(self):
+        """Запускает сервер в фоновом потоке."""
+        threading.Thread(target=self._server.serve_forever, name='metrics-server', daemon=True).start()
+        logger.info(f"Метрики доступны на http://{self._server.server_address[0]}:{self.port}/metrics")
+        return self
+
+    def stop(self):
+        """Останавливает сервер."""
+        self._server.shutdown()
+        self._server.server_close()
@@ -0,0 +1,161 @@
+"""
+Объединение почти одинаковых комментариев перед анализом моделями.
+
+Спам-волны, копипаста с мелкими правками и варианты вроде «great video!!»
+группируются по сходству Жаккара символьных шинглов: сигнатуры MinHash
+раскладываются по корзинам LSH, кандидаты из одной корзины проверяются
+по оценке сходства и объединяются в кластеры. Моделями оценивается один
+представитель кластера (комментарий с наибольшим числом лайков), а лайки
+остальных переносятся на него.
+"""
+import re
+import unicodedata
+import zlib
+import numpy as np
+
+# Простое число Мерсенна 2^31 - 1: произведение a * h < 2^62 помещается в uint64
+MERSENNE_PRIME = (1 << 31) - 1
+
+_REPEATS = re.compile(r'(.)\1{2,}')
+_NON_WORD = re.compile(r'[^\w\s]')
+_SPACES = re.compile(r'\s+')
+
+
+def normalize(text):
+    """
+    Приводит текст к виду для сравнения: регистр, пунктуация, повторы символов и пробелы.
+
+    :param text: Текст комментария.
+    :return: Нормализованный текст; тексты только из эмодзи и знаков сохраняют их.
+    """
+    collapsed = _REPEATS.sub(r'\1\1', unicodedata.normalize('NFKC', text).lower())
+    normalized = _SPACES.sub(' ', _NON_WORD.sub(' ', collapsed)).strip()
+    return normalized or _SPACES.sub(' ', collapsed).strip()
+
+
+def shingle_hashes(text, k=4):
+    """
+    Хеши символьных k-шинглов нормализованного текста.
+
+    :param text: Текст комментария.
+    :param k: Длина шингла в символах.
+    :return: Массив uint64 уникальных хешей (в пределах MERSENNE_PRIME).
+    """
+    text = f' {normalize(text)} '
+    shingles = {text[i:i + k] for i in range(max(1, len(text) - k + 1))}
+    return np.fromiter(
+        (zlib.crc32(shingle.encode()) % MERSENNE_PRIME for shingle in shingles), dtype=np.uint64, count=len(shingles)
+    )
+
+
+class MinHasher:
+    """Сигнатуры MinHash: num_perm минимумов случайных линейных хеш-функций по шинглам текста."""
+
+    def __init__(self, num_perm=64, k=4, seed=1, chunk_size=2000):
+        """
+        :param num_perm: Длина сигнатуры.
+        :param k: Длина шингла в символах.
+        :param seed: Зерно генератора хеш-функций (сигнатуры воспроизводимы между процессами).
+        :param chunk_size: Сколько текстов обрабатывать за раз (ограничивает память).
+        """
+        rng = np.random.default_rng(seed)
+        self.num_perm = num_perm
+        self.k = k
+        self.chunk_size = chunk_size
+        self._a = rng.integers(1, MERSENNE_PRIME, num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, MERSENNE_PRIME, num_perm, dtype=np.uint64)
+
+    def signatures(self, texts):
+        """
+        Вычисляет сигнатуры текстов.
+
+        :param texts: Последовательность текстов.
+        :return: Массив uint64 формы (количество текстов, num_perm).
+        """
+        texts = list(texts)
+        result = np.empty((len(texts), self.num_perm), dtype=np.uint64)
+        for start in range(0, len(texts), self.chunk_size):
+            hashes = [shingle_hashes(text, self.k) for text in texts[start:start + self.chunk_size]]
+            lengths = np.fromiter((len(h) for h in hashes), dtype=np.int64, count=len(hashes))
+            offsets = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+            # Повторяющиеся шинглы (копипаста, спам) переставляются один раз
+            unique, inverse = np.unique(np.concatenate(hashes), return_inverse=True)
+            permuted = ((unique[:, None] * self._a + self._b) % MERSENNE_PRIME)[inverse.ravel()]
+            result[start:start + len(hashes)] = np.minimum.reduceat(permuted, offsets, axis=0)
+        return result
+
+
+def _find(parents, i):
+    while parents[i] != i:
+        parents[i] = parents[parents[i]]
+        i = parents[i]
+    return i
+
+
+def cluster_near_duplicates(texts, threshold=0.8, num_perm=64, bands=16, hasher=None):
+    """
+    Группирует почти одинаковые тексты.
+
+    Тексты с оценкой сходства Жаккара не ниже threshold попадают в один
+    кластер (с транзитивным замыканием). Сигнатура делится на bands полос;
+    тексты, совпавшие хотя бы в одной полосе, становятся кандидатами.
+
+    :param texts: Последовательность текстов.
+    :param threshold: Порог сходства Жаккара.
+    :param num_perm: Длина сигнатуры MinHash.
+    :param bands: Количество полос LSH (num_perm должно делиться на bands).
+    :param hasher: Готовый MinHasher (по умолчанию создаётся с num_perm).
+    :return: Массив номеров кластеров: для каждого текста — индекс первого текста его кластера.
+    """
+    if num_perm % bands:
+        raise ValueError("Длина сигнатуры должна делиться на количество полос")
+    hasher = hasher or MinHasher(num_perm)
+    signatures = hasher.signatures(texts)
+    count, rows = len(signatures), hasher.num_perm // bands
+
+    parents = list(range(count))
+    for band in range(bands):
+        keys = np.ascontiguousarray(signatures[:, band * rows:(band + 1) * rows])
+        keys = keys.view(np.dtype((np.void, keys.dtype.itemsize * rows))).ravel()
+        _, first, inverse = np.unique(keys, return_index=True, return_inverse=True)
+        # Каждый текст сравнивается с первым текстом своей корзины
+        leaders = first[inverse.ravel()]
+        candidates = np.flatnonzero(leaders != np.arange(count))
+        similarity = (signatures[candidates] == signatures[leaders[candidates]]).mean(axis=1)
+        for member in candidates[similarity >= threshold]:
+            root, other = _find(parents, leaders[member]), _find(parents, member)
+            if root != other:
+                parents[max(root, other)] = min(root, other)
+
+    return np.fromiter((_find(parents, i) for i in range(count)), dtype=np.int64, count=count)
+
+
+def collapse_near_duplicates(batch, threshold=0.8, **kwargs):
+    """
+    Оставляет по одному представителю на кластер почти одинаковых комментариев.
+
+    Представитель — комментарий кластера с наибольшим числом лайков. Его лайки
+    заменяются на sum(likes + 1) - 1 по кластеру, поэтому при линейном
+    взвешивании VideoEvaluator вес кластера равен суммарному весу его
+    комментариев.
+
+    :param batch: Набор комментариев (CommentBatch).
+    :param threshold: Порог сходства Жаккара.
+    :param kwargs: Параметры cluster_near_duplicates.
+    :return: Пара (набор представителей в исходном порядке, размеры их кластеров).
+    """
+    if not len(batch):
+        return batch, np.zeros(0, dtype=np.int64)
+
+    labels = cluster_near_duplicates(batch.texts.tolist(), threshold, **kwargs)
+    clusters, inverse = np.unique(labels, return_inverse=True)
+
+    # Представитель кластера: наибольшее число лайков, при равенстве — первый по порядку
+    order = np.lexsort((np.arange(len(batch)), -batch.likes, inverse))
+    representatives = np.sort(order[np.flatnonzero(np.r_[True, np.diff(inverse[order]) != 0])])
+
+    collapsed = batch.take(representatives)
+    cluster_of = inverse[representatives]
+    collapsed.likes = (np.bincount(inverse, weights=batch.likes + 1)[cluster_of] - 1).astype(np.int64)
+    sizes = np.bincount(inverse, minlength=len(clusters))[cluster_of]
+    return collapsed, sizes
@@ -0,0 +1,307 @@
+import asyncio
+import json
+import logging
+import random
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+logger = logging.getLogger(__name__)
+
+# Дневная квота проекта YouTube Data API по умолчанию, единиц
+DEFAULT_DAILY_QUOTA = 10000
+
+# Квота сбрасывается в полночь по тихоокеанскому времени (с учётом перехода на летнее время)
+QUOTA_TIMEZONE = ZoneInfo('America/Los_Angeles')
+
+QUOTA_REASONS = {'quotaExceeded', 'dailyLimitExceeded'}
+RATE_LIMIT_REASONS = {'rateLimitExceeded', 'userRateLimitExceeded'}
+TRANSIENT_STATUSES = {429, 500, 502, 503, 504}
+
+
+class ApiError(Exception):
+    """Ошибка ответа YouTube Data API."""
+
+    def __init__(self, status, reason=None, message=''):
+        """
+        :param status: HTTP-статус ответа.
+        :param reason: Причина ошибки из тела ответа (например, 'quotaExceeded').
+        :param message: Текст ошибки.
+        """
+        super().__init__(f"{status} {reason or ''} {message}".strip())
+        self.status = status
+        self.reason = reason
+
+
+class QuotaExhaustedError(Exception):
+    """Квота исчерпана на всех API ключах."""
+
+
+def parse_error_reason(content):
+    """
+    Извлекает причину ошибки из тела ответа YouTube Data API.
+
+    :param content: Тело ответа (bytes или str).
+    :return: Причина ошибки или None.
+    """
+    try:
+        error = json.loads(content)['error']
+        return error['errors'][0]['reason']
+    except (ValueError, KeyError, IndexError, TypeError):
+        return None
+
+
+class TokenBucket:
+    """
+    Ограничение частоты запросов алгоритмом token bucket.
+
+    Метод reserve не ждёт сам, а возвращает время ожидания, поэтому одно
+    ограничение используется и синхронным, и асинхронным клиентом.
+    """
+
+    def __init__(self, rate, capacity, clock=time.monotonic):
+        """
+        :param rate: Скорость пополнения, единиц в секунду.
+        :param capacity: Ёмкость (максимальный всплеск), единиц.
+        :param clock: Источник времени.
+        """
+        self.rate = rate
+        self.capacity = capacity
+        self._clock = clock
+        self._tokens = capacity
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def reserve(self, tokens=1):
+        """
+        Резервирует единицы; при нехватке уходит в долг.
+
+        :param tokens: Количество единиц.
+        :return: Сколько секунд нужно подождать перед запросом.
+        """
+        with self._lock:
+            now = self._clock()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= tokens
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+
+
+class QuotaManager:
+    """
+    Учёт квоты YouTube Data API для пула API ключей.
+
+    Считает стоимость каждого запроса, ограничивает частоту запросов,
+    повторяет временные ошибки (429, 5xx, rateLimitExceeded) с экспоненциальной
+    задержкой со случайным разбросом и переключается на следующий ключ,
+    когда квота текущего исчерпана (403 quotaExceeded). При низком остатке
+    квоты рекомендует уменьшить объём загрузки комментариев.
+    """
+
+    def __init__(self, api_keys, daily_quota=DEFAULT_DAILY_QUOTA, rate=20.0, burst=50, max_retries=5,
+                 base_delay=0.5, max_delay=30.0, low_quota_ratio=0.2, max_tracked_videos=1000,
+                 clock=time.time, rng=random.random):
+        """
+        :param api_keys: Список API ключей (или один ключ).
+        :param daily_quota: Дневная квота одного ключа, единиц.
+        :param rate: Допустимая скорость расхода квоты, единиц в секунду.
+        :param burst: Допустимый всплеск запросов, единиц.
+        :param max_retries: Количество повторов при временных ошибках.
+        :param base_delay: Начальная задержка повтора, секунд.
+        :param max_delay: Максимальная задержка повтора, секунд.
+        :param low_quota_ratio: Доля остатка квоты, ниже которой загрузка сокращается.
+        :param max_tracked_videos: Сколько последних видео хранить в метриках расхода.
+        :param clock: Источник времени (для смены суток квоты).
+        :param rng: Генератор случайных чисел в [0, 1) для разброса задержек.
+        """
+        if isinstance(api_keys, str):
+            api_keys = [api_keys]
+        api_keys = [key for key in api_keys if key]
+        if not api_keys:
+            raise ValueError("Необходим хотя бы один API ключ YouTube")
+
+        self.api_keys = api_keys
+        self.daily_quota = daily_quota
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.low_quota_ratio = low_quota_ratio
+        self.max_tracked_videos = max_tracked_videos
+        self.bucket = TokenBucket(rate, burst)
+        self._clock = clock
+        self._rng = rng
+        self._lock = threading.Lock()
+
+        self._day = self._quota_day()
+        self._used = {key: 0 for key in api_keys}
+        self._exhausted = set()
+        self._video_units = OrderedDict()
+        self.retries = 0
+        self.rotations = 0
+        self.throttled_seconds = 0.0
+
+    def current_key(self):
+        """
+        Возвращает ключ, на котором ещё есть квота.
+
+        :raises QuotaExhaustedError: Если квота исчерпана на всех ключах.
+        """
+        with self._lock:
+            self._roll_day()
+            for key in self.api_keys:
+                if key not in self._exhausted:
+                    return key
+        raise QuotaExhaustedError("Квота YouTube Data API исчерпана на всех ключах")
+
+    def remaining(self):
+        """Оценка остатка квоты по всем ключам за текущие сутки, единиц."""
+        with self._lock:
+            self._roll_day()
+            return sum(
+                max(0, self.daily_quota - used)
+                for key, used in self._used.items() if key not in self._exhausted
+            )
+
+    def plan(self, max_results, max_quota_units):
+        """
+        Сокращает объём загрузки при низком остатке квоты.
+
+        :param max_results: Запрошенное количество комментариев.
+        :param max_quota_units: Запрошенный бюджет квоты на видео.
+        :return: Тройка (max_results, max_quota_units, degraded).
+        """
+        ratio = self.remaining() / (self.daily_quota * len(self.api_keys))
+        if ratio >= self.low_quota_ratio:
+            return max_results, max_quota_units, False
+        scale = ratio / self.low_quota_ratio
+        return max(1, int(max_results * scale)), max(1, int(max_quota_units * scale)), True
+
+    def execute(self, send, cost, video_id=None):
+        """
+        Выполняет запрос с ограничением частоты, повторами и переключением ключей.
+
+        :param send: Функция send(key), выполняющая запрос; ошибки API выбрасывает как ApiError.
+        :param cost: Стоимость запроса в единицах квоты.
+        :param video_id: Видео, на которое расходуется квота (для метрик).
+        :return: Результат send.
+        """
+        attempt = 0
+        while True:
+            key = self.current_key()
+            self._sleep(self._throttle(cost))
+            self._record(key, cost, video_id)
+            try:
+                return send(key)
+            except ApiError as e:
+                delay = self._on_error(key, e, attempt)
+                if delay:
+                    attempt += 1
+                    self._sleep(delay)
+
+    async def execute_async(self, send, cost, video_id=None):
+        """Асинхронный вариант execute: send(key) — корутина."""
+        attempt = 0
+        while True:
+            key = self.current_key()
+            await asyncio.sleep(self._throttle(cost))
+            self._record(key, cost, video_id)
+            try:
+                return await send(key)
+            except ApiError as e:
+                delay = self._on_error(key, e, attempt)
+                if delay:
+                    attempt += 1
+                    await asyncio.sleep(delay)
+
+    def video_units(self, video_id):
+        """Потрачено единиц квоты на видео (по последним max_tracked_videos видео)."""
+        with self._lock:
+            return self._video_units.get(video_id, 0)
+
+    def metrics(self):
+        """Метрики расхода квоты: по ключам, по видео, повторы и переключения."""
+        with self._lock:
+            self._roll_day()
+            videos = list(self._video_units.values())
+            return {
+                'keys': [
+                    {'key': f'...{key[-4:]}', 'used': self._used[key], 'exhausted': key in self._exhausted}
+                    for key in self.api_keys
+                ],
+                'used': sum(self._used.values()),
+                'remaining': sum(
+                    max(0, self.daily_quota - used)
+                    for key, used in self._used.items() if key not in self._exhausted
+                ),
+                'videos': len(videos),
+                'units_per_video': sum(videos) / len(videos) if videos else 0.0,
+                'max_units_per_video': max(videos, default=0),
+                'retries': self.retries,
+                'rotations': self.rotations,
+                'throttled_seconds': self.throttled_seconds,
+            }
+
+    def _throttle(self, cost):
+        delay = self.bucket.reserve(cost)
+        if delay:
+            with self._lock:
+                self.throttled_seconds += delay
+        return delay
+
+    def _record(self, key, cost, video_id):
+        with self._lock:
+            self._roll_day()
+            self._used[key] += cost
+            if video_id is not None:
+                self._video_units[video_id] = self._video_units.pop(video_id, 0) + cost
+                while len(self._video_units) > self.max_tracked_videos:
+                    self._video_units.popitem(last=False)
+
+    def _on_error(self, key, error, attempt):
+        """
+        Решает, как поступить с ошибкой API.
+
+        :return: Задержка перед повтором, секунд (0 — повторить сразу с другим ключом).
+        :raises ApiError: Если ошибку не нужно повторять или повторы исчерпаны.
+        :raises QuotaExhaustedError: Если квота исчерпана на всех ключах.
+        """
+        if error.status == 403 and error.reason in QUOTA_REASONS:
+            with self._lock:
+                self._exhausted.add(key)
+                self.rotations += 1
+            logger.warning(f"Квота ключа ...{key[-4:]} исчерпана, переключение на следующий ключ")
+            self.current_key()
+            return 0
+
+        transient = error.status in TRANSIENT_STATUSES or (
+            error.status == 403 and error.reason in RATE_LIMIT_REASONS
+        )
+        if not transient or attempt >= self.max_retries:
+            raise error
+
+        # Экспоненциальная задержка с полным случайным разбросом
+        delay = self._rng() * min(self.max_delay, self.base_delay * 2 ** attempt)
+        with self._lock:
+            self.retries += 1
+        logger.warning(f"Временная ошибка YouTube API ({error}), повтор через {delay:.2f} с")
+        return max(delay, 1e-3)
+
+    def _sleep(self, delay):
+        if delay:
+            time.sleep(delay)
+
+    def _quota_day(self):
+        """Текущие сутки квоты — дата по тихоокеанскому времени."""
+        return datetime.fromtimestamp(self._clock(), QUOTA_TIMEZONE).date()
+
+    def _roll_day(self):
+        """Сбрасывает учёт при наступлении новых суток квоты (вызывается под блокировкой)."""
+        day = self._quota_day()
+        if day != self._day:
+            self._day = day
+            self._used = {key: 0 for key in self.api_keys}
+            self._exhausted.clear()
@@ -0,0 +1,268 @@
+import asyncio
+import json
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from single_flight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+# Версия формата сохраняемых результатов; увеличивается при его изменении
+CACHE_FORMAT_VERSION = 1
+
+
+class ResultCache:
+    """
+    Двухуровневый кеш результатов анализа видео.
+
+    Первый уровень — LRU-кеш в памяти, второй — база SQLite на диске; у каждого
+    уровня свой срок жизни записей; запись, поднятая с диска в память, живёт не
+    дольше срока записи на диске. Одновременные запросы одного и того же видео
+    разделяют одно выполняющееся вычисление (SingleFlight).
+
+    Асинхронные методы (get_async, set_async, get_or_compute) обращаются к
+    памяти в цикле событий, а к SQLite — в отдельном потоке, поэтому чтение,
+    запись и удаление устаревших записей на диске не блокируют цикл событий.
+    """
+
+    def __init__(self, path=None, memory_size=256, memory_ttl=3600, disk_ttl=86400, clock=time.time):
+        """
+        Инициализация кеша.
+
+        :param path: Путь к файлу SQLite; None — только кеш в памяти.
+        :param memory_size: Максимальное количество записей в памяти.
+        :param memory_ttl: Срок жизни записи в памяти, секунд.
+        :param disk_ttl: Срок жизни записи на диске, секунд.
+        :param clock: Функция текущего времени (для тестов).
+        """
+        self.memory_size = memory_size
+        self.memory_ttl = memory_ttl
+        self.disk_ttl = disk_ttl
+        self._clock = clock
+
+        self._memory = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        # Отдельная блокировка базы: пока поток ждёт диск, цикл событий читает память
+        self._db_lock = threading.Lock()
+        self.flights = SingleFlight()
+
+        self.counters = {
+            'memory_hits': 0,
+            'disk_hits': 0,
+            'misses': 0,
+            'evictions': 0,
+            'expirations': 0,
+            'shared_computations': 0,
+        }
+
+        self._db = None
+        if path is not None:
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(str(path), check_same_thread=False)
+            self._db.execute(
+                'CREATE TABLE IF NOT EXISTS results ('
+                'key TEXT PRIMARY KEY, value TEXT NOT NULL, created_at REAL NOT NULL)'
+            )
+            self._db.commit()
+
+    @staticmethod
+    def make_key(video_id, *model_versions):
+        """
+        Формирует ключ кеша.
+
+        :param video_id: Идентификатор видео.
+        :param model_versions: Названия (версии) моделей, участвующих в анализе.
+        :return: Строковый ключ.
+        """
+        return '|'.join([f'v{CACHE_FORMAT_VERSION}', video_id, *model_versions])
+
+    def get(self, key):
+        """
+        Возвращает сохранённый результат.
+
+        :param key: Ключ кеша.
+        :return: Результат или None, если записи нет или она устарела.
+        """
+        now = self._clock()
+        value = self._get_from_memory(key, now)
+        if value is not None:
+            return value
+        return self._load_from_disk(key, now)
+
+    async def get_async(self, key):
+        """
+        Возвращает сохранённый результат, читая диск в отдельном потоке.
+
+        :param key: Ключ кеша.
+        :return: Результат или None, если записи нет или она устарела.
+        """
+        now = self._clock()
+        value = self._get_from_memory(key, now)
+        if value is not None:
+            return value
+        if self._db is None:
+            return self._load_from_disk(key, now)
+        return await asyncio.to_thread(self._load_from_disk, key, now)
+
+    def set(self, key, value):
+        """
+        Сохраняет результат на обоих уровнях кеша.
+
+        :param key: Ключ кеша.
+        :param value: JSON-сериализуемый результат.
+        """
+        now = self._clock()
+        with self._lock:
+            self._put_in_memory(key, value, now, now)
+        self._put_on_disk(key, value, now)
+
+    async def set_async(self, key, value):
+        """
+        Сохраняет результат на обоих уровнях кеша, записывая диск в отдельном потоке.
+
+        :param key: Ключ кеша.
+        :param value: JSON-сериализуемый результат.
+        """
+        now = self._clock()
+        with self._lock:
+            self._put_in_memory(key, value, now, now)
+        if self._db is not None:
+            await asyncio.to_thread(self._put_on_disk, key, value, now)
+
+    def is_in_flight(self, key):
+        """Проверяет, выполняется ли сейчас вычисление для ключа."""
+        return self.flights.in_flight(key)
+
+    async def get_or_compute(self, key, compute, on_progress=None, use_cache=True):
+        """
+        Возвращает результат из кеша или вычисляет его один раз для всех ожидающих.
+
+        Поздние запросы присоединяются к выполняющемуся вычислению и получают
+        сообщения о его ходе; если все ожидающие уходят, вычисление отменяется.
+
+        :param key: Ключ кеша.
+        :param compute: Корутинная функция compute(progress); результат None не кешируется.
+                        progress(message) рассылает сообщение о ходе вычисления всем ожидающим.
+        :param on_progress: Корутинная функция, получающая сообщения о ходе вычисления.
+        :param use_cache: False — результат не берётся из кеша и не сохраняется,
+                          объединяются только одновременные вычисления.
+        :return: Результат.
+        """
+        if use_cache:
+            value = await self.get_async(key)
+            if value is not None:
+                return value
+
+        if self.flights.in_flight(key):
+            self.counters['shared_computations'] += 1
+
+        async def compute_and_store(progress):
+            value = await compute(progress)
+            if value is not None and use_cache:
+                await self.set_async(key, value)
+            return value
+
+        return await self.flights.run(key, compute_and_store, on_progress)
+
+    def purge_expired(self):
+        """Удаляет устаревшие записи с диска."""
+        if self._db is None:
+            return 0
+        with self._db_lock:
+            cursor = self._db.execute('DELETE FROM results WHERE created_at <= ?', (self._clock() - self.disk_ttl,))
+            self._db.commit()
+        with self._lock:
+            self.counters['expirations'] += cursor.rowcount
+        return cursor.rowcount
+
+    def stats(self):
+        """Возвращает счётчики попаданий, промахов и вытеснений."""
+        with self._lock:
+            stats = dict(self.counters)
+            stats['memory_entries'] = len(self._memory)
+        hits = stats['memory_hits'] + stats['disk_hits']
+        total = hits + stats['misses']
+        stats['hit_rate'] = hits / total if total else 0.0
+        return stats
+
+    def close(self):
+        """Закрывает соединение с базой."""
+        with self._db_lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    def _get_from_memory(self, key, now):
+        """Возвращает запись из памяти или None, удаляя устаревшую запись."""
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if now < expires_at:
+                self._memory.move_to_end(key)
+                self.counters['memory_hits'] += 1
+                return value
+            del self._memory[key]
+            self.counters['expirations'] += 1
+            return None
+
+    def _load_from_disk(self, key, now):
+        """Читает запись с диска и поднимает её в память; учитывает попадание или промах."""
+        row = self._get_from_disk(key, now)
+        with self._lock:
+            if row is None:
+                self.counters['misses'] += 1
+                return None
+            value, created_at = row
+            self.counters['disk_hits'] += 1
+            self._put_in_memory(key, value, created_at, now)
+            return value
+
+    def _put_on_disk(self, key, value, now):
+        """Записывает результат в базу."""
+        with self._db_lock:
+            if self._db is None:
+                return
+            self._db.execute(
+                'INSERT OR REPLACE INTO results (key, value, created_at) VALUES (?, ?, ?)',
+                (key, json.dumps(value, ensure_ascii=False), now)
+            )
+            self._db.commit()
+
+    def _put_in_memory(self, key, value, created_at, now):
+        """
+        Добавляет запись в LRU-кеш, вытесняя самые старые записи.
+
+        Срок жизни в памяти отсчитывается от момента добавления, но не выходит
+        за срок жизни записи на диске, отсчитываемый от её создания.
+        """
+        self._memory[key] = (min(now + self.memory_ttl, created_at + self.disk_ttl), value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+            self.counters['evictions'] += 1
+
+    def _get_from_disk(self, key, now):
+        """
+        Читает запись с диска, удаляя её, если она устарела.
+
+        :return: Пара (результат, время создания записи) или None.
+        """
+        with self._db_lock:
+            if self._db is None:
+                return None
+            row = self._db.execute('SELECT value, created_at FROM results WHERE key = ?', (key,)).fetchone()
+            if row is None:
+                return None
+            value, created_at = row
+            if now - created_at >= self.disk_ttl:
+                self._db.execute('DELETE FROM results WHERE key = ?', (key,))
+                self._db.commit()
+                with self._lock:
+                    self.counters['expirations'] += 1
+                return None
+        return json.loads(value), created_at
@@ -1,46 +1,121 @@
 import os
-from transformers import pipeline, AutoTokenizer, AutoModelForSequenceClassification
+import time
+from transformers import AutoTokenizer
 from pathlib import Path
+from batching import plan_batches
+from inference_backends import load_model, TRANSFORMERS
+from metrics import observe_model_batch
 
 class SentimentAnalyzer:
     """
     Класс для анализа тональности текста с использованием модели Hugging Face и кешированием.
     """
 
-    def __init__(self, model_name='nlptown/bert-base-multilingual-uncased-sentiment', cache_dir=None):
+    def __init__(self, model_name='nlptown/bert-base-multilingual-uncased-sentiment', cache_dir=None,
+                 max_length=512, max_batch_tokens=8192, max_batch_size=64, multilingual=None, memo=None,
+                 backend=TRANSFORMERS, num_threads=None):
         """
-        Инициализация пайплайна для анализа тональности.
+        Инициализация модели для анализа тональности.
 
         :param model_name: Название модели на Hugging Face.
         :param cache_dir: Директория для кеширования модели.
+        :param max_length: Максимальная длина текста в токенах.
+        :param max_batch_tokens: Бюджет токенов на один батч с учётом паддинга.
+        :param max_batch_size: Максимальное количество текстов в батче.
+        :param multilingual: Модель понимает тексты на разных языках и перевод не нужен;
+                             по умолчанию определяется по названию модели.
+        :param memo: Кеш результатов по тексту комментария (CommentMemo).
+        :param backend: Бэкенд инференса: 'transformers', 'onnx' или 'onnx-int8'.
+        :param num_threads: Количество потоков на вызов модели (см. load_model); None — значение библиотеки.
         """
         if cache_dir is None:
             cache_dir = Path(__file__).parent / 'model_cache'
 
         os.makedirs(cache_dir, exist_ok=True)
 
-        # Загрузка токенизатора и модели с использованием cache_dir
-        tokenizer = AutoTokenizer.from_pretrained(model_name, cache_dir=cache_dir, clean_up_tokenization_spaces=True)
-        model = AutoModelForSequenceClassification.from_pretrained(model_name, cache_dir=cache_dir)
+        self.model_name = model_name
+        self.max_length = max_length
+        self.max_batch_tokens = max_batch_tokens
+        self.max_batch_size = max_batch_size
+        if multilingual is None:
+            multilingual = any(marker in model_name.lower() for marker in ('multilingual', 'xlm'))
+        self.multilingual = multilingual
+        self.memo = memo
+        self.backend = backend
 
-        # Создание пайплайна анализа тональности без параметра clean_up_tokenization_spaces
-        self.analyzer = pipeline('sentiment-analysis', model=model, tokenizer=tokenizer)
+        # Загрузка токенизатора и модели с использованием cache_dir
+        self.tokenizer = AutoTokenizer.from_pretrained(model_name, cache_dir=cache_dir, clean_up_tokenization_spaces=True)
+        self.model = load_model('sequence-classification', model_name, cache_dir, backend, num_threads)
 
     def analyze(self, texts):
         """
-        Анализ списка текстов.
+        Анализ списка текстов с использованием кеша результатов, если он задан.
 
         :param texts: Список строк для анализа.
         :return: Список результатов анализа.
         """
-        results = []
-        for text in texts:
-            result = self.analyzer(text[:512])[0]  # Ограничение длины текста до 512 символов
-            label = result['label']  # Метка в формате '1 star', '2 stars', и т.д.
-            stars = int(label.split()[0])  # Извлекаем числовое значение звезд
-            results.append({
-                'text': text,
-                'stars': stars,
-                'score': result['score']
-            })
+        if self.memo is None:
+            return self._analyze_batched(texts)
+
+        cached = self.memo.memoize(
+            f'sentiment:{self.model_name}:{self.backend}', texts,
+            lambda missing: [
+                {'stars': result['stars'], 'score': result['score']}
+                for result in self._analyze_batched(missing)
+            ]
+        )
+        return [{'text': text, **result} for text, result in zip(texts, cached)]
+
+    def analyze_batch(self, batch):
+        """
+        Анализ тональности набора комментариев.
+
+        Анализируется перевод комментария, если он есть, иначе исходный текст;
+        оценки сохраняются в столбцах набора.
+
+        :param batch: Набор комментариев (CommentBatch).
+        :return: Тот же набор.
+        """
+        batch.set_sentiments(self.analyze(batch.model_texts()))
+        return batch
+
+    def _analyze_batched(self, texts):
+        """
+        Анализ списка текстов батчами.
+
+        Тексты обрезаются по токенам, группируются по длине и прогоняются через
+        модель батчами с паддингом; результаты возвращаются в исходном порядке.
+
+        :param texts: Список строк для анализа.
+        :return: Список результатов анализа.
+        """
+        if not texts:
+            return []
+        # PyTorch импортируется при первом анализе, а не при запуске (как и загрузка модели)
+        import torch
+
+        encodings = self.tokenizer(list(texts), truncation=True, max_length=self.max_length)
+        lengths = [len(input_ids) for input_ids in encodings['input_ids']]
+
+        results = [None] * len(texts)
+        for batch in plan_batches(lengths, self.max_batch_tokens, self.max_batch_size):
+            started = time.perf_counter()
+            features = [{key: encodings[key][i] for key in encodings.keys()} for i in batch]
+            inputs = self.tokenizer.pad(features, return_tensors='pt')
+
+            with torch.no_grad():
+                logits = self.model(**inputs).logits
+            scores, label_ids = torch.softmax(logits, dim=-1).max(dim=-1)
+            observe_model_batch(
+                'sentiment', len(batch), sum(lengths[i] for i in batch), inputs['input_ids'].numel(),
+                time.perf_counter() - started
+            )
+
+            for i, label_id, score in zip(batch, label_ids.tolist(), scores.tolist()):
+                label = self.model.config.id2label[label_id]  # Метка в формате '1 star', '2 stars', и т.д.
+                results[i] = {
+                    'text': texts[i],
+                    'stars': int(label.split()[0]),  # Извлекаем числовое значение звезд
+                    'score': score
+                }
         return results
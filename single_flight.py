@@ -0,0 +1,129 @@
+import asyncio
+import logging
+from functools import partial
+
+logger = logging.getLogger(__name__)
+
+
+class Flight:
+    """
+    Выполняющееся вычисление и ожидающие его результата.
+
+    Сообщения о ходе вычисления рассылаются всем подписчикам; подписчик,
+    присоединившийся позже, сразу получает последнее сообщение.
+    """
+
+    def __init__(self, key):
+        """
+        :param key: Ключ вычисления.
+        """
+        self.key = key
+        self.task = None
+        self.waiters = 0
+        self.last_progress = None
+        self._listeners = []
+
+    async def publish(self, message):
+        """
+        Рассылает сообщение о ходе вычисления всем подписчикам.
+
+        Ошибка одного подписчика не мешает остальным и самому вычислению.
+
+        :param message: Сообщение (например, текст статуса).
+        """
+        self.last_progress = message
+        results = await asyncio.gather(
+            *(listener(message) for listener in list(self._listeners)), return_exceptions=True
+        )
+        for result in results:
+            if isinstance(result, Exception):
+                logger.warning(f"Не удалось передать ход вычисления {self.key}: {result}")
+
+    async def subscribe(self, listener):
+        """Подписывает корутинную функцию listener(message) на сообщения о ходе вычисления."""
+        self._listeners.append(listener)
+        if self.last_progress is not None:
+            try:
+                await listener(self.last_progress)
+            except Exception as e:
+                logger.warning(f"Не удалось передать ход вычисления {self.key}: {e}")
+
+    def unsubscribe(self, listener):
+        """Отписывает подписчика."""
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+
+
+class SingleFlight:
+    """
+    Объединение одновременных одинаковых вычислений.
+
+    Первый запрос по ключу запускает вычисление в отдельной задаче, следующие
+    присоединяются к нему и получают тот же результат (или то же исключение).
+    Вычисление не принадлежит ни одному из ожидающих: уход первого запроса
+    его не прерывает, а когда уходят все ожидающие, вычисление отменяется.
+    """
+
+    def __init__(self):
+        self._flights = {}
+        self.counters = {
+            'started': 0,
+            'joined': 0,
+            'cancelled': 0,
+        }
+
+    def in_flight(self, key):
+        """Проверяет, выполняется ли сейчас вычисление для ключа."""
+        return key in self._flights
+
+    def waiters(self, key):
+        """Количество ожидающих результата вычисления."""
+        flight = self._flights.get(key)
+        return flight.waiters if flight is not None else 0
+
+    async def run(self, key, compute, on_progress=None):
+        """
+        Выполняет вычисление или присоединяется к уже выполняющемуся.
+
+        :param key: Ключ вычисления.
+        :param compute: Корутинная функция compute(progress), где progress — корутинная
+                        функция рассылки сообщений о ходе вычисления всем ожидающим.
+        :param on_progress: Корутинная функция, получающая сообщения о ходе вычисления.
+        :return: Результат вычисления.
+        """
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = Flight(key)
+            self._flights[key] = flight
+            flight.task = asyncio.ensure_future(compute(flight.publish))
+            flight.task.add_done_callback(partial(self._finished, flight))
+            self.counters['started'] += 1
+        else:
+            self.counters['joined'] += 1
+            logger.debug(f"Запрос присоединён к вычислению {key}, ожидающих: {flight.waiters + 1}")
+
+        flight.waiters += 1
+        try:
+            if on_progress is not None:
+                await flight.subscribe(on_progress)
+            return await asyncio.shield(flight.task)
+        finally:
+            flight.waiters -= 1
+            if on_progress is not None:
+                flight.unsubscribe(on_progress)
+            if flight.waiters == 0 and not flight.task.done():
+                # Результат больше никому не нужен
+                logger.info(f"Все ожидающие ушли, вычисление {key} отменено")
+                self._forget(flight)
+                flight.task.cancel()
+                self.counters['cancelled'] += 1
+
+    def _forget(self, flight):
+        if self._flights.get(flight.key) is flight:
+            del self._flights[flight.key]
+
+    def _finished(self, flight, task):
+        self._forget(flight)
+        if not task.cancelled():
+            # Исключение уже получено ожидающими; без них не выводим предупреждение
+            task.exception()
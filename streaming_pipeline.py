@@ -0,0 +1,72 @@
+class PipelineStageError(Exception):
+    """Ошибка на одном из этапов потокового конвейера."""
+
+    def __init__(self, stage):
+        """
+        :param stage: Название этапа ('translation' или 'sentiment').
+        """
+        super().__init__(f"Ошибка на этапе {stage}")
+        self.stage = stage
+
+
+def iter_batches(comments, batch_size):
+    """
+    Разбивает комментарии на порции.
+
+    :param comments: Набор комментариев (CommentBatch).
+    :param batch_size: Размер порции.
+    :return: Генератор срезов набора (без копирования данных).
+    """
+    for start in range(0, len(comments), batch_size):
+        yield comments[start:start + batch_size]
+
+
+def translation_stage(batches, route, translate):
+    """
+    Этап перевода: для каждой порции переводит комментарии, которым нужен перевод.
+
+    :param batches: Итератор порций комментариев (CommentBatch).
+    :param route: Функция, сохраняющая путь обработки в порции и возвращающая индексы для перевода.
+    :param translate: Функция (порция, индексы), сохраняющая переводы в порции; None означает ошибку.
+    """
+    for batch in batches:
+        to_translate = route(batch)
+        if len(to_translate) and translate(batch, to_translate) is None:
+            raise PipelineStageError('translation')
+        yield batch
+
+
+def sentiment_stage(batches, analyze):
+    """
+    Этап анализа тональности переведённых комментариев.
+
+    :param batches: Итератор порций комментариев (CommentBatch).
+    :param analyze: Функция, сохраняющая оценки тональности в порции; None означает ошибку.
+    """
+    for batch in batches:
+        if analyze(batch) is None:
+            raise PipelineStageError('sentiment')
+        yield batch
+
+
+def stream_analysis(comments, route, translate, analyze, batch_size=5):
+    """
+    Потоковый конвейер перевод -> тональность.
+
+    Порции комментариев проходят все этапы по очереди, поэтому первая порция
+    полностью обработана раньше, чем начнётся обработка второй, и её можно
+    сразу учесть в предварительной оценке. Комментарии лучше передавать
+    по убыванию лайков: самые весомые попадут в первые порции.
+
+    Порции — срезы исходного набора, поэтому после прохождения конвейера
+    результаты всех этапов доступны в столбцах comments.
+
+    :param comments: Набор комментариев (CommentBatch).
+    :param route: Функция маршрутизации перевода (см. translation_stage).
+    :param translate: Функция перевода порции (см. translation_stage).
+    :param analyze: Функция анализа тональности порции (см. sentiment_stage).
+    :param batch_size: Размер порции.
+    :return: Генератор обработанных порций комментариев.
+    """
+    batches = iter_batches(comments, batch_size)
+    return sentiment_stage(translation_stage(batches, route, translate), analyze)
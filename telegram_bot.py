@@ -1,11 +1,26 @@
-import re
+import time
+import asyncio
+import inspect
 import logging
-from telegram import Update
+from telegram import Bot, Update
+from telegram.error import TelegramError
 from telegram.ext import ApplicationBuilder, CommandHandler, ContextTypes, MessageHandler, filters
-from youtube_service import YouTubeService
-from sentiment_analyzer import SentimentAnalyzer
-from translator import Translator
-from video_evaluator import VideoEvaluator
+from video_evaluator import VideoEvaluator, rank_videos
+from worker_pool import WorkerPool, QueueFullError, UserLimitError
+from result_cache import ResultCache
+from language_detector import LanguageDetector, route_batch
+from streaming_pipeline import stream_analysis, PipelineStageError
+from lazy_resource import LazyResource
+from youtube_links import (
+    extract_video_id, extract_video_ids, extract_playlist_id, parse_video_reference, parse_playlist_reference
+)
+from quota_manager import QuotaExhaustedError
+from comment_batch import CommentBatch
+from video_state import IncrementalScorer
+from metrics import REGISTRY, span
+from near_duplicates import collapse_near_duplicates
+from adaptive_sampler import EARLY_STOP_REASONS
+from webhook import QueueWorker
 
 # Настройка логирования
 logger = logging.getLogger(__name__)
@@ -31,25 +46,197 @@ console_handler.setFormatter(formatter)
 logger.addHandler(file_handler)
 logger.addHandler(console_handler)
 
+class StatusMessage:
+    """
+    Статусное сообщение о ходе анализа в одном чате.
+
+    Первое обновление отправляется ответом на сообщение пользователя,
+    следующие редактируют его; ошибки Telegram не прерывают анализ.
+    """
+
+    def __init__(self, message):
+        """
+        :param message: Сообщение пользователя со ссылкой на видео.
+        """
+        self.message = message
+        self.status = None
+        self.text = None
+
+    async def update(self, text):
+        """Показывает пользователю новый статус анализа."""
+        if text == self.text:
+            return
+        self.text = text
+        try:
+            if self.status is None:
+                self.status = await self.message.reply_text(text)
+            else:
+                await self.status.edit_text(text)
+        except TelegramError as e:
+            logger.warning(f"Не удалось обновить статусное сообщение: {e}")
+
+
 class TelegramBot:
     """
     Класс для управления Telegram-ботом.
     """
-    MAX_COMMENTS = 100
+    MAX_COMMENTS = 20  # Количество комментариев с наибольшим числом лайков для анализа
     MAX_MESSAGE_LENGTH = 4096  # Максимальная длина сообщения в Telegram
-
-    def __init__(self, token, youtube_api_key):
+    # Размер порции комментариев конвейера с предварительной оценкой: не меньше батча модели
+    # перевода (Translator.max_batch_size), чтобы порция обходилась одним вызовом каждой модели
+    STREAM_BATCH_SIZE = 32
+    INCREMENTAL_MAX_COMMENTS = 500  # Количество последних комментариев при первом инкрементальном анализе
+    MAX_VIDEOS_PER_MESSAGE = 20  # Максимальное количество видео в одном сравнении
+    SHARED_BATCH_SIZE = 32  # Размер общей для всех видео порции моделей при сравнении
+    SENTIMENT_MODEL = 'nlptown/bert-base-multilingual-uncased-sentiment'
+    TRANSLATION_MODEL = 'Helsinki-NLP/opus-mt-mul-en'
+
+    def __init__(self, token, youtube_api_key, worker_pool=None, result_cache=None, comment_memo=None,
+                 youtube_service=None, preload=False, warm_up=True, inference_backend='transformers',
+                 inference_socket=None, quota_manager=None, video_state=None, near_duplicate_threshold=None,
+                 adaptive_sampler=None, inference_profile=None):
         """
         Инициализация бота и необходимых сервисов.
 
+        Клиент YouTube API и модели создаются лениво при первом обращении,
+        поэтому бот начинает отвечать сразу после запуска.
+
         :param token: Токен Telegram бота.
         :param youtube_api_key: API ключ YouTube Data API.
+        :param worker_pool: Пул воркеров для блокирующих этапов анализа (WorkerPool).
+        :param result_cache: Кеш результатов анализа видео (ResultCache).
+        :param comment_memo: Кеш перевода и тональности отдельных комментариев (CommentMemo).
+        :param youtube_service: Сервис получения комментариев (YouTubeService или AsyncYouTubeService).
+        :param preload: Загрузить модели и клиент API сразу, до начала опроса.
+        :param warm_up: Загружать модели в фоне после запуска бота.
+        :param inference_backend: Бэкенд инференса моделей: 'transformers', 'onnx' или 'onnx-int8'.
+        :param inference_socket: Unix-сокет общего сервера инференса; если задан, модели
+            в процессе бота не загружаются.
+        :param quota_manager: Менеджер квоты YouTube API с пулом ключей (QuotaManager).
+        :param video_state: Хранилище состояний видео (VideoStateStore); если задано, повторный
+            анализ видео обрабатывает только новые и изменённые комментарии.
+        :param near_duplicate_threshold: Порог сходства Жаккара для объединения почти одинаковых
+            комментариев перед анализом; None — объединяются только точные повторы.
+        :param adaptive_sampler: Настройки адаптивной выборки (AdaptiveSampler); если заданы, комментарии
+            оцениваются порциями по убыванию лайков до достижения точности оценки.
+        :param inference_profile: Профиль калибровки машины (InferenceProfile, см. autotune.py):
+            количество потоков моделей и размер порции конвейера.
         """
+        started = time.perf_counter()
         self.token = token
-        self.youtube_service = YouTubeService(youtube_api_key)
-        self.translator = Translator()
-        self.sentiment_analyzer = SentimentAnalyzer()
+        self.comment_memo = comment_memo
+        self.inference_backend = inference_backend
+        self.inference_socket = inference_socket
+        self.quota_manager = quota_manager
+        self.near_duplicate_threshold = near_duplicate_threshold
+        self.adaptive_sampler = adaptive_sampler
+        self.background_warm_up = warm_up
+        self.model_threads = None
+        if inference_profile is not None:
+            self.model_threads = inference_profile.threads
+            if inference_profile.batch_size:
+                self.STREAM_BATCH_SIZE = inference_profile.batch_size
+
+        self._youtube_service = LazyResource(
+            'youtube', lambda: youtube_service or self._create_youtube_service(youtube_api_key)
+        )
+        self._translator = LazyResource('translator', self._create_translator)
+        self._sentiment_analyzer = LazyResource('sentiment', self._create_sentiment_analyzer)
+        self.components = [self._youtube_service, self._translator, self._sentiment_analyzer]
+
         self.video_evaluator = VideoEvaluator()
+        self.language_detector = LanguageDetector()
+        self.worker_pool = worker_pool or WorkerPool()
+        self.result_cache = result_cache or ResultCache()
+        self.incremental_scorer = None
+        if video_state is not None:
+            self.incremental_scorer = IncrementalScorer(video_state, self._model_key())
+        self._register_metrics()
+
+        if preload:
+            self.preload()
+        logger.info(f"Бот инициализирован за {time.perf_counter() - started:.2f} с")
+
+    @property
+    def youtube_service(self):
+        """Сервис получения комментариев (создаётся при первом обращении)."""
+        return self._youtube_service.get()
+
+    @property
+    def translator(self):
+        """Переводчик (модель загружается при первом обращении)."""
+        return self._translator.get()
+
+    @property
+    def sentiment_analyzer(self):
+        """Анализатор тональности (модель загружается при первом обращении)."""
+        return self._sentiment_analyzer.get()
+
+    def _create_youtube_service(self, youtube_api_key):
+        from youtube_service import YouTubeService
+        return YouTubeService(youtube_api_key, quota_manager=self.quota_manager)
+
+    def _create_translator(self):
+        if self.inference_socket:
+            from inference_server import InferenceClient, RemoteTranslator
+            return RemoteTranslator(InferenceClient(self.inference_socket))
+        # Импорт transformers и torch занимает секунды, поэтому выполняется вместе с загрузкой модели
+        from translator import Translator
+        return Translator(
+            self.TRANSLATION_MODEL, memo=self.comment_memo, backend=self.inference_backend, num_threads=self.model_threads
+        )
+
+    def _create_sentiment_analyzer(self):
+        if self.inference_socket:
+            from inference_server import InferenceClient, RemoteSentimentAnalyzer
+            return RemoteSentimentAnalyzer(InferenceClient(self.inference_socket))
+        from sentiment_analyzer import SentimentAnalyzer
+        return SentimentAnalyzer(
+            self.SENTIMENT_MODEL, memo=self.comment_memo, backend=self.inference_backend, num_threads=self.model_threads
+        )
+
+    def _model_key(self):
+        """Модели и бэкенд, от которых зависят оценки комментариев."""
+        return '|'.join([self.SENTIMENT_MODEL, self.TRANSLATION_MODEL, self.inference_backend])
+
+    def _register_metrics(self):
+        """Регистрирует датчики и счётчики состояния бота в общем реестре метрик."""
+        REGISTRY.gauge('analysis_queue_depth', 'Задания, ожидающие слота пула воркеров').set_function(
+            lambda: self.worker_pool.queue_depth
+        )
+        REGISTRY.gauge('analysis_active_jobs', 'Выполняемые задания анализа').set_function(
+            lambda: self.worker_pool.active_jobs
+        )
+        REGISTRY.gauge('result_cache_hit_rate', 'Доля попаданий в кеш результатов').set_function(
+            lambda: self.result_cache.stats()['hit_rate']
+        )
+        lookups = REGISTRY.counter('result_cache_lookups_total', 'Обращения к кешу результатов', ['result'])
+        for result in ('memory_hits', 'disk_hits', 'misses'):
+            lookups.set_function(lambda result=result: self.result_cache.stats()[result], result=result)
+        flights = REGISTRY.counter('analysis_flights_total', 'Объединение одинаковых запросов анализа', ['event'])
+        for event in ('started', 'joined', 'cancelled'):
+            flights.set_function(lambda event=event: self.result_cache.flights.counters[event], event=event)
+        if self.quota_manager is not None:
+            REGISTRY.gauge('youtube_quota_remaining_units', 'Остаток квоты YouTube Data API').set_function(
+                self.quota_manager.remaining
+            )
+            REGISTRY.counter('youtube_api_retries_total', 'Повторы запросов к YouTube Data API').set_function(
+                lambda: self.quota_manager.retries
+            )
+            REGISTRY.counter('youtube_api_key_rotations_total', 'Переключения API ключей').set_function(
+                lambda: self.quota_manager.rotations
+            )
+
+    def preload(self):
+        """Загружает все компоненты синхронно."""
+        for component in self.components:
+            component.get()
+
+    def warm_up(self):
+        """Запускает фоновую загрузку ещё не загруженных компонентов."""
+        for component in self.components:
+            if not component.ready and not component.status()['loading']:
+                component.warm_up()
 
     async def start(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Обработчик команды /start."""
@@ -57,29 +244,76 @@ class TelegramBot:
             'Привет! Отправьте мне ссылку на YouTube видео, и я проведу анализ.'
         )
 
+    async def health(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Обработчик команды /health: готовность моделей и загрузка очереди."""
+        lines = ['Состояние компонентов:']
+        for component in self.components:
+            status = component.status()
+            if status['ready']:
+                state = f"готов ({status['load_time']:.1f} с)"
+            elif status['loading']:
+                state = 'загружается...'
+            elif status['error']:
+                state = f"ошибка: {status['error']}"
+            else:
+                state = 'не загружен'
+            lines.append(f"{status['name']}: {state}")
+        lines.append(f'Заданий в работе: {self.worker_pool.active_jobs}, в очереди: {self.worker_pool.queue_depth}')
+        quota_manager = getattr(self.youtube_service, 'quota', None) if self._youtube_service.ready else None
+        if quota_manager is not None:
+            quota = quota_manager.metrics()
+            lines.append(
+                f"Квота YouTube API: израсходовано {quota['used']}, осталось {quota['remaining']}, "
+                f"в среднем {quota['units_per_video']:.1f} ед. на видео"
+            )
+        await update.message.reply_text('\n'.join(lines))
+
     async def analyze(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
-        """Обработчик команды /analyze."""
+        """
+        Обработчик команды /analyze.
+
+        Аргументы — ссылки на видео или их идентификаторы; несколько видео
+        или плейлист сравниваются между собой.
+        """
         if not context.args:
             await update.message.reply_text('Пожалуйста, предоставьте ссылку на YouTube видео после команды /analyze.')
             return
 
-        url = context.args[0]
-        video_id = self._extract_video_id(url)
-
-        if not video_id:
+        video_ids = []
+        playlist_id = None
+        for reference in context.args:
+            video_id = parse_video_reference(reference)
+            if video_id is None:
+                playlist_id = playlist_id or parse_playlist_reference(reference)
+            elif video_id not in video_ids:
+                video_ids.append(video_id)
+
+        if len(video_ids) > 1 or (playlist_id and not video_ids):
+            await self._process_videos(update, video_ids, playlist_id if not video_ids else None)
+        elif video_ids:
+            await self._process_video(update, video_ids[0])
+        else:
             await update.message.reply_text('Некорректная ссылка на видео. Пожалуйста, попробуйте снова.')
-            return
-
-        await self._process_video(update, video_id)
 
     async def handle_message(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
-        """Обрабатывает входящие текстовые сообщения."""
+        """
+        Обрабатывает входящие текстовые сообщения.
+
+        Сообщение с несколькими ссылками на видео или со ссылкой на плейлист
+        (без ссылок на отдельные видео) сравнивает видео между собой.
+        """
         message_text = update.message.text
 
         if len(message_text) > self.MAX_MESSAGE_LENGTH:
             await update.message.reply_text('Сообщение слишком длинное. Пожалуйста, отправьте более короткое сообщение.')
             return
 
+        video_ids = extract_video_ids(message_text)
+        playlist_id = extract_playlist_id(message_text) if not video_ids else None
+        if len(video_ids) > 1 or playlist_id:
+            await self._process_videos(update, video_ids, playlist_id)
+            return
+
         video_id = self._extract_video_id(message_text)
 
         if not video_id:
@@ -89,96 +323,586 @@ class TelegramBot:
         await self._process_video(update, video_id)
 
     async def _process_video(self, update: Update, video_id: str):
-        """Обрабатывает анализ видео по идентификатору видео."""
-        await update.message.reply_text('Получаю комментарии, пожалуйста, подождите...')
+        """
+        Обрабатывает анализ видео, используя кеш и общие вычисления для одинаковых запросов.
 
-        comments = self._fetch_comments(video_id)
-        if comments is None:
-            await update.message.reply_text('Произошла ошибка при получении комментариев.')
-            return
-        if not comments:
-            await update.message.reply_text('Не удалось найти комментарии к этому видео.')
-            return
+        Запросы одного видео во время анализа присоединяются к нему: статус анализа
+        показывается в каждом из ожидающих чатов, а результат приходит всем сразу.
+        """
+        mode = self._analysis_mode()
+        cache_key = self._cache_key(video_id, mode)
+        # Инкрементальный анализ и так дешёв, а сохранённый результат не учитывал бы новые комментарии
+        use_cache = mode != 'incremental'
+        with span('request', video_id=video_id, mode=mode) as request_span:
+            joined = self.result_cache.is_in_flight(cache_key)
+            if joined:
+                await update.message.reply_text('Это видео уже анализируется, результат придёт сюда же...')
+            request_span.set(joined=joined)
+
+            status = StatusMessage(update.message)
+            result = await self.result_cache.get_or_compute(
+                cache_key, lambda progress: self._analyze_video(update, video_id, progress), on_progress=status.update,
+                use_cache=use_cache
+            )
+            logger.debug(f"Статистика кеша результатов: {self.result_cache.stats()}")
+
+            if result is not None:
+                await self._send_evaluation_result(update, result['evaluation'])
+            else:
+                request_span.fail('анализ не выполнен')
+                if joined and status.text is None:
+                    await update.message.reply_text('Не удалось выполнить анализ видео. Пожалуйста, попробуйте позже.')
+
+    async def _process_videos(self, update: Update, video_ids, playlist_id=None):
+        """
+        Сравнивает несколько видео по релевантности и отправляет общую таблицу.
 
-        await update.message.reply_text('Перевожу комментарии, это может занять некоторое время...')
+        Видео с готовым результатом берутся из кеша, остальные анализируются вместе
+        (см. _compare_videos), а их результаты сохраняются в кеш по отдельности,
+        поэтому последующий запрос любого из видео не требует повторного анализа.
+        Сравнение всегда выполняется по комментариям с наибольшим числом лайков.
 
-        translated_texts = self._translate_comments([comment['text'] for comment in comments])
-        if translated_texts is None:
-            await update.message.reply_text('Произошла ошибка при переводе комментариев.')
-            return
+        :param video_ids: Идентификаторы видео.
+        :param playlist_id: Идентификатор плейлиста; если задан, сравниваются видео плейлиста.
+        """
+        status = StatusMessage(update.message)
+        if playlist_id is not None:
+            await status.update('Получаю список видео плейлиста...')
+            try:
+                video_ids = await self._fetch_playlist(playlist_id)
+            except QuotaExhaustedError:
+                await status.update('Дневной лимит запросов к YouTube исчерпан. Пожалуйста, попробуйте позже.')
+                return
+            if video_ids is None:
+                await status.update('Произошла ошибка при получении списка видео плейлиста.')
+                return
+            if not video_ids:
+                await status.update('Плейлист пуст или недоступен.')
+                return
+
+        video_ids = list(dict.fromkeys(video_ids))
+        skipped = max(0, len(video_ids) - self.MAX_VIDEOS_PER_MESSAGE)
+        video_ids = video_ids[:self.MAX_VIDEOS_PER_MESSAGE]
+        mode = self._top_liked_mode()
+        cache_keys = {video_id: self._cache_key(video_id, mode) for video_id in video_ids}
+
+        with span('compare', videos=len(video_ids), mode=mode) as compare_span:
+            results = {}
+            for video_id, cache_key in cache_keys.items():
+                cached = await self.result_cache.get_async(cache_key)
+                if cached is not None:
+                    results[video_id] = cached['evaluation']
+            pending = [video_id for video_id in video_ids if video_id not in results]
+            compare_span.set(cached=len(results))
+
+            if pending:
+                analyzed = await self._run_admitted(update, status.update, self._compare_videos, pending, status.update)
+                if analyzed is None:
+                    compare_span.fail('анализ не выполнен')
+                    return
+                for video_id, result in analyzed.items():
+                    if isinstance(result, dict):
+                        await self.result_cache.set_async(cache_keys[video_id], result)
+                        result = result['evaluation']
+                    results[video_id] = result
+
+        await self._send_comparison(update, {video_id: results[video_id] for video_id in video_ids}, skipped)
+
+    async def _analyze_video(self, update: Update, video_id: str, progress):
+        """
+        Ставит анализ видео в очередь пула воркеров с учётом лимитов.
 
-        await update.message.reply_text('Анализирую комментарии, это может занять некоторое время...')
+        :param progress: Корутинная функция, показывающая статус анализа всем ожидающим.
+        :return: Результат анализа или None, если анализ не выполнен.
+        """
+        if self.incremental_scorer is not None:
+            analysis = self._run_incremental_analysis
+        elif self.adaptive_sampler is not None:
+            analysis = self._run_adaptive_analysis
+        else:
+            analysis = self._run_analysis
+        return await self._run_admitted(update, progress, analysis, video_id, progress)
+
+    async def _run_admitted(self, update: Update, progress, analysis, *args):
+        """
+        Выполняет анализ в слоте пула воркеров с учётом лимитов пользователя и очереди.
 
-        sentiments = self._analyze_sentiments(translated_texts)
-        if sentiments is None:
-            await update.message.reply_text('Произошла ошибка при анализе комментариев.')
-            return
+        :param progress: Корутинная функция, показывающая статус анализа.
+        :param analysis: Корутинная функция анализа, вызываемая с аргументами args.
+        :return: Результат анализа или None, если задание не принято или анализ не выполнен.
+        """
+        user_id = self._get_user_id(update)
+        try:
+            position = self.worker_pool.admit(user_id)
+        except UserLimitError:
+            await update.message.reply_text('Дождитесь завершения предыдущего анализа, пожалуйста.')
+            return None
+        except QueueFullError:
+            await update.message.reply_text('Сейчас слишком много запросов. Пожалуйста, попробуйте позже.')
+            return None
 
-        # Обновляем комментарии с результатами анализа
-        for i, comment in enumerate(comments):
-            comment['translated_text'] = translated_texts[i]
-            comment['stars'] = sentiments[i]['stars']
-            comment['sentiment_score'] = sentiments[i]['score']
+        async def notify_queued():
+            await progress(f'Вы #{position} в очереди на анализ, пожалуйста, подождите...')
+
+        async with self.worker_pool.slot(user_id, on_wait=notify_queued if position else None):
+            return await analysis(*args)
+
+    async def _run_analysis(self, video_id: str, progress):
+        """
+        Выполняет анализ видео; блокирующие этапы выполняются в пуле воркеров.
+
+        Комментарии проходят перевод и анализ тональности порциями, а статус
+        обновляется предварительной оценкой после каждой порции.
+
+        :param progress: Корутинная функция, показывающая статус анализа всем ожидающим.
+        :return: Словарь с оценкой видео ('evaluation') и оценками комментариев ('comments')
+                 или None при ошибке.
+        """
+        await progress('Получаю комментарии, пожалуйста, подождите...')
+
+        try:
+            comments = await self._fetch_comments(video_id)
+        except QuotaExhaustedError:
+            await progress('Дневной лимит запросов к YouTube исчерпан. Пожалуйста, попробуйте позже.')
+            return None
+        if comments is None:
+            await progress('Произошла ошибка при получении комментариев.')
+            return None
+        if not comments:
+            await progress('Не удалось найти комментарии к этому видео.')
+            return None
+
+        fetched = len(comments)
+        if self.near_duplicate_threshold is not None:
+            comments = await self.worker_pool.run(self._collapse_duplicates, comments)
+        if len(comments) < fetched:
+            await progress(f'Получено комментариев: {fetched} (без повторов: {len(comments)}). Анализирую...')
+        else:
+            await progress(f'Получено комментариев: {fetched}. Анализирую...')
+
+        if not await self._stream_comments(progress, comments):
+            return None
 
         # Оцениваем видео
         evaluation_result = self._evaluate_video(comments)
 
-        # Отправляем результат пользователю
-        await self._send_evaluation_result(update, evaluation_result)
+        return {
+            'evaluation': evaluation_result,
+            'comments': comments.to_comments()
+        }
 
-    def _extract_video_id(self, url):
-        """Извлекает идентификатор видео из ссылки YouTube."""
-        logger.info(f"Извлечение video_id из URL: {url}")
-        patterns = [
-            r'(?:v=|\/)([0-9A-Za-z_-]{11}).*',
-            r'youtu\.be\/([0-9A-Za-z_-]{11})'
-        ]
-        for pattern in patterns:
-            match = re.search(pattern, url)
-            if match:
-                video_id = match.group(1)
-                logger.info(f"Найден video_id: {video_id}")
-                return video_id
-        logger.warning("Не удалось извлечь video_id")
-        return None
-
-    def _fetch_comments(self, video_id):
-        """Получает комментарии к видео."""
-        logger.info(f"Получение комментариев для video_id: {video_id}")
+    async def _compare_videos(self, video_ids, progress):
+        """
+        Анализирует несколько видео общими порциями моделей.
+
+        Комментарии всех видео загружаются конкурентно и объединяются в один набор:
+        перевод и анализ тональности идут порциями по SHARED_BATCH_SIZE комментариев
+        независимо от границ видео, поэтому видео с небольшим количеством
+        комментариев не требуют отдельных вызовов моделей. После анализа набор
+        разбивается обратно, и каждое видео оценивается отдельно.
+
+        :param progress: Корутинная функция, показывающая статус анализа.
+        :return: Словарь video_id -> результат анализа ('evaluation', 'comments') или описание
+                 причины, по которой видео не оценено; None при ошибке моделей.
+        """
+        await progress(f'Получаю комментарии к {len(video_ids)} видео, пожалуйста, подождите...')
+        fetched = await asyncio.gather(
+            *(self._fetch_comments(video_id) for video_id in video_ids), return_exceptions=True
+        )
+
+        results, batches = {}, {}
+        for video_id, comments in zip(video_ids, fetched):
+            if isinstance(comments, QuotaExhaustedError):
+                results[video_id] = 'дневной лимит запросов к YouTube исчерпан'
+            elif isinstance(comments, BaseException):
+                raise comments
+            elif comments is None:
+                results[video_id] = 'ошибка при получении комментариев'
+            elif not comments:
+                results[video_id] = 'комментарии не найдены'
+            else:
+                batches[video_id] = comments
+        if not batches:
+            return results
+
+        if self.near_duplicate_threshold is not None:
+            for video_id, comments in batches.items():
+                batches[video_id] = await self.worker_pool.run(self._collapse_duplicates, comments)
+        combined = CommentBatch.concat(list(batches.values()))
+        await progress(f'Получено комментариев: {len(combined)} к {len(batches)} видео. Анализирую...')
+
+        stream = stream_analysis(
+            combined, self._route_comments, self._translate_comments, self._analyze_sentiments,
+            batch_size=self.SHARED_BATCH_SIZE
+        )
+        analyzed = 0
         try:
-            comments = self.youtube_service.get_comments(video_id, max_results=self.MAX_COMMENTS)
-            logger.info(f"Получено {len(comments)} комментариев")
-            return comments
-        except Exception as e:
-            logger.error(f"Ошибка при получении комментариев: {e}")
+            while True:
+                batch = await self.worker_pool.run(next, stream, None)
+                if batch is None:
+                    break
+                analyzed += len(batch)
+                await progress(f'Проанализировано {analyzed} из {len(combined)} комментариев к {len(batches)} видео.')
+        except PipelineStageError as e:
+            await self._report_stage_error(progress, e)
             return None
 
-    def _translate_comments(self, texts):
-        """Переводит комментарии на английский язык."""
-        logger.info("Начало перевода комментариев")
+        # Комментарии видео идут в объединённом наборе подряд: оцениваем каждое видео по своему срезу
+        start = 0
+        for video_id, comments in batches.items():
+            video_comments = combined[start:start + len(comments)]
+            start += len(comments)
+            results[video_id] = {
+                'evaluation': self._evaluate_video(video_comments),
+                'comments': video_comments.to_comments()
+            }
+        return results
+
+    async def _run_incremental_analysis(self, video_id: str, progress):
+        """
+        Выполняет анализ видео с учётом сохранённого состояния.
+
+        При первом анализе оцениваются последние комментарии видео, при повторном —
+        только опубликованные или изменённые после предыдущего анализа.
+
+        :param progress: Корутинная функция, показывающая статус анализа всем ожидающим.
+        :return: Словарь с оценкой видео ('evaluation') и оценками новых комментариев ('comments')
+                 или None при ошибке.
+        """
+        await progress('Проверяю новые комментарии, пожалуйста, подождите...')
+
+        state = await self.worker_pool.run(self.incremental_scorer.load, video_id)
         try:
-            translated_texts = self.translator.translate(texts)
-            logger.info("Перевод комментариев завершён")
-            return translated_texts
-        except Exception as e:
-            logger.error(f"Ошибка при переводе комментариев: {e}")
+            fetched = await self._fetch_new_comments(video_id, state.watermark)
+        except QuotaExhaustedError:
+            await progress('Дневной лимит запросов к YouTube исчерпан. Пожалуйста, попробуйте позже.')
+            return None
+        if fetched is None:
+            await progress('Произошла ошибка при получении комментариев.')
             return None
 
-    def _analyze_sentiments(self, texts):
-        """Анализирует тональность переведённых комментариев."""
-        logger.info("Начало анализа тональности комментариев")
-        try:
-            sentiments = self.sentiment_analyzer.analyze(texts)
-            logger.info("Анализ тональности завершён")
-            return sentiments
-        except Exception as e:
-            logger.error(f"Ошибка при анализе тональности: {e}")
+        records, stop_reason = fetched
+        self.incremental_scorer.advance(state, records, stop_reason)
+        changed = self.incremental_scorer.changed(state, records)
+        comments = CommentBatch.from_comments(changed)
+        if not len(comments) and not state.evaluation.count:
+            await progress('Не удалось найти комментарии к этому видео.')
+            return None
+
+        await progress(
+            f'Новых и изменённых комментариев: {len(comments)}, ранее оценено: {state.evaluation.count}. Анализирую...'
+        )
+        if len(comments) and not await self._stream_comments(progress, comments):
+            return None
+
+        evaluation_result = await self.worker_pool.run(self.incremental_scorer.apply, state, changed, comments)
+        logger.info(f"Инкрементальная оценка видео {video_id}: {evaluation_result}")
+        return {
+            'evaluation': evaluation_result,
+            'comments': comments.to_comments()
+        }
+
+    async def _run_adaptive_analysis(self, video_id: str, progress):
+        """
+        Выполняет анализ видео адаптивной выборкой.
+
+        Комментарии загружаются постранично и оцениваются порциями по убыванию
+        лайков, пока оценка не достигнет заданной точности.
+
+        :param progress: Корутинная функция, показывающая статус анализа всем ожидающим.
+        :return: Словарь с оценкой видео ('evaluation', включая 'comments_used')
+                 и оценками комментариев ('comments') или None при ошибке.
+        """
+        await progress('Получаю комментарии, пожалуйста, подождите...')
+
+        sample = self.adaptive_sampler.start()
+        # Загрузка и анализ чередуются, поэтому выборка — отдельный спан, включающий этапы перевода и тональности
+        with span('sample', video_id=video_id) as sample_span:
+            try:
+                youtube_service = await self.worker_pool.run(self._youtube_service.get)
+                pages = youtube_service.iter_comment_pages(video_id)
+                while not sample.done:
+                    if sample.needs_page():
+                        page = await self._next_page(pages)
+                        if page is None:
+                            sample.exhausted = True
+                        else:
+                            sample.add_page(page)
+                        continue
+                    batch = sample.next_batch()
+                    if batch is None:
+                        break
+                    await self.worker_pool.run(self._score_batch, batch)
+                    sample.record(batch)
+                    await progress(
+                        f'Проанализировано {sample.used} из {sample.fetched} полученных комментариев.\n'
+                        f'Предварительная релевантность: {sample.estimate["video_relevance"]}% '
+                        f'(±{sample.margin():.0f})'
+                    )
+                # Оставшиеся страницы не нужны
+                if inspect.isasyncgen(pages):
+                    await pages.aclose()
+                else:
+                    pages.close()
+            except QuotaExhaustedError:
+                logger.error("Квота YouTube Data API исчерпана на всех ключах")
+                await progress('Дневной лимит запросов к YouTube исчерпан. Пожалуйста, попробуйте позже.')
+                return None
+            except PipelineStageError as e:
+                sample_span.fail(e)
+                await self._report_stage_error(progress, e)
+                return None
+            except Exception as e:
+                logger.error(f"Ошибка при получении комментариев: {e}")
+                sample_span.fail(e)
+                await progress('Произошла ошибка при получении комментариев.')
+                return None
+            sample_span.set(pages=sample.pages, comments=sample.fetched, used=sample.used, stop_reason=sample.stop_reason)
+
+        if not sample.used:
+            await progress('Не удалось найти комментарии к этому видео.')
             return None
 
+        evaluation_result = sample.result()
+        logger.info(f"Адаптивная оценка видео {video_id}: {evaluation_result}")
+        return {
+            'evaluation': evaluation_result,
+            'comments': sample.comments()
+        }
+
+    async def _next_page(self, pages):
+        """Следующая страница синхронного или асинхронного генератора страниц; None, если страниц больше нет."""
+        if inspect.isasyncgen(pages):
+            try:
+                return await pages.__anext__()
+            except StopAsyncIteration:
+                return None
+        return await self.worker_pool.run(next, pages, None)
+
+    def _score_batch(self, batch):
+        """Переводит и оценивает порцию комментариев целиком."""
+        for _ in stream_analysis(
+            batch, self._route_comments, self._translate_comments, self._analyze_sentiments, batch_size=len(batch)
+        ):
+            pass
+        return batch
+
+    async def _report_stage_error(self, progress, error):
+        """Показывает сообщение об ошибке этапа конвейера (PipelineStageError)."""
+        if error.stage == 'translation':
+            await progress('Произошла ошибка при переводе комментариев.')
+        else:
+            await progress('Произошла ошибка при анализе комментариев.')
+
+    async def _stream_comments(self, progress, comments):
+        """
+        Пропускает комментарии через перевод и анализ тональности порциями.
+
+        Статус обновляется предварительной оценкой после каждой порции; она
+        вычисляется тем же оценщиком (и стратегией взвешивания), что и итоговая.
+
+        :return: True при успехе, False при ошибке одного из этапов.
+        """
+        stream = stream_analysis(
+            comments, self._route_comments, self._translate_comments, self._analyze_sentiments,
+            batch_size=self.STREAM_BATCH_SIZE
+        )
+        analyzed = 0
+        try:
+            while True:
+                batch = await self.worker_pool.run(next, stream, None)
+                if batch is None:
+                    return True
+                # Порции — срезы набора по порядку, поэтому оценённые комментарии — его начало
+                analyzed += len(batch)
+                provisional = self.video_evaluator.evaluate_batch(comments[:analyzed])
+                await progress(
+                    f'Проанализировано {analyzed} из {len(comments)} комментариев.\n'
+                    f'Предварительная релевантность: {provisional["video_relevance"]}%'
+                )
+        except PipelineStageError as e:
+            await self._report_stage_error(progress, e)
+            return False
+
+    def _analysis_mode(self):
+        """Режим анализа одного видео (часть ключа кеша результатов)."""
+        if self.incremental_scorer is not None:
+            return 'incremental'
+        if self.adaptive_sampler is not None:
+            return f'adaptive-{self.adaptive_sampler.tolerance}'
+        return self._top_liked_mode()
+
+    def _top_liked_mode(self):
+        """Режим анализа комментариев с наибольшим числом лайков."""
+        mode = 'top-liked'
+        if self.near_duplicate_threshold is not None:
+            mode += f'-nd{self.near_duplicate_threshold}'
+        return mode
+
+    def _cache_key(self, video_id, mode):
+        """Ключ кеша результата анализа видео в заданном режиме."""
+        return self.result_cache.make_key(
+            video_id, self.SENTIMENT_MODEL, self.TRANSLATION_MODEL, self.inference_backend, mode
+        )
+
+    def _get_user_id(self, update: Update):
+        """Возвращает идентификатор пользователя (или чата) для учёта лимитов."""
+        if update.effective_user is not None:
+            return update.effective_user.id
+        return update.effective_chat.id
+
+    def _extract_video_id(self, url):
+        """Извлекает идентификатор видео из ссылки YouTube."""
+        logger.info(f"Извлечение video_id из URL: {url}")
+        video_id = extract_video_id(url)
+        if video_id:
+            logger.info(f"Найден video_id: {video_id}")
+        else:
+            logger.warning("Не удалось извлечь video_id")
+        return video_id
+
+    async def _fetch_comments(self, video_id):
+        """Получает комментарии к видео; синхронный клиент API вызывается в пуле воркеров."""
+        logger.info(f"Получение комментариев для video_id: {video_id}")
+        with span('fetch', video_id=video_id) as fetch_span:
+            try:
+                youtube_service = await self.worker_pool.run(self._youtube_service.get)
+                if inspect.iscoroutinefunction(youtube_service.get_comment_batch):
+                    comments = await youtube_service.get_comment_batch(video_id, max_results=self.MAX_COMMENTS)
+                else:
+                    comments = await self.worker_pool.run(
+                        youtube_service.get_comment_batch, video_id, max_results=self.MAX_COMMENTS
+                    )
+                logger.info(f"Получено {len(comments)} комментариев")
+                fetch_span.set(comments=len(comments))
+                return comments
+            except QuotaExhaustedError:
+                logger.error("Квота YouTube Data API исчерпана на всех ключах")
+                raise
+            except Exception as e:
+                logger.error(f"Ошибка при получении комментариев: {e}")
+                fetch_span.fail(e)
+                return None
+
+    async def _fetch_playlist(self, playlist_id):
+        """Получает идентификаторы видео плейлиста; None при ошибке."""
+        logger.info(f"Получение видео плейлиста {playlist_id}")
+        with span('playlist', playlist_id=playlist_id) as playlist_span:
+            try:
+                youtube_service = await self.worker_pool.run(self._youtube_service.get)
+                if inspect.iscoroutinefunction(youtube_service.get_playlist_video_ids):
+                    video_ids = await youtube_service.get_playlist_video_ids(
+                        playlist_id, max_results=self.MAX_VIDEOS_PER_MESSAGE
+                    )
+                else:
+                    video_ids = await self.worker_pool.run(
+                        youtube_service.get_playlist_video_ids, playlist_id, max_results=self.MAX_VIDEOS_PER_MESSAGE
+                    )
+                playlist_span.set(videos=len(video_ids))
+                return video_ids
+            except QuotaExhaustedError:
+                logger.error("Квота YouTube Data API исчерпана на всех ключах")
+                raise
+            except Exception as e:
+                logger.error(f"Ошибка при получении видео плейлиста: {e}")
+                playlist_span.fail(e)
+                return None
+
+    async def _fetch_new_comments(self, video_id, watermark):
+        """
+        Получает комментарии, опубликованные после отметки.
+
+        :return: Пара (записи комментариев, причина остановки загрузки) или None при ошибке.
+        """
+        logger.info(f"Получение новых комментариев для video_id: {video_id} (отметка: {watermark})")
+        with span('fetch', video_id=video_id, incremental=True) as fetch_span:
+            try:
+                youtube_service = await self.worker_pool.run(self._youtube_service.get)
+                if inspect.iscoroutinefunction(youtube_service.get_comments_since):
+                    records, stats = await youtube_service.get_comments_since(
+                        video_id, watermark, max_results=self.INCREMENTAL_MAX_COMMENTS
+                    )
+                else:
+                    records, stats = await self.worker_pool.run(
+                        youtube_service.get_comments_since, video_id, watermark,
+                        max_results=self.INCREMENTAL_MAX_COMMENTS
+                    )
+                fetch_span.set(comments=len(records), stop_reason=stats['stop_reason'])
+                return records, stats['stop_reason']
+            except QuotaExhaustedError:
+                logger.error("Квота YouTube Data API исчерпана на всех ключах")
+                raise
+            except Exception as e:
+                logger.error(f"Ошибка при получении комментариев: {e}")
+                fetch_span.fail(e)
+                return None
+
+    def _collapse_duplicates(self, comments):
+        """
+        Объединяет почти одинаковые комментарии набора.
+
+        Моделями анализируется один представитель каждой группы, а лайки
+        группы учитываются в его весе.
+
+        :param comments: Набор комментариев (CommentBatch).
+        :return: Набор представителей групп.
+        """
+        with span('deduplicate', comments=len(comments)) as deduplicate_span:
+            collapsed, sizes = collapse_near_duplicates(comments, self.near_duplicate_threshold)
+            deduplicate_span.set(clusters=len(collapsed))
+        if len(collapsed) < len(comments):
+            logger.info(
+                f"Почти одинаковые комментарии объединены: {len(comments)} -> {len(collapsed)} "
+                f"(наибольшая группа: {sizes.max()})"
+            )
+        return collapsed
+
+    def _route_comments(self, comments):
+        """
+        Определяет язык комментариев и путь их обработки.
+
+        Язык и путь сохраняются в столбцах набора (languages, paths).
+        Перевод нужен только неанглийским комментариям и только если модель
+        тональности не является многоязычной.
+
+        :param comments: Набор комментариев (CommentBatch).
+        :return: Индексы комментариев, которые нужно перевести.
+        """
+        to_translate = route_batch(comments, self.language_detector, multilingual=self.sentiment_analyzer.multilingual)
+        logger.info(f"Перевод требуется для {len(to_translate)} из {len(comments)} комментариев")
+        return to_translate
+
+    def _translate_comments(self, comments, indices):
+        """Переводит комментарии набора с указанными индексами на английский язык."""
+        logger.info("Начало перевода комментариев")
+        with span('translate', comments=len(indices), batch_size=len(comments)) as translate_span:
+            try:
+                comments = self.translator.translate_batch(comments, indices)
+                logger.info("Перевод комментариев завершён")
+                return comments
+            except Exception as e:
+                logger.error(f"Ошибка при переводе комментариев: {e}")
+                translate_span.fail(e)
+                return None
+
+    def _analyze_sentiments(self, comments):
+        """Анализирует тональность переведённых комментариев набора."""
+        logger.info("Начало анализа тональности комментариев")
+        with span('sentiment', comments=len(comments)) as sentiment_span:
+            try:
+                comments = self.sentiment_analyzer.analyze_batch(comments)
+                logger.info("Анализ тональности завершён")
+                return comments
+            except Exception as e:
+                logger.error(f"Ошибка при анализе тональности: {e}")
+                sentiment_span.fail(e)
+                return None
+
     def _evaluate_video(self, comments):
         """Оценивает видео на основе комментариев."""
         logger.info("Начало оценки видео")
-        evaluation_result = self.video_evaluator.evaluate(comments)
+        with span('evaluate', comments=len(comments)):
+            evaluation_result = self.video_evaluator.evaluate_batch(comments)
         logger.info(f"Оценка видео завершена: {evaluation_result}")
         return evaluation_result
 
@@ -192,14 +916,86 @@ class TelegramBot:
             f'Релевантность видео: {relevance}%\n'
             f'Видео считается: {verdict}'
         )
+        # Результаты из кеша прежних версий могут не содержать интервала
+        interval = evaluation_result.get('confidence_interval')
+        if interval:
+            response += f'\nДоверительный интервал (95%): {interval[0]:.0f}–{interval[1]:.0f}%'
+        if 'comments_used' in evaluation_result:
+            response += f'\nОценено комментариев: {evaluation_result["comments_used"]}'
+            if evaluation_result['stop_reason'] in EARLY_STOP_REASONS:
+                response += ' (точность достигнута досрочно)'
 
         await update.message.reply_text(response)
 
+    async def _send_comparison(self, update: Update, results, skipped=0):
+        """
+        Отправляет таблицу сравнения видео по релевантности.
+
+        :param results: Словарь video_id -> оценка видео или причина, по которой видео не оценено.
+        :param skipped: Сколько видео не вошло в сравнение из-за ограничения MAX_VIDEOS_PER_MESSAGE.
+        """
+        evaluations = {video_id: result for video_id, result in results.items() if isinstance(result, dict)}
+        lines = ['Сравнение видео по релевантности:', '']
+        for rank, (video_id, evaluation) in enumerate(rank_videos(evaluations), 1):
+            line = f'{rank}. youtu.be/{video_id} — {evaluation["video_relevance"]}% ({evaluation["verdict"]})'
+            interval = evaluation.get('confidence_interval')
+            if interval:
+                line += f', 95%: {interval[0]:.0f}–{interval[1]:.0f}%'
+            count = evaluation.get('comments_used', evaluation.get('count'))
+            if count:
+                line += f', комментариев: {count}'
+            lines.append(line)
+
+        failed = [(video_id, reason) for video_id, reason in results.items() if video_id not in evaluations]
+        if failed:
+            if evaluations:
+                lines.append('')
+            lines.append('Не оценены:')
+            lines.extend(f'youtu.be/{video_id} — {reason}' for video_id, reason in failed)
+        if skipped:
+            lines += ['', f'Ещё {skipped} видео не вошли в сравнение: не больше {self.MAX_VIDEOS_PER_MESSAGE} за раз.']
+
+        await update.message.reply_text('\n'.join(lines))
+
     def run(self):
         """Запуск бота."""
-        application = ApplicationBuilder().token(self.token).build()
+        # Обновления обрабатываются конкурентно: ограничения задаёт пул воркеров
+        application = ApplicationBuilder().token(self.token).concurrent_updates(True).build()
 
         application.add_handler(CommandHandler('start', self.start))
+        application.add_handler(CommandHandler('health', self.health))
+        application.add_handler(CommandHandler('analyze', self.analyze))
         application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, self.handle_message))
 
-        application.run_polling()
\ No newline at end of file
+        if self.background_warm_up:
+            self.warm_up()
+
+        application.run_polling()
+        self.worker_pool.shutdown()
+
+    def run_worker(self, queue, base_url=None, concurrency=4):
+        """
+        Запуск воркера очереди заданий (режим вебхука).
+
+        :param queue: Очередь заданий (JobQueue), которую наполняет WebhookIngress.
+        :param base_url: Адрес Bot API (для локальной проверки — адрес заглушки).
+        :param concurrency: Количество одновременно выполняемых заданий.
+        """
+        if self.background_warm_up:
+            self.warm_up()
+        try:
+            asyncio.run(self.serve_queue(queue, Bot(self.token, base_url=base_url or 'https://api.telegram.org/bot'),
+                                         concurrency=concurrency))
+        finally:
+            self.worker_pool.shutdown()
+
+    async def serve_queue(self, queue, telegram, **options):
+        """
+        Выполняет задания очереди, отвечая через клиент Bot API.
+
+        :param queue: Очередь заданий (JobQueue).
+        :param telegram: Клиент Bot API (telegram.Bot).
+        :param options: Параметры QueueWorker.
+        """
+        async with telegram:
+            await QueueWorker(queue, self, telegram, **options).run()
\ No newline at end of file
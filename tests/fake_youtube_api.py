@@ -0,0 +1,154 @@
+"""
+Локальная заглушка эндпоинтов YouTube Data API (commentThreads.list, comments.list и playlistItems.list).
+
+Используется как транспорт httpx (httpx.MockTransport(api.handle_request)).
+"""
+import asyncio
+import json
+import random
+import httpx
+
+INLINE_REPLIES = 5  # Сколько ответов API возвращает в поле replies
+
+
+def make_comment(comment_id, text, like_count, parent_id=None, published_at='2024-01-01T00:00:00Z'):
+    """Формирует ресурс comment в формате YouTube Data API."""
+    snippet = {
+        'textDisplay': text,
+        'textOriginal': text,
+        'likeCount': like_count,
+        'publishedAt': published_at,
+        'updatedAt': published_at,
+    }
+    if parent_id is not None:
+        snippet['parentId'] = parent_id
+    return {'kind': 'youtube#comment', 'id': comment_id, 'snippet': snippet}
+
+
+def error_body(status, reason, message):
+    """Формирует ответ с ошибкой в формате YouTube Data API."""
+    return status, {'error': {
+        'code': status, 'message': message,
+        'errors': [{'reason': reason, 'domain': 'youtube.quota', 'message': message}]
+    }}
+
+
+class FakeYouTubeAPI:
+    """Хранит ветки комментариев видео и отвечает на запросы в формате YouTube Data API."""
+
+    def __init__(self, latency=0.0):
+        """
+        :param latency: Искусственная задержка ответа, секунд.
+        """
+        self.latency = latency
+        self.videos = {}  # video_id -> список веток (top_comment, [replies])
+        self.playlists = {}  # playlist_id -> список идентификаторов видео
+        self.requests = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.exhausted_keys = set()  # Ключи с исчерпанной квотой (403 quotaExceeded)
+        self.failures = []  # Ошибки (статус, причина) для следующих запросов
+
+    def add_thread(self, video_id, text, like_count=0, replies=(), published_at='2024-01-01T00:00:00Z'):
+        """
+        Добавляет ветку комментариев.
+
+        :param replies: Последовательность пар (текст, лайки).
+        :param published_at: Время публикации верхнеуровневого комментария.
+        :return: Идентификатор ветки.
+        """
+        threads = self.videos.setdefault(video_id, [])
+        thread_id = f'{video_id}-t{len(threads)}'
+        top = make_comment(thread_id, text, like_count, published_at=published_at)
+        reply_resources = [
+            make_comment(f'{thread_id}.r{i}', reply_text, reply_likes, parent_id=thread_id)
+            for i, (reply_text, reply_likes) in enumerate(replies)
+        ]
+        threads.append((top, reply_resources))
+        return thread_id
+
+    def edit(self, comment_id, text, updated_at):
+        """Изменяет текст комментария."""
+        for threads in self.videos.values():
+            for top, replies in threads:
+                for comment in [top, *replies]:
+                    if comment['id'] == comment_id:
+                        comment['snippet'].update(textDisplay=text, textOriginal=text, updatedAt=updated_at)
+
+    def generate(self, video_id, threads=100, max_replies=10, seed=0):
+        """Заполняет видео синтетическими ветками комментариев."""
+        rng = random.Random(seed)
+        for i in range(threads):
+            replies = [
+                (f'reply {j} to comment {i}', int(rng.paretovariate(1.5)) - 1)
+                for j in range(rng.randint(0, max_replies))
+            ]
+            self.add_thread(video_id, f'comment {i}', int(rng.paretovariate(1.2)) - 1, replies)
+
+    def count(self, resource):
+        """Количество запросов к ресурсу."""
+        return sum(1 for name, _ in self.requests if name == resource)
+
+    def respond(self, resource, params):
+        """
+        Формирует ответ API.
+
+        :return: Пара (HTTP-статус, тело ответа).
+        """
+        self.requests.append((resource, dict(params)))
+        if not params.get('key'):
+            return error_body(403, 'forbidden', 'The request is missing a valid API key.')
+        if params['key'] in self.exhausted_keys:
+            return error_body(403, 'quotaExceeded', 'The request cannot be completed because you have exceeded your quota.')
+        if self.failures:
+            status, reason = self.failures.pop(0)
+            return error_body(status, reason, 'Simulated failure')
+
+        max_results = int(params.get('maxResults', 20))
+        offset = int(params.get('pageToken', 0))
+
+        if resource == 'commentThreads':
+            items = []
+            threads = self.videos.get(params['videoId'], [])
+            if params.get('order') == 'time':
+                threads = sorted(threads, key=lambda thread: thread[0]['snippet']['publishedAt'], reverse=True)
+            for top, replies in threads:
+                item = {
+                    'kind': 'youtube#commentThread',
+                    'id': top['id'],
+                    'snippet': {'topLevelComment': top, 'totalReplyCount': len(replies)},
+                }
+                if replies and 'replies' in params.get('part', ''):
+                    item['replies'] = {'comments': replies[:INLINE_REPLIES]}
+                items.append(item)
+        elif resource == 'playlistItems':
+            items = [
+                {'kind': 'youtube#playlistItem', 'contentDetails': {'videoId': video_id}}
+                for video_id in self.playlists.get(params['playlistId'], [])
+            ]
+        elif resource == 'comments':
+            items = []
+            for threads in self.videos.values():
+                for top, replies in threads:
+                    if top['id'] == params['parentId']:
+                        items = replies
+        else:
+            return error_body(404, 'notFound', 'Not Found')
+
+        body = {'items': items[offset:offset + max_results]}
+        if offset + max_results < len(items):
+            body['nextPageToken'] = str(offset + max_results)
+        return 200, body
+
+    async def handle_request(self, request: httpx.Request):
+        """Обработчик запросов для httpx.MockTransport."""
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            if self.latency:
+                await asyncio.sleep(self.latency)
+            resource = request.url.path.rstrip('/').rsplit('/', 1)[-1]
+            status, body = self.respond(resource, dict(request.url.params))
+        finally:
+            self.in_flight -= 1
+        return httpx.Response(status, content=json.dumps(body), headers={'Content-Type': 'application/json'})
@@ -0,0 +1,67 @@
+"""
+Заглушки токенизатора и моделей Hugging Face для тестов батчевого инференса.
+
+Токенизатор переводит слова в идентификаторы по словарю; модели возвращают
+результат, зависящий от длины входа, и запоминают формы батчей.
+Для тензоров требуется PyTorch.
+"""
+from types import SimpleNamespace
+
+PAD_ID = 0
+
+
+class StubTokenizer:
+    """Токенизатор: одно слово — один токен."""
+
+    def __init__(self):
+        self.vocab = {}
+        self.words = {}
+
+    def __call__(self, texts, truncation=False, max_length=None):
+        input_ids = []
+        for text in texts:
+            ids = [self.vocab.setdefault(word, len(self.vocab) + 1) for word in text.split()]
+            if truncation and max_length is not None:
+                ids = ids[:max_length]
+            input_ids.append(ids)
+        self.words = {token_id: word for word, token_id in self.vocab.items()}
+        return {'input_ids': input_ids, 'attention_mask': [[1] * len(ids) for ids in input_ids]}
+
+    def pad(self, features, return_tensors='pt'):
+        import torch
+        width = max(len(feature['input_ids']) for feature in features)
+        return {
+            key: torch.tensor([feature[key] + [PAD_ID] * (width - len(feature[key])) for feature in features])
+            for key in ('input_ids', 'attention_mask')
+        }
+
+    def batch_decode(self, outputs, skip_special_tokens=True):
+        return [
+            ' '.join(self.words[token_id] for token_id in row.tolist() if token_id != PAD_ID)
+            for row in outputs
+        ]
+
+
+class StubClassifier:
+    """Классификатор тональности: количество звёзд равно количеству токенов (не больше пяти)."""
+
+    def __init__(self):
+        self.config = SimpleNamespace(id2label={0: '1 star', 1: '2 stars', 2: '3 stars', 3: '4 stars', 4: '5 stars'})
+        self.batch_shapes = []
+
+    def __call__(self, input_ids, attention_mask):
+        import torch
+        self.batch_shapes.append(tuple(input_ids.shape))
+        stars = attention_mask.sum(dim=-1).clamp(1, 5)
+        return SimpleNamespace(logits=torch.nn.functional.one_hot(stars - 1, 5).float() * 10)
+
+
+class StubSeq2Seq:
+    """Модель перевода: «переводом» служит сам вход."""
+
+    def __init__(self):
+        self.calls = []
+
+    def generate(self, input_ids, attention_mask, num_beams, max_new_tokens):
+        self.calls.append({'shape': tuple(input_ids.shape), 'max_new_tokens': max_new_tokens})
+        return input_ids
@@ -0,0 +1,97 @@
+import random
+import unittest
+from adaptive_sampler import AdaptiveSampler
+
+
+def make_pages(pages=10, per_page=100, seed=0):
+    """Страницы комментариев с лайками, убывающими от страницы к странице."""
+    rng = random.Random(seed)
+    result = []
+    for page in range(pages):
+        comments = []
+        for i in range(per_page):
+            number = page * per_page + i
+            comments.append({'text': f'comment {number}', 'likeCount': rng.randint(0, 1000 // (number + 1))})
+        result.append(comments)
+    return result
+
+
+class CountingPages:
+    """Итератор страниц, считающий запрошенные страницы."""
+
+    def __init__(self, pages):
+        self._pages = iter(pages)
+        self.requested = 0
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        self.requested += 1
+        return next(self._pages)
+
+
+class TestAdaptiveSampler(unittest.TestCase):
+    def score(self, stars_of):
+        def score(batch):
+            self.batches.append(batch.likes.tolist())
+            batch.set_sentiments([{'stars': stars_of(text), 'score': 1.0} for text in batch.texts])
+            return batch
+        return score
+
+    def setUp(self):
+        self.batches = []
+
+    def test_stops_when_verdict_settled(self):
+        """Тест досрочной остановки для однозначно положительного видео."""
+        rng = random.Random(1)
+        stars = {}
+        pages = CountingPages(make_pages())
+        sampler = AdaptiveSampler(tolerance=1.0, batch_size=20, min_comments=40)
+
+        sample = sampler.run(pages, self.score(lambda text: stars.setdefault(text, rng.choice([4, 5, 5, 5]))))
+        result = sample.result()
+
+        self.assertIn(result['stop_reason'], ('verdict', 'converged'))
+        self.assertEqual(result['verdict'], 'Высокая релевантность')
+        self.assertLess(result['comments_used'], 200)
+        self.assertEqual(result['comments_used'], len(sample.comments()))
+        # Следующие страницы не загружаются
+        self.assertEqual(pages.requested, 1)
+
+    def test_batches_ordered_by_likes(self):
+        """Тест выдачи порций по убыванию лайков."""
+        sampler = AdaptiveSampler(tolerance=0.0, batch_size=10, min_comments=10, max_comments=60)
+        sampler.run(make_pages(pages=1), self.score(lambda text: 3))
+        likes = [like for batch in self.batches for like in batch]
+        self.assertEqual(likes, sorted(likes, reverse=True))
+
+    def test_mixed_video_uses_more_comments(self):
+        """Тест продолжения выборки, пока вердикт не определён и интервал широк."""
+        rng = random.Random(2)
+        stars = {}
+        sampler = AdaptiveSampler(tolerance=0.5, batch_size=25, min_comments=50, max_comments=300)
+        result = sampler.run(
+            make_pages(), self.score(lambda text: stars.setdefault(text, rng.choice([1, 2, 4, 5])))
+        ).result()
+        self.assertEqual(result['stop_reason'], 'limit')
+        self.assertEqual(result['comments_used'], 300)
+
+    def test_exhausted(self):
+        """Тест завершения, когда комментарии закончились."""
+        pages = [[{'text': 'a', 'likeCount': 1}, {'text': 'b', 'likeCount': 5}, {'text': 'a', 'likeCount': 1}]]
+        result = AdaptiveSampler(min_comments=50).run(pages, self.score(lambda text: 5)).result()
+        self.assertEqual(result['stop_reason'], 'exhausted')
+        self.assertEqual(result['comments_used'], 2)
+        self.assertEqual(result['comments_fetched'], 2)
+        self.assertEqual(self.batches, [[5, 1]])
+
+    def test_no_comments(self):
+        """Тест видео без комментариев."""
+        result = AdaptiveSampler().run([], self.score(lambda text: 5)).result()
+        self.assertEqual(result['comments_used'], 0)
+        self.assertEqual(result['video_relevance'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
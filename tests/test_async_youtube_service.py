@@ -0,0 +1,214 @@
+import unittest
+import httpx
+from async_youtube_service import AsyncYouTubeService
+from youtube_service import YouTubeService, default_quota_budget
+from quota_manager import QuotaManager, ApiError, QuotaExhaustedError
+from fake_youtube_api import FakeYouTubeAPI
+
+
+class TestAsyncYouTubeService(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.api = FakeYouTubeAPI()
+
+    def make_service(self, **kwargs):
+        kwargs.setdefault('quota_manager', QuotaManager(['test_api_key'], rate=10000, burst=10000))
+        return AsyncYouTubeService(
+            'test_api_key', base_url='http://youtube.test/youtube/v3',
+            transport=httpx.MockTransport(self.api.handle_request), **kwargs
+        )
+
+    async def test_get_comments(self):
+        """Тест формата и сортировки комментариев."""
+        self.api.add_thread('video', 'Отличное видео', 5)
+        self.api.add_thread('video', 'Great video!', 12, replies=[('Agreed', 30)])
+        self.api.add_thread('video', 'Great video!', 1)
+
+        async with self.make_service() as service:
+            comments = await service.get_comments('video')
+
+        self.assertEqual(comments, [
+            {'text': 'Agreed', 'likeCount': 30},
+            {'text': 'Great video!', 'likeCount': 12},
+            {'text': 'Отличное видео', 'likeCount': 5},
+        ])
+
+        async with self.make_service() as service:
+            batch = await service.get_comment_batch('video')
+        self.assertEqual(batch.select_texts([0, 1]), ['Agreed', 'Great video!'])
+        self.assertEqual(batch.likes.tolist(), [30, 12, 5])
+
+    async def test_truncated_replies_fetched(self):
+        """Тест догрузки ответов, не поместившихся в поле replies."""
+        replies = [(f'reply {i}', 100 + i) for i in range(8)]
+        self.api.add_thread('video', 'top', 0, replies=replies)
+
+        async with self.make_service() as service:
+            comments = await service.get_comments('video')
+
+        texts = {comment['text'] for comment in comments}
+        self.assertEqual(texts, {'top'} | {text for text, _ in replies})
+        self.assertEqual(self.api.count('comments'), 1)
+
+    async def test_truncated_replies_fetched_with_default_budget(self):
+        """Тест догрузки ответов при бюджете по умолчанию в одну страницу (max_results=20)."""
+        replies = [(f'r{i}', 100 + i) for i in range(8)]
+        self.api.add_thread('video', 'top', 0, replies=replies)
+
+        async with self.make_service() as service:
+            comments, stats = await service.get_comments_with_stats('video', max_results=20)
+
+        texts = {comment['text'] for comment in comments}
+        self.assertEqual(stats['reply_threads'], 1)
+        self.assertEqual(stats['truncated_reply_threads'], 0)
+        self.assertTrue({'r5', 'r6', 'r7'} <= texts)
+        self.assertEqual(stats['quota_units'], 2)
+
+    async def test_pagination_and_concurrency_cap(self):
+        """Тест постраничной загрузки и ограничения параллельных запросов."""
+        self.api.latency = 0.01
+        self.api.generate('video', threads=250, max_replies=12)
+
+        async with self.make_service(max_concurrency=3) as service:
+            comments, stats = await service.get_comments_with_stats('video', max_results=1000, max_quota_units=1000)
+
+        self.assertEqual(self.api.count('commentThreads'), 3)
+        self.assertEqual(stats['quota_units'], len(self.api.requests))
+        self.assertEqual(stats['stop_reason'], 'exhausted')
+        self.assertGreater(self.api.count('comments'), 0)
+        self.assertLessEqual(self.api.max_in_flight, 3)
+        self.assertGreater(self.api.max_in_flight, 1)
+        likes = [comment['likeCount'] for comment in comments]
+        self.assertEqual(likes, sorted(likes, reverse=True))
+
+    async def test_error_propagates(self):
+        """Тест передачи ошибки API вызывающему коду."""
+        self.api.failures.append((403, 'commentsDisabled'))
+        async with self.make_service() as service:
+            with self.assertRaises(ApiError) as context:
+                await service.get_comments('video')
+        self.assertEqual(context.exception.status, 403)
+        self.assertEqual(context.exception.reason, 'commentsDisabled')
+
+    async def test_retries_and_key_rotation(self):
+        """Тест повтора временных ошибок и переключения ключа при исчерпании квоты."""
+        self.api.generate('video', threads=50)
+        self.api.failures.extend([(503, 'backendError'), (429, 'rateLimitExceeded')])
+        self.api.exhausted_keys.add('key-1')
+        quota = QuotaManager(['key-1', 'key-2'], rate=10000, burst=10000, base_delay=0.001, rng=lambda: 1.0)
+
+        async with self.make_service(quota_manager=quota) as service:
+            comments = await service.get_comments('video', max_results=10)
+
+        self.assertEqual(len(comments), 10)
+        metrics = quota.metrics()
+        self.assertEqual(metrics['retries'], 2)
+        self.assertEqual(metrics['rotations'], 1)
+        self.assertEqual(quota.video_units('video'), len(self.api.requests))
+
+        self.api.exhausted_keys.add('key-2')
+        async with self.make_service(quota_manager=quota) as service:
+            with self.assertRaises(QuotaExhaustedError):
+                await service.get_comments('video')
+
+    async def test_returns_requested_count(self):
+        """Тест количества возвращаемых комментариев и остановки при стабильном отборе."""
+        for i in range(300):
+            self.api.add_thread('video', f'comment {i}', 1000 - i)
+
+        async with self.make_service() as service:
+            comments, stats = await service.get_comments_with_stats('video', max_results=60, max_quota_units=10)
+
+        self.assertEqual(len(comments), 60)
+        self.assertEqual(comments[0], {'text': 'comment 0', 'likeCount': 1000})
+        self.assertEqual(stats['stop_reason'], 'stable')
+        self.assertEqual(stats['pages'], 2)
+
+    async def test_default_budget(self):
+        """Тест расхода квоты по умолчанию: страниц не больше default_quota_budget."""
+        self.api.generate('video', threads=1000, max_replies=3, seed=1)
+
+        for max_results in (20, 100, 250):
+            self.api.requests.clear()
+            async with self.make_service() as service:
+                comments, stats = await service.get_comments_with_stats('video', max_results=max_results)
+            self.assertEqual(len(comments), max_results)
+            self.assertLessEqual(stats['pages'], default_quota_budget(max_results))
+            self.assertEqual(stats['quota_units'], len(self.api.requests))
+
+    async def test_stable_stop_with_default_budget(self):
+        """Тест остановки при стабильном отборе раньше исчерпания бюджета по умолчанию."""
+        for i in range(1000):
+            self.api.add_thread('video', f'comment {i}', 1000 - i)
+
+        async with self.make_service() as service:
+            comments, stats = await service.get_comments_with_stats('video', max_results=250)
+
+        self.assertEqual(len(comments), 250)
+        self.assertEqual(stats['stop_reason'], 'stable')
+        self.assertEqual(stats['pages'], 4)
+        self.assertLess(stats['pages'], default_quota_budget(250))
+
+    async def test_reply_pages_within_budget(self):
+        """Тест бюджета квоты при догрузке большой ветки ответов."""
+        self.api.add_thread('video', 'top', 0, replies=[(f'reply {i}', i) for i in range(250)])
+
+        async with self.make_service() as service:
+            comments, stats = await service.get_comments_with_stats(
+                'video', max_results=100, max_quota_units=3, max_reply_quota_units=2
+            )
+
+        self.assertEqual(stats['quota_units'], 3)
+        self.assertEqual(stats['reply_quota_units'], 2)
+        self.assertEqual(self.api.count('comments'), 2)
+        self.assertEqual(stats['truncated_reply_threads'], 1)
+        self.assertEqual(len(comments), 100)
+
+    async def test_iter_comment_pages_lazy(self):
+        """Тест постраничной загрузки по запросу потребителя."""
+        for i in range(250):
+            self.api.add_thread('video', f'comment {i}', i, replies=[(f'reply {i}', 0)] if i == 0 else ())
+
+        async with self.make_service() as service:
+            pages = service.iter_comment_pages('video')
+            first = await pages.__anext__()
+            self.assertEqual(len(first), 101)
+            self.assertEqual(first[1], {'text': 'reply 0', 'likeCount': 0})
+            self.assertEqual(self.api.count('commentThreads'), 1)
+            await pages.aclose()
+
+            budgeted = [page async for page in service.iter_comment_pages('video', max_quota_units=2)]
+        self.assertEqual([len(page) for page in budgeted], [101, 100])
+
+    async def test_playlist_video_ids(self):
+        """Тест получения видео плейлиста постранично с ограничением количества."""
+        self.api.playlists['PLtest'] = [f'video{i:06d}' for i in range(70)]
+
+        async with self.make_service() as service:
+            video_ids = await service.get_playlist_video_ids('PLtest', max_results=60)
+            self.assertEqual(video_ids, [f'video{i:06d}' for i in range(60)])
+            self.assertEqual(self.api.count('playlistItems'), 2)
+            self.assertEqual(await service.get_playlist_video_ids('PLmissing'), [])
+
+
+class TestYouTubeServicePaging(unittest.TestCase):
+    def setUp(self):
+        self.api = FakeYouTubeAPI()
+        self.service = YouTubeService('test_api_key', quota_manager=QuotaManager(['test_api_key']))
+        # Запросы направляются в заглушку API вместо googleapiclient
+        self.service._execute = lambda resource, params, video_id: self.api.respond(
+            resource, {**params, 'key': 'test_api_key'}
+        )[1]
+
+    def test_default_budget(self):
+        """Тест расхода квоты по умолчанию синхронным клиентом: страниц не больше default_quota_budget."""
+        self.api.generate('video', threads=1000, max_replies=3, seed=1)
+
+        for max_results in (20, 100, 250):
+            self.api.requests.clear()
+            comments, stats = self.service.get_comments_with_stats('video', max_results=max_results)
+            self.assertEqual(len(comments), max_results)
+            self.assertLessEqual(stats['pages'], default_quota_budget(max_results))
+            self.assertEqual(stats['pages'], self.api.count('commentThreads'))
+
+if __name__ == '__main__':
+    unittest.main()
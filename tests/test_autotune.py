@@ -0,0 +1,127 @@
+import json
+import os
+import tempfile
+import time
+import unittest
+from autotune import (
+    InferenceProfile, calibrate, candidate_grid, choose, format_report, pareto_front, powers_of_two
+)
+from test_telegram_bot import FakeBot
+
+
+class SleepingTranslator:
+    def __init__(self, cost):
+        self.cost = cost
+
+    def translate_batch(self, batch, indices):
+        time.sleep(self.cost)
+        batch.set_translations(indices, [f'en:{text}' for text in batch.select_texts(indices)])
+        return batch
+
+
+class SleepingSentimentAnalyzer:
+    multilingual = True
+
+    def __init__(self, cost):
+        self.cost = cost
+        self.calls = 0
+
+    def analyze_batch(self, batch):
+        self.calls += 1
+        time.sleep(self.cost)
+        batch.set_sentiments([{'stars': 5, 'score': 0.9} for _ in range(len(batch))])
+        return batch
+
+
+def measurement(threads, workers, batch_size, videos_per_second, latency_p95_ms):
+    return {
+        'threads': threads, 'workers': workers, 'batch_size': batch_size,
+        'videos_per_second': videos_per_second, 'comments_per_second': videos_per_second * 20,
+        'latency_p50_ms': latency_p95_ms / 2, 'latency_p95_ms': latency_p95_ms, 'first_batch_p50_ms': 10.0,
+    }
+
+
+class TestAutotune(unittest.TestCase):
+    def test_grid(self):
+        """Тест перебираемых конфигураций без превышения количества ядер."""
+        self.assertEqual(powers_of_two(6), [1, 2, 4, 6])
+        grid = candidate_grid([1, 2, 4], [1, 2], [5], cpu_count=4)
+        self.assertEqual(grid, [(1, 1, 5), (1, 2, 5), (2, 1, 5), (2, 2, 5), (4, 1, 5)])
+        self.assertEqual(len(candidate_grid([1, 2, 4], [1, 2], [5], cpu_count=4, oversubscribe=True)), 6)
+
+    def test_choose_within_latency_slack(self):
+        """Тест выбора наибольшей пропускной способности при допустимой задержке."""
+        measurements = [
+            measurement(4, 1, 5, 2.0, 100),
+            measurement(2, 2, 10, 3.5, 140),
+            measurement(1, 4, 20, 5.0, 400),
+            measurement(1, 2, 5, 1.5, 150),  # Хуже второй по обоим показателям
+        ]
+        self.assertIs(choose(measurements), measurements[1])
+        self.assertIs(choose(measurements, max_latency_ms=500), measurements[2])
+        self.assertIs(choose(measurements, max_latency_ms=50), measurements[0])
+        self.assertEqual(pareto_front(measurements), measurements[2::-1])
+
+        report = format_report(measurements, measurements[1], baseline=measurements[3])
+        self.assertTrue(report[2].startswith('->'))
+        self.assertIn('пропускная способность ×2.33', report[-1])
+
+    def test_calibrate(self):
+        """Тест замеров конфигураций с загрузкой моделей по количеству потоков."""
+        loaded, analyzers = [], []
+
+        def load_models(threads):
+            loaded.append(threads)
+            analyzers.append(SleepingSentimentAnalyzer(0.001))
+            return SleepingTranslator(0.001), analyzers[-1]
+
+        texts = ['great video', 'отличное видео', 'bad video']
+        measurements = calibrate(
+            load_models, texts, [(None, 2, 5), (1, 1, 5), (1, 2, 10)], requests=4, comments_per_request=10
+        )
+
+        self.assertEqual(loaded, [None, 1])
+        self.assertEqual([(m['threads'], m['workers'], m['batch_size']) for m in measurements],
+                         [(None, 2, 5), (1, 1, 5), (1, 2, 10)])
+        for result in measurements:
+            self.assertEqual(result['requests'], 4)
+            self.assertGreater(result['videos_per_second'], 0)
+            self.assertLessEqual(result['first_batch_p50_ms'], result['latency_p50_ms'])
+        # Порция 5 — два вызова модели на запрос, порция 10 — один; плюс прогрев перед каждым замером
+        self.assertEqual(analyzers[1].calls, (4 * 2 + 1) + (4 * 1 + 1))
+
+
+class TestInferenceProfile(unittest.TestCase):
+    def test_save_and_load(self):
+        """Тест сохранения профиля и его загрузки при запуске."""
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'cache', 'inference_profile.json')
+            self.assertIsNone(InferenceProfile.load(path))
+
+            profile = InferenceProfile(
+                threads=2, workers=4, batch_size=10, backend='transformers', host={'cpu_count': os.cpu_count()},
+                measurements=[measurement(2, 4, 10, 3.0, 120)]
+            )
+            profile.save(path)
+            loaded = InferenceProfile.load(path, backend='transformers')
+            self.assertEqual((loaded.threads, loaded.workers, loaded.batch_size), (2, 4, 10))
+            self.assertEqual(loaded.measurements, profile.measurements)
+
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump({'version': 0}, f)
+            with self.assertLogs('autotune', 'WARNING'):
+                self.assertIsNone(InferenceProfile.load(path))
+
+    def test_bot_applies_profile(self):
+        """Тест применения профиля ботом: размер порции конвейера и потоки моделей."""
+        bot = FakeBot('token', None, warm_up=False, inference_profile=InferenceProfile(threads=3, batch_size=10))
+        try:
+            self.assertEqual(bot.STREAM_BATCH_SIZE, 10)
+            self.assertEqual(bot.model_threads, 3)
+        finally:
+            bot.worker_pool.shutdown()
+        self.assertEqual(FakeBot.STREAM_BATCH_SIZE, 32)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,35 @@
+import unittest
+from batching import plan_batches
+
+class TestPlanBatches(unittest.TestCase):
+    def test_all_indices_once(self):
+        """Тест того, что каждый текст попадает ровно в один батч."""
+        lengths = [5, 120, 7, 300, 64, 5, 512, 33]
+        batches = plan_batches(lengths, max_batch_tokens=600, max_batch_size=4)
+        indices = sorted(i for batch in batches for i in batch)
+        self.assertEqual(indices, list(range(len(lengths))))
+
+    def test_token_budget(self):
+        """Тест соблюдения бюджета токенов с учётом паддинга."""
+        lengths = [10, 20, 30, 40, 50, 60, 70, 80]
+        batches = plan_batches(lengths, max_batch_tokens=100, max_batch_size=64)
+        for batch in batches:
+            self.assertLessEqual(max(lengths[i] for i in batch) * len(batch), 100)
+
+    def test_sorted_by_length(self):
+        """Тест группировки текстов близкой длины."""
+        lengths = [100, 1, 100, 1]
+        batches = plan_batches(lengths, max_batch_tokens=1000, max_batch_size=2)
+        self.assertEqual([sorted(batch) for batch in batches], [[1, 3], [0, 2]])
+
+    def test_oversized_text(self):
+        """Тест текста длиннее бюджета: он получает собственный батч."""
+        batches = plan_batches([10, 1000], max_batch_tokens=100)
+        self.assertEqual(batches, [[0], [1]])
+
+    def test_empty(self):
+        """Тест пустого списка."""
+        self.assertEqual(plan_batches([]), [])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,109 @@
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from unittest import mock
+import bulk_score
+from comment_batch import CommentBatch
+from language_detector import LanguageDetector
+from video_evaluator import VideoEvaluator
+
+
+class FakeYouTube:
+    def get_comment_batch(self, video_id, max_results=100):
+        if video_id == 'empty000000':
+            return CommentBatch()
+        return CommentBatch(['Great video', 'Отличное видео'], [10, 0])
+
+
+class FakeTranslator:
+    def translate_batch(self, batch, indices):
+        batch.set_translations(indices, ['Great video'] * len(indices))
+        return batch
+
+
+class FakeSentimentAnalyzer:
+    multilingual = False
+
+    def analyze_batch(self, batch):
+        batch.set_sentiments([{'stars': 5 if 'Great' in text else 1, 'score': 0.9} for text in batch.model_texts()])
+        return batch
+
+
+class TestBulkScore(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+        bulk_score._worker.clear()
+
+    def write(self, name, text):
+        path = os.path.join(self.tmpdir, name)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(text)
+        return path
+
+    def test_read_video_ids(self):
+        """Тест чтения списка видео из ссылок и идентификаторов."""
+        path = self.write('videos.txt', '\n'.join([
+            '# канал',
+            'https://www.youtube.com/watch?v=dQw4w9WgXcQ',
+            'https://youtu.be/dQw4w9WgXcQ',
+            'aaaaaaaaaaa',
+            '',
+            'not a video',
+        ]))
+        self.assertEqual(bulk_score.read_video_ids(path), ['dQw4w9WgXcQ', 'aaaaaaaaaaa'])
+
+    def test_resume_from_checkpoint(self):
+        """Тест пропуска уже оценённых видео при повторном запуске."""
+        path = self.write('results.jsonl', '\n'.join([
+            json.dumps({'video_id': 'a', 'video_relevance': 80}),
+            json.dumps({'video_id': 'b', 'error': 'quota'}),
+            json.dumps({'video_id': 'c', 'error': 'quota'}),
+            json.dumps({'video_id': 'c', 'video_relevance': 40}),
+            '{"video_id": "d", "video_rel',
+        ]))
+        results = bulk_score.load_results(path)
+        self.assertEqual(set(results), {'a', 'b', 'c'})
+        self.assertEqual(bulk_score.completed_video_ids(results), {'a', 'c'})
+
+    def test_worker_quota_settings(self):
+        """Тест деления дневной квоты и частоты запросов между процессами."""
+        self.assertEqual(
+            bulk_score.worker_quota_settings(4, daily_quota=10000, rate=20.0, burst=50),
+            {'daily_quota': 2500, 'rate': 5.0, 'burst': 12}
+        )
+        self.assertEqual(bulk_score.worker_quota_settings(1), {'daily_quota': 10000, 'rate': 20.0, 'burst': 50})
+        self.assertEqual(bulk_score.worker_quota_settings(100, burst=50)['burst'], 1)
+
+    def test_init_worker_threads(self):
+        """Тест ограничения потоков моделей воркера без обязательного импорта PyTorch."""
+        with mock.patch.dict(sys.modules, {'torch': None}), \
+                mock.patch('translator.Translator') as translator, \
+                mock.patch('sentiment_analyzer.SentimentAnalyzer') as sentiment_analyzer:
+            bulk_score.init_worker('key', 'onnx-int8', None, 20, threads=2)
+
+        translator.assert_called_once_with(memo=None, backend='onnx-int8', num_threads=2)
+        sentiment_analyzer.assert_called_once_with(memo=None, backend='onnx-int8', num_threads=2)
+        self.assertEqual(bulk_score._worker['max_comments'], 20)
+
+    def test_score_video(self):
+        """Тест оценки одного видео компонентами воркера."""
+        bulk_score._worker.update(
+            youtube=FakeYouTube(), translator=FakeTranslator(), sentiment_analyzer=FakeSentimentAnalyzer(),
+            language_detector=LanguageDetector(), video_evaluator=VideoEvaluator(), max_comments=10
+        )
+        record = bulk_score.score_video('dQw4w9WgXcQ')
+        self.assertEqual(record['video_id'], 'dQw4w9WgXcQ')
+        self.assertEqual(record['video_relevance'], 100)
+        self.assertEqual(record['count'], 2)
+        json.dumps(record)
+
+        self.assertEqual(bulk_score.score_video('empty000000')['error'], 'no comments')
+
+if __name__ == '__main__':
+    unittest.main()
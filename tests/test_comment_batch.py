@@ -0,0 +1,41 @@
+import json
+import unittest
+from comment_batch import CommentBatch
+
+class TestCommentBatch(unittest.TestCase):
+    def setUp(self):
+        self.batch = CommentBatch.from_comments([
+            {'text': 'Great video', 'likeCount': 10},
+            {'text': 'Отличное видео', 'likeCount': 3},
+            {'text': 'Bad', 'likeCount': 0},
+        ])
+
+    def test_columns(self):
+        """Тест создания столбцов из словарей комментариев."""
+        self.assertEqual(len(self.batch), 3)
+        self.assertEqual(self.batch.likes.tolist(), [10, 3, 0])
+        self.assertEqual(self.batch.select_texts([1]), ['Отличное видео'])
+        with self.assertRaises(ValueError):
+            CommentBatch(['a'], [1, 2])
+
+    def test_slice_shares_columns(self):
+        """Тест записи результатов через срез без копирования."""
+        view = self.batch[1:3]
+        view.set_translations([0], ['Great video'])
+        view.set_sentiments([{'stars': 5, 'score': 0.8}, {'stars': 1, 'score': 0.6}])
+        self.assertEqual(self.batch.translated[1], 'Great video')
+        self.assertEqual(self.batch.stars.tolist(), [0, 5, 1])
+        self.assertEqual(self.batch.model_texts(), ['Great video', 'Great video', 'Bad'])
+
+    def test_to_comments(self):
+        """Тест преобразования в сериализуемые словари."""
+        self.batch.set_sentiments([{'stars': 4, 'score': 0.5}] * 3)
+        comments = self.batch.to_comments()
+        self.assertEqual(comments[0], {
+            'text': 'Great video', 'likeCount': 10, 'translated_text': 'Great video',
+            'stars': 4, 'sentiment_score': 0.5
+        })
+        json.dumps(comments)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,59 @@
+import os
+import tempfile
+import unittest
+from comment_memo import CommentMemo, normalize_text, text_key
+
+class TestCommentMemo(unittest.TestCase):
+    def setUp(self):
+        self.memo = CommentMemo(max_entries=10)
+        self.calls = []
+
+    def tearDown(self):
+        self.memo.close()
+
+    def compute(self, texts):
+        self.calls.append(list(texts))
+        return [text.upper() for text in texts]
+
+    def test_normalization(self):
+        """Тест нормализации пробелов и формы Unicode."""
+        self.assertEqual(normalize_text('  first \n\t comment '), 'first comment')
+        self.assertEqual(text_key('m', 'ﬁrst'), text_key('m', 'first'))
+
+    def test_namespace_separates_models(self):
+        """Тест разделения результатов разных моделей."""
+        self.assertNotEqual(text_key('sentiment:a', 'first'), text_key('sentiment:b', 'first'))
+
+    def test_only_misses_computed(self):
+        """Тест того, что модель получает только отсутствующие в кеше тексты."""
+        self.assertEqual(self.memo.memoize('m', ['a', 'b'], self.compute), ['A', 'B'])
+        self.assertEqual(self.memo.memoize('m', ['b', 'c', 'a'], self.compute), ['B', 'C', 'A'])
+        self.assertEqual(self.calls, [['a', 'b'], ['c']])
+
+    def test_duplicates_in_batch(self):
+        """Тест однократной обработки повторов внутри батча."""
+        result = self.memo.memoize('m', ['first', 'first ', 'x', 'first'], self.compute)
+        self.assertEqual(result, ['FIRST', 'FIRST', 'X', 'FIRST'])
+        self.assertEqual(self.calls, [['first', 'x']])
+
+    def test_size_bound(self):
+        """Тест вытеснения записей при превышении лимита."""
+        self.memo.memoize('m', [str(i) for i in range(25)], self.compute)
+        self.assertLessEqual(len(self.memo), 10)
+        self.assertGreater(self.memo.evictions, 0)
+
+    def test_persistence(self):
+        """Тест сохранения записей на диске."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, 'memo.sqlite3')
+            memo = CommentMemo(path)
+            memo.memoize('m', ['a'], self.compute)
+            memo.close()
+
+            memo = CommentMemo(path)
+            self.assertEqual(memo.memoize('m', ['a'], self.compute), ['A'])
+            memo.close()
+        self.assertEqual(self.calls, [['a']])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,6 +1,7 @@
 import unittest
 import os
 from telegram_bot import TelegramBot
+from youtube_links import extract_video_ids, extract_playlist_id, parse_playlist_reference
 from dotenv import load_dotenv
 
 class TestExtractVideoID(unittest.TestCase):
@@ -44,5 +45,26 @@ class TestExtractVideoID(unittest.TestCase):
         video_id = self.bot._extract_video_id(url)
         self.assertIsNone(video_id)
 
+
+class TestExtractVideoIDs(unittest.TestCase):
+    def test_several_links(self):
+        """Тест извлечения всех ссылок из сообщения без повторов."""
+        text = (
+            'Сравни https://www.youtube.com/watch?v=dQw4w9WgXcQ&t=42s, https://youtu.be/9bZkp7q1907\n'
+            'https://youtube.com/shorts/kJQP7kiw5Fk и ещё раз youtu.be/dQw4w9WgXcQ'
+        )
+        self.assertEqual(extract_video_ids(text), ['dQw4w9WgXcQ', '9bZkp7q1907', 'kJQP7kiw5Fk'])
+
+    def test_words_are_not_ids(self):
+        """Тест отказа принимать слова из 11 символов за идентификаторы."""
+        self.assertEqual(extract_video_ids('informative video /abcdefghijk'), [])
+
+    def test_playlist(self):
+        """Тест извлечения идентификатора плейлиста из ссылки и аргумента команды."""
+        playlist_id = 'PLrAXtmErZgOeiKm4sgNOknGvNjby9efdf'
+        self.assertEqual(extract_playlist_id(f'https://www.youtube.com/playlist?list={playlist_id}'), playlist_id)
+        self.assertEqual(parse_playlist_reference(playlist_id), playlist_id)
+        self.assertIsNone(parse_playlist_reference('dQw4w9WgXcQ'))
+
 if __name__ == '__main__':
     unittest.main()
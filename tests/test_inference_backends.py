@@ -0,0 +1,100 @@
+import sys
+import tempfile
+import types
+import unittest
+from pathlib import Path
+from unittest import mock
+import inference_backends
+from inference_backends import ONNX_INT8, OPTIMUM_INSTALL_HINT, load_model, quantize_dynamic_int8
+
+
+class FakeORTModel:
+    """Класс модели optimum: экспорт записывает model.onnx, загрузка запоминает директорию."""
+
+    exports = []
+    loads = []
+
+    def __init__(self, model_dir=None):
+        self.model_dir = model_dir
+
+    @classmethod
+    def from_pretrained(cls, model_name_or_dir, export=False, cache_dir=None, session_options=None):
+        if export:
+            cls.exports.append(model_name_or_dir)
+            return cls()
+        cls.loads.append(Path(model_name_or_dir))
+        return cls(Path(model_name_or_dir))
+
+    def save_pretrained(self, directory):
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        (directory / 'model.onnx').write_bytes(b'fp32')
+        (directory / 'config.json').write_text('{}')
+
+
+def fake_quantization_module(calls):
+    """Модуль onnxruntime.quantization, «квантующий» копированием с пометкой."""
+    def quantize_dynamic(source, target, weight_type):
+        calls.append((Path(source).name, weight_type))
+        Path(target).write_bytes(Path(source).read_bytes() + b'-int8')
+
+    return types.SimpleNamespace(quantize_dynamic=quantize_dynamic, QuantType=types.SimpleNamespace(QInt8='QInt8'))
+
+
+class TestInferenceBackends(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.cache_dir = Path(self.tmpdir.name)
+        FakeORTModel.exports = []
+        FakeORTModel.loads = []
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_unknown_backend(self):
+        """Тест ошибки при неизвестном бэкенде инференса."""
+        with self.assertRaises(ValueError) as context:
+            load_model('seq2seq', 'model', self.cache_dir, backend='tflite')
+        self.assertIn('tflite', str(context.exception))
+
+    def test_missing_optimum(self):
+        """Тест подсказки по установке, если optimum не установлен."""
+        with mock.patch.dict(sys.modules, {'optimum': None, 'optimum.onnxruntime': None}):
+            with self.assertRaises(ImportError) as context:
+                load_model('seq2seq', 'model', self.cache_dir, backend=ONNX_INT8)
+        self.assertEqual(str(context.exception), OPTIMUM_INSTALL_HINT)
+
+    def test_quantize_dynamic_int8(self):
+        """Тест квантования ONNX-файлов и копирования остальных файлов модели."""
+        source, target = self.cache_dir / 'fp32', self.cache_dir / 'int8'
+        FakeORTModel().save_pretrained(source)
+        (source / 'nested').mkdir()
+        calls = []
+
+        with mock.patch.dict(sys.modules, {'onnxruntime': types.ModuleType('onnxruntime'),
+                                           'onnxruntime.quantization': fake_quantization_module(calls)}):
+            quantize_dynamic_int8(source, target)
+
+        self.assertEqual(calls, [('model.onnx', 'QInt8')])
+        self.assertEqual((target / 'model.onnx').read_bytes(), b'fp32-int8')
+        self.assertEqual((target / 'config.json').read_text(), '{}')
+        self.assertFalse((target / 'nested').exists())
+
+    def test_int8_export_reused(self):
+        """Тест однократного экспорта и квантования: повторная загрузка использует готовую модель."""
+        calls = []
+        with mock.patch.object(inference_backends, '_ort_model_class', return_value=FakeORTModel), \
+                mock.patch.dict(sys.modules, {'onnxruntime': types.ModuleType('onnxruntime'),
+                                              'onnxruntime.quantization': fake_quantization_module(calls)}):
+            first = load_model('sequence-classification', 'org/model', self.cache_dir, backend=ONNX_INT8)
+            second = load_model('sequence-classification', 'org/model', self.cache_dir, backend=ONNX_INT8)
+
+        int8_dir = self.cache_dir / 'onnx' / 'org--model--int8'
+        self.assertEqual(FakeORTModel.exports, ['org/model'])
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(first.model_dir, int8_dir)
+        self.assertEqual(second.model_dir, int8_dir)
+        self.assertEqual((int8_dir / 'model.onnx').read_bytes(), b'fp32-int8')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,115 @@
+import asyncio
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+from inference_server import (
+    InferenceServer, InferenceClient, InferenceServerError, RemoteTranslator, RemoteSentimentAnalyzer
+)
+
+
+class FakeTranslator:
+    model_name = 'fake-translator'
+    backend = 'transformers'
+
+    def __init__(self):
+        self.calls = []
+
+    def translate(self, texts):
+        self.calls.append(list(texts))
+        return [f'en:{text}' for text in texts]
+
+
+class FakeSentimentAnalyzer:
+    model_name = 'fake-sentiment'
+    backend = 'transformers'
+    multilingual = True
+
+    def __init__(self):
+        self.calls = []
+
+    def analyze(self, texts):
+        self.calls.append(list(texts))
+        if 'fail' in texts:
+            raise RuntimeError('model error')
+        return [{'text': text, 'stars': len(text) % 5 + 1, 'score': 0.9} for text in texts]
+
+
+class TestInferenceServer(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.socket_path = os.path.join(self.tmpdir, 'inference.sock')
+        self.translator = FakeTranslator()
+        self.analyzer = FakeSentimentAnalyzer()
+        # Большая задержка накопления, чтобы одновременные запросы гарантированно попали в один батч
+        self.server = InferenceServer(self.socket_path, self.translator, self.analyzer, max_delay=0.1)
+
+        self.loop = asyncio.new_event_loop()
+        started = threading.Event()
+        self.task = None
+
+        def run():
+            asyncio.set_event_loop(self.loop)
+            self.task = self.loop.create_task(self.server.serve(started))
+            try:
+                self.loop.run_until_complete(self.task)
+            except asyncio.CancelledError:
+                pass
+
+        self.thread = threading.Thread(target=run, daemon=True)
+        self.thread.start()
+        self.assertTrue(started.wait(5))
+        self.client = InferenceClient(self.socket_path, timeout=5)
+
+    def tearDown(self):
+        self.client.close()
+        self.loop.call_soon_threadsafe(self.task.cancel)
+        self.thread.join(5)
+        self.loop.close()
+        shutil.rmtree(self.tmpdir)
+
+    def test_remote_clients(self):
+        """Тест тонких клиентов с интерфейсом моделей."""
+        translator = RemoteTranslator(self.client)
+        analyzer = RemoteSentimentAnalyzer(self.client)
+        self.assertEqual(translator.model_name, 'fake-translator')
+        self.assertTrue(analyzer.multilingual)
+
+        self.assertEqual(translator.translate(['привет', 'мир']), ['en:привет', 'en:мир'])
+        self.assertEqual(analyzer.analyze(['good'])[0]['stars'], 5)
+
+    def test_cross_request_micro_batching(self):
+        """Тест объединения запросов разных клиентов в один батч."""
+        results = {}
+
+        def request(i):
+            client = InferenceClient(self.socket_path, timeout=5)
+            results[i] = client.call('translate', [f'text {i}', f'other {i}'])
+            client.close()
+
+        threads = [threading.Thread(target=request, args=(i,)) for i in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        for i in range(4):
+            self.assertEqual(results[i], [f'en:text {i}', f'en:other {i}'])
+        self.assertEqual(len(self.translator.calls), 1)
+        self.assertEqual(len(self.translator.calls[0]), 8)
+        stats = self.client.call('info')['stats']['translate']
+        self.assertEqual(stats, {'requests': 4, 'batches': 1})
+
+    def test_error_propagation(self):
+        """Тест передачи ошибки модели клиенту."""
+        with self.assertRaises(InferenceServerError):
+            self.client.call('analyze', ['fail'])
+        with self.assertRaises(InferenceServerError):
+            self.client.call('unknown', [])
+        # Соединение остаётся рабочим после ошибки
+        self.assertEqual(self.client.call('translate', ['a']), ['en:a'])
+
+
+if __name__ == '__main__':
+    unittest.main()
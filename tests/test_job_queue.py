@@ -0,0 +1,140 @@
+import tempfile
+import unittest
+from pathlib import Path
+from job_queue import JobQueue, SQLiteJobQueue, open_job_queue, register_queue_backend, QUEUE_BACKENDS
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestSQLiteJobQueue(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = Path(self.tmp.name) / 'jobs.sqlite3'
+        self.clock = FakeClock()
+        self.queue = SQLiteJobQueue(self.path, visibility_timeout=30, max_attempts=2, retry_delay=5, clock=self.clock)
+
+    def tearDown(self):
+        self.queue.close()
+        self.tmp.cleanup()
+
+    def test_claim_and_complete(self):
+        """Тест выдачи заданий по порядку и подтверждения выполнения."""
+        first = self.queue.enqueue({'text': 'a'})
+        self.queue.enqueue({'text': 'b'})
+
+        job = self.queue.claim('w1')
+        self.assertEqual((job.id, job.payload, job.attempts), (first, {'text': 'a'}, 1))
+        self.assertEqual(self.queue.claim('w2').payload, {'text': 'b'})
+        self.assertIsNone(self.queue.claim('w3'))
+
+        self.assertTrue(self.queue.complete(job))
+        self.assertEqual(self.queue.stats(), {'queued': 0, 'running': 1, 'done': 1, 'dead': 0})
+
+    def test_idempotency_key(self):
+        """Тест отказа в повторном задании с тем же ключом."""
+        self.assertIsNotNone(self.queue.enqueue({'text': 'a'}, key='update:1'))
+        self.assertIsNone(self.queue.enqueue({'text': 'a'}, key='update:1'))
+        self.assertEqual(self.queue.stats()['queued'], 1)
+
+    def test_visibility_timeout(self):
+        """Тест повторной выдачи задания, аренда которого истекла."""
+        self.queue.enqueue({'text': 'a'})
+        lost = self.queue.claim('w1')
+
+        self.clock.now += 20
+        self.assertTrue(self.queue.extend(lost))
+        self.clock.now += 20
+        self.assertIsNone(self.queue.claim('w2'))
+
+        self.clock.now += 15
+        job = self.queue.claim('w2')
+        self.assertEqual((job.id, job.attempts), (lost.id, 2))
+        # Прежний воркер больше не может подтвердить задание
+        self.assertFalse(self.queue.complete(lost))
+        self.assertTrue(self.queue.complete(job))
+
+        # Аренда последней попытки истекла — задание становится мёртвым
+        self.queue.enqueue({'text': 'b'})
+        self.queue.claim('w1')
+        self.clock.now += 31
+        self.queue.claim('w2')
+        self.clock.now += 31
+        self.assertIsNone(self.queue.claim('w3'))
+        self.assertEqual(self.queue.dead_letters()[0]['error'], 'истекло время аренды')
+
+    def test_retry_then_dead_letter(self):
+        """Тест повтора с задержкой и переноса в мёртвые после max_attempts."""
+        job_id = self.queue.enqueue({'text': 'a'})
+        self.assertTrue(self.queue.fail(self.queue.claim('w1'), 'NetworkError: timeout'))
+        self.assertIsNone(self.queue.claim('w1'))
+
+        self.clock.now += 5
+        job = self.queue.claim('w1')
+        self.assertEqual(job.attempts, 2)
+        self.queue.fail(job, 'NetworkError: timeout')
+
+        self.assertEqual(self.queue.stats()['dead'], 1)
+        self.assertEqual(self.queue.dead_letters(), [
+            {'id': job_id, 'payload': {'text': 'a'}, 'attempts': 2, 'error': 'NetworkError: timeout'}
+        ])
+
+        self.assertTrue(self.queue.requeue(job_id))
+        self.assertEqual(self.queue.claim('w1').attempts, 1)
+
+    def test_shared_between_connections(self):
+        """Тест общей очереди для нескольких процессов (соединений с одной базой)."""
+        other = SQLiteJobQueue(self.path, clock=self.clock)
+        try:
+            self.queue.enqueue({'text': 'a'})
+            job = other.claim('w2')
+            self.assertEqual(job.payload, {'text': 'a'})
+            self.assertIsNone(self.queue.claim('w1'))
+        finally:
+            other.close()
+
+    def test_purge(self):
+        """Тест удаления старых выполненных заданий."""
+        self.queue.enqueue({'text': 'a'})
+        self.queue.complete(self.queue.claim('w1'))
+        self.assertEqual(self.queue.purge(60), 0)
+        self.clock.now += 61
+        self.assertEqual(self.queue.purge(60), 1)
+
+
+class TestOpenJobQueue(unittest.TestCase):
+    def test_open_by_url(self):
+        """Тест создания очереди по адресу и регистрации реализаций."""
+        with tempfile.TemporaryDirectory() as tmp:
+            queue = open_job_queue(f'sqlite://{tmp}/jobs.sqlite3', max_attempts=5)
+            self.assertIsInstance(queue, SQLiteJobQueue)
+            self.assertEqual(queue.max_attempts, 5)
+            queue.close()
+            self.assertTrue((Path(tmp) / 'jobs.sqlite3').exists())
+
+        with self.assertRaises(ValueError):
+            open_job_queue('redis://localhost/0')
+
+        register_queue_backend('memory', lambda url, **options: ('memory', url.netloc))
+        try:
+            self.assertEqual(open_job_queue('memory://jobs'), ('memory', 'jobs'))
+        finally:
+            del QUEUE_BACKENDS['memory']
+
+    def test_incomplete_backend_rejected(self):
+        """Тест реализации очереди без всех методов интерфейса: создать её нельзя."""
+        class PartialQueue(JobQueue):
+            def enqueue(self, payload, key=None, delay=0.0):
+                return None
+
+        with self.assertRaises(TypeError):
+            PartialQueue()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,48 @@
+import unittest
+from language_detector import (
+    LanguageDetector, route_for_translation,
+    PATH_TRANSLATED, PATH_ENGLISH, PATH_MULTILINGUAL, PATH_NO_TEXT
+)
+
+class TestLanguageDetector(unittest.TestCase):
+    def setUp(self):
+        self.detector = LanguageDetector()
+
+    def test_english(self):
+        """Тест английских комментариев, включая короткие реплики."""
+        self.assertEqual(self.detector.detect('I love this video!'), 'en')
+        self.assertEqual(self.detector.detect('first'), 'en')
+
+    def test_cyrillic(self):
+        """Тест русского и украинского текста."""
+        self.assertEqual(self.detector.detect('Отличное видео, спасибо автору!'), 'ru')
+        self.assertEqual(self.detector.detect('Дякую, дуже цікаво і корисно'), 'uk')
+
+    def test_latin_languages(self):
+        """Тест латинских языков, отличных от английского."""
+        self.assertEqual(self.detector.detect('Me encanta este canal, siempre aprendo algo nuevo.'), 'es')
+        self.assertEqual(self.detector.detect('Das Video ist wirklich gut gemacht.'), 'de')
+
+    def test_other_scripts(self):
+        """Тест определения языка по письменности."""
+        self.assertEqual(self.detector.detect('こんにちは世界'), 'ja')
+        self.assertEqual(self.detector.detect('你好'), 'zh')
+
+    def test_no_letters(self):
+        """Тест комментариев без букв."""
+        self.assertEqual(self.detector.detect('😂😂😂'), 'zxx')
+        self.assertEqual(self.detector.detect('10/10'), 'zxx')
+
+class TestRouteForTranslation(unittest.TestCase):
+    def test_english_model(self):
+        """Тест маршрутизации для англоязычной модели тональности."""
+        paths = route_for_translation(['en', 'ru', 'zxx', 'und'])
+        self.assertEqual(paths, [PATH_ENGLISH, PATH_TRANSLATED, PATH_NO_TEXT, PATH_TRANSLATED])
+
+    def test_multilingual_model(self):
+        """Тест маршрутизации для многоязычной модели тональности: перевод не нужен."""
+        paths = route_for_translation(['en', 'ru'], multilingual=True)
+        self.assertEqual(paths, [PATH_MULTILINGUAL, PATH_MULTILINGUAL])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,62 @@
+import threading
+import time
+import unittest
+from lazy_resource import LazyResource
+
+class TestLazyResource(unittest.TestCase):
+    def test_created_on_first_use(self):
+        """Тест отложенного создания ресурса."""
+        calls = []
+        resource = LazyResource('model', lambda: calls.append(1) or 'value')
+        self.assertFalse(resource.ready)
+        self.assertEqual(calls, [])
+        self.assertEqual(resource.get(), 'value')
+        self.assertEqual(resource.get(), 'value')
+        self.assertEqual(calls, [1])
+        self.assertTrue(resource.ready)
+        self.assertIsNotNone(resource.status()['load_time'])
+
+    def test_single_initialization_across_threads(self):
+        """Тест единственной инициализации при одновременных обращениях."""
+        calls = []
+
+        def factory():
+            calls.append(1)
+            time.sleep(0.05)
+            return object()
+
+        resource = LazyResource('model', factory)
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(resource.get())) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(calls), 1)
+        self.assertTrue(all(result is results[0] for result in results))
+
+    def test_background_warm_up(self):
+        """Тест фоновой загрузки."""
+        resource = LazyResource('model', lambda: 'value')
+        resource.warm_up().join()
+        self.assertTrue(resource.ready)
+
+    def test_error_and_retry(self):
+        """Тест повторной попытки после ошибки инициализации."""
+        attempts = []
+
+        def factory():
+            attempts.append(1)
+            if len(attempts) == 1:
+                raise RuntimeError('нет сети')
+            return 'value'
+
+        resource = LazyResource('model', factory)
+        resource.warm_up().join()
+        self.assertFalse(resource.ready)
+        self.assertEqual(resource.status()['error'], 'нет сети')
+        self.assertEqual(resource.get(), 'value')
+        self.assertIsNone(resource.status()['error'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,160 @@
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+import urllib.request
+from metrics import MetricsRegistry, Tracer, MetricsServer, SamplingProfiler, slow_request_recorder
+from worker_pool import WorkerPool
+
+
+class TestMetricsRegistry(unittest.TestCase):
+    def test_prometheus_format(self):
+        """Тест текстового формата Prometheus для счётчиков, датчиков и гистограмм."""
+        registry = MetricsRegistry()
+        requests = registry.counter('api_requests_total', 'Запросы', ['status'])
+        requests.inc(status=200)
+        requests.inc(2, status=200)
+        requests.inc(status=403)
+        registry.gauge('queue_depth', 'Очередь').set_function(lambda: 3)
+        latency = registry.histogram('latency_seconds', 'Задержка', buckets=(0.1, 1.0))
+        for value in (0.05, 0.5, 5.0):
+            latency.observe(value)
+
+        text = registry.render()
+        self.assertIn('# TYPE api_requests_total counter', text)
+        self.assertIn('api_requests_total{status="200"} 3', text)
+        self.assertIn('api_requests_total{status="403"} 1', text)
+        self.assertIn('queue_depth 3', text)
+        self.assertIn('latency_seconds_bucket{le="0.1"} 1', text)
+        self.assertIn('latency_seconds_bucket{le="1.0"} 2', text)
+        self.assertIn('latency_seconds_bucket{le="+Inf"} 3', text)
+        self.assertIn('latency_seconds_count 3', text)
+        self.assertIn('latency_seconds_sum 5.55', text)
+
+    def test_counter_function(self):
+        """Тест счётчика, значение которого берётся из счётчика другого компонента."""
+        registry = MetricsRegistry()
+        retries = {'count': 2}
+        registry.counter('api_retries_total', 'Повторы').set_function(lambda: retries['count'])
+
+        self.assertIn('# TYPE api_retries_total counter', registry.render())
+        self.assertIn('api_retries_total 2', registry.render())
+        retries['count'] = 5
+        self.assertIn('api_retries_total 5', registry.render())
+
+    def test_registration_is_idempotent(self):
+        """Тест повторной регистрации метрики и проверки меток."""
+        registry = MetricsRegistry()
+        counter = registry.counter('events_total', 'События', ['kind'])
+        self.assertIs(registry.counter('events_total', 'События', ['kind']), counter)
+        with self.assertRaises(ValueError):
+            registry.histogram('events_total', 'События')
+        with self.assertRaises(ValueError):
+            counter.inc(other='x')
+
+
+class TestTracing(unittest.IsolatedAsyncioTestCase):
+    async def test_spans_in_worker_pool_belong_to_request(self):
+        """Тест связи спанов этапов в пуле воркеров со спаном запроса."""
+        tracer = Tracer(MetricsRegistry())
+        pool = WorkerPool(max_workers=2)
+
+        def stage(name):
+            with tracer.span(name, comments=5) as stage_span:
+                stage_span.add(tokens=10)
+                stage_span.add(tokens=5)
+
+        with tracer.span('request', video_id='video') as request_span:
+            await pool.run(stage, 'translate')
+            await pool.run(stage, 'sentiment')
+        pool.shutdown()
+
+        spans = {span['name']: span for span in tracer.recent()}
+        self.assertEqual(spans['translate']['trace_id'], request_span.trace_id)
+        self.assertEqual(spans['sentiment']['parent_id'], request_span.span_id)
+        self.assertEqual(spans['translate']['attributes'], {'comments': 5, 'tokens': 15})
+        self.assertEqual(tracer.durations.count(span='translate', status='ok'), 1)
+
+    def test_failed_span(self):
+        """Тест отметки спана с исключением как ошибочного."""
+        tracer = Tracer(MetricsRegistry())
+        with self.assertRaises(RuntimeError):
+            with tracer.span('fetch'):
+                raise RuntimeError('нет сети')
+        span = tracer.recent('fetch')[0]
+        self.assertEqual(span['status'], 'error')
+        self.assertEqual(span['attributes']['error'], 'нет сети')
+
+
+def busy_wait(seconds):
+    deadline = time.time() + seconds
+    while time.time() < deadline:
+        pass
+
+
+class TestProfiling(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_slow_request_profile(self):
+        """Тест сохранения профиля медленного запроса в формате collapsed stacks."""
+        profiler = SamplingProfiler(interval=0.005).start()
+        tracer = Tracer(MetricsRegistry())
+        tracer.add_listener(slow_request_recorder(profiler, 0.1, self.tmpdir))
+        try:
+            with tracer.span('request'):
+                busy_wait(0.05)
+            with tracer.span('request') as slow:
+                busy_wait(0.2)
+        finally:
+            profiler.stop()
+
+        self.assertEqual(os.listdir(self.tmpdir), [f'{slow.trace_id}.folded'])
+        with open(os.path.join(self.tmpdir, f'{slow.trace_id}.folded')) as f:
+            profile = f.read()
+        stacks = [line.rsplit(' ', 1) for line in profile.splitlines()]
+        self.assertTrue(any(
+            stack.startswith('MainThread;') and stack.endswith('test_metrics.py:busy_wait') and int(count) > 0
+            for stack, count in stacks
+        ))
+
+
+class TestMetricsServer(unittest.TestCase):
+    def test_endpoints(self):
+        """Тест эндпоинтов /metrics, /debug/spans и /debug/profile."""
+        registry = MetricsRegistry()
+        registry.counter('bot_messages_total', 'Сообщения').inc()
+        tracer = Tracer(registry)
+        with tracer.span('request', video_id='video'):
+            pass
+
+        server = MetricsServer(port=0, registry=registry, tracer=tracer).start()
+        base = f'http://127.0.0.1:{server.port}'
+        try:
+            with urllib.request.urlopen(f'{base}/metrics') as response:
+                text = response.read().decode()
+            self.assertIn('bot_messages_total 1', text)
+            self.assertIn('span_duration_seconds_count{span="request",status="ok"} 1', text)
+
+            with urllib.request.urlopen(f'{base}/debug/spans?name=request') as response:
+                spans = json.loads(response.read())
+            self.assertEqual(spans[0]['attributes'], {'video_id': 'video'})
+
+            worker = threading.Thread(target=busy_wait, args=(0.3,), name='busy')
+            worker.start()
+            with urllib.request.urlopen(f'{base}/debug/profile?seconds=0.2') as response:
+                profile = response.read().decode()
+            worker.join()
+            self.assertIn('busy;', profile)
+        finally:
+            server.stop()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,84 @@
+import unittest
+import numpy as np
+from comment_batch import CommentBatch
+from near_duplicates import MinHasher, normalize, cluster_near_duplicates, collapse_near_duplicates
+from video_evaluator import evaluate_arrays
+
+
+class TestNearDuplicates(unittest.TestCase):
+    def test_normalize(self):
+        """Тест нормализации регистра, пунктуации и повторов символов."""
+        self.assertEqual(normalize('GREAT   video!!!!!'), 'great video')
+        self.assertEqual(normalize('Sooooo good'), 'soo good')
+        # Текст только из эмодзи не превращается в пустую строку
+        self.assertEqual(normalize('😂😂😂😂'), '😂😂')
+
+    def test_signatures_reproducible(self):
+        """Тест воспроизводимости сигнатур между экземплярами."""
+        texts = ['first', 'Great video!!']
+        first, second = MinHasher().signatures(texts), MinHasher().signatures(texts)
+        self.assertEqual(first.shape, (2, 64))
+        np.testing.assert_array_equal(first, second)
+
+    def test_variants_clustered(self):
+        """Тест объединения вариантов одного комментария и разделения разных."""
+        copypasta = ('I have been following this channel for years and the quality keeps getting better, '
+                     'please never stop making these videos')
+        texts = [
+            'Great video!!',
+            'This is the worst video ever.',
+            'great video!!!!!',
+            copypasta,
+            'GREAT VIDEO',
+            copypasta.replace('quality', 'qualty'),
+            'I love this video, thank you so much for making it!',
+        ]
+        labels = cluster_near_duplicates(texts).tolist()
+        self.assertEqual(labels, [0, 1, 0, 3, 0, 3, 6])
+
+    def test_invalid_bands(self):
+        """Тест проверки делимости длины сигнатуры на количество полос."""
+        with self.assertRaises(ValueError):
+            cluster_near_duplicates(['a'], num_perm=64, bands=10)
+
+    def test_collapse_merges_likes(self):
+        """Тест выбора представителя и переноса лайков группы."""
+        batch = CommentBatch(
+            ['Great video!!', 'Worst video ever', 'great video!!!', 'GREAT VIDEO'],
+            [2, 5, 10, 0]
+        )
+        collapsed, sizes = collapse_near_duplicates(batch)
+        # Представитель — комментарий с наибольшим числом лайков, порядок исходный
+        self.assertEqual(collapsed.texts.tolist(), ['Worst video ever', 'great video!!!'])
+        self.assertEqual(sizes.tolist(), [1, 3])
+        self.assertEqual(collapsed.likes.tolist(), [5, (2 + 1) + (10 + 1) + (0 + 1) - 1])
+
+    def test_collapse_preserves_linear_score(self):
+        """Тест совпадения оценки видео до и после объединения при одинаковых оценках в группе."""
+        batch = CommentBatch(['Great video!!', 'Worst video ever', 'great video!!!'], [2, 5, 10])
+        batch.stars[:] = [5, 1, 5]
+        batch.scores[:] = 0.9
+        collapsed, _ = collapse_near_duplicates(batch)
+        full = evaluate_arrays(batch.stars, batch.likes, batch.scores)
+        reduced = evaluate_arrays(collapsed.stars, collapsed.likes, collapsed.scores)
+        self.assertAlmostEqual(full['video_relevance'], reduced['video_relevance'])
+
+    def test_collapse_empty(self):
+        """Тест пустого набора."""
+        collapsed, sizes = collapse_near_duplicates(CommentBatch())
+        self.assertEqual(len(collapsed), 0)
+        self.assertEqual(len(sizes), 0)
+
+
+class TestCommentBatchTake(unittest.TestCase):
+    def test_take_copies(self):
+        """Тест выборки комментариев по индексам с копированием столбцов."""
+        batch = CommentBatch(['a', 'b', 'c'], [1, 2, 3])
+        subset = batch.take([2, 0])
+        self.assertEqual(subset.texts.tolist(), ['c', 'a'])
+        subset.likes[0] = 100
+        self.assertEqual(batch.likes.tolist(), [1, 2, 3])
+
+
+if __name__ == '__main__':
+    unittest.main()
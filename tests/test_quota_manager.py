@@ -0,0 +1,121 @@
+import unittest
+from datetime import datetime, timezone
+from quota_manager import QuotaManager, TokenBucket, ApiError, QuotaExhaustedError, parse_error_reason
+
+
+class FakeClock:
+    def __init__(self, now=0.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class TestQuotaManager(unittest.TestCase):
+    def make_manager(self, keys=('key-1', 'key-2'), **kwargs):
+        kwargs.setdefault('rate', 10000)
+        kwargs.setdefault('burst', 10000)
+        kwargs.setdefault('base_delay', 0.001)
+        return QuotaManager(list(keys), **kwargs)
+
+    def test_token_bucket(self):
+        """Тест ограничения частоты запросов."""
+        clock = FakeClock()
+        bucket = TokenBucket(rate=10, capacity=2, clock=clock)
+        self.assertEqual(bucket.reserve(), 0)
+        self.assertEqual(bucket.reserve(), 0)
+        self.assertAlmostEqual(bucket.reserve(), 0.1)
+        clock.now += 1
+        self.assertEqual(bucket.reserve(), 0)
+
+    def test_retries_transient_errors(self):
+        """Тест повтора временных ошибок с экспоненциальной задержкой."""
+        manager = self.make_manager(rng=lambda: 1.0)
+        errors = [ApiError(503), ApiError(403, 'rateLimitExceeded')]
+
+        def send(key):
+            if errors:
+                raise errors.pop(0)
+            return 'ok'
+
+        self.assertEqual(manager.execute(send, cost=1, video_id='video'), 'ok')
+        self.assertEqual(manager.retries, 2)
+        self.assertEqual(manager.video_units('video'), 3)
+
+    def test_gives_up_after_max_retries(self):
+        """Тест прекращения повторов и передачи неповторяемых ошибок."""
+        manager = self.make_manager(max_retries=2)
+        calls = []
+
+        def send(key):
+            calls.append(key)
+            raise ApiError(500)
+
+        with self.assertRaises(ApiError):
+            manager.execute(send, cost=1)
+        self.assertEqual(len(calls), 3)
+
+        with self.assertRaises(ApiError):
+            manager.execute(lambda key: (_ for _ in ()).throw(ApiError(404, 'videoNotFound')), cost=1)
+        self.assertEqual(manager.retries, 2)
+
+    def test_key_rotation(self):
+        """Тест переключения ключа при исчерпании квоты и сброса в новые сутки."""
+        clock = FakeClock(1_000_000)
+        manager = self.make_manager(clock=clock)
+        exhausted = {'key-1'}
+
+        def send(key):
+            if key in exhausted:
+                raise ApiError(403, 'quotaExceeded')
+            return key
+
+        self.assertEqual(manager.execute(send, cost=1), 'key-2')
+        self.assertEqual(manager.current_key(), 'key-2')
+        self.assertEqual(manager.rotations, 1)
+
+        exhausted.add('key-2')
+        with self.assertRaises(QuotaExhaustedError):
+            manager.execute(send, cost=1)
+
+        clock.now += 86400
+        self.assertEqual(manager.current_key(), 'key-1')
+
+    def test_quota_day_follows_pacific_time(self):
+        """Тест смены суток квоты в полночь по тихоокеанскому времени, в том числе летом."""
+        # 23:30 по летнему тихоокеанскому времени (UTC-7)
+        clock = FakeClock(datetime(2024, 7, 1, 6, 30, tzinfo=timezone.utc).timestamp())
+        manager = self.make_manager(keys=['key-1'], daily_quota=100, clock=clock)
+        manager.execute(lambda key: None, cost=60)
+        self.assertEqual(manager.remaining(), 40)
+
+        clock.now += 3600  # 00:30 PDT — новые сутки квоты
+        self.assertEqual(manager.remaining(), 100)
+
+        # Зимой (UTC-8) сутки меняются в 08:00 UTC
+        clock.now = datetime(2024, 1, 15, 7, 0, tzinfo=timezone.utc).timestamp()
+        manager.execute(lambda key: None, cost=60)
+        clock.now += 1800
+        self.assertEqual(manager.remaining(), 40)
+        clock.now += 1800
+        self.assertEqual(manager.remaining(), 100)
+
+    def test_degradation(self):
+        """Тест сокращения загрузки при низком остатке квоты."""
+        manager = self.make_manager(keys=['key-1'], daily_quota=100, low_quota_ratio=0.2)
+        self.assertEqual(manager.plan(100, 10), (100, 10, False))
+        for _ in range(90):
+            manager.execute(lambda key: None, cost=1, video_id='video')
+        self.assertEqual(manager.plan(100, 10), (50, 5, True))
+        metrics = manager.metrics()
+        self.assertEqual(metrics['remaining'], 10)
+        self.assertEqual(metrics['units_per_video'], 90)
+        self.assertEqual(metrics['keys'][0]['key'], '...ey-1')
+
+    def test_parse_error_reason(self):
+        """Тест извлечения причины ошибки из ответа API."""
+        self.assertEqual(parse_error_reason(b'{"error": {"errors": [{"reason": "quotaExceeded"}]}}'), 'quotaExceeded')
+        self.assertIsNone(parse_error_reason(b'<html>'))
+
+if __name__ == '__main__':
+    unittest.main()
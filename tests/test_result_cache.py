@@ -0,0 +1,152 @@
+import asyncio
+import os
+import tempfile
+import threading
+import unittest
+from result_cache import ResultCache
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+class TestResultCache(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, 'results.sqlite3')
+        self.clock = FakeClock()
+        self.cache = ResultCache(self.path, memory_size=2, memory_ttl=10, disk_ttl=100, clock=self.clock)
+
+    def tearDown(self):
+        self.cache.close()
+        self.tmpdir.cleanup()
+
+    def test_key_includes_models(self):
+        """Тест зависимости ключа от версий моделей."""
+        self.assertNotEqual(
+            ResultCache.make_key('abc', 'model-a'),
+            ResultCache.make_key('abc', 'model-b')
+        )
+
+    def test_memory_hit_and_miss(self):
+        """Тест попадания в память и промаха."""
+        self.assertIsNone(self.cache.get('a'))
+        self.cache.set('a', {'evaluation': {'video_relevance': 80}})
+        self.assertEqual(self.cache.get('a'), {'evaluation': {'video_relevance': 80}})
+        stats = self.cache.stats()
+        self.assertEqual(stats['misses'], 1)
+        self.assertEqual(stats['memory_hits'], 1)
+
+    def test_lru_eviction(self):
+        """Тест вытеснения давно не использованной записи."""
+        self.cache.set('a', 1)
+        self.cache.set('b', 2)
+        self.cache.get('a')
+        self.cache.set('c', 3)
+        self.assertEqual(self.cache.stats()['evictions'], 1)
+        self.assertNotIn('b', self.cache._memory)
+        # Вытесненная из памяти запись остаётся на диске
+        self.assertEqual(self.cache.get('b'), 2)
+        self.assertEqual(self.cache.stats()['disk_hits'], 1)
+
+    def test_ttl_per_tier(self):
+        """Тест разных сроков жизни записей в памяти и на диске."""
+        self.cache.set('a', 1)
+        self.clock.now += 50
+        self.assertEqual(self.cache.get('a'), 1)
+        self.assertEqual(self.cache.stats()['disk_hits'], 1)
+        self.clock.now += 100
+        self.assertIsNone(self.cache.get('a'))
+
+    def test_disk_hit_keeps_disk_expiry(self):
+        """Тест записи, поднятой с диска незадолго до истечения срока: в памяти она не живёт дольше."""
+        self.cache.set('a', 1)
+        self.clock.now += 95
+        self.assertEqual(self.cache.get('a'), 1)
+        self.assertEqual(self.cache.stats()['disk_hits'], 1)
+        self.clock.now += 3
+        self.assertEqual(self.cache.get('a'), 1)
+        self.assertEqual(self.cache.stats()['memory_hits'], 1)
+        # Срок на диске истёк, хотя в памяти запись провела меньше memory_ttl
+        self.clock.now += 3
+        self.assertIsNone(self.cache.get('a'))
+
+    def test_persistence(self):
+        """Тест сохранения результатов между перезапусками."""
+        self.cache.set('a', {'comments': [{'text': 'привет', 'stars': 5}]})
+        self.cache.close()
+        self.cache = ResultCache(self.path, clock=self.clock)
+        self.assertEqual(self.cache.get('a'), {'comments': [{'text': 'привет', 'stars': 5}]})
+
+    def test_shared_computation(self):
+        """Тест одного вычисления для одновременных запросов."""
+        calls = []
+
+        async def compute(progress):
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return {'evaluation': {'video_relevance': 42}}
+
+        async def run():
+            return await asyncio.gather(*(self.cache.get_or_compute('v', compute) for _ in range(5)))
+
+        results = asyncio.run(run())
+        self.assertEqual(len(calls), 1)
+        self.assertTrue(all(result == {'evaluation': {'video_relevance': 42}} for result in results))
+        self.assertEqual(self.cache.stats()['shared_computations'], 4)
+
+    def test_none_not_cached(self):
+        """Тест того, что неудачный анализ не кешируется."""
+        async def compute(progress):
+            return None
+
+        self.assertIsNone(asyncio.run(self.cache.get_or_compute('v', compute)))
+        self.assertIsNone(self.cache.get('v'))
+
+    def test_async_disk_access_off_event_loop(self):
+        """Тест асинхронных чтения и записи: к SQLite обращаются не из потока цикла событий."""
+        disk_threads = []
+        get_from_disk, put_on_disk = self.cache._get_from_disk, self.cache._put_on_disk
+
+        def record(func):
+            def wrapper(*args):
+                disk_threads.append(threading.get_ident())
+                return func(*args)
+            return wrapper
+
+        self.cache._get_from_disk = record(get_from_disk)
+        self.cache._put_on_disk = record(put_on_disk)
+
+        async def run():
+            await self.cache.set_async('a', {'evaluation': {'video_relevance': 70}})
+            self.cache._memory.clear()
+            return await self.cache.get_async('a'), await self.cache.get_async('a'), await self.cache.get_async('b')
+
+        self.assertEqual(asyncio.run(run()), ({'evaluation': {'video_relevance': 70}},) * 2 + (None,))
+        stats = self.cache.stats()
+        self.assertEqual((stats['disk_hits'], stats['memory_hits'], stats['misses']), (1, 1, 1))
+        self.assertEqual(len(disk_threads), 3)
+        self.assertNotIn(threading.get_ident(), disk_threads)
+
+    def test_uncached_computation(self):
+        """Тест вычисления без кеша: одновременные запросы объединяются, результат не сохраняется."""
+        self.cache.set('v', {'evaluation': {'video_relevance': 1}})
+        calls = []
+
+        async def compute(progress):
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return {'evaluation': {'video_relevance': 42}}
+
+        async def run():
+            return await asyncio.gather(*(self.cache.get_or_compute('v', compute, use_cache=False) for _ in range(3)))
+
+        results = asyncio.run(run())
+        self.assertEqual(len(calls), 1)
+        self.assertTrue(all(result == {'evaluation': {'video_relevance': 42}} for result in results))
+        self.assertEqual(self.cache.get('v'), {'evaluation': {'video_relevance': 1}})
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,5 +1,23 @@
+import importlib.util
 import unittest
 from sentiment_analyzer import SentimentAnalyzer
+from stub_models import StubClassifier, StubTokenizer
+
+
+def make_analyzer(max_length=512, max_batch_tokens=8192, max_batch_size=64):
+    """Создаёт анализатор с заглушками токенизатора и модели без загрузки весов."""
+    analyzer = SentimentAnalyzer.__new__(SentimentAnalyzer)
+    analyzer.model_name = 'stub'
+    analyzer.max_length = max_length
+    analyzer.max_batch_tokens = max_batch_tokens
+    analyzer.max_batch_size = max_batch_size
+    analyzer.multilingual = True
+    analyzer.memo = None
+    analyzer.backend = 'transformers'
+    analyzer.tokenizer = StubTokenizer()
+    analyzer.model = StubClassifier()
+    return analyzer
+
 
 class TestSentimentAnalyzer(unittest.TestCase):
     @classmethod
@@ -25,5 +43,43 @@ class TestSentimentAnalyzer(unittest.TestCase):
         results = self.analyzer.analyze(texts)
         self.assertIn(results[0]['stars'], [3])
 
+
+@unittest.skipUnless(importlib.util.find_spec('torch'), 'требуется PyTorch')
+class TestBatchedAnalysis(unittest.TestCase):
+    def test_order_preserved_across_sorted_batches(self):
+        """Тест порядка результатов после группировки текстов по длине."""
+        analyzer = make_analyzer(max_batch_tokens=8, max_batch_size=3)
+        texts = ['a b c d', 'a', 'a b', 'a b c d e', 'a b c', 'b', 'c d']
+
+        results = analyzer._analyze_batched(texts)
+
+        self.assertEqual([result['text'] for result in results], texts)
+        self.assertEqual([result['stars'] for result in results], [4, 1, 2, 5, 3, 1, 2])
+        self.assertGreater(len(analyzer.model.batch_shapes), 1)
+        for size, width in analyzer.model.batch_shapes:
+            self.assertLessEqual(size, 3)
+            self.assertLessEqual(size * width, 8)
+
+    def test_truncation(self):
+        """Тест обрезки длинных текстов по max_length."""
+        analyzer = make_analyzer(max_length=3)
+
+        results = analyzer._analyze_batched(['a b c d e f g h', 'a b'])
+
+        self.assertEqual([result['stars'] for result in results], [3, 2])
+        self.assertEqual(analyzer.model.batch_shapes, [(2, 3)])
+
+    def test_batch_smaller_than_limits(self):
+        """Тест батча меньше ограничений plan_batches: один вызов модели."""
+        analyzer = make_analyzer()
+
+        results = analyzer._analyze_batched(['a b'])
+
+        self.assertEqual(len(results), 1)
+        self.assertEqual(results[0]['stars'], 2)
+        self.assertAlmostEqual(results[0]['score'], 1.0, places=3)
+        self.assertEqual(analyzer.model.batch_shapes, [(1, 2)])
+        self.assertEqual(analyzer._analyze_batched([]), [])
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,108 @@
+import asyncio
+import unittest
+from single_flight import SingleFlight
+
+
+class TestSingleFlight(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.flights = SingleFlight()
+        self.calls = 0
+        self.release = asyncio.Event()
+
+    async def compute(self, progress):
+        self.calls += 1
+        await progress('started')
+        await self.release.wait()
+        await progress('almost done')
+        return 42
+
+    def listener(self, messages):
+        async def on_progress(message):
+            messages.append(message)
+        return on_progress
+
+    async def test_late_joiners_share_result_and_progress(self):
+        """Тест присоединения поздних запросов и рассылки хода вычисления."""
+        first_messages, late_messages = [], []
+        first = asyncio.create_task(self.flights.run('video', self.compute, self.listener(first_messages)))
+        await asyncio.sleep(0)
+        late = asyncio.create_task(self.flights.run('video', self.compute, self.listener(late_messages)))
+        await asyncio.sleep(0)
+        self.assertEqual(self.flights.waiters('video'), 2)
+
+        self.release.set()
+        self.assertEqual(await asyncio.gather(first, late), [42, 42])
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(first_messages, ['started', 'almost done'])
+        # Поздний запрос сразу получает последнее сообщение
+        self.assertEqual(late_messages, ['started', 'almost done'])
+        self.assertEqual(self.flights.counters, {'started': 1, 'joined': 1, 'cancelled': 0})
+        self.assertFalse(self.flights.in_flight('video'))
+
+    async def test_computation_survives_first_waiter(self):
+        """Тест продолжения вычисления после ухода первого запроса."""
+        first = asyncio.create_task(self.flights.run('video', self.compute))
+        await asyncio.sleep(0)
+        late = asyncio.create_task(self.flights.run('video', self.compute))
+        await asyncio.sleep(0)
+
+        first.cancel()
+        await asyncio.sleep(0)
+        self.release.set()
+        self.assertEqual(await late, 42)
+        with self.assertRaises(asyncio.CancelledError):
+            await first
+
+    async def test_cancelled_when_all_waiters_leave(self):
+        """Тест отмены вычисления, когда все ожидающие ушли."""
+        cancelled = asyncio.Event()
+
+        async def compute(progress):
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        waiters = [asyncio.create_task(self.flights.run('video', compute)) for _ in range(3)]
+        await asyncio.sleep(0)
+        for waiter in waiters:
+            waiter.cancel()
+        await asyncio.gather(*waiters, return_exceptions=True)
+
+        await asyncio.wait_for(cancelled.wait(), 1)
+        self.assertEqual(self.flights.counters['cancelled'], 1)
+        self.assertFalse(self.flights.in_flight('video'))
+
+        # Новый запрос запускает новое вычисление
+        self.release.set()
+        self.assertEqual(await self.flights.run('video', self.compute), 42)
+
+    async def test_exception_reaches_all_waiters(self):
+        """Тест передачи исключения всем ожидающим."""
+        async def compute(progress):
+            await asyncio.sleep(0.01)
+            raise RuntimeError('quota')
+
+        results = await asyncio.gather(
+            *(self.flights.run('video', compute) for _ in range(3)), return_exceptions=True
+        )
+        self.assertTrue(all(isinstance(result, RuntimeError) for result in results))
+
+    async def test_failing_listener_does_not_break_computation(self):
+        """Тест того, что ошибка одного подписчика не прерывает вычисление."""
+        async def broken(message):
+            raise ConnectionError('chat unavailable')
+
+        messages = []
+        self.release.set()
+        results = await asyncio.gather(
+            self.flights.run('video', self.compute, broken),
+            self.flights.run('video', self.compute, self.listener(messages)),
+        )
+        self.assertEqual(results, [42, 42])
+        self.assertEqual(messages, ['started', 'almost done'])
+
+
+if __name__ == '__main__':
+    unittest.main()
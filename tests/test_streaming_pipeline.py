@@ -0,0 +1,70 @@
+import unittest
+from comment_batch import CommentBatch
+from streaming_pipeline import stream_analysis, PipelineStageError
+from video_evaluator import RunningEvaluation, VideoEvaluator
+
+class TestStreamingPipeline(unittest.TestCase):
+    def setUp(self):
+        self.calls = []
+
+    def route(self, batch):
+        return [i for i, text in enumerate(batch.texts) if text.startswith('ru:')]
+
+    def translate(self, batch, indices):
+        texts = batch.select_texts(indices)
+        self.calls.append(('translate', texts))
+        batch.set_translations(indices, [text[3:] for text in texts])
+        return batch
+
+    def analyze(self, batch):
+        texts = batch.model_texts()
+        self.calls.append(('analyze', texts))
+        batch.set_sentiments([{'stars': 5 if 'good' in text else 1, 'score': 0.9} for text in texts])
+        return batch
+
+    def test_batches_flow_through_stages(self):
+        """Тест поочерёдного прохождения порций через все этапы."""
+        comments = CommentBatch(['good', 'ru:good', 'bad'], [10, 5, 1])
+        stream = stream_analysis(comments, self.route, self.translate, self.analyze, batch_size=2)
+
+        first = next(stream)
+        self.assertEqual(first.stars.tolist(), [5, 5])
+        self.assertEqual(first.translated[1], 'good')
+        # Вторая порция ещё не обработана
+        self.assertEqual(len(self.calls), 2)
+
+        rest = list(stream)
+        self.assertEqual(len(rest), 1)
+        # Порции — срезы исходного набора, результаты видны в нём
+        self.assertEqual(comments.stars.tolist(), [5, 5, 1])
+        self.assertEqual(comments.to_comments()[1]['translated_text'], 'good')
+
+    def test_running_evaluation_matches_evaluator(self):
+        """Тест совпадения накопительной оценки с итоговой."""
+        comments = [{'stars': s, 'likeCount': l} for s, l in [(5, 10), (3, 5), (1, 10), (4, 0)]]
+        running = RunningEvaluation()
+        running.add(comments[:2])
+        running.add(comments[2:])
+        evaluation = VideoEvaluator().evaluate(comments)
+        self.assertEqual(running.result(), {key: evaluation[key] for key in ('video_relevance', 'verdict')})
+
+    def test_running_evaluation_of_batches(self):
+        """Тест накопительной оценки по столбцовым порциям."""
+        comments = CommentBatch(['a', 'b', 'c', 'd'], [10, 5, 10, 0])
+        comments.stars[:] = [5, 3, 1, 4]
+        running = RunningEvaluation()
+        running.add(comments[:2])
+        running.add(comments[2:])
+        self.assertEqual(running.count, 4)
+        evaluation = VideoEvaluator().evaluate_batch(comments)
+        self.assertEqual(running.result()['video_relevance'], evaluation['video_relevance'])
+
+    def test_stage_error(self):
+        """Тест ошибки этапа перевода."""
+        stream = stream_analysis(CommentBatch(['ru:x']), self.route, lambda batch, indices: None, self.analyze)
+        with self.assertRaises(PipelineStageError) as context:
+            next(stream)
+        self.assertEqual(context.exception.stage, 'translation')
+
+if __name__ == '__main__':
+    unittest.main()
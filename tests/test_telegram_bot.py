@@ -0,0 +1,286 @@
+import asyncio
+import types
+import unittest
+from comment_batch import CommentBatch
+from telegram_bot import TelegramBot
+from adaptive_sampler import AdaptiveSampler
+from video_evaluator import VideoEvaluator
+
+
+class FakeTranslator:
+    model_name = 'fake-translator'
+
+    def translate_batch(self, batch, indices=None):
+        batch.set_translations(indices, [f'en:{text}' for text in batch.select_texts(indices)])
+        return batch
+
+
+class FakeSentimentAnalyzer:
+    model_name = 'fake-sentiment'
+    multilingual = True
+
+    def analyze_batch(self, batch):
+        batch.set_sentiments([{'stars': 5, 'score': 0.9} for _ in range(len(batch))])
+        return batch
+
+
+class FakeYouTubeService:
+    """Асинхронный сервис комментариев, отдающий результат по сигналу."""
+
+    def __init__(self):
+        self.calls = 0
+        self.release = asyncio.Event()
+
+    async def get_comment_batch(self, video_id, max_results=20):
+        self.calls += 1
+        await self.release.wait()
+        return CommentBatch([f'great video {i}' for i in range(12)], list(range(12)))
+
+    async def iter_comment_pages(self, video_id, max_quota_units=50):
+        for page in range(10):
+            self.calls += 1
+            yield [{'text': f'comment {page}.{i}', 'likeCount': 1000 - page * 100 - i} for i in range(100)]
+
+
+class FakeBot(TelegramBot):
+    def _create_translator(self):
+        return FakeTranslator()
+
+    def _create_sentiment_analyzer(self):
+        return FakeSentimentAnalyzer()
+
+
+class FakeMessage:
+    """Сообщение Telegram, записывающее ответы и правки в общую переписку чата."""
+
+    def __init__(self, chat, text=''):
+        self.chat = chat
+        self.text = text
+
+    async def reply_text(self, text):
+        self.chat.append(('reply', text))
+        return FakeMessage(self.chat, text)
+
+    async def edit_text(self, text):
+        self.chat.append(('edit', text))
+        return FakeMessage(self.chat, text)
+
+
+def make_update(user_id, text, chat):
+    update = types.SimpleNamespace(message=FakeMessage(chat, text))
+    update.effective_user = types.SimpleNamespace(id=user_id)
+    update.effective_chat = types.SimpleNamespace(id=user_id)
+    return update
+
+
+class TestRequestCoalescing(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.youtube = FakeYouTubeService()
+        self.bot = FakeBot('token', None, youtube_service=self.youtube, warm_up=False)
+
+    async def asyncTearDown(self):
+        self.bot.worker_pool.shutdown()
+
+    async def test_identical_requests_share_one_analysis(self):
+        """Тест одного анализа для одновременных запросов видео из разных чатов."""
+        chats = [[] for _ in range(3)]
+        url = 'https://youtu.be/dQw4w9WgXcQ'
+        first = asyncio.create_task(self.bot.handle_message(make_update(1, url, chats[0]), None))
+        await asyncio.sleep(0.05)
+        late = [
+            asyncio.create_task(self.bot.handle_message(make_update(user_id, url, chats[user_id - 1]), None))
+            for user_id in (2, 3)
+        ]
+        await asyncio.sleep(0.05)
+
+        self.youtube.release.set()
+        await asyncio.wait_for(asyncio.gather(first, *late), 5)
+
+        self.assertEqual(self.youtube.calls, 1)
+        for chat in chats:
+            self.assertTrue(chat[-1][1].startswith('Анализ завершён!'))
+            # Каждый чат видит ход анализа в своём статусном сообщении
+            self.assertIn(('edit', 'Получено комментариев: 12. Анализирую...'), chat)
+        self.assertEqual(chats[1][0], ('reply', 'Это видео уже анализируется, результат придёт сюда же...'))
+        self.assertEqual(chats[1][1], ('reply', 'Получаю комментарии, пожалуйста, подождите...'))
+
+    async def test_analysis_cancelled_when_everyone_leaves(self):
+        """Тест отмены анализа, когда все ожидающие запросы отменены."""
+        url = 'https://youtu.be/dQw4w9WgXcQ'
+        tasks = [
+            asyncio.create_task(self.bot.handle_message(make_update(user_id, url, []), None))
+            for user_id in (1, 2)
+        ]
+        await asyncio.sleep(0.05)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await asyncio.sleep(0)
+
+        flights = self.bot.result_cache.flights
+        self.assertEqual(flights.counters['cancelled'], 1)
+        self.assertEqual(self.bot.worker_pool.active_jobs, 0)
+
+
+
+class TestAdaptiveAnalysis(unittest.IsolatedAsyncioTestCase):
+    async def test_stops_early(self):
+        """Тест досрочной остановки адаптивного анализа и количества оценённых комментариев."""
+        youtube = FakeYouTubeService()
+        bot = FakeBot(
+            'token', None, youtube_service=youtube, warm_up=False,
+            adaptive_sampler=AdaptiveSampler(tolerance=2.0, batch_size=20, min_comments=40)
+        )
+        chat = []
+        try:
+            await asyncio.wait_for(bot.handle_message(make_update(1, 'https://youtu.be/dQw4w9WgXcQ', chat), None), 5)
+        finally:
+            bot.worker_pool.shutdown()
+
+        # Все комментарии на 5 звёзд: хватает минимальной выборки и первой страницы
+        self.assertEqual(youtube.calls, 1)
+        self.assertIn(('edit', 'Проанализировано 40 из 100 полученных комментариев.\n'
+                               'Предварительная релевантность: 100% (±0)'), chat)
+        self.assertTrue(chat[-1][1].endswith('Оценено комментариев: 40 (точность достигнута досрочно)'))
+
+
+class CountingSentimentAnalyzer(FakeSentimentAnalyzer):
+    """Ставит одну звезду комментариям со словом 'bad' и записывает размеры вызовов модели."""
+
+    def __init__(self):
+        self.calls = []
+
+    def analyze_batch(self, batch):
+        self.calls.append(len(batch))
+        batch.set_sentiments([{'stars': 1 if 'bad' in text else 5, 'score': 0.9} for text in batch.model_texts()])
+        return batch
+
+
+class CountingBot(FakeBot):
+    def _create_sentiment_analyzer(self):
+        return CountingSentimentAnalyzer()
+
+
+class MultiVideoYouTubeService:
+    """Асинхронный сервис комментариев с несколькими видео и плейлистом из них."""
+
+    def __init__(self, videos):
+        self.videos = videos
+        self.requested = []
+
+    async def get_comment_batch(self, video_id, max_results=20):
+        self.requested.append(video_id)
+        await asyncio.sleep(0.01)
+        texts = self.videos.get(video_id, [])
+        return CommentBatch(texts, [1] * len(texts))
+
+    async def get_playlist_video_ids(self, playlist_id, max_results=50):
+        return list(self.videos)[:max_results]
+
+
+class TestMultiVideoAnalysis(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.youtube = MultiVideoYouTubeService({
+            'badvideo001': [f'bad video {i}' for i in range(8)],
+            'goodvideo01': [f'good video {i}' for i in range(10)],
+            'mixedvideo1': [f'{"bad" if i % 2 else "good"} part {i}' for i in range(12)],
+            'emptyvideo1': [],
+        })
+        self.bot = CountingBot('token', None, youtube_service=self.youtube, warm_up=False)
+
+    async def asyncTearDown(self):
+        self.bot.worker_pool.shutdown()
+
+    async def test_ranked_comparison_with_shared_batches(self):
+        """Тест общей порции моделей для нескольких видео и таблицы по убыванию релевантности."""
+        chat = []
+        text = ' '.join(f'https://youtu.be/{video_id}' for video_id in self.youtube.videos)
+        await asyncio.wait_for(self.bot.handle_message(make_update(1, text, chat), None), 5)
+
+        # 30 комментариев трёх видео — один вызов модели вместо отдельного на каждое видео
+        self.assertEqual(self.bot.sentiment_analyzer.calls, [30])
+        self.assertIn(('edit', 'Получено комментариев: 30 к 3 видео. Анализирую...'), chat)
+        lines = chat[-1][1].splitlines()
+        self.assertEqual(lines[0], 'Сравнение видео по релевантности:')
+        self.assertTrue(lines[2].startswith('1. youtu.be/goodvideo01 — 100% (Высокая релевантность)'))
+        self.assertTrue(lines[3].startswith('2. youtu.be/mixedvideo1 — 60% (Релевантное)'))
+        self.assertTrue(lines[4].startswith('3. youtu.be/badvideo001 — 20% (Низкая релевантность)'))
+        self.assertTrue(lines[4].endswith('комментариев: 8'))
+        self.assertEqual(lines[-2:], ['Не оценены:', 'youtu.be/emptyvideo1 — комментарии не найдены'])
+
+        # Результаты сохранены по каждому видео: одиночный запрос не загружает комментарии повторно
+        await self.bot.handle_message(make_update(1, 'https://youtu.be/mixedvideo1', chat), None)
+        self.assertEqual(len(self.youtube.requested), 4)
+        self.assertTrue(chat[-1][1].startswith('Анализ завершён!\n\nРелевантность видео: 60%'))
+
+    async def test_playlist_command(self):
+        """Тест сравнения видео плейлиста по команде /analyze с ограничением количества видео."""
+        self.bot.MAX_VIDEOS_PER_MESSAGE = 2
+        chat = []
+        context = types.SimpleNamespace(args=['PLrAXtmErZgOeiKm4sgNOknGvNjby9efdf'])
+        await asyncio.wait_for(self.bot.analyze(make_update(1, '/analyze', chat), context), 5)
+
+        self.assertEqual(chat[0], ('reply', 'Получаю список видео плейлиста...'))
+        self.assertEqual(sorted(self.youtube.requested), ['badvideo001', 'goodvideo01'])
+        lines = chat[-1][1].splitlines()
+        self.assertTrue(lines[2].startswith('1. youtu.be/goodvideo01'))
+        self.assertTrue(lines[3].startswith('2. youtu.be/badvideo001'))
+
+
+class StaticYouTubeService:
+    """Асинхронный сервис комментариев, возвращающий заданные тексты и лайки."""
+
+    def __init__(self, texts, likes):
+        self.texts = texts
+        self.likes = likes
+
+    async def get_comment_batch(self, video_id, max_results=20):
+        return CommentBatch(self.texts, self.likes)
+
+
+class TestStreamedAnalysis(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        # Негативные комментарии с большим числом лайков: линейное и логарифмическое взвешивание расходятся
+        texts = [f'{"bad" if i % 3 == 0 else "good"} comment {i}' for i in range(20)]
+        likes = [1000 if i % 3 == 0 else i for i in range(20)]
+        self.bot = CountingBot('token', None, youtube_service=StaticYouTubeService(texts, likes), warm_up=False)
+
+    async def asyncTearDown(self):
+        self.bot.worker_pool.shutdown()
+
+    async def analyze(self):
+        chat = []
+        await asyncio.wait_for(self.bot.handle_message(make_update(1, 'https://youtu.be/dQw4w9WgXcQ', chat), None), 5)
+        provisional = [text for kind, text in chat if 'Предварительная релевантность' in text]
+        cached = self.bot.result_cache.get(self.bot._cache_key('dQw4w9WgXcQ', self.bot._top_liked_mode()))
+        return provisional, cached['evaluation']
+
+    async def test_one_model_call_per_stage(self):
+        """Тест размера порции по умолчанию: все комментарии видео — один вызов модели."""
+        provisional, evaluation = await self.analyze()
+
+        self.assertEqual(self.bot.sentiment_analyzer.calls, [20])
+        self.assertEqual(provisional, [
+            f'Проанализировано 20 из 20 комментариев.\n'
+            f'Предварительная релевантность: {evaluation["video_relevance"]}%'
+        ])
+
+    async def test_provisional_uses_weighting_strategy(self):
+        """Тест предварительной оценки по настроенной стратегии взвешивания."""
+        self.bot.STREAM_BATCH_SIZE = 8
+        self.bot.video_evaluator = VideoEvaluator('log')
+
+        provisional, evaluation = await self.analyze()
+
+        self.assertEqual(self.bot.sentiment_analyzer.calls, [8, 8, 4])
+        self.assertEqual(len(provisional), 3)
+        # Последняя предварительная оценка совпадает с итоговой
+        self.assertTrue(provisional[-1].endswith(f'релевантность: {evaluation["video_relevance"]}%'))
+        linear = VideoEvaluator().evaluate([
+            {'stars': 1 if i % 3 == 0 else 5, 'likeCount': 1000 if i % 3 == 0 else i} for i in range(20)
+        ])
+        self.assertNotEqual(evaluation['video_relevance'], linear['video_relevance'])
+
+
+if __name__ == '__main__':
+    unittest.main()
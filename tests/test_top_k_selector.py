@@ -0,0 +1,34 @@
+import unittest
+from youtube_service import TopKSelector
+
+class TestTopKSelector(unittest.TestCase):
+    def test_top_k_by_likes(self):
+        """Тест отбора комментариев с наибольшим количеством лайков."""
+        selector = TopKSelector(3)
+        for i, likes in enumerate([5, 1, 9, 3, 7, 0]):
+            selector.add({'text': f'c{i}', 'likeCount': likes})
+        self.assertEqual([c['likeCount'] for c in selector.result()], [9, 7, 5])
+
+    def test_duplicates_removed(self):
+        """Тест удаления дубликатов: учитывается первый комментарий с данным текстом."""
+        selector = TopKSelector(5)
+        selector.add({'text': 'same', 'likeCount': 1})
+        self.assertFalse(selector.add({'text': 'same', 'likeCount': 100}))
+        self.assertEqual(selector.result(), [{'text': 'same', 'likeCount': 1}])
+
+    def test_ties_keep_earlier(self):
+        """Тест порядка комментариев с одинаковым количеством лайков."""
+        selector = TopKSelector(2)
+        for text in ('a', 'b', 'c'):
+            selector.add({'text': text, 'likeCount': 1})
+        self.assertEqual([c['text'] for c in selector.result()], ['a', 'b'])
+
+    def test_change_reporting(self):
+        """Тест признака изменения отбора."""
+        selector = TopKSelector(1)
+        self.assertTrue(selector.add({'text': 'a', 'likeCount': 5}))
+        self.assertFalse(selector.add({'text': 'b', 'likeCount': 2}))
+        self.assertTrue(selector.add({'text': 'c', 'likeCount': 6}))
+
+if __name__ == '__main__':
+    unittest.main()
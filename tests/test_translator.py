@@ -0,0 +1,76 @@
+import importlib.util
+import unittest
+from translator import Translator
+from stub_models import StubSeq2Seq, StubTokenizer
+
+
+def make_translator(max_length=512, max_batch_tokens=4096, max_batch_size=32, new_tokens_ratio=1.5,
+                    new_tokens_margin=10):
+    """Создаёт переводчик с заглушками токенизатора и модели без загрузки весов."""
+    translator = Translator.__new__(Translator)
+    translator.model_name = 'stub'
+    translator.max_length = max_length
+    translator.max_batch_tokens = max_batch_tokens
+    translator.max_batch_size = max_batch_size
+    translator.new_tokens_ratio = new_tokens_ratio
+    translator.new_tokens_margin = new_tokens_margin
+    translator.memo = None
+    translator.backend = 'transformers'
+    translator.num_beams = 1
+    translator.tokenizer = StubTokenizer()
+    translator.model = StubSeq2Seq()
+    return translator
+
+
+class TestTranslator(unittest.TestCase):
+    def test_max_new_tokens(self):
+        """Тест длины перевода: растёт с длиной входа и ограничена max_length."""
+        translator = make_translator(max_length=100)
+        self.assertEqual(translator._max_new_tokens(1), 11)
+        self.assertEqual(translator._max_new_tokens(20), 40)
+        self.assertEqual(translator._max_new_tokens(60), 100)
+        self.assertEqual(translator._max_new_tokens(100), 100)
+
+    def test_empty_texts_skip_model(self):
+        """Тест пустых текстов и текстов из пробелов: модель не вызывается."""
+        translator = make_translator()
+        self.assertEqual(translator.translate_with_model([]), [])
+        self.assertEqual(translator.translate_with_model(['', '   ', '\n']), ['', '', ''])
+        self.assertEqual(translator.model.calls, [])
+
+
+@unittest.skipUnless(importlib.util.find_spec('torch'), 'требуется PyTorch')
+class TestBatchedTranslation(unittest.TestCase):
+    def test_order_preserved_across_sorted_batches(self):
+        """Тест порядка переводов после группировки текстов по длине."""
+        translator = make_translator(max_batch_tokens=8, max_batch_size=3)
+        texts = ['a b c d', 'a', 'a b', 'a b c d e', 'a b c', 'b', 'c d']
+
+        self.assertEqual(translator.translate_with_model(texts), texts)
+        self.assertGreater(len(translator.model.calls), 1)
+        for call in translator.model.calls:
+            size, width = call['shape']
+            self.assertLessEqual(size, 3)
+            self.assertEqual(call['max_new_tokens'], translator._max_new_tokens(width))
+
+    def test_max_new_tokens_per_batch(self):
+        """Тест длины перевода по самому длинному тексту батча с учётом обрезки."""
+        translator = make_translator(max_length=4, max_batch_size=1)
+
+        translations = translator.translate_with_model(['a', 'a b c d e f'])
+
+        self.assertEqual(translations, ['a', 'a b c d'])
+        self.assertEqual([call['max_new_tokens'] for call in translator.model.calls], [4, 4])
+        self.assertEqual([call['shape'] for call in translator.model.calls], [(1, 1), (1, 4)])
+
+    def test_empty_texts_among_others(self):
+        """Тест пустых текстов среди обычных: в модель попадают только непустые."""
+        translator = make_translator()
+
+        translations = translator.translate_with_model(['', 'a b', '  ', 'c'])
+
+        self.assertEqual(translations, ['', 'a b', '', 'c'])
+        self.assertEqual([call['shape'] for call in translator.model.calls], [(2, 2)])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,5 +1,8 @@
 import unittest
-from video_evaluator import VideoEvaluator
+import numpy as np
+from video_evaluator import (
+    RunningEvaluation, VideoEvaluator, evaluate_arrays, register_weighting, WEIGHTING_STRATEGIES
+)
 
 class TestVideoEvaluator(unittest.TestCase):
     def setUp(self):
@@ -56,5 +59,49 @@ class TestVideoEvaluator(unittest.TestCase):
         self.assertEqual(result['video_relevance'], 0)
         self.assertEqual(result['verdict'], 'Не релевантное')
 
+    def test_statistics(self):
+        """Тест распределения, доверительного интервала и выбросов."""
+        comments = [{'stars': 5, 'likeCount': 0} for _ in range(10)] + [{'stars': 1, 'likeCount': 1000}]
+        result = self.evaluator.evaluate(comments)
+        self.assertEqual(result['counts'], {'1': 1, '2': 0, '3': 0, '4': 0, '5': 10})
+        self.assertAlmostEqual(sum(result['distribution'].values()), 1.0)
+        self.assertGreater(result['distribution']['1'], 0.9)
+        self.assertEqual(result['outliers'], 1)
+        low, high = result['confidence_interval']
+        self.assertLessEqual(low, result['mean_relevance'])
+        self.assertGreaterEqual(high, result['mean_relevance'])
+        self.assertLess(result['effective_count'], 2)
+
+    def test_weighting_strategies(self):
+        """Тест стратегий взвешивания."""
+        stars = np.array([5, 1])
+        likes = np.array([0, 100])
+        scores = np.array([1.0, 0.01])
+        linear = evaluate_arrays(stars, likes, scores, weighting='linear')
+        log = evaluate_arrays(stars, likes, scores, weighting='log')
+        confidence = evaluate_arrays(stars, likes, scores, weighting='confidence')
+        self.assertLess(linear['mean_relevance'], log['mean_relevance'])
+        self.assertLess(linear['mean_relevance'], confidence['mean_relevance'])
+        with self.assertRaises(ValueError):
+            evaluate_arrays(stars, likes, weighting='unknown')
+
+        register_weighting('uniform', lambda likes, scores: np.ones_like(likes))
+        try:
+            self.assertEqual(evaluate_arrays(stars, likes, weighting='uniform')['video_relevance'], 60)
+            self.assertEqual(VideoEvaluator('uniform').evaluate(
+                [{'stars': 5, 'likeCount': 0}, {'stars': 1, 'likeCount': 100}]
+            )['video_relevance'], 60)
+        finally:
+            del WEIGHTING_STRATEGIES['uniform']
+
+    def test_matches_running_evaluation(self):
+        """Тест совпадения векторизованной оценки с накопительной."""
+        rng = np.random.default_rng(0)
+        stars = rng.integers(1, 6, 1000)
+        likes = rng.integers(0, 500, 1000)
+        running = RunningEvaluation()
+        running.add([{'stars': int(s), 'likeCount': int(l)} for s, l in zip(stars, likes)])
+        self.assertEqual(evaluate_arrays(stars, likes)['video_relevance'], running.result()['video_relevance'])
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,119 @@
+import unittest
+import httpx
+from async_youtube_service import AsyncYouTubeService
+from comment_batch import CommentBatch
+from quota_manager import QuotaManager
+from video_evaluator import VideoEvaluator
+from video_state import VideoStateStore, IncrementalScorer
+from fake_youtube_api import FakeYouTubeAPI
+
+
+class FakeClock:
+    def __init__(self, now=0.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def day(n):
+    return f'2024-01-{n:02d}T00:00:00Z'
+
+
+class TestIncrementalScoring(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.api = FakeYouTubeAPI()
+        self.store = VideoStateStore()
+        self.clock = FakeClock()
+        self.scorer = IncrementalScorer(self.store, 'models-v1', max_state_age=100, clock=self.clock)
+        self.scored_texts = []
+
+    def tearDown(self):
+        self.store.close()
+
+    def make_service(self):
+        return AsyncYouTubeService(
+            'test_api_key', base_url='http://youtube.test/youtube/v3',
+            transport=httpx.MockTransport(self.api.handle_request),
+            quota_manager=QuotaManager(['test_api_key'], rate=10000, burst=10000)
+        )
+
+    def score(self, records):
+        """Оценивает тексты: 'good' — 5 звёзд, иначе 1."""
+        batch = CommentBatch.from_comments(records)
+        texts = batch.model_texts()
+        self.scored_texts.extend(texts)
+        batch.set_sentiments([{'stars': 5 if 'good' in text else 1, 'score': 0.9} for text in texts])
+        return batch
+
+    async def rescore(self, video_id, max_quota_units=10):
+        state = self.scorer.load(video_id)
+        async with self.make_service() as service:
+            records, stats = await service.get_comments_since(
+                video_id, state.watermark, max_quota_units=max_quota_units
+            )
+        self.scorer.advance(state, records, stats['stop_reason'])
+        changed = self.scorer.changed(state, records)
+        return self.scorer.apply(state, changed, self.score(changed)), stats
+
+    async def test_only_delta_is_scored(self):
+        """Тест оценки только новых и изменённых комментариев при повторном анализе."""
+        for i in range(150):
+            self.api.add_thread('video', f'good {i}', i % 7, published_at=day(1 + i % 10))
+        first, stats = await self.rescore('video')
+        self.assertEqual(first['count'], 150)
+        self.assertEqual(first['new_comments'], 150)
+        self.assertEqual(len(self.scored_texts), 150)
+
+        self.scored_texts.clear()
+        new_id = self.api.add_thread('video', 'bad new', 50, published_at=day(20))
+        self.api.edit(new_id.replace('-t150', '-t9'), 'bad edited', day(21))
+        second, stats = await self.rescore('video')
+
+        self.assertEqual(stats['stop_reason'], 'watermark')
+        self.assertEqual(sorted(self.scored_texts), ['bad edited', 'bad new'])
+        self.assertEqual(second['new_comments'], 1)
+        self.assertEqual(second['updated_comments'], 1)
+        self.assertEqual(second['count'], 151)
+
+        # Инкрементальная оценка совпадает с полной оценкой текущих комментариев
+        async with self.make_service() as service:
+            records, _ = await service.get_comments_since('video', max_results=1000)
+        full = VideoEvaluator().evaluate_batch(self.score(records))
+        self.assertEqual(second['video_relevance'], full['video_relevance'])
+
+    async def test_gap_after_budget_stop_is_scored(self):
+        """Тест неполной загрузки: отметка не сдвигается, пропущенные ветки оцениваются позже."""
+        self.api.add_thread('video', 'good old', 1, published_at=day(1))
+        await self.rescore('video')
+
+        for i in range(250):
+            self.api.add_thread('video', f'bad {i}', 0, published_at=f'2024-02-01T00:{i // 60:02d}:{i % 60:02d}Z')
+        partial, stats = await self.rescore('video', max_quota_units=1)
+        self.assertEqual(stats['stop_reason'], 'budget')
+        self.assertEqual(partial['new_comments'], 100)
+        self.assertEqual(self.scorer.load('video').watermark, day(1))
+
+        self.scored_texts.clear()
+        resumed, stats = await self.rescore('video')
+        self.assertEqual(stats['stop_reason'], 'watermark')
+        self.assertEqual(resumed['new_comments'], 150)
+        self.assertEqual(len(self.scored_texts), 150)
+        self.assertEqual(resumed['count'], 251)
+        self.assertEqual(self.scorer.load('video').watermark, '2024-02-01T00:04:09Z')
+
+    async def test_stale_state_is_rebuilt(self):
+        """Тест полного пересчёта устаревшего состояния и при смене моделей."""
+        self.api.add_thread('video', 'good', 1, published_at=day(1))
+        await self.rescore('video')
+        self.assertEqual(self.scorer.load('video').watermark, day(1))
+
+        self.clock.now = 200
+        self.assertIsNone(self.scorer.load('video').watermark)
+
+        await self.rescore('video')
+        other_models = IncrementalScorer(self.store, 'models-v2', clock=self.clock)
+        self.assertIsNone(other_models.load('video').watermark)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,89 @@
+import asyncio
+import tempfile
+import unittest
+from pathlib import Path
+from telegram import Bot
+from benchmarks.fake_telegram_server import FakeTelegramServer
+from comment_batch import CommentBatch
+from job_queue import SQLiteJobQueue
+from webhook import QueueWorker, WebhookIngress, update_payload
+from test_telegram_bot import FakeBot
+
+URL = 'https://youtu.be/dQw4w9WgXcQ'
+
+
+class FakeYouTubeService:
+    async def get_comment_batch(self, video_id, max_results=20):
+        return CommentBatch([f'great video {i}' for i in range(12)], list(range(12)))
+
+
+class TestUpdatePayload(unittest.TestCase):
+    def test_text_message(self):
+        """Тест извлечения данных задания из обновления."""
+        update = {'update_id': 7, 'message': {
+            'message_id': 3, 'text': URL, 'chat': {'id': 10, 'type': 'private'}, 'from': {'id': 11}
+        }}
+        self.assertEqual(update_payload(update), {
+            'update_id': 7, 'chat_id': 10, 'user_id': 11, 'message_id': 3, 'text': URL
+        })
+        self.assertIsNone(update_payload({'update_id': 8, 'message': {'chat': {'id': 10}, 'sticker': {}}}))
+
+
+class TestWebhookMode(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.queue = SQLiteJobQueue(Path(self.tmp.name) / 'jobs.sqlite3', retry_delay=0)
+        self.telegram_api = FakeTelegramServer().start()
+        self.ingress = WebhookIngress(self.queue, host='127.0.0.1', port=0, secret_token='secret').start()
+        self.bot = FakeBot('token', None, youtube_service=FakeYouTubeService(), warm_up=False)
+        self.telegram = Bot('token', base_url=self.telegram_api.base_url)
+        await self.telegram.initialize()
+        await self.telegram.set_webhook(self.ingress.url, secret_token='secret')
+
+    async def asyncTearDown(self):
+        await self.telegram.shutdown()
+        self.bot.worker_pool.shutdown()
+        self.ingress.stop()
+        self.telegram_api.stop()
+        self.queue.close()
+        self.tmp.cleanup()
+
+    def deliver(self, chat_id, text, **kwargs):
+        return self.telegram_api.send_update(chat_id, text, secret_token='secret', **kwargs)
+
+    async def test_end_to_end(self):
+        """Тест приёма обновлений вебхуком и выполнения заданий воркером."""
+        self.assertEqual(await asyncio.to_thread(self.deliver, 1, URL, update_id=100), 200)
+        # Повторная доставка того же обновления не создаёт второе задание
+        self.assertEqual(await asyncio.to_thread(self.deliver, 1, URL, update_id=100), 200)
+        self.assertEqual(await asyncio.to_thread(self.deliver, 2, '/start'), 200)
+        self.assertEqual(
+            await asyncio.to_thread(self.telegram_api.send_update, 3, URL, secret_token='wrong'), 403
+        )
+        self.assertEqual(self.ingress.counters, {'accepted': 2, 'duplicates': 1, 'ignored': 0, 'rejected': 1})
+
+        worker = QueueWorker(self.queue, self.bot, self.telegram, poll_interval=0.01)
+        await asyncio.wait_for(worker.run(max_jobs=2), 10)
+
+        chat = self.telegram_api.messages(1)
+        self.assertEqual(chat[0], ('sendMessage', 'Получаю комментарии, пожалуйста, подождите...'))
+        self.assertIn(('editMessageText', 'Получено комментариев: 12. Анализирую...'), chat)
+        self.assertTrue(chat[-1][1].startswith('Анализ завершён!'))
+        self.assertEqual(self.telegram_api.messages(2)[0][1], 'Привет! Отправьте мне ссылку на YouTube видео, и я проведу анализ.')
+        self.assertEqual(self.queue.stats()['done'], 2)
+
+    async def test_failed_job_retried(self):
+        """Тест повтора задания после ошибки Bot API."""
+        await asyncio.to_thread(self.deliver, 1, '/start')
+        self.telegram_api.failures = 1
+
+        worker = QueueWorker(self.queue, self.bot, self.telegram, poll_interval=0.01)
+        await asyncio.wait_for(worker.run(max_jobs=2), 10)
+
+        self.assertEqual(worker.counters, {'completed': 1, 'failed': 1})
+        self.assertEqual(len(self.telegram_api.messages(1)), 1)
+        self.assertEqual(self.queue.stats()['done'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,149 @@
+import asyncio
+import threading
+import unittest
+from worker_pool import WorkerPool, QueueFullError, UserLimitError
+
+class TestWorkerPool(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.pool = WorkerPool(max_workers=1, max_queue_size=2, max_jobs_per_user=1)
+
+    def tearDown(self):
+        self.pool.shutdown()
+
+    async def test_queue_positions(self):
+        """Тест позиций заданий в очереди."""
+        self.assertEqual(self.pool.admit('a'), 0)
+        self.assertEqual(self.pool.admit('b'), 1)
+        self.assertEqual(self.pool.admit('c'), 2)
+        self.assertEqual(self.pool.queue_depth, 2)
+
+    async def test_queue_full(self):
+        """Тест отказа при переполненной очереди."""
+        for user_id in ('a', 'b', 'c'):
+            self.pool.admit(user_id)
+        with self.assertRaises(QueueFullError):
+            self.pool.admit('d')
+
+    async def test_user_limit(self):
+        """Тест лимита одновременных заданий пользователя."""
+        self.pool.admit('a')
+        with self.assertRaises(UserLimitError):
+            self.pool.admit('a')
+
+    async def test_run_outside_event_loop_thread(self):
+        """Тест выполнения блокирующей функции в отдельном потоке."""
+        thread_name = await self.pool.run(lambda: threading.current_thread().name)
+        self.assertNotEqual(thread_name, threading.current_thread().name)
+
+    async def test_jobs_run_in_order(self):
+        """Тест очерёдности выполнения и уведомления о месте в очереди."""
+        order = []
+        notified = []
+        first_started = asyncio.Event()
+        release_first = asyncio.Event()
+
+        async def first():
+            self.pool.admit('a')
+            async with self.pool.slot('a'):
+                first_started.set()
+                await release_first.wait()
+                order.append('a')
+
+        async def second():
+            self.pool.admit('b')
+
+            async def on_wait():
+                notified.append('b')
+
+            async with self.pool.slot('b', on_wait=on_wait):
+                order.append('b')
+
+        task_a = asyncio.create_task(first())
+        await first_started.wait()
+        task_b = asyncio.create_task(second())
+        await asyncio.sleep(0)
+        self.assertEqual(notified, ['b'])
+        release_first.set()
+        await asyncio.gather(task_a, task_b)
+
+        self.assertEqual(order, ['a', 'b'])
+        self.assertEqual(self.pool.queue_depth, 0)
+        self.assertEqual(self.pool.active_jobs, 0)
+        self.assertEqual(self.pool.admit('a'), 0)
+
+    async def test_on_wait_error_frees_queue_place(self):
+        """Тест ошибки уведомления об ожидании: слот не теряется и достаётся следующему заданию."""
+        release_first = asyncio.Event()
+        order = []
+
+        async def first():
+            self.pool.admit('a')
+            async with self.pool.slot('a'):
+                await release_first.wait()
+                order.append('a')
+
+        async def failing_on_wait():
+            raise RuntimeError('уведомление не отправлено')
+
+        async def failing():
+            self.pool.admit('b')
+            async with self.pool.slot('b', on_wait=failing_on_wait):
+                order.append('b')
+
+        async def third():
+            self.pool.admit('c')
+            async with self.pool.slot('c'):
+                order.append('c')
+
+        task_a = asyncio.create_task(first())
+        await asyncio.sleep(0)
+        with self.assertRaises(RuntimeError):
+            await failing()
+        task_c = asyncio.create_task(third())
+        await asyncio.sleep(0)
+        release_first.set()
+        await asyncio.wait_for(asyncio.gather(task_a, task_c), timeout=1)
+
+        self.assertEqual(order, ['a', 'c'])
+        self.assertEqual(self.pool.active_jobs, 0)
+        self.assertEqual(self.pool.queue_depth, 0)
+
+    async def test_on_wait_error_after_slot_granted(self):
+        """Тест ошибки уведомления, когда слот уже передан заданию: слот переходит следующему."""
+        release_first = asyncio.Event()
+        order = []
+
+        async def first():
+            self.pool.admit('a')
+            async with self.pool.slot('a'):
+                await release_first.wait()
+
+        async def failing_on_wait():
+            # Слот освобождается, пока уведомление ещё отправляется
+            release_first.set()
+            await asyncio.sleep(0.01)
+            raise RuntimeError('уведомление не отправлено')
+
+        async def failing():
+            self.pool.admit('b')
+            async with self.pool.slot('b', on_wait=failing_on_wait):
+                order.append('b')
+
+        async def third():
+            self.pool.admit('c')
+            async with self.pool.slot('c'):
+                order.append('c')
+
+        task_a = asyncio.create_task(first())
+        await asyncio.sleep(0)
+        task_b = asyncio.create_task(failing())
+        await asyncio.sleep(0)
+        task_c = asyncio.create_task(third())
+        results = await asyncio.wait_for(asyncio.gather(task_a, task_b, task_c, return_exceptions=True), timeout=1)
+
+        self.assertIsInstance(results[1], RuntimeError)
+        self.assertEqual(order, ['c'])
+        self.assertEqual(self.pool.active_jobs, 0)
+
+if __name__ == '__main__':
+    unittest.main()
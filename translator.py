@@ -1,9 +1,13 @@
 import os
+import time
 import logging
-from transformers import pipeline, AutoTokenizer, AutoModelForSeq2SeqLM
+from transformers import AutoTokenizer
 from pathlib import Path
-from typing import List
+from typing import List, Optional
 from deep_translator import GoogleTranslator as DeepGoogleTranslator
+from batching import plan_batches
+from inference_backends import load_model, TRANSFORMERS
+from metrics import observe_model_batch
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.DEBUG)
@@ -14,24 +18,42 @@ class Translator:
     резервного переводчика на основе модели Hugging Face.
     """
 
-    def __init__(self, model_name='Helsinki-NLP/opus-mt-mul-en', cache_dir=None):
+    def __init__(self, model_name='Helsinki-NLP/opus-mt-mul-en', cache_dir=None, num_beams: Optional[int] = None,
+                 max_length=512, max_batch_tokens=4096, max_batch_size=32,
+                 new_tokens_ratio=1.5, new_tokens_margin=10, memo=None, backend=TRANSFORMERS, num_threads=None):
         """
         Инициализация переводчиков.
 
         :param model_name: Название модели на Hugging Face.
         :param cache_dir: Директория для кеширования модели.
+        :param num_beams: Количество лучей при декодировании; по умолчанию берётся из конфигурации модели.
+        :param max_length: Максимальная длина входного текста и перевода в токенах.
+        :param max_batch_tokens: Бюджет токенов на один батч с учётом паддинга.
+        :param max_batch_size: Максимальное количество текстов в батче.
+        :param new_tokens_ratio: Во сколько раз перевод может быть длиннее самого длинного текста батча.
+        :param new_tokens_margin: Запас токенов для очень коротких текстов.
+        :param memo: Кеш переводов по тексту комментария (CommentMemo).
+        :param backend: Бэкенд инференса: 'transformers', 'onnx' или 'onnx-int8'.
+        :param num_threads: Количество потоков на вызов модели (см. load_model); None — значение библиотеки.
         """
         if cache_dir is None:
             cache_dir = Path(__file__).parent / 'model_cache'
 
         os.makedirs(cache_dir, exist_ok=True)
 
-        # Загрузка токенизатора и модели с использованием cache_dir
-        tokenizer = AutoTokenizer.from_pretrained(model_name, cache_dir=cache_dir)
-        model = AutoModelForSeq2SeqLM.from_pretrained(model_name, cache_dir=cache_dir)
+        self.model_name = model_name
+        self.max_length = max_length
+        self.max_batch_tokens = max_batch_tokens
+        self.max_batch_size = max_batch_size
+        self.new_tokens_ratio = new_tokens_ratio
+        self.new_tokens_margin = new_tokens_margin
+        self.memo = memo
+        self.backend = backend
 
-        # Создание пайплайна перевода для резервного переводчика
-        self.model_translator = pipeline('translation', model=model, tokenizer=tokenizer)
+        # Загрузка токенизатора и модели с использованием cache_dir
+        self.tokenizer = AutoTokenizer.from_pretrained(model_name, cache_dir=cache_dir)
+        self.model = load_model('seq2seq', model_name, cache_dir, backend, num_threads)
+        self.num_beams = num_beams or self.model.generation_config.num_beams
 
         # Инициализация основного переводчика с использованием deep-translator
         self.deep_translator = DeepGoogleTranslator(source='auto', target='en')
@@ -40,26 +62,71 @@ class Translator:
         """
         Резервный метод перевода списка текстов на английский язык с использованием модели Hugging Face.
 
+        Тексты группируются по длине и декодируются батчами; максимальная длина
+        перевода рассчитывается по самому длинному тексту батча. Пустые тексты
+        и тексты из одних пробелов в модель не передаются и переводятся пустой строкой.
+
         :param texts: Список строк для перевода.
-        :return: Список переведённых текстов.
+        :return: Список переведённых текстов в исходном порядке.
         """
-        translations = []
-        for text in texts:
-            # Ограничение длины текста до 512 символов
-            translated = self.model_translator(text[:512], max_length=512)
-            translations.append(translated[0]['translation_text'])
+        translations = ['' for _ in texts]
+        indices = [i for i, text in enumerate(texts) if text.strip()]
+        if not indices:
+            return translations
+        # PyTorch импортируется при первом переводе, а не при запуске (как и загрузка модели)
+        import torch
+
+        encodings = self.tokenizer([texts[i] for i in indices], truncation=True, max_length=self.max_length)
+        lengths = [len(input_ids) for input_ids in encodings['input_ids']]
+
+        for batch in plan_batches(lengths, self.max_batch_tokens, self.max_batch_size):
+            started = time.perf_counter()
+            features = [{key: encodings[key][i] for key in encodings.keys()} for i in batch]
+            inputs = self.tokenizer.pad(features, return_tensors='pt')
+            max_new_tokens = self._max_new_tokens(max(lengths[i] for i in batch))
+
+            with torch.no_grad():
+                outputs = self.model.generate(**inputs, num_beams=self.num_beams, max_new_tokens=max_new_tokens)
+            decoded = self.tokenizer.batch_decode(outputs, skip_special_tokens=True)
+            observe_model_batch(
+                'translation', len(batch), sum(lengths[i] for i in batch), inputs['input_ids'].numel(),
+                time.perf_counter() - started
+            )
+
+            for i, translation in zip(batch, decoded):
+                translations[indices[i]] = translation
         return translations
 
+    def _max_new_tokens(self, input_length):
+        """Максимальное количество генерируемых токенов для батча с заданной длиной входа."""
+        return min(self.max_length, int(input_length * self.new_tokens_ratio) + self.new_tokens_margin)
+
     def translate(self, texts: List[str]) -> List[str]:
         """
         Переводит список текстов на английский язык, используя переводчик Hugging Face.
+        Если задан кеш переводов, модель получает только отсутствующие в нём тексты.
         """
         try:
+            if self.memo is not None:
+                return self.memo.memoize(f'translation:{self.model_name}:{self.backend}', texts, self.translate_with_model)
             return self.translate_with_model(texts)
         except Exception as e:
             logger.error(f"Ошибка при переводе с помощью резервного переводчика: {e}")
             raise e
 
+    def translate_batch(self, batch, indices=None):
+        """
+        Переводит комментарии набора и сохраняет переводы в его столбце translated.
+
+        :param batch: Набор комментариев (CommentBatch).
+        :param indices: Индексы комментариев для перевода (по умолчанию все).
+        :return: Тот же набор.
+        """
+        if indices is None:
+            indices = slice(None)
+        batch.set_translations(indices, self.translate(batch.select_texts(indices)))
+        return batch
+
     #РЕЗЕРВ
     def __translate(self, texts: List[str]) -> List[str]:
         """
@@ -1,17 +1,169 @@
-class VideoEvaluator:
+import numpy as np
+from comment_batch import CommentBatch
+
+
+def linear_weights(likes, scores):
+    """Вес комментария — количество лайков плюс один."""
+    return likes + 1.0
+
+
+def log_weights(likes, scores):
+    """Логарифмический вес: ослабляет влияние комментариев с очень большим числом лайков."""
+    return np.log1p(likes) + 1.0
+
+
+def confidence_weights(likes, scores):
+    """Вес по лайкам, умноженный на уверенность модели тональности."""
+    return (likes + 1.0) * scores
+
+
+WEIGHTING_STRATEGIES = {
+    'linear': linear_weights,
+    'log': log_weights,
+    'confidence': confidence_weights,
+}
+
+
+def register_weighting(name, func):
     """
-    Класс для оценки релевантности видео на основе комментариев.
+    Регистрирует стратегию взвешивания комментариев.
+
+    :param name: Название стратегии.
+    :param func: Функция (likes, scores) -> массив весов.
     """
+    WEIGHTING_STRATEGIES[name] = func
 
-    def evaluate(self, comments):
+
+def evaluate_arrays(stars, likes, scores=None, weighting='linear', z=1.96):
+    """
+    Векторизованная оценка релевантности по столбцам комментариев.
+
+    Помимо взвешенной релевантности возвращает распределение оценок,
+    доверительный интервал (нормальное приближение по эффективному числу
+    комментариев Киша) и количество комментариев с аномально большим весом
+    (выше Q3 + 1.5 * IQR).
+
+    :param stars: Массив оценок тональности от 1 до 5.
+    :param likes: Массив количества лайков.
+    :param scores: Массив уверенности модели (по умолчанию 1).
+    :param weighting: Название стратегии взвешивания из WEIGHTING_STRATEGIES.
+    :param z: Квантиль нормального распределения для доверительного интервала.
+    :return: Словарь с релевантностью, вердиктом и статистиками.
+    """
+    if weighting not in WEIGHTING_STRATEGIES:
+        raise ValueError(f"Неизвестная стратегия взвешивания: {weighting}")
+
+    stars = np.asarray(stars, dtype=np.float64)
+    likes = np.asarray(likes, dtype=np.float64)
+    scores = np.ones_like(stars) if scores is None else np.asarray(scores, dtype=np.float64)
+    count = len(stars)
+
+    weights = WEIGHTING_STRATEGIES[weighting](likes, scores) if count else stars
+    total_weight = float(weights.sum())
+    if count == 0 or total_weight <= 0:
+        return {
+            'video_relevance': 0,
+            'verdict': relevance_verdict(0),
+            'mean_relevance': 0.0,
+            'confidence_interval': [0.0, 0.0],
+            'distribution': {str(star): 0.0 for star in range(1, 6)},
+            'counts': {str(star): 0 for star in range(1, 6)},
+            'outliers': 0,
+            'count': count,
+            'effective_count': 0.0,
+        }
+
+    # Релевантность комментариев в процентах
+    relevance = (stars / 5) * 100
+    mean = float(np.dot(relevance, weights) / total_weight)
+
+    # Взвешенная дисперсия и эффективное число комментариев
+    variance = float(np.dot(weights, (relevance - mean) ** 2) / total_weight)
+    effective_count = total_weight ** 2 / float(np.dot(weights, weights))
+    margin = z * np.sqrt(variance / effective_count)
+
+    star_bins = np.clip(np.rint(stars).astype(np.int64), 1, 5)
+    weight_by_star = np.bincount(star_bins, weights=weights, minlength=6)[1:]
+    count_by_star = np.bincount(star_bins, minlength=6)[1:]
+
+    q1, q3 = np.percentile(weights, [25, 75])
+    outliers = int(np.count_nonzero(weights > q3 + 1.5 * (q3 - q1)))
+
+    # Округляем релевантность до целого числа
+    video_relevance = round(mean)
+    return {
+        'video_relevance': video_relevance,
+        'verdict': relevance_verdict(video_relevance),
+        'mean_relevance': mean,
+        'confidence_interval': [max(0.0, mean - margin), min(100.0, mean + margin)],
+        'distribution': {str(star): float(share) for star, share in zip(range(1, 6), weight_by_star / total_weight)},
+        'counts': {str(star): int(n) for star, n in zip(range(1, 6), count_by_star)},
+        'outliers': outliers,
+        'count': count,
+        'effective_count': effective_count,
+    }
+
+
+def relevance_verdict(video_relevance):
+    """
+    Определяет вердикт на основе пороговых значений релевантности.
+
+    :param video_relevance: Релевантность видео в процентах.
+    :return: Текстовый вердикт.
+    """
+    if video_relevance >= 80:
+        return 'Высокая релевантность'
+    elif video_relevance >= 60:
+        return 'Релевантное'
+    elif video_relevance >= 40:
+        return 'Средняя релевантность'
+    elif video_relevance >= 20:
+        return 'Низкая релевантность'
+    else:
+        return 'Не релевантное'
+
+
+def rank_videos(evaluations):
+    """
+    Упорядочивает видео по убыванию релевантности.
+
+    При равной релевантности выше видео с большей нижней границей
+    доверительного интервала, то есть оценённое увереннее.
+
+    :param evaluations: Словарь video_id -> оценка видео (см. evaluate_arrays).
+    :return: Список пар (video_id, оценка) от самого релевантного.
+    """
+    def rank_key(item):
+        evaluation = item[1]
+        # Результаты из кеша прежних версий могут не содержать интервала
+        interval = evaluation.get('confidence_interval') or [evaluation['video_relevance']] * 2
+        return evaluation['video_relevance'], interval[0]
+
+    return sorted(evaluations.items(), key=rank_key, reverse=True)
+
+
+class RunningEvaluation:
+    """
+    Накопительная оценка релевантности, обновляемая по мере обработки комментариев.
+    """
+
+    def __init__(self):
+        self.total_weighted_relevance = 0
+        self.total_weight = 0
+        self.count = 0
+
+    def add(self, comments):
         """
-        Вычисляет релевантность видео в процентах.
+        Учитывает очередную порцию комментариев.
 
-        :param comments: Список комментариев с метаданными, включая 'stars' и 'likeCount'.
-        :return: Словарь с релевантностью и вердиктом.
+        :param comments: Набор комментариев (CommentBatch) или список словарей с 'stars' и 'likeCount'.
         """
-        total_weighted_relevance = 0
-        total_weight = 0
+        if isinstance(comments, CommentBatch):
+            weights = comments.likes + 1
+            self.total_weighted_relevance += float(np.dot((comments.stars / 5) * 100, weights))
+            self.total_weight += int(weights.sum())
+            self.count += len(comments)
+            return
 
         for comment in comments:
             stars = comment['stars']
@@ -24,30 +176,76 @@ class VideoEvaluator:
             # Взвешенная релевантность
             weighted_relevance = relevance * like_weight
 
-            total_weighted_relevance += weighted_relevance
-            total_weight += like_weight
+            self.total_weighted_relevance += weighted_relevance
+            self.total_weight += like_weight
+            self.count += 1
 
-        if total_weight == 0:
+    def remove(self, comments):
+        """
+        Исключает ранее учтённые комментарии (например, изменённые после анализа).
+
+        :param comments: Набор комментариев (CommentBatch) или список словарей с 'stars' и 'likeCount'.
+        """
+        removed = RunningEvaluation()
+        removed.add(comments)
+        self.total_weighted_relevance -= removed.total_weighted_relevance
+        self.total_weight -= removed.total_weight
+        self.count -= removed.count
+
+    def result(self):
+        """
+        Возвращает текущую оценку.
+
+        :return: Словарь с релевантностью и вердиктом.
+        """
+        if self.total_weight == 0:
             video_relevance = 0
         else:
-            video_relevance = total_weighted_relevance / total_weight
+            video_relevance = self.total_weighted_relevance / self.total_weight
 
         # Округляем релевантность до целого числа
         video_relevance = round(video_relevance)
 
-        # Определяем вердикт на основе пороговых значений
-        if video_relevance >= 80:
-            verdict = 'Высокая релевантность'
-        elif video_relevance >= 60:
-            verdict = 'Релевантное'
-        elif video_relevance >= 40:
-            verdict = 'Средняя релевантность'
-        elif video_relevance >= 20:
-            verdict = 'Низкая релевантность'
-        else:
-            verdict = 'Не релевантное'
-
         return {
             'video_relevance': video_relevance,
-            'verdict': verdict
+            'verdict': relevance_verdict(video_relevance)
         }
+
+
+class VideoEvaluator:
+    """
+    Класс для оценки релевантности видео на основе комментариев.
+    """
+
+    def __init__(self, weighting='linear'):
+        """
+        :param weighting: Стратегия взвешивания комментариев: 'linear', 'log', 'confidence'
+            или зарегистрированная через register_weighting.
+        """
+        if weighting not in WEIGHTING_STRATEGIES:
+            raise ValueError(f"Неизвестная стратегия взвешивания: {weighting}")
+        self.weighting = weighting
+
+    def evaluate(self, comments):
+        """
+        Вычисляет релевантность видео в процентах.
+
+        :param comments: Список комментариев с метаданными, включая 'stars' и 'likeCount'
+            (и 'sentiment_score' для взвешивания по уверенности).
+        :return: Словарь с релевантностью, вердиктом и статистиками (см. evaluate_arrays).
+        """
+        return evaluate_arrays(
+            [comment['stars'] for comment in comments],
+            [comment['likeCount'] for comment in comments],
+            [comment.get('sentiment_score', 1.0) for comment in comments],
+            weighting=self.weighting
+        )
+
+    def evaluate_batch(self, batch):
+        """
+        Вычисляет релевантность видео по столбцовому набору комментариев.
+
+        :param batch: Набор проанализированных комментариев (CommentBatch).
+        :return: Словарь с релевантностью, вердиктом и статистиками (см. evaluate_arrays).
+        """
+        return evaluate_arrays(batch.stars, batch.likes, batch.scores, weighting=self.weighting)
@@ -0,0 +1,244 @@
+import logging
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from video_evaluator import RunningEvaluation
+
+logger = logging.getLogger(__name__)
+
+# Причины остановки загрузки, при которых просмотрены все ветки новее отметки
+COMPLETE_STOP_REASONS = ('watermark', 'exhausted')
+
+
+class VideoState:
+    """
+    Сохранённое состояние анализа видео.
+
+    Хранит оценку каждого учтённого комментария и накопленные суммы
+    взвешенной релевантности, поэтому новую оценку можно получить,
+    обработав только новые и изменённые комментарии.
+    """
+
+    __slots__ = ('video_id', 'model_key', 'watermark', 'evaluation', 'comments', 'created_at')
+
+    def __init__(self, video_id, model_key, created_at, watermark=None):
+        """
+        :param video_id: Идентификатор видео.
+        :param model_key: Модели, которыми получены оценки.
+        :param created_at: Время полного анализа видео.
+        :param watermark: Время публикации самой новой учтённой ветки комментариев.
+        """
+        self.video_id = video_id
+        self.model_key = model_key
+        self.watermark = watermark
+        self.evaluation = RunningEvaluation()
+        self.comments = {}  # comment_id -> (updatedAt, likeCount, stars, score)
+        self.created_at = created_at
+
+
+class VideoStateStore:
+    """
+    Хранилище состояний анализа видео в SQLite.
+
+    Для каждого видео хранятся отметка последней учтённой ветки, накопленные
+    суммы оценки и по каждому комментарию — время изменения и оценка тональности.
+    """
+
+    def __init__(self, path=None):
+        """
+        :param path: Путь к файлу SQLite; None — хранилище в памяти.
+        """
+        if path is None:
+            path = ':memory:'
+        else:
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(path), check_same_thread=False)
+        self._db.execute(
+            'CREATE TABLE IF NOT EXISTS videos ('
+            'video_id TEXT PRIMARY KEY, model_key TEXT NOT NULL, watermark TEXT, '
+            'total_weighted_relevance REAL NOT NULL, total_weight REAL NOT NULL, count INTEGER NOT NULL, '
+            'created_at REAL NOT NULL)'
+        )
+        self._db.execute(
+            'CREATE TABLE IF NOT EXISTS comments ('
+            'video_id TEXT NOT NULL, comment_id TEXT NOT NULL, updated_at TEXT, like_count INTEGER NOT NULL, '
+            'stars INTEGER NOT NULL, score REAL NOT NULL, PRIMARY KEY (video_id, comment_id)) WITHOUT ROWID'
+        )
+        self._db.commit()
+
+    def load(self, video_id):
+        """
+        Загружает состояние видео.
+
+        :param video_id: Идентификатор видео.
+        :return: VideoState или None, если видео ещё не анализировалось.
+        """
+        with self._lock:
+            row = self._db.execute(
+                'SELECT model_key, watermark, total_weighted_relevance, total_weight, count, created_at '
+                'FROM videos WHERE video_id = ?', (video_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            comments = self._db.execute(
+                'SELECT comment_id, updated_at, like_count, stars, score FROM comments WHERE video_id = ?',
+                (video_id,)
+            ).fetchall()
+
+        model_key, watermark, total_weighted_relevance, total_weight, count, created_at = row
+        state = VideoState(video_id, model_key, created_at, watermark)
+        state.evaluation.total_weighted_relevance = total_weighted_relevance
+        state.evaluation.total_weight = total_weight
+        state.evaluation.count = count
+        state.comments = {comment_id: tuple(values) for comment_id, *values in comments}
+        return state
+
+    def save(self, state, comment_ids):
+        """
+        Сохраняет состояние видео и изменившиеся комментарии.
+
+        :param state: Состояние видео (VideoState).
+        :param comment_ids: Идентификаторы новых и изменённых комментариев.
+        """
+        evaluation = state.evaluation
+        with self._lock:
+            self._db.execute(
+                'INSERT OR REPLACE INTO videos VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (state.video_id, state.model_key, state.watermark, evaluation.total_weighted_relevance,
+                 evaluation.total_weight, evaluation.count, state.created_at)
+            )
+            self._db.executemany(
+                'INSERT OR REPLACE INTO comments VALUES (?, ?, ?, ?, ?, ?)',
+                [(state.video_id, comment_id, *state.comments[comment_id]) for comment_id in comment_ids]
+            )
+            self._db.commit()
+
+    def delete(self, video_id):
+        """Удаляет состояние видео."""
+        with self._lock:
+            self._db.execute('DELETE FROM videos WHERE video_id = ?', (video_id,))
+            self._db.execute('DELETE FROM comments WHERE video_id = ?', (video_id,))
+            self._db.commit()
+
+    def close(self):
+        """Закрывает соединение с базой."""
+        with self._lock:
+            self._db.close()
+
+
+class IncrementalScorer:
+    """
+    Инкрементальная переоценка ранее проанализированных видео.
+
+    При повторном анализе загружаются только ветки, опубликованные после
+    отметки (плюс одна страница перекрытия, где видны правки), и через
+    перевод и анализ тональности проходят только новые и изменённые комментарии.
+    Накопленная оценка обновляется по формуле VideoEvaluator: вклад изменённых
+    комментариев вычитается, вклад новых оценок добавляется.
+
+    Правки старых комментариев за пределами перекрытия, удаления и изменения
+    количества лайков не видны, поэтому состояние старше max_state_age
+    пересчитывается полностью.
+
+    Если загрузка остановилась раньше отметки (бюджет квоты или лимит
+    комментариев), отметка не сдвигается: следующий анализ снова дойдёт до
+    неё, а уже оценённые комментарии пропустит, поэтому пропуск между
+    загруженными ветками и отметкой тоже будет оценён.
+    """
+
+    def __init__(self, store, model_key, max_state_age=7 * 86400, clock=time.time):
+        """
+        :param store: Хранилище состояний (VideoStateStore).
+        :param model_key: Модели, которыми получаются оценки; при их смене видео пересчитывается полностью.
+        :param max_state_age: Через сколько секунд после полного анализа видео пересчитывается заново.
+        :param clock: Функция текущего времени (для тестов).
+        """
+        self.store = store
+        self.model_key = model_key
+        self.max_state_age = max_state_age
+        self._clock = clock
+
+    def load(self, video_id):
+        """
+        Возвращает состояние видео для переоценки.
+
+        Устаревшее или полученное другими моделями состояние сбрасывается.
+
+        :param video_id: Идентификатор видео.
+        :return: VideoState (watermark None означает полный анализ).
+        """
+        state = self.store.load(video_id)
+        if state is not None and state.model_key == self.model_key \
+                and self._clock() - state.created_at < self.max_state_age:
+            return state
+        if state is not None:
+            logger.info(f"Состояние {video_id} устарело, видео будет проанализировано заново")
+            self.store.delete(video_id)
+        return VideoState(video_id, self.model_key, self._clock())
+
+    @staticmethod
+    def changed(state, records):
+        """
+        Отбирает новые и изменённые комментарии.
+
+        :param state: Состояние видео.
+        :param records: Записи комментариев с 'id' и 'updatedAt'.
+        :return: Список записей, которые нужно оценить.
+        """
+        changed = []
+        seen = set()
+        for record in records:
+            if record['id'] in seen:
+                continue
+            seen.add(record['id'])
+            known = state.comments.get(record['id'])
+            if known is None or known[0] != record['updatedAt']:
+                changed.append(record)
+        return changed
+
+    @staticmethod
+    def advance(state, records, stop_reason):
+        """
+        Сдвигает отметку к самой новой загруженной ветке, если загрузка дошла до прежней отметки.
+
+        :param state: Состояние видео.
+        :param records: Все загруженные записи комментариев.
+        :param stop_reason: Причина остановки загрузки (stats['stop_reason'] get_comments_since).
+        :return: True, если отметка сдвинута (загрузка полная).
+        """
+        if stop_reason not in COMPLETE_STOP_REASONS:
+            logger.info(f"Загрузка {state.video_id} неполная ({stop_reason}), отметка не сдвигается")
+            return False
+        for record in records:
+            if record['parentId'] is None and record['publishedAt'] \
+                    and (state.watermark is None or record['publishedAt'] > state.watermark):
+                state.watermark = record['publishedAt']
+        return True
+
+    def apply(self, state, records, batch):
+        """
+        Учитывает оценённые комментарии и сохраняет состояние вместе с отметкой (см. advance).
+
+        :param state: Состояние видео.
+        :param records: Новые и изменённые записи комментариев (результат changed).
+        :param batch: Набор тех же комментариев с оценками тональности (CommentBatch).
+        :return: Оценка видео со статистикой обновления.
+        """
+        previous = [
+            {'stars': state.comments[record['id']][2], 'likeCount': state.comments[record['id']][1]}
+            for record in records if record['id'] in state.comments
+        ]
+        state.evaluation.remove(previous)
+        state.evaluation.add(batch)
+
+        for record, stars, score in zip(records, batch.stars.tolist(), batch.scores.tolist()):
+            state.comments[record['id']] = (record['updatedAt'], record['likeCount'], stars, score)
+        self.store.save(state, [record['id'] for record in records])
+
+        result = state.evaluation.result()
+        result.update(count=state.evaluation.count, new_comments=len(records) - len(previous),
+                      updated_comments=len(previous))
+        return result
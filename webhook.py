@@ -0,0 +1,285 @@
+"""
+Режим вебхука: приём обновлений Telegram отдельно от анализа.
+
+Приёмник (WebhookIngress) только разбирает обновления и ставит задания
+в очередь (JobQueue), поэтому не загружает модели и отвечает Telegram сразу.
+Воркеры (QueueWorker) в отдельных процессах или на других машинах забирают
+задания, выполняют анализ обработчиками TelegramBot и отправляют ответы
+через Bot API.
+"""
+import asyncio
+import json
+import logging
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+from job_queue import make_worker_id
+
+logger = logging.getLogger(__name__)
+
+
+def update_payload(update):
+    """
+    Извлекает из обновления Telegram данные задания.
+
+    :param update: Обновление (словарь из JSON Bot API).
+    :return: Словарь с 'chat_id', 'user_id', 'message_id' и 'text' или None,
+             если обновление не содержит текстового сообщения.
+    """
+    message = update.get('message') or update.get('edited_message')
+    if not message or not isinstance(message.get('text'), str):
+        return None
+    return {
+        'update_id': update.get('update_id'),
+        'chat_id': message['chat']['id'],
+        'user_id': message.get('from', {}).get('id'),
+        'message_id': message.get('message_id'),
+        'text': message['text'],
+    }
+
+
+class WebhookIngress:
+    """
+    HTTP-приёмник вебхука Telegram.
+
+    Каждое обновление с текстовым сообщением становится заданием очереди с ключом
+    идемпотентности по update_id, поэтому повторная доставка обновления
+    Telegram не создаёт второе задание.
+    """
+
+    def __init__(self, queue, host='0.0.0.0', port=8443, path='/telegram', secret_token=None):
+        """
+        :param queue: Очередь заданий (JobQueue).
+        :param host: Адрес сервера.
+        :param port: Порт (0 — любой свободный).
+        :param path: Путь вебхука.
+        :param secret_token: Секрет из setWebhook; запросы без заголовка
+            X-Telegram-Bot-Api-Secret-Token с этим значением отклоняются.
+        """
+        self.queue = queue
+        self.path = path
+        self.secret_token = secret_token
+        self.counters = {'accepted': 0, 'duplicates': 0, 'ignored': 0, 'rejected': 0}
+        self._lock = threading.Lock()
+        ingress = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+                status = ingress.handle(self.path, self.headers.get('X-Telegram-Bot-Api-Secret-Token'), body)
+                self.send_response(status)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+
+    @property
+    def url(self):
+        """Локальный адрес вебхука."""
+        host, port = self._server.server_address[:2]
+        return f'http://{host}:{port}{self.path}'
+
+    def handle(self, path, secret_token, body):
+        """
+        Обрабатывает запрос вебхука.
+
+        :return: HTTP-статус ответа.
+        """
+        if path != self.path:
+            return 404
+        if self.secret_token is not None and secret_token != self.secret_token:
+            self._count('rejected')
+            return 403
+        try:
+            update = json.loads(body)
+        except ValueError:
+            self._count('rejected')
+            return 400
+
+        payload = update_payload(update)
+        if payload is None:
+            self._count('ignored')
+            return 200
+        job_id = self.queue.enqueue(payload, key=f"update:{update.get('update_id')}")
+        self._count('accepted' if job_id is not None else 'duplicates')
+        logger.debug(f"Обновление {update.get('update_id')} поставлено в очередь: задание {job_id}")
+        return 200
+
+    def _count(self, event):
+        with self._lock:
+            self.counters[event] += 1
+
+    def serve_forever(self):
+        """Обрабатывает запросы в текущем потоке до остановки."""
+        logger.info(f"Вебхук принимает обновления на {self.url}")
+        self._server.serve_forever()
+
+    def start(self):
+        """Запускает приёмник в фоновом потоке."""
+        threading.Thread(target=self.serve_forever, name='webhook-ingress', daemon=True).start()
+        return self
+
+    def stop(self):
+        """Останавливает приёмник."""
+        self._server.shutdown()
+        self._server.server_close()
+
+
+class QueuedMessage:
+    """
+    Сообщение чата для обработчиков TelegramBot в воркере очереди.
+
+    Повторяет используемую обработчиками часть telegram.Message
+    (text, reply_text, edit_text), отправляя ответы через Bot API.
+    """
+
+    def __init__(self, telegram, chat_id, text=None, message_id=None):
+        """
+        :param telegram: Клиент Bot API (telegram.Bot).
+        :param chat_id: Идентификатор чата.
+        :param text: Текст сообщения.
+        :param message_id: Идентификатор сообщения.
+        """
+        self.telegram = telegram
+        self.chat_id = chat_id
+        self.text = text
+        self.message_id = message_id
+
+    async def reply_text(self, text):
+        """Отправляет ответ в чат сообщения."""
+        sent = await self.telegram.send_message(self.chat_id, text)
+        return QueuedMessage(self.telegram, self.chat_id, text, sent.message_id)
+
+    async def edit_text(self, text):
+        """Изменяет текст сообщения."""
+        await self.telegram.edit_message_text(text, chat_id=self.chat_id, message_id=self.message_id)
+        return QueuedMessage(self.telegram, self.chat_id, text, self.message_id)
+
+
+def make_update(payload, telegram):
+    """
+    Формирует из данных задания объект обновления для обработчиков TelegramBot.
+
+    :param payload: Данные задания (см. update_payload).
+    :param telegram: Клиент Bot API (telegram.Bot).
+    :return: Объект с message, effective_user и effective_chat.
+    """
+    message = QueuedMessage(telegram, payload['chat_id'], payload['text'], payload.get('message_id'))
+    user = SimpleNamespace(id=payload['user_id']) if payload.get('user_id') is not None else None
+    return SimpleNamespace(message=message, effective_user=user, effective_chat=SimpleNamespace(id=payload['chat_id']))
+
+
+class QueueWorker:
+    """
+    Воркер, выполняющий задания очереди обработчиками TelegramBot.
+
+    Одновременно выполняется до concurrency заданий; аренда выполняемого
+    задания продлевается, пока оно не завершится. Исключение обработчика
+    (например, недоступность Bot API) возвращает задание в очередь на повтор.
+    """
+
+    def __init__(self, queue, bot, telegram, worker_id=None, concurrency=4, poll_interval=1.0,
+                 heartbeat_interval=None, retention=86400.0):
+        """
+        :param queue: Очередь заданий (JobQueue).
+        :param bot: Бот с обработчиками (TelegramBot).
+        :param telegram: Клиент Bot API для ответов (telegram.Bot).
+        :param worker_id: Идентификатор воркера (по умолчанию — хост, процесс и суффикс).
+        :param concurrency: Количество одновременно выполняемых заданий.
+        :param poll_interval: Пауза между опросами пустой очереди, секунд.
+        :param heartbeat_interval: Период продления аренды, секунд (по умолчанию треть visibility_timeout).
+        :param retention: Сколько хранить выполненные задания, секунд.
+        """
+        self.queue = queue
+        self.bot = bot
+        self.telegram = telegram
+        self.worker_id = worker_id or make_worker_id()
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self.heartbeat_interval = heartbeat_interval or getattr(queue, 'visibility_timeout', 300.0) / 3
+        self.retention = retention
+        self.counters = {'completed': 0, 'failed': 0}
+        self._stopping = None
+
+    def stop(self):
+        """Просит воркер завершиться после выполняемых заданий."""
+        if self._stopping is not None:
+            self._stopping.set()
+
+    async def run(self, max_jobs=None):
+        """
+        Забирает и выполняет задания до остановки.
+
+        :param max_jobs: Завершиться после стольких заданий (для тестов); None — без ограничения.
+        """
+        self._stopping = asyncio.Event()
+        slots = asyncio.Semaphore(self.concurrency)
+        tasks = set()
+        claimed = 0
+        logger.info(f"Воркер {self.worker_id} запущен")
+        try:
+            while not self._stopping.is_set() and (max_jobs is None or claimed < max_jobs):
+                await slots.acquire()
+                job = await asyncio.to_thread(self.queue.claim, self.worker_id)
+                if job is None:
+                    slots.release()
+                    await asyncio.to_thread(self.queue.purge, self.retention)
+                    try:
+                        await asyncio.wait_for(self._stopping.wait(), self.poll_interval)
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
+                claimed += 1
+                task = asyncio.create_task(self.process(job))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+                task.add_done_callback(lambda _: slots.release())
+        finally:
+            if tasks:
+                await asyncio.gather(*tasks, return_exceptions=True)
+            logger.info(f"Воркер {self.worker_id} остановлен: {self.counters}")
+
+    async def process(self, job):
+        """
+        Выполняет задание и подтверждает его или возвращает на повтор.
+
+        :param job: Задание (Job).
+        """
+        heartbeat = asyncio.create_task(self._heartbeat(job))
+        try:
+            await self.dispatch(make_update(job.payload, self.telegram))
+        except Exception as e:
+            self.counters['failed'] += 1
+            logger.error(f"Ошибка выполнения задания {job.id}: {e}")
+            await asyncio.to_thread(self.queue.fail, job, f'{type(e).__name__}: {e}')
+        else:
+            self.counters['completed'] += 1
+            await asyncio.to_thread(self.queue.complete, job)
+        finally:
+            heartbeat.cancel()
+
+    async def dispatch(self, update):
+        """Передаёт обновление обработчику бота по тексту сообщения."""
+        text = update.message.text
+        if text.startswith('/'):
+            command, _, argument = text[1:].partition(' ')
+            command = command.split('@', 1)[0]
+            if command == 'start':
+                await self.bot.start(update, None)
+            elif command == 'health':
+                await self.bot.health(update, None)
+            elif command == 'analyze':
+                await self.bot.analyze(update, SimpleNamespace(args=argument.split()))
+            return
+        await self.bot.handle_message(update, None)
+
+    async def _heartbeat(self, job):
+        """Продлевает аренду задания, пока оно выполняется."""
+        while True:
+            await asyncio.sleep(self.heartbeat_interval)
+            if not await asyncio.to_thread(self.queue.extend, job):
+                return
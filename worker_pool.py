@@ -0,0 +1,145 @@
+import asyncio
+import contextvars
+import logging
+from collections import deque, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from functools import partial
+
+logger = logging.getLogger(__name__)
+
+
+class QueueFullError(Exception):
+    """Очередь заданий на анализ переполнена."""
+
+
+class UserLimitError(Exception):
+    """Пользователь превысил лимит одновременно выполняемых заданий."""
+
+
+class WorkerPool:
+    """
+    Пул воркеров для выполнения блокирующих этапов анализа вне цикла событий.
+
+    Ограничивает число одновременно выполняемых заданий, число заданий одного
+    пользователя и глубину очереди ожидания. Сами этапы (запросы к YouTube API,
+    перевод, анализ тональности) выполняются в пуле потоков: модели загружены
+    в память процесса бота, а PyTorch освобождает GIL на время вычислений.
+    """
+
+    def __init__(self, max_workers=2, max_queue_size=10, max_jobs_per_user=1):
+        """
+        Инициализация пула.
+
+        :param max_workers: Максимальное количество одновременно выполняемых заданий.
+        :param max_queue_size: Максимальное количество заданий, ожидающих в очереди.
+        :param max_jobs_per_user: Максимальное количество заданий одного пользователя (в работе и в очереди).
+        """
+        self.max_workers = max_workers
+        self.max_queue_size = max_queue_size
+        self.max_jobs_per_user = max_jobs_per_user
+
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='analysis')
+        self._admitted = 0  # Задания в работе и в очереди
+        self._active = 0  # Задания, получившие слот
+        self._waiters = deque()
+        self._user_jobs = defaultdict(int)
+
+    @property
+    def active_jobs(self):
+        """Количество выполняемых заданий."""
+        return self._active
+
+    @property
+    def queue_depth(self):
+        """Количество заданий, ожидающих свободного слота."""
+        return max(0, self._admitted - self.max_workers)
+
+    def admit(self, user_id):
+        """
+        Регистрирует новое задание пользователя с проверкой лимитов.
+
+        :param user_id: Идентификатор пользователя (или чата).
+        :return: Позиция задания в очереди; 0, если есть свободный слот.
+        :raises UserLimitError: Если у пользователя уже максимум заданий.
+        :raises QueueFullError: Если очередь ожидания заполнена.
+        """
+        user_jobs = self._user_jobs.get(user_id, 0)
+        if user_jobs >= self.max_jobs_per_user:
+            raise UserLimitError(f"У пользователя {user_id} уже {user_jobs} заданий")
+        if self.queue_depth >= self.max_queue_size:
+            raise QueueFullError(f"Очередь заполнена: {self.queue_depth} заданий")
+
+        position = max(0, self._admitted - self.max_workers + 1)
+        self._admitted += 1
+        self._user_jobs[user_id] += 1
+        logger.debug(f"Задание пользователя {user_id} принято, позиция в очереди: {position}")
+        return position
+
+    @asynccontextmanager
+    async def slot(self, user_id, on_wait=None):
+        """
+        Ожидает свободный слот для ранее принятого задания и освобождает его по завершении.
+
+        :param user_id: Идентификатор пользователя, переданный в admit.
+        :param on_wait: Корутинная функция, вызываемая, если заданию придётся ждать в очереди.
+        """
+        try:
+            await self._acquire(on_wait)
+            try:
+                yield
+            finally:
+                self._release()
+        finally:
+            self._admitted -= 1
+            self._user_jobs[user_id] -= 1
+            if self._user_jobs[user_id] <= 0:
+                del self._user_jobs[user_id]
+
+    async def run(self, func, *args, **kwargs):
+        """
+        Выполняет блокирующую функцию в пуле потоков.
+
+        Функция выполняется в копии текущего контекста (contextvars), поэтому
+        спаны этапов, открытые в потоке пула, относятся к спану запроса.
+
+        :param func: Вызываемый объект.
+        :return: Результат func(*args, **kwargs).
+        """
+        loop = asyncio.get_running_loop()
+        context = contextvars.copy_context()
+        return await loop.run_in_executor(self._executor, partial(context.run, func, *args, **kwargs))
+
+    def shutdown(self, wait=True):
+        """Останавливает пул потоков."""
+        self._executor.shutdown(wait=wait)
+
+    async def _acquire(self, on_wait=None):
+        """Занимает слот, соблюдая порядок очереди."""
+        if self._active < self.max_workers and not self._waiters:
+            self._active += 1
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.append(future)
+        try:
+            if on_wait is not None:
+                await on_wait()
+            await future
+        except BaseException:
+            # Отмена или ошибка on_wait (например, при отправке уведомления о месте в очереди)
+            if future.done() and not future.cancelled():
+                # Слот уже был передан этому заданию — отдаём его следующему
+                self._release()
+            elif future in self._waiters:
+                self._waiters.remove(future)
+            raise
+
+    def _release(self):
+        """Передаёт слот следующему заданию в очереди или освобождает его."""
+        while self._waiters:
+            future = self._waiters.popleft()
+            if not future.done():
+                future.set_result(None)
+                return
+        self._active -= 1
@@ -0,0 +1,79 @@
+import re
+
+# Ссылки вида watch?v=ID, /shorts/ID, /embed/ID и youtu.be/ID
+VIDEO_URL_PATTERNS = [
+    re.compile(r'(?:v=|\/)([0-9A-Za-z_-]{11}).*'),
+    re.compile(r'youtu\.be\/([0-9A-Za-z_-]{11})'),
+]
+VIDEO_ID_PATTERN = re.compile(r'[0-9A-Za-z_-]{11}')
+# Ссылки на видео в свободном тексте: только известные формы, чтобы не принять за идентификатор слово из 11 букв
+VIDEO_LINK_PATTERN = re.compile(
+    r'(?:youtu\.be/|youtube\.com/(?:watch\?(?:[^\s#]*&)?v=|shorts/|embed/|live/))([0-9A-Za-z_-]{11})(?![0-9A-Za-z_-])'
+)
+# Ссылки на плейлист (параметр list=) и отдельные идентификаторы плейлистов
+PLAYLIST_LINK_PATTERN = re.compile(r'[?&]list=([0-9A-Za-z_-]{10,})')
+PLAYLIST_ID_PATTERN = re.compile(r'(?:PL|UU|LL|FL|OL)[0-9A-Za-z_-]{10,}')
+
+
+def extract_video_id(url):
+    """
+    Извлекает идентификатор видео из ссылки YouTube.
+
+    :param url: Ссылка на видео или текст, содержащий ссылку.
+    :return: Идентификатор видео или None.
+    """
+    for pattern in VIDEO_URL_PATTERNS:
+        match = pattern.search(url)
+        if match:
+            return match.group(1)
+    return None
+
+
+def extract_video_ids(text):
+    """
+    Извлекает идентификаторы всех видео, ссылки на которые есть в тексте.
+
+    :param text: Текст сообщения.
+    :return: Список идентификаторов без повторов в порядке появления.
+    """
+    return list(dict.fromkeys(VIDEO_LINK_PATTERN.findall(text)))
+
+
+def extract_playlist_id(text):
+    """
+    Извлекает идентификатор плейлиста из ссылки YouTube.
+
+    :param text: Ссылка на плейлист или текст, содержащий ссылку.
+    :return: Идентификатор плейлиста или None.
+    """
+    match = PLAYLIST_LINK_PATTERN.search(text)
+    return match.group(1) if match else None
+
+
+def parse_video_reference(reference):
+    """
+    Извлекает идентификатор видео из ссылки или принимает идентификатор как есть.
+
+    Отдельный идентификатор принимается только если строка целиком им является,
+    поэтому функция подходит для списков видео, но не для свободного текста.
+
+    :param reference: Ссылка на видео или идентификатор.
+    :return: Идентификатор видео или None.
+    """
+    reference = reference.strip()
+    if VIDEO_ID_PATTERN.fullmatch(reference):
+        return reference
+    return extract_video_id(reference)
+
+
+def parse_playlist_reference(reference):
+    """
+    Извлекает идентификатор плейлиста из ссылки или принимает идентификатор как есть.
+
+    :param reference: Ссылка на плейлист или идентификатор.
+    :return: Идентификатор плейлиста или None.
+    """
+    reference = reference.strip()
+    if PLAYLIST_ID_PATTERN.fullmatch(reference):
+        return reference
+    return extract_playlist_id(reference)
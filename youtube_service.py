@@ -1,80 +1,378 @@
+import heapq
+import itertools
+import logging
+import math
+import threading
+import time
 from googleapiclient.discovery import build
+from googleapiclient.errors import HttpError
+from googleapiclient.http import build_http
+from comment_batch import CommentBatch
+from quota_manager import QuotaManager, ApiError, parse_error_reason
+from metrics import observe_api_request
+
+logger = logging.getLogger(__name__)
+
+# Стоимость запросов в единицах квоты YouTube Data API
+QUOTA_COSTS = {
+    'commentThreads.list': 1,
+    'comments.list': 1,
+    'playlistItems.list': 1,
+}
+
+COMMENT_THREADS_PAGE_SIZE = 100  # Максимальное количество веток на странице commentThreads.list
+# Во сколько раз больше веток, чем возвращается комментариев, просматривается при отборе по умолчанию.
+# Комментарии приходят в порядке релевантности, а не лайков, поэтому почти каждая
+# страница меняет отбор и признак стабильности сам по себе загрузку не останавливает.
+SCAN_FACTOR = 2
+
+
+def default_quota_budget(max_results):
+    """
+    Бюджет квоты по умолчанию на страницы commentThreads при отборе лучших комментариев.
+
+    :param max_results: Количество возвращаемых комментариев.
+    :return: Количество страниц commentThreads, вмещающих SCAN_FACTOR * max_results веток, не меньше одной.
+    """
+    return max(1, math.ceil(SCAN_FACTOR * max_results / COMMENT_THREADS_PAGE_SIZE))
+
+
+def parse_comment(resource):
+    """
+    Преобразует ресурс комментария YouTube Data API в словарь комментария.
+
+    :param resource: Ресурс comment из ответа API.
+    :return: Словарь с текстом и количеством лайков.
+    """
+    snippet = resource['snippet']
+    return {
+        'text': snippet['textDisplay'],
+        'likeCount': snippet.get('likeCount', 0)
+    }
+
+
+def parse_thread(item):
+    """
+    Извлекает верхнеуровневый комментарий и вложенные ответы из ресурса commentThread.
+
+    :param item: Ресурс commentThread из ответа API.
+    :return: Список словарей комментариев: сначала верхнеуровневый, затем ответы.
+    """
+    comments = [parse_comment(item['snippet']['topLevelComment'])]
+    for reply in item.get('replies', {}).get('comments', []):
+        comments.append(parse_comment(reply))
+    return comments
+
+
+def parse_comment_record(resource):
+    """
+    Преобразует ресурс комментария в запись с идентификатором и временем изменения.
+
+    :param resource: Ресурс comment из ответа API.
+    :return: Словарь комментария с 'id', 'parentId', 'publishedAt' и 'updatedAt'.
+    """
+    snippet = resource['snippet']
+    return {
+        **parse_comment(resource),
+        'id': resource['id'],
+        'parentId': snippet.get('parentId'),
+        'publishedAt': snippet.get('publishedAt'),
+        'updatedAt': snippet.get('updatedAt', snippet.get('publishedAt')),
+    }
+
+
+class WatermarkCollector:
+    """
+    Сбор комментариев, опубликованных после отметки (watermark).
+
+    Страницы commentThreads с order='time' идут от новых веток к старым.
+    Сбор прекращается на странице, где встретилась ветка не новее отметки;
+    более старые ветки этой страницы тоже попадают в результат, что позволяет
+    заметить их правки.
+    """
+
+    def __init__(self, watermark=None, max_results=500):
+        """
+        :param watermark: Время публикации самой новой учтённой ветки (ISO 8601) или None.
+        :param max_results: Максимальное количество комментариев без отметки (первая загрузка).
+        """
+        self.watermark = watermark
+        self.max_results = max_results
+        self.records = []
+        self.reached_watermark = False
+
+    def add_page(self, items):
+        """
+        Учитывает страницу веток.
+
+        :return: True, если нужна следующая страница.
+        """
+        for item in items:
+            top = item['snippet']['topLevelComment']
+            if self.watermark is not None and top['snippet'].get('publishedAt', '') <= self.watermark:
+                self.reached_watermark = True
+            self.records.append(parse_comment_record(top))
+            for reply in item.get('replies', {}).get('comments', []):
+                self.records.append(parse_comment_record(reply))
+        if self.reached_watermark:
+            return False
+        # Без отметки загружается не больше max_results; с отметкой — все новые комментарии
+        return self.watermark is not None or len(self.records) < self.max_results
+
+
+class TopKSelector:
+    """
+    Отбор K комментариев с наибольшим количеством лайков без дубликатов.
+
+    Хранит кучу (min-heap) из K лучших комментариев, поэтому добавление стоит
+    O(log K) и не требует сортировки всего списка. Из комментариев с одинаковым
+    текстом учитывается первый; при равном количестве лайков выше тот,
+    что получен раньше.
+    """
+
+    def __init__(self, k):
+        """
+        :param k: Количество отбираемых комментариев.
+        """
+        self.k = k
+        self._heap = []
+        self._seen_texts = set()
+        self._order = itertools.count()
+
+    def __len__(self):
+        return len(self._heap)
+
+    def add(self, comment):
+        """
+        Добавляет комментарий.
+
+        :return: True, если набор лучших комментариев изменился.
+        """
+        if self.k <= 0 or comment['text'] in self._seen_texts:
+            return False
+        self._seen_texts.add(comment['text'])
+
+        entry = (comment['likeCount'], -next(self._order), comment)
+        if len(self._heap) < self.k:
+            heapq.heappush(self._heap, entry)
+            return True
+        if entry[:2] > self._heap[0][:2]:
+            heapq.heapreplace(self._heap, entry)
+            return True
+        return False
+
+    def result(self):
+        """Возвращает отобранные комментарии по убыванию лайков."""
+        return [comment for _, _, comment in sorted(self._heap, key=lambda entry: entry[:2], reverse=True)]
+
+
 class YouTubeService:
     """
     Класс для взаимодействия с YouTube Data API.
     """
 
-    def __init__(self, api_key):
+    def __init__(self, api_key, quota_manager=None, api_endpoint=None):
         """
         Инициализация клиента YouTube API.
 
         :param api_key: API ключ для доступа к YouTube Data API.
+        :param quota_manager: Менеджер квоты с пулом ключей (QuotaManager); по умолчанию — для одного api_key.
+        :param api_endpoint: Адрес сервера API (для бенчмарков — адрес локальной заглушки).
         """
-        self.youtube = build('youtube', 'v3', developerKey=api_key)
-        self.max_comments = 20
+        self.quota = quota_manager or QuotaManager([api_key])
+        client_options = {'api_endpoint': api_endpoint} if api_endpoint else None
+        # Ключ передаётся в каждом запросе, чтобы менеджер квоты мог переключать ключи
+        self.youtube = build('youtube', 'v3', http=build_http(), client_options=client_options)
+        # httplib2.Http не потокобезопасен, поэтому каждый поток пула воркеров использует свой экземпляр
+        self._local = threading.local()
 
-    def get_comments(self, video_id, max_results=100):
+    def _http(self):
+        """Возвращает HTTP-клиент текущего потока."""
+        http = getattr(self._local, 'http', None)
+        if http is None:
+            http = build_http()
+            self._local.http = http
+        return http
+
+    def get_comments(self, video_id, max_results=100, max_quota_units=None, stable_pages=1):
         """
         Получение комментариев к видео, включая вложенные комментарии, отсортированных по убыванию лайков.
 
         :param video_id: Идентификатор видео на YouTube.
-        :param max_results: Максимальное количество комментариев для возвращения после обработки.
+        :param max_results: Количество комментариев для возвращения после обработки.
+        :param max_quota_units: Бюджет единиц квоты API на вызов; по умолчанию — default_quota_budget(max_results).
+        :param stable_pages: Сколько страниц подряд не должны менять отбор, чтобы прекратить загрузку.
         :return: Список словарей с комментариями и их метаданными.
+        :raises QuotaExhaustedError: Если квота исчерпана на всех ключах.
+        """
+        comments, _ = self.get_comments_with_stats(video_id, max_results, max_quota_units, stable_pages)
+        return comments
+
+    def get_comment_batch(self, video_id, max_results=100, max_quota_units=None, stable_pages=1):
+        """
+        Получение комментариев к видео в столбцовом представлении.
+
+        :return: Набор комментариев (CommentBatch) по убыванию лайков.
         """
-        all_comments = []
-        comments_fetched = 0
-        total_comments_to_fetch = max_results * 2
+        comments, _ = self.get_comments_with_stats(video_id, max_results, max_quota_units, stable_pages)
+        return CommentBatch.from_comments(comments)
 
-        request = self.youtube.commentThreads().list(
-            part='snippet,replies',
-            videoId=video_id,
-            maxResults=100,
-            textFormat='plainText',
-            order='relevance'
-        )
+    def get_comments_with_stats(self, video_id, max_results=100, max_quota_units=None, stable_pages=1):
+        """
+        Получение комментариев вместе со статистикой загрузки.
+
+        Страницы загружаются до тех пор, пока отбор лучших по лайкам комментариев
+        не перестанет меняться, не закончатся комментарии или бюджет квоты.
+        При низком остатке дневной квоты объём загрузки сокращается.
 
-        while request and comments_fetched < total_comments_to_fetch:
-            response = request.execute()
+        :return: Пара (список комментариев, словарь статистики с потраченными единицами квоты).
+        """
+        if max_quota_units is None:
+            max_quota_units = default_quota_budget(max_results)
+        max_results, max_quota_units, degraded = self.quota.plan(max_results, max_quota_units)
+        selector = TopKSelector(max_results)
+        stats = {'pages': 0, 'quota_units': 0, 'comments_seen': 0, 'stop_reason': 'exhausted', 'degraded': degraded}
+        unchanged_pages = 0
+
+        params = {
+            'part': 'snippet,replies',
+            'videoId': video_id,
+            'maxResults': COMMENT_THREADS_PAGE_SIZE,
+            'textFormat': 'plainText',
+            'order': 'relevance'
+        }
+
+        while params:
+            if stats['quota_units'] + QUOTA_COSTS['commentThreads.list'] > max_quota_units:
+                stats['stop_reason'] = 'budget'
+                break
+
+            response = self._execute('commentThreads', params, video_id)
+            stats['pages'] += 1
+            stats['quota_units'] += QUOTA_COSTS['commentThreads.list']
+
+            changed = False
             for item in response.get('items', []):
-                # Верхнеуровневый комментарий
-                top_comment_snippet = item['snippet']['topLevelComment']['snippet']
-                comment_text = top_comment_snippet['textDisplay']
-                like_count = top_comment_snippet.get('likeCount', 0)
-                all_comments.append({
-                    'text': comment_text,
-                    'likeCount': like_count
-                })
-                comments_fetched += 1
-
-                # Вложенные комментарии
-                replies = item.get('replies', {}).get('comments', [])
-                for reply in replies:
-                    reply_snippet = reply['snippet']
-                    reply_text = reply_snippet['textDisplay']
-                    reply_like_count = reply_snippet.get('likeCount', 0)
-                    all_comments.append({
-                        'text': reply_text,
-                        'likeCount': reply_like_count
-                    })
-                    comments_fetched += 1
+                for comment in parse_thread(item):
+                    stats['comments_seen'] += 1
+                    changed = selector.add(comment) or changed
+
+            unchanged_pages = 0 if changed else unchanged_pages + 1
+            if len(selector) >= max_results and unchanged_pages >= stable_pages:
+                stats['stop_reason'] = 'stable'
+                break
 
             # Получение следующей страницы комментариев
-            request = self.youtube.commentThreads().list_next(request, response)
+            next_page_token = response.get('nextPageToken')
+            params = {**params, 'pageToken': next_page_token} if next_page_token else None
+
+        comments = selector.result()
+        stats['returned'] = len(comments)
+        logger.info(f"Комментарии к {video_id}: {stats}")
+        return comments, stats
+
+    def iter_comment_pages(self, video_id, max_quota_units=50):
+        """
+        Постраничное получение комментариев для адаптивной выборки.
+
+        Следующая страница запрашивается только когда потребитель генератора
+        её запросит, поэтому досрочная остановка выборки экономит квоту.
+
+        :param video_id: Идентификатор видео на YouTube.
+        :param max_quota_units: Бюджет единиц квоты API на видео.
+        :return: Генератор списков словарей комментариев (по странице commentThreads).
+        :raises QuotaExhaustedError: Если квота исчерпана на всех ключах.
+        """
+        _, max_quota_units, _ = self.quota.plan(0, max_quota_units)
+        params = {
+            'part': 'snippet,replies',
+            'videoId': video_id,
+            'maxResults': COMMENT_THREADS_PAGE_SIZE,
+            'textFormat': 'plainText',
+            'order': 'relevance'
+        }
+        quota_units = 0
+        while params and quota_units + QUOTA_COSTS['commentThreads.list'] <= max_quota_units:
+            response = self._execute('commentThreads', params, video_id)
+            quota_units += QUOTA_COSTS['commentThreads.list']
+            yield [comment for item in response.get('items', []) for comment in parse_thread(item)]
+
+            next_page_token = response.get('nextPageToken')
+            params = {**params, 'pageToken': next_page_token} if next_page_token else None
+
+    def get_playlist_video_ids(self, playlist_id, max_results=50):
+        """
+        Получение идентификаторов видео плейлиста в порядке плейлиста.
+
+        :param playlist_id: Идентификатор плейлиста.
+        :param max_results: Максимальное количество видео.
+        :return: Список идентификаторов видео.
+        :raises QuotaExhaustedError: Если квота исчерпана на всех ключах.
+        """
+        params = {'part': 'contentDetails', 'playlistId': playlist_id, 'maxResults': min(max_results, 50)}
+        video_ids = []
+        while params and len(video_ids) < max_results:
+            response = self._execute('playlistItems', params, None)
+            video_ids.extend(item['contentDetails']['videoId'] for item in response.get('items', []))
+
+            next_page_token = response.get('nextPageToken')
+            params = {**params, 'pageToken': next_page_token} if next_page_token else None
+        return video_ids[:max_results]
+
+    def get_comments_since(self, video_id, watermark=None, max_results=500, max_quota_units=10):
+        """
+        Получение комментариев, опубликованных после отметки, от новых к старым.
+
+        :param video_id: Идентификатор видео на YouTube.
+        :param watermark: Время публикации самой новой учтённой ветки или None для первой загрузки.
+        :param max_results: Максимальное количество комментариев при первой загрузке.
+        :param max_quota_units: Бюджет единиц квоты API на вызов.
+        :return: Пара (список записей комментариев с 'id' и 'updatedAt', словарь статистики).
+        """
+        collector = WatermarkCollector(watermark, max_results)
+        stats = {'pages': 0, 'quota_units': 0, 'stop_reason': 'exhausted'}
+        params = {
+            'part': 'snippet,replies',
+            'videoId': video_id,
+            'maxResults': COMMENT_THREADS_PAGE_SIZE,
+            'textFormat': 'plainText',
+            'order': 'time'
+        }
+
+        while params:
+            if stats['quota_units'] + QUOTA_COSTS['commentThreads.list'] > max_quota_units:
+                stats['stop_reason'] = 'budget'
+                break
+
+            response = self._execute('commentThreads', params, video_id)
+            stats['pages'] += 1
+            stats['quota_units'] += QUOTA_COSTS['commentThreads.list']
+
+            if not collector.add_page(response.get('items', [])):
+                stats['stop_reason'] = 'watermark' if collector.reached_watermark else 'limit'
+                break
 
-        # Удаление дубликатов
-        unique_comments = []
-        seen_texts = set()
-        for comment in all_comments:
-            text = comment['text']
-            if text not in seen_texts:
-                seen_texts.add(text)
-                unique_comments.append(comment)
+            next_page_token = response.get('nextPageToken')
+            params = {**params, 'pageToken': next_page_token} if next_page_token else None
 
-        # Сортировка по количеству лайков
-        unique_comments.sort(key=lambda x: x['likeCount'], reverse=True)
+        stats['returned'] = len(collector.records)
+        logger.info(f"Новые комментарии к {video_id}: {stats}")
+        return collector.records, stats
 
-        # Возврат первых max_results комментариев
-        #final_comments = unique_comments[:max_results]
-        final_comments = unique_comments[:self.max_comments]
+    def _execute(self, resource, params, video_id):
+        """Выполняет запрос к ресурсу API через менеджер квоты."""
+        def send(key):
+            request = getattr(self.youtube, resource)().list(**params, key=key)
+            started = time.perf_counter()
+            status = 'error'
+            try:
+                response = request.execute(http=self._http())
+                status = 200
+                return response
+            except HttpError as e:
+                status = e.resp.status
+                raise ApiError(e.resp.status, parse_error_reason(e.content), str(e)) from e
+            finally:
+                observe_api_request(resource, status, time.perf_counter() - started)
 
-        return final_comments
+        return self.quota.execute(send, QUOTA_COSTS[f'{resource}.list'], video_id)